@@ -11,7 +11,8 @@ from functools import partial
 import numpy as np
 
 from .GameBackend import GameBackNames, Keyboard, Event, InputMode
-from PyEngine3D.Common import logger, log_level, COMMAND, VIDEO_RESIZE_TIME
+from .JobScheduler import JobPriority
+from PyEngine3D.Common import logger, log_level, COMMAND, VIDEO_RESIZE_TIME, ResourceListSnapshot, AttributeSnapshot
 from PyEngine3D.Utilities import Singleton, GetClassName, Config, Profiler
 
 
@@ -29,6 +30,11 @@ class CoreManager(Singleton):
         self.uiCmdQueue = None
         self.cmdPipe = None
 
+        # what the editor has, only the differences are sent.
+        self.resource_list_snapshot = ResourceListSnapshot()
+        self.resource_attribute_snapshot = AttributeSnapshot()
+        self.object_attribute_snapshot = AttributeSnapshot()
+
         self.need_to_gc_collect = False
 
         self.is_basic_mode = False
@@ -37,12 +43,14 @@ class CoreManager(Singleton):
         self.fps = 0.0
         self.vsync = False
         self.limit_delta = 1.0 / 60.0  # 60fps
+        self.fixed_delta = 0.0  # deterministic delta time for headless runs. 0.0 is disabled.
         self.delta = 0.0
         self.update_time = 0.0
         self.logic_time = 0.0
         self.gpu_time = 0.0
         self.render_time = 0.0
         self.present_time = 0.0
+        self.gl_call_stats = dict(state_call_issued=0, state_call_skipped=0, uniform_call_issued=0, uniform_call_skipped=0)
         self.current_time = 0.0
         self.video_resize_time = 0.0
         self.video_resized = False
@@ -82,6 +90,7 @@ class CoreManager(Singleton):
         self.viewport_manager = None
         self.effect_manager = None
         self.project_manager = None
+        self.job_scheduler = None
         self.config = None
 
         self.last_game_backend = GameBackNames.PYGLET
@@ -92,7 +101,7 @@ class CoreManager(Singleton):
     def gc_collect(self):
         self.need_to_gc_collect = True
 
-    def initialize(self, cmdQueue, uiCmdQueue, cmdPipe, project_filename=""):
+    def initialize(self, cmdQueue, uiCmdQueue, cmdPipe, project_filename="", game_backend=""):
         # process start
         logger.info('Platform : %s' % platformModule.platform())
         logger.info("Process Start : %s" % GetClassName(self))
@@ -116,6 +125,7 @@ class CoreManager(Singleton):
         from .SceneManager import SceneManager
         from .SoundManager import SoundManager
         from .ProjectManager import ProjectManager
+        from .JobScheduler import JobScheduler
 
         self.opengl_context = OpenGLContext
         self.viewport_manager = ViewportManager.instance()
@@ -130,6 +140,7 @@ class CoreManager(Singleton):
         self.sound_manager = SoundManager.instance()
         self.effect_manager = EffectManager.instance()
         self.project_manager = ProjectManager.instance()
+        self.job_scheduler = JobScheduler.instance()
 
         # check invalid project
         if not self.project_manager.initialize(self, project_filename):
@@ -141,7 +152,9 @@ class CoreManager(Singleton):
         width, height = self.project_manager.config.Screen.size
         full_screen = self.project_manager.config.Screen.full_screen
 
-        if self.config.hasValue('Project', 'game_backend'):
+        if game_backend:
+            self.last_game_backend = game_backend
+        elif self.config.hasValue('Project', 'game_backend'):
             self.last_game_backend = self.config.getValue('Project', 'game_backend')
 
         self.last_game_backend = self.last_game_backend.lower()
@@ -156,32 +169,47 @@ class CoreManager(Singleton):
             self.game_backend = GameBackend_pyglet.PyGlet(self)
             self.last_game_backend = GameBackNames.PYGLET
 
-        for i in range(GameBackNames.COUNT):
-            if self.last_game_backend == GameBackNames.PYGAME:
-                try:
-                    run_pygame()
-                    break
-                except:
-                    logger.error(traceback.format_exc())
-                    logger.error("The pygame library does not exist and execution failed. Run again with the pyglet.")
-                    self.last_game_backend = GameBackNames.PYGLET
-            else:
-                try:
-                    run_pyglet()
-                    break
-                except:
-                    logger.error(traceback.format_exc())
-                    logger.error("The pyglet library does not exist and execution failed. Run again with the pygame.")
-                    self.last_game_backend = GameBackNames.PYGAME
+        def run_headless():
+            from .GameBackend import GameBackend_headless
+            self.game_backend = GameBackend_headless.Headless(self)
+            self.last_game_backend = GameBackNames.HEADLESS
+
+        if self.last_game_backend == GameBackNames.HEADLESS:
+            # headless never falls back to a window backend
+            try:
+                run_headless()
+            except:
+                logger.error(traceback.format_exc())
+                return False
         else:
-            logger.error('PyGame or PyGlet is required. Please run "pip install -r requirements.txt" and try again.')
-            # send a message to close ui
-            if self.uiCmdQueue:
-                self.uiCmdQueue.put(COMMAND.CLOSE_UI)
-            return False
+            for i in range(GameBackNames.COUNT):
+                if self.last_game_backend == GameBackNames.PYGAME:
+                    try:
+                        run_pygame()
+                        break
+                    except:
+                        logger.error(traceback.format_exc())
+                        logger.error("The pygame library does not exist and execution failed. Run again with the pyglet.")
+                        self.last_game_backend = GameBackNames.PYGLET
+                else:
+                    try:
+                        run_pyglet()
+                        break
+                    except:
+                        logger.error(traceback.format_exc())
+                        logger.error("The pyglet library does not exist and execution failed. Run again with the pygame.")
+                        self.last_game_backend = GameBackNames.PYGAME
+            else:
+                logger.error('PyGame or PyGlet is required. Please run "pip install -r requirements.txt" and try again.')
+                # send a message to close ui
+                if self.uiCmdQueue:
+                    self.uiCmdQueue.put(COMMAND.CLOSE_UI)
+                    self.uiCmdQueue.flush()
+                return False
 
         self.game_backend.create_window(width, height, full_screen)
         self.opengl_context.initialize()
+        self.gl_call_stats = self.opengl_context.get_gl_call_stats()
 
         if not self.opengl_context.check_gl_version():
             self.is_basic_mode = True
@@ -195,6 +223,8 @@ class CoreManager(Singleton):
             self.error('game_backend initializing failed')
 
         # initialize managers
+        self.job_scheduler.initialize(self)
+        self.resource_manager.enable_save = GameBackNames.HEADLESS != self.last_game_backend
         self.resource_manager.initialize(self, self.project_manager.project_dir)
         self.viewport_manager.initialize(self)
         if not self.is_basic_mode:
@@ -250,9 +280,10 @@ class CoreManager(Singleton):
         # send a message to close ui
         if self.uiCmdQueue:
             self.uiCmdQueue.put(COMMAND.CLOSE_UI)
+            self.uiCmdQueue.flush()
 
-        # write config
-        if self.valid:
+        # write config. headless runs must not change the user config.
+        if self.valid and self.last_game_backend != GameBackNames.HEADLESS:
             self.config.setValue("Project", "recent", self.project_manager.project_filename)
             self.config.setValue("Project", "game_backend", self.last_game_backend)
             self.config.save()  # save config
@@ -260,6 +291,7 @@ class CoreManager(Singleton):
         # save project
         self.sound_manager.clear()
         self.project_manager.close_project()
+        self.job_scheduler.close()
         self.renderer.close()
         self.resource_manager.close()
         self.sound_manager.close()
@@ -293,14 +325,53 @@ class CoreManager(Singleton):
         if self.cmdQueue:
             self.cmdQueue.put(*args)
 
-    def send_object_attribute(self, attribute):
-        self.send(COMMAND.TRANS_OBJECT_ATTRIBUTE, attribute)
+    def send_attribute(self, command, diff_command, attribute_snapshot, attribute, refresh):
+        if self.uiCmdQueue is None:
+            return
+
+        if refresh:
+            attribute_snapshot.reset(attribute)
+            self.send(command, attribute)
+        else:
+            changed_attributes = attribute_snapshot.make_diff(attribute)
+            if changed_attributes is None:
+                self.send(command, attribute)
+            elif changed_attributes:
+                self.send(diff_command, changed_attributes)
+
+    def send_object_attribute(self, attribute, refresh=False):
+        """
+        :param refresh: send the whole attributes, otherwise only the changed attributes since the last send.
+        """
+        self.send_attribute(COMMAND.TRANS_OBJECT_ATTRIBUTE,
+                            COMMAND.TRANS_OBJECT_ATTRIBUTE_DIFF,
+                            self.object_attribute_snapshot,
+                            attribute,
+                            refresh)
+
+    def send_resource_attribute(self, attribute, refresh=False):
+        self.send_attribute(COMMAND.TRANS_RESOURCE_ATTRIBUTE,
+                            COMMAND.TRANS_RESOURCE_ATTRIBUTE_DIFF,
+                            self.resource_attribute_snapshot,
+                            attribute,
+                            refresh)
 
     def send_resource_info(self, resource_info):
-        self.send(COMMAND.TRANS_RESOURCE_INFO, resource_info)
+        # coalesced until send_resource_list_diff
+        if self.uiCmdQueue:
+            self.resource_list_snapshot.set_resource_info(resource_info)
 
     def notify_delete_resource(self, resource_info):
-        self.send(COMMAND.DELETE_RESOURCE_INFO, resource_info)
+        if self.uiCmdQueue:
+            self.resource_list_snapshot.delete_resource_info(resource_info)
+
+    def send_resource_list(self):
+        self.send(COMMAND.TRANS_RESOURCE_LIST, self.resource_list_snapshot.get_snapshot())
+
+    def send_resource_list_diff(self):
+        diff = self.resource_list_snapshot.pop_diff()
+        if diff is not None:
+            self.send(COMMAND.TRANS_RESOURCE_LIST_DIFF, diff)
 
     def send_object_info(self, obj):
         object_name = obj.name if hasattr(obj, 'name') else str(obj)
@@ -409,16 +480,13 @@ class CoreManager(Singleton):
             self.resource_manager.delete_resource(resource_name, resource_type_name)
         self.commands[COMMAND.DELETE_RESOURCE.value] = cmd_delete_resource
 
-        def cmd_request_resource_list(value):
-            resourceList = self.resource_manager.get_resource_name_and_type_list()
-            self.send(COMMAND.TRANS_RESOURCE_LIST, resourceList)
-        self.commands[COMMAND.REQUEST_RESOURCE_LIST.value] = cmd_request_resource_list
+        self.commands[COMMAND.REQUEST_RESOURCE_LIST.value] = lambda value: self.send_resource_list()
 
         def cmd_request_resource_attribute(value):
             resource_name, resource_type_name = value
             attribute = self.resource_manager.get_resource_attribute(resource_name, resource_type_name)
             if attribute:
-                self.send(COMMAND.TRANS_RESOURCE_ATTRIBUTE, attribute)
+                self.send_resource_attribute(attribute, refresh=True)
         self.commands[COMMAND.REQUEST_RESOURCE_ATTRIBUTE.value] = cmd_request_resource_attribute
 
         def cmd_set_resource_attribute(value):
@@ -471,7 +539,7 @@ class CoreManager(Singleton):
             obj_name, obj_type_name = value
             attribute = self.scene_manager.get_object_attribute(obj_name, obj_type_name)
             if attribute:
-                self.send(COMMAND.TRANS_OBJECT_ATTRIBUTE, attribute)
+                self.send_object_attribute(attribute, refresh=True)
         self.commands[COMMAND.REQUEST_OBJECT_ATTRIBUTE.value] = cmd_request_object_attribute
 
         def cmd_set_object_attribute(value):
@@ -505,7 +573,7 @@ class CoreManager(Singleton):
             self.renderer.set_debug_texture(texture)
             if self.renderer.debug_texture is not None:
                 attribute = self.renderer.debug_texture.get_attribute()
-                self.send(COMMAND.TRANS_OBJECT_ATTRIBUTE, attribute)
+                self.send_object_attribute(attribute, refresh=True)
         self.commands[COMMAND.VIEW_RENDERTARGET.value] = cmd_view_rendertarget
 
         def cmd_view_texture(value):
@@ -513,7 +581,7 @@ class CoreManager(Singleton):
             self.renderer.set_debug_texture(texture)
             if texture is not None:
                 attribute = texture.get_attribute()
-                self.send(COMMAND.TRANS_OBJECT_ATTRIBUTE, attribute)
+                self.send_object_attribute(attribute, refresh=True)
         self.commands[COMMAND.VIEW_TEXTURE.value] = cmd_view_texture
 
         def cmd_view_material_instance(value):
@@ -521,7 +589,7 @@ class CoreManager(Singleton):
             if material_instance is not None and value == material_instance.name:
                 self.renderer.postprocess.set_render_material_instance(material_instance)
                 attribute = material_instance.get_attribute()
-                self.send(COMMAND.TRANS_OBJECT_ATTRIBUTE, attribute)
+                self.send_object_attribute(attribute, refresh=True)
         self.commands[COMMAND.VIEW_MATERIAL_INSTANCE.value] = cmd_view_material_instance
 
     def update_command(self):
@@ -533,6 +601,11 @@ class CoreManager(Singleton):
             cmd, value = self.cmdQueue.get()
             self.commands[cmd.value](value)
 
+        self.send_resource_list_diff()
+
+        # the messages to ui are batched, send them once per frame.
+        self.uiCmdQueue.flush()
+
     def get_window_size(self):
         return self.game_backend.width, self.game_backend.height
 
@@ -708,7 +781,9 @@ class CoreManager(Singleton):
         current_time = time.perf_counter()
         delta = current_time - self.current_time
 
-        if self.vsync and delta < self.limit_delta or delta == 0.0:
+        if 0.0 < self.fixed_delta:
+            delta = self.fixed_delta
+        elif self.vsync and delta < self.limit_delta or delta == 0.0:
             return
 
         self.acc_time += delta
@@ -759,7 +834,15 @@ class CoreManager(Singleton):
 
         if not self.video_resized:
             # render_light_probe scene
-            self.renderer.render_light_probe(self.scene_manager.main_light_probe)
+            light_probe = self.scene_manager.main_light_probe
+            if light_probe is not None and not light_probe.isRendered:
+                self.job_scheduler.submit("render_light_probe",
+                                          lambda: self.renderer.render_light_probe(self.scene_manager.main_light_probe),
+                                          priority=JobPriority.HIGH,
+                                          key="render_light_probe")
+
+            # the gl jobs, in the frame budget
+            self.job_scheduler.update()
 
             # render sceme
             self.renderer.render_scene()
@@ -774,6 +857,8 @@ class CoreManager(Singleton):
 
             # end of render scene
             self.opengl_context.present()
+            self.gl_call_stats = self.opengl_context.get_gl_call_stats()
+            self.opengl_context.reset_gl_call_stats()
 
             # swap buffer
             self.game_backend.flip()
@@ -820,18 +905,22 @@ class CoreManager(Singleton):
             render_count += len(self.scene_manager.static_solid_render_infos)
             render_count += len(self.scene_manager.static_translucent_render_infos)
             self.font_manager.log("Render Count : %d" % render_count)
+            self.font_manager.log("Instancing Saved Draw Calls : %d" % self.scene_manager.instance_draw_call_saved)
+            self.font_manager.log("Static Shadow Renders : %d" % self.renderer.static_shadow_render_count)
             self.font_manager.log("Point Lights : %d" % self.scene_manager.point_light_count)
+            self.font_manager.log("GL State : %(state_call_issued)d issued, %(state_call_skipped)d skipped" % self.gl_call_stats)
+            self.font_manager.log("Uniform : %(uniform_call_issued)d issued, %(uniform_call_skipped)d skipped" % self.gl_call_stats)
             self.font_manager.log("Effect Count : %d" % len(self.effect_manager.render_effects))
             self.font_manager.log("Particle Count : %d" % self.effect_manager.alive_particle_count)
+            self.font_manager.log("Picking : %.2f ms" % (self.scene_manager.object_picker.pick_time * 1000.0))
+            job_stats = self.job_scheduler.get_stats()
+            self.font_manager.log("Jobs : %(main_queue)d main, %(worker_queue)d worker, %(running_workers)d running, %(waiting)d waiting" % job_stats)
+            self.font_manager.log("Job Latency : wait %(wait_ms).2f ms (max %(max_wait_ms).2f ms), run %(run_ms).2f ms, frame %(frame_main_ms).2f ms" % job_stats)
 
             # selected object transform info
             selected_object = self.scene_manager.get_selected_object()
             if selected_object:
-                btn_left, btn_middle, btn_right = self.game_backend.get_mouse_pressed()
-                if InputMode.NONE == self.game_backend.get_input_mode():
-                    if btn_left:
-                        self.scene_manager.update_select_object_id()
-                elif InputMode.EDIT_OBJECT_TRANSFORM == self.game_backend.get_input_mode():
+                if InputMode.EDIT_OBJECT_TRANSFORM == self.game_backend.get_input_mode():
                     self.scene_manager.edit_selected_object_transform()
 
                 self.font_manager.log("Selected Object : %s" % selected_object.name)
@@ -0,0 +1,130 @@
+import math
+import time
+
+import numpy as np
+
+from PyEngine3D.Common import logger, NullGL, INITIAL_WIDTH, INITIAL_HEIGHT
+from .GameBackend import GameBackend, Keyboard
+
+
+def orbit_camera_script(radius=10.0, height=2.0, period=600):
+    """ returns a camera script that orbits the origin once every 'period' frames. """
+    def camera_script(frame_index, camera):
+        angle = (frame_index % period) * math.pi * 2.0 / period
+        camera.transform.set_pos([math.sin(angle) * radius, height, math.cos(angle) * radius])
+        camera.transform.set_rotation([0.0, angle, 0.0])
+    return camera_script
+
+
+class Headless(GameBackend):
+    """
+    Window less game backend for benchmarks and CI.
+    OpenGL calls are counted by NullGL instead of executed, the delta time is fixed and the camera is scripted,
+    so the same scene always produces the same frames.
+    """
+    frame_count = 600
+    fixed_delta = 1.0 / 60.0
+    random_seed = 0
+
+    def __init__(self, core_manager):
+        GameBackend.__init__(self, core_manager)
+
+        if not NullGL.is_installed():
+            raise BaseException("The headless game backend requires NullGL. Call NullGL.install() before importing OpenGL.")
+
+        logger.info('GameBackend : headless')
+
+        self.screen_width = INITIAL_WIDTH
+        self.screen_height = INITIAL_HEIGHT
+
+        self.frame_index = 0
+        self.camera_script = orbit_camera_script()
+        self.frame_stats = []
+
+        # there is no keyboard, the key codes of the shared Keyboard class are used as they are.
+        self.key_map = dict((symbol, key) for symbol, key in Keyboard.__dict__.items() if not symbol.startswith('__'))
+        for key in self.key_map.values():
+            self.key_pressed[key] = False
+
+        core_manager.fixed_delta = self.fixed_delta
+        np.random.seed(self.random_seed)
+
+        self.valid = True
+
+    def set_frame_count(self, frame_count):
+        self.frame_count = frame_count
+
+    def set_camera_script(self, camera_script):
+        """ camera_script(frame_index, camera) is called before every frame. """
+        self.camera_script = camera_script
+
+    def set_window_title(self, title):
+        pass
+
+    def set_mouse_visible(self, visible):
+        pass
+
+    def do_change_resolution(self):
+        pass
+
+    def update_event(self):
+        self.mouse_delta[0] = 0.0
+        self.mouse_delta[1] = 0.0
+        self.key_released.clear()
+
+        if self.camera_script is not None:
+            camera = self.core_manager.scene_manager.main_camera
+            if camera is not None:
+                self.camera_script(self.frame_index, camera)
+
+    def get_keyboard_pressed(self):
+        return self.key_pressed
+
+    def flip(self):
+        pass
+
+    def record_frame_stat(self, frame_time):
+        core_manager = self.core_manager
+        self.frame_stats.append(dict(
+            frame=self.frame_index,
+            frame_time=frame_time,
+            logic_time=core_manager.logic_time,
+            render_time=core_manager.render_time,
+            present_time=core_manager.present_time,
+            instance_draw_call_saved=core_manager.scene_manager.instance_draw_call_saved,
+            **core_manager.gl_call_stats
+        ))
+
+    def get_frame_stats_summary(self):
+        summary = dict(frame_count=len(self.frame_stats))
+        if self.frame_stats:
+            for key in self.frame_stats[0]:
+                if key != 'frame':
+                    values = [frame_stat[key] for frame_stat in self.frame_stats]
+                    summary[key] = dict(avg=sum(values) / len(values), min=min(values), max=max(values))
+        return summary
+
+    def run(self):
+        self.running = True
+        self.frame_index = 0
+        self.frame_stats = []
+        while self.running and self.frame_index < self.frame_count:
+            self.update_event()
+
+            start_time = time.perf_counter()
+            self.core_manager.update()
+            self.record_frame_stat((time.perf_counter() - start_time) * 1000.0)
+
+            self.frame_index += 1
+        self.running = False
+
+        summary = self.get_frame_stats_summary()
+        if 0 < summary['frame_count']:
+            logger.info("Headless : %d frames, %.3f ms/frame, %.1f draw calls, %.1f gl calls" % (
+                summary['frame_count'], summary['frame_time']['avg'], summary['draw_calls']['avg'], summary['gl_calls']['avg']))
+
+    def close(self):
+        self.running = False
+
+    def quit(self):
+        pass
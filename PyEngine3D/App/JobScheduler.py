@@ -0,0 +1,311 @@
+import heapq
+import os
+import queue
+import time
+import traceback
+import types
+from threading import Thread, Lock
+
+from PyEngine3D.Common import logger
+from PyEngine3D.Utilities import Singleton, GetClassName, AutoEnum
+
+
+class JobPriority:
+    LOW = 0
+    NORMAL = 1
+    HIGH = 2
+
+
+class JobState(AutoEnum):
+    WAITING = ()
+    READY = ()
+    RUNNING = ()
+    DONE = ()
+    FAILED = ()
+    CANCELED = ()
+    COUNT = ()
+
+
+class Job:
+    def __init__(self, name, func, args=(), kwargs=None, priority=JobPriority.NORMAL, main_thread=True, on_complete=None, key=None):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.priority = priority
+        self.main_thread = main_thread
+        self.on_complete = on_complete
+        self.key = key
+        self.state = JobState.WAITING
+        self.result = None
+        self.error = None
+        self.generator = None
+        self.dependents = []
+        self.waiting_count = 0
+        self.sequence = 0
+        self.submit_time = time.perf_counter()
+        self.start_time = 0.0
+        self.end_time = 0.0
+
+    def is_done(self):
+        return self.state in (JobState.DONE, JobState.FAILED, JobState.CANCELED)
+
+    def run(self):
+        """
+        :return: True when the job is finished. A function which returns a generator is a job of the steps,
+        the main thread runs a step at a time, so the job is split over the frames by the frame budget.
+        """
+        if self.generator is None:
+            self.start_time = time.perf_counter()
+            self.state = JobState.RUNNING
+            result = self.func(*self.args, **self.kwargs)
+            if not isinstance(result, types.GeneratorType):
+                self.result = result
+                return True
+            self.generator = result
+        try:
+            next(self.generator)
+        except StopIteration as e:
+            self.result = e.value
+            return True
+        return False
+
+
+class JobScheduler(Singleton):
+    """
+    Runs the deferred work of the engine in the main loop.
+
+    The main thread jobs are the jobs which use the gl context. They run in the priority order in update,
+    until the frame budget is spent, but at least one job runs in a frame so the queue always makes progress.
+    The worker jobs are the cpu jobs, they run on the worker threads in the priority order.
+    A job starts after all of its dependencies are done, and it fails when a dependency fails.
+    The jobs are submitted and completed on the main thread, the on_complete callbacks run on the main thread too.
+    The jobs of the same key are merged while the job is pending.
+    The jobs are canceled through cancel, the dependents of a canceled job fail.
+    """
+    frame_budget = 0.002  # seconds of the main thread jobs in a frame
+    worker_count = max(1, min(4, (os.cpu_count() or 2) - 1))
+    latency_smoothing = 0.1
+
+    def __init__(self):
+        logger.info("Create " + GetClassName(self))
+        self.core_manager = None
+        self.main_queue = []
+        self.worker_queue = queue.PriorityQueue()
+        self.complete_queue = queue.Queue()
+        self.workers = []
+        self.keyed_jobs = {}
+        self.sequence = 0
+        self.lock = Lock()
+
+        # stats
+        self.waiting_job_count = 0
+        # the worker jobs from the push until the main thread processes the completion
+        self.worker_job_count = 0
+        self.running_worker_job_count = 0
+        self.completed_job_count = 0
+        self.failed_job_count = 0
+        self.wait_time = 0.0
+        self.run_time = 0.0
+        self.max_wait_time = 0.0
+        self.frame_main_time = 0.0
+        self.frame_main_job_count = 0
+
+    def initialize(self, core_manager):
+        self.core_manager = core_manager
+        for i in range(self.worker_count):
+            worker = Thread(target=self.run_worker, name="JobWorker%d" % i, daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def close(self):
+        for _ in self.workers:
+            self.worker_queue.put((float('inf'), 0, None))
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+
+    def submit(self, name, func, args=(), kwargs=None, priority=JobPriority.NORMAL, main_thread=True, dependencies=(), on_complete=None, key=None):
+        if key is not None:
+            job = self.keyed_jobs.get(key)
+            if job is not None and not job.is_done():
+                return job
+
+        job = Job(name, func, args, kwargs, priority, main_thread, on_complete, key)
+        if key is not None:
+            self.keyed_jobs[key] = job
+
+        failed_dependency = None
+        for dependency in dependencies:
+            if dependency.state in (JobState.FAILED, JobState.CANCELED):
+                failed_dependency = dependency
+            elif not dependency.is_done():
+                job.waiting_count += 1
+                dependency.dependents.append(job)
+
+        if failed_dependency is not None:
+            self.finish_job(job, error="The dependency %s is %s." % (failed_dependency.name, failed_dependency.state.name))
+        elif 0 == job.waiting_count:
+            self.push_job(job)
+        else:
+            self.waiting_job_count += 1
+        return job
+
+    def submit_worker(self, name, func, args=(), kwargs=None, priority=JobPriority.NORMAL, dependencies=(), on_complete=None, key=None):
+        return self.submit(name, func, args, kwargs, priority, False, dependencies, on_complete, key)
+
+    def cancel(self, job):
+        """ :return: True if the job is canceled before it started """
+        if JobState.WAITING is job.state:
+            # the dependencies skip the canceled job when they finish
+            self.waiting_job_count -= 1
+            job.state = JobState.CANCELED
+            self.finish_job(job)
+            return True
+        with self.lock:
+            if JobState.READY is not job.state:
+                return False
+            job.state = JobState.CANCELED
+        # the job is finished when it comes out of its queue
+        return True
+
+    def push_job(self, job):
+        job.state = JobState.READY
+        self.sequence += 1
+        job.sequence = self.sequence
+        # without the workers, the worker jobs run on the main thread.
+        if job.main_thread or not self.workers:
+            heapq.heappush(self.main_queue, (-job.priority, job.sequence, job))
+        else:
+            with self.lock:
+                self.worker_job_count += 1
+            self.worker_queue.put((-job.priority, job.sequence, job))
+
+    def run_worker(self):
+        while True:
+            job = self.worker_queue.get()[2]
+            if job is None:
+                break
+            with self.lock:
+                canceled = JobState.CANCELED is job.state
+                if not canceled:
+                    job.state = JobState.RUNNING
+                    self.running_worker_job_count += 1
+            error = None
+            if not canceled:
+                try:
+                    while not job.run():
+                        pass
+                except:
+                    error = traceback.format_exc()
+                with self.lock:
+                    self.running_worker_job_count -= 1
+            self.complete_queue.put((job, error))
+
+    def finish_job(self, job, error=None):
+        job.end_time = time.perf_counter()
+        if job.state is JobState.CANCELED:
+            pass
+        elif error is None:
+            job.state = JobState.DONE
+            self.completed_job_count += 1
+        else:
+            job.state = JobState.FAILED
+            job.error = error
+            self.failed_job_count += 1
+            logger.error("Job %s failed.\n%s" % (job.name, error))
+
+        if job.key is not None and self.keyed_jobs.get(job.key) is job:
+            self.keyed_jobs.pop(job.key)
+
+        if 0.0 < job.start_time:
+            wait_time = job.start_time - job.submit_time
+            self.wait_time += (wait_time - self.wait_time) * self.latency_smoothing
+            self.run_time += (job.end_time - job.start_time - self.run_time) * self.latency_smoothing
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+        if JobState.DONE is job.state and job.on_complete is not None:
+            try:
+                job.on_complete(job.result)
+            except:
+                logger.error(traceback.format_exc())
+
+        for dependent in job.dependents:
+            if dependent.is_done():
+                continue
+            dependent.waiting_count -= 1
+            if JobState.DONE is not job.state:
+                self.waiting_job_count -= 1
+                self.finish_job(dependent, error="The dependency %s is %s." % (job.name, job.state.name))
+            elif 0 == dependent.waiting_count:
+                self.waiting_job_count -= 1
+                self.push_job(dependent)
+        job.dependents = []
+
+    def process_completed_jobs(self):
+        while not self.complete_queue.empty():
+            job, error = self.complete_queue.get()
+            with self.lock:
+                self.worker_job_count -= 1
+            self.finish_job(job, error)
+
+    def run_main_jobs(self, deadline):
+        run_count = 0
+        while self.main_queue:
+            if 0 < run_count and deadline < time.perf_counter():
+                break
+            job = self.main_queue[0][2]
+            if job.state is JobState.CANCELED:
+                heapq.heappop(self.main_queue)
+                self.finish_job(job)
+                continue
+            run_count += 1
+            error = None
+            try:
+                if not job.run():
+                    # the next step of the job stays at the same order
+                    continue
+            except:
+                error = traceback.format_exc()
+            heapq.heappop(self.main_queue)
+            self.finish_job(job, error)
+            # the finished job can make the worker jobs ready
+            self.process_completed_jobs()
+        return run_count
+
+    def update(self):
+        start_time = time.perf_counter()
+        self.process_completed_jobs()
+        self.frame_main_job_count = self.run_main_jobs(start_time + self.frame_budget)
+        self.frame_main_time = time.perf_counter() - start_time
+
+    def flush(self, timeout=10.0):
+        """ runs the jobs without the frame budget until all of the jobs are done, for the loading and the headless runs """
+        deadline = time.perf_counter() + timeout
+        while self.get_pending_job_count() and time.perf_counter() < deadline:
+            self.process_completed_jobs()
+            if 0 == self.run_main_jobs(deadline):
+                time.sleep(0.001)
+        return 0 == self.get_pending_job_count()
+
+    def get_pending_job_count(self):
+        with self.lock:
+            worker_job_count = self.worker_job_count
+        return len(self.main_queue) + worker_job_count + self.waiting_job_count
+
+    def get_stats(self):
+        stats = dict(
+            main_queue=len(self.main_queue),
+            worker_queue=self.worker_queue.qsize(),
+            running_workers=self.running_worker_job_count,
+            waiting=self.waiting_job_count,
+            completed=self.completed_job_count,
+            failed=self.failed_job_count,
+            wait_ms=self.wait_time * 1000.0,
+            max_wait_ms=self.max_wait_time * 1000.0,
+            run_ms=self.run_time * 1000.0,
+            frame_main_ms=self.frame_main_time * 1000.0,
+            frame_main_jobs=self.frame_main_job_count
+        )
+        self.max_wait_time = 0.0
+        return stats
@@ -89,7 +89,7 @@ class ProjectManager(Singleton):
 
     def save_project(self):
         try:
-            if self.config and self.project_filename != self.resource_manager.DefaultProjectFile:
+            if self.config and self.project_filename != self.resource_manager.DefaultProjectFile and self.resource_manager.enable_save:
                 main_camera = self.core_manager.scene_manager.main_camera
                 if main_camera:
                     main_camera.write_to_config(self.config)
@@ -10,10 +10,12 @@ from PyEngine3D.Common import logger
 from PyEngine3D.Common.Constants import *
 from PyEngine3D.Render import CollisionActor, StaticActor, SkeletonActor, AxisGizmo
 from PyEngine3D.Render import Camera, MainLight, PointLight, LightProbe
-from PyEngine3D.Render import gather_render_infos, always_pass, view_frustum_culling_geometry, shadow_culling
+from PyEngine3D.Render import RenderInfoPool, gather_render_infos, gather_instance_render_infos, sort_render_infos, always_pass, view_frustum_culling_geometry, shadow_culling
+from PyEngine3D.Render import select_lods, get_render_triangle_count
 from PyEngine3D.Render import Atmosphere, Ocean, Terrain
 from PyEngine3D.Render import Effect
 from PyEngine3D.Render import Spline3D
+from PyEngine3D.Render import ObjectPicker, CollisionWorld
 from PyEngine3D.Render.RenderOptions import RenderOption
 from PyEngine3D.Render.RenderTarget import RenderTargets
 from PyEngine3D.Utilities import *
@@ -23,6 +25,7 @@ class SceneManager(Singleton):
     def __init__(self):
         self.core_manager = None
         self.resource_manager = None
+        self.transform_store = None
         self.scene_loader = None
         self.renderer = None
         self.effect_manager = None
@@ -68,17 +71,37 @@ class SceneManager(Singleton):
         self.static_solid_render_infos = []
         self.static_translucent_render_infos = []
         self.static_shadow_render_infos = []
+        self.static_solid_instance_render_infos = []
+        self.static_shadow_instance_render_infos = []
         self.skeleton_solid_render_infos = []
         self.skeleton_translucent_render_infos = []
         self.skeleton_shadow_render_infos = []
+        self.instance_draw_call_saved = 0
+        self.static_render_info_pool = RenderInfoPool()
+        self.static_shadow_render_info_pool = RenderInfoPool()
+        self.skeleton_render_info_pool = RenderInfoPool()
+        # the static shadow map is rendered again only when static_shadow_dirty is set.
+        self.static_shadow_dirty = True
+        self.static_shadow_actors = set()
+        self.static_shadow_instance_draw_call_saved = 0
+        self.static_shadow_options = None
+        self.lod_enabled = False
+        self.render_triangle_count = 0
+        self.full_triangle_count = 0
 
         self.axis_gizmo_render_infos = []
         self.spline_gizmo_render_infos = []
 
+        self.object_picker = ObjectPicker()
+        self.collision_world = CollisionWorld()
+        # pixel of the OBJECT_ID render target to read back, when the cpu picking is not used.
+        self.object_id_request = None
+
     def initialize(self, core_manager):
         logger.info("initialize " + GetClassName(self))
         self.core_manager = core_manager
         self.resource_manager = core_manager.resource_manager
+        self.transform_store = TransformStore.instance()
         self.scene_loader = self.resource_manager.scene_loader
         self.renderer = core_manager.renderer
         self.effect_manager = core_manager.effect_manager
@@ -97,6 +120,8 @@ class SceneManager(Singleton):
         self.clear_spline_gizmo()
         self.clear_selected_axis_gizmo_id()
         self.effect_manager.clear()
+        if self.terrain is not None:
+            self.terrain.delete()
         self.main_camera = None
         self.main_light = None
         self.main_light_probe = None
@@ -110,6 +135,7 @@ class SceneManager(Singleton):
         self.static_actors = []
         self.skeleton_actors = []
         self.splines = []
+        self.collision_world.clear()
 
         self.objectMap = {}
         self.objectIDMap = {}
@@ -118,11 +144,24 @@ class SceneManager(Singleton):
         self.static_solid_render_infos = []
         self.static_translucent_render_infos = []
         self.static_shadow_render_infos = []
+        self.static_solid_instance_render_infos = []
+        self.static_shadow_instance_render_infos = []
         self.skeleton_solid_render_infos = []
         self.skeleton_translucent_render_infos = []
         self.skeleton_shadow_render_infos = []
+        self.instance_draw_call_saved = 0
+        self.static_render_info_pool = RenderInfoPool()
+        self.static_shadow_render_info_pool = RenderInfoPool()
+        self.skeleton_render_info_pool = RenderInfoPool()
+        # the static shadow map is rendered again only when static_shadow_dirty is set.
+        self.static_shadow_dirty = True
+        self.static_shadow_actors = set()
+        self.static_shadow_instance_draw_call_saved = 0
+        self.static_shadow_options = None
         self.selected_object_render_info = []
         self.spline_gizmo_render_infos = []
+        self.object_picker.clear()
+        self.object_id_request = None
 
         self.renderer.set_debug_texture(None)
 
@@ -213,6 +252,9 @@ class SceneManager(Singleton):
         for effect_data in scene_data.get('effects', []):
             self.add_effect(**effect_data)
 
+        # the parents can be loaded after their children
+        self.link_object_parents()
+
         self.end_open_scene()
 
     def save_scene(self):
@@ -237,6 +279,26 @@ class SceneManager(Singleton):
         )
         return scene_data
 
+    def set_object_parent(self, obj, parent=None):
+        """ the transform of the object becomes relative to the transform of the parent object. """
+        if parent is None:
+            obj.transform.detach()
+        elif parent is obj or not hasattr(parent, 'transform') or not obj.transform.set_parent(parent.transform):
+            logger.warn("%s can not be a child of %s." % (obj.name, parent.name))
+            return False
+        obj.parent_name = parent.name if parent is not None else ''
+        obj.transform.set_dirty()
+        return True
+
+    def link_object_parents(self):
+        for obj in list(self.objectMap.values()):
+            parent_name = getattr(obj, 'parent_name', '')
+            if parent_name and obj.transform.get_parent() is None:
+                parent = self.objectMap.get(parent_name)
+                if parent is None:
+                    logger.warn("The parent %s of %s does not exist." % (parent_name, obj.name))
+                self.set_object_parent(obj, parent)
+
     def generate_object_name(self, currName):
         index = 0
         if currName in self.objectMap:
@@ -280,6 +342,8 @@ class SceneManager(Singleton):
             object_list = self.get_object_list(object_type)
             if object_list is not None:
                 object_list.append(obj)
+                if object_type in (StaticActor, CollisionActor):
+                    self.collision_world.add_actor(obj)
             elif object_type is Effect:
                 self.effect_manager.add_effect(obj)
             if hasattr(obj, 'set_object_id'):
@@ -287,20 +351,29 @@ class SceneManager(Singleton):
                 obj.set_object_id(object_id)
                 self.objectIDMap[object_id] = obj
             self.objectMap[obj.name] = obj
+            self.static_shadow_dirty = True
             self.core_manager.send_object_info(obj)
         else:
             logger.error("SceneManager::regist_object error. %s" % obj.name if obj else 'None')
 
     def unregist_resource(self, obj):
         if obj is not None and obj.name in self.objectMap:
+            for child in list(self.objectMap.values()):
+                if getattr(child, 'parent_name', '') == obj.name:
+                    self.set_object_parent(child, None)
+            if getattr(obj, 'parent_name', ''):
+                self.set_object_parent(obj, None)
+
             object_type = type(obj)
             object_list = self.get_object_list(object_type)
             if object_list is not None:
                 object_list.remove(obj)
+                self.collision_world.remove_actor(obj)
             elif object_type is Effect:
                 self.effect_manager.delete_effect(obj)
 
             self.objectMap.pop(obj.name)
+            self.static_shadow_dirty = True
 
             if hasattr(obj, 'get_object_id'):
                 object_id = obj.get_object_id()
@@ -376,19 +449,24 @@ class SceneManager(Singleton):
         if len(spline.spline_data.spline_points) < 1:
             return
 
+        # the gizmos are the children of the spline, so their positions are the spline points.
+        # the scale of the spline is canceled to keep the size of the gizmos.
+        inverse_spline_scale = 1.0 / np.maximum(np.abs(spline.transform.get_scale()), 1e-6)
+
         for spline_point in spline.spline_data.spline_points:
-            pos = np.dot(Float4(*spline_point.position, 1.0), spline.transform.matrix)[:3]
-            gizmo_object = StaticActor(name=spline_point_name, model=gizmo_model, pos=Float3(*pos), scale=Float3(0.1, 0.1, 0.1), object_id=self.generate_object_id(), object_color=Float3(0.5, 0.5, 1.0))
+            gizmo_object = StaticActor(name=spline_point_name, model=gizmo_model, pos=Float3(*spline_point.position), scale=inverse_spline_scale * 0.1, object_id=self.generate_object_id(), object_color=Float3(0.5, 0.5, 1.0))
+            gizmo_object.transform.set_parent(spline.transform)
             self.spline_gizmo_object_map[gizmo_object.get_object_id()] = gizmo_object
 
         spline_point = spline.spline_data.spline_points[0]
 
         def create_spline_control_point_gizmo(spline_gizmo_object_map, object_id, inverse):
             if inverse:
-                pos = np.dot(Float4(*(spline_point.position + spline_point.control_point), 1.0), spline.transform.matrix)[:3]
+                pos = spline_point.position + spline_point.control_point
             else:
-                pos = np.dot(Float4(*(spline_point.position - spline_point.control_point), 1.0), spline.transform.matrix)[:3]
-            gizmo_object = StaticActor(name=control_point_name, model=gizmo_model, pos=Float3(*pos), scale=Float3(0.075, 0.075, 0.075), object_id=object_id, object_color=Float3(0.0, 1.0, 0.0))
+                pos = spline_point.position - spline_point.control_point
+            gizmo_object = StaticActor(name=control_point_name, model=gizmo_model, pos=Float3(*pos), scale=inverse_spline_scale * 0.075, object_id=object_id, object_color=Float3(0.0, 1.0, 0.0))
+            gizmo_object.transform.set_parent(spline.transform)
             spline_gizmo_object_map[gizmo_object.get_object_id()] = gizmo_object
             return gizmo_object.get_object_id()
         self.spline_control_point_gizmo_id0 = create_spline_control_point_gizmo(self.spline_gizmo_object_map, self.generate_object_id(), inverse=False)
@@ -507,6 +585,7 @@ class SceneManager(Singleton):
         self.skeleton_actors = []
         self.splines = []
         self.objectMap = {}
+        self.collision_world.clear()
 
     def clear_actors(self):
         for obj_name in list(self.objectMap.keys()):
@@ -553,7 +632,9 @@ class SceneManager(Singleton):
 
     def set_object_attribute(self, object_name, objectTypeName, attribute_name, attribute_value, item_info_history, attribute_index):
         obj = self.get_object(object_name)
-        obj and obj.set_attribute(attribute_name, attribute_value, item_info_history, attribute_index)
+        if obj:
+            obj.set_attribute(attribute_name, attribute_value, item_info_history, attribute_index)
+            self.static_shadow_dirty = True
 
     def get_selected_object_id(self):
         return self.selected_object_id
@@ -621,6 +702,9 @@ class SceneManager(Singleton):
             screen_width = self.core_manager.viewport_manager.main_viewport.width
             screen_height = self.core_manager.viewport_manager.main_viewport.height
             edit_object_transform = edit_object.transform
+            # the deltas below are in the world space, the position of a child is converted to the parent space after.
+            parent_transform = edit_object_transform.get_parent()
+            edit_object_pos = edit_object_transform.get_pos().copy()
             use_quaternion = False
 
             mouse_x_ratio = mouse_pos[0] / screen_width
@@ -630,7 +714,7 @@ class SceneManager(Singleton):
             mouse_world_pos = np.dot(Float4(mouse_x_ratio * 2.0 - 1.0, mouse_y_ratio * 2.0 - 1.0, 0.0, 1.0), camera.inv_view_origin_projection)
             mouse_world_pos_old = np.dot(Float4(mouse_x_ratio_old * 2.0 - 1.0, mouse_y_ratio_old * 2.0 - 1.0, 0.0, 1.0), camera.inv_view_origin_projection)
 
-            to_object = edit_object_transform.get_pos() - camera_transform.get_pos()
+            to_object = edit_object_transform.get_world_pos() - camera_transform.get_pos()
             to_object_xz_dist = length(Float2(to_object[0], to_object[2]))
             mouse_xz_dist = length(Float2(mouse_world_pos[0], mouse_world_pos[2]))
             mouse_xz_dist_old = length(Float2(mouse_world_pos_old[0], mouse_world_pos_old[2]))
@@ -686,31 +770,66 @@ class SceneManager(Singleton):
                 pos = (mouse_world_pos[0:3] / d1 * d0) - to_object
                 edit_object_transform.move(pos)
 
-            # update_spline_gizmo_object
+            if parent_transform is not None:
+                world_delta = edit_object_transform.get_pos() - edit_object_pos
+                if any(0.0 != world_delta):
+                    edit_object_transform.set_pos(edit_object_pos + np.dot(Float4(*world_delta, 0.0), parent_transform.inverse_matrix)[:3])
+
+            # update_spline_gizmo_object, the gizmos are in the space of the spline
             if selected_spline_point_gizmo_object is not None and self.selected_object is not None:
                 spline_index = list(self.spline_gizmo_object_map).index(self.selected_spline_point_gizmo_id)
                 spline_point = self.selected_object.spline_data.spline_points[spline_index]
-                spline_point_gizmo_pos = np.dot(Float4(*selected_spline_point_gizmo_object.transform.get_pos(), 1.0), self.selected_object.transform.inverse_matrix)[:3]
+                spline_point_gizmo_pos = selected_spline_point_gizmo_object.transform.get_pos()
                 spline_point.position[...] = spline_point_gizmo_pos
                 if selected_spline_control_point_gizmo_object is not None:
-                    spline_control_point_gizmo_pos = np.dot(Float4(*selected_spline_control_point_gizmo_object.transform.get_pos(), 1.0), self.selected_object.transform.inverse_matrix)[:3]
+                    spline_control_point_gizmo_pos = selected_spline_control_point_gizmo_object.transform.get_pos()
                     if self.spline_control_point_gizmo_id0 == self.selected_spline_control_point_gizmo_id:
                         spline_point.control_point[...] = spline_point_gizmo_pos - spline_control_point_gizmo_pos
                     elif self.spline_control_point_gizmo_id1 == self.selected_spline_control_point_gizmo_id:
                         spline_point.control_point[...] = spline_control_point_gizmo_pos - spline_point_gizmo_pos
                 self.selected_object.spline_data.resampling()
 
-    def update_select_object_id(self):
+    def pick_object_id(self):
+        if not RenderOption.RENDER_CPU_PICKING:
+            return None
+
+        actors = []
+        if RenderOption.RENDER_STATIC_ACTOR:
+            actors.extend(self.static_actors)
+        if RenderOption.RENDER_SKELETON_ACTOR:
+            actors.extend(self.skeleton_actors)
+        if RenderOption.RENDER_COLLISION:
+            actors.extend(self.collision_actors)
+        actors.extend(self.spline_gizmo_object_map.values())
+        axis_gizmo = self.axis_gizmo if self.selected_object is not None else None
+        return self.object_picker.pick(self.main_camera,
+                                       self.core_manager.get_mouse_pos(),
+                                       self.core_manager.get_window_size(),
+                                       actors,
+                                       self.splines,
+                                       axis_gizmo)
+
+    def request_object_id(self):
+        # the renderer draws the OBJECT_ID render target and reads this pixel back asynchronously.
         windows_size = self.core_manager.get_window_size()
         mouse_pos = self.core_manager.get_mouse_pos()
         x = math.floor(min(1.0, (mouse_pos[0] / windows_size[0])) * (RenderTargets.OBJECT_ID.width - 1))
         y = math.floor(min(1.0, (mouse_pos[1] / windows_size[1])) * (RenderTargets.OBJECT_ID.height - 1))
-        object_ids = RenderTargets.OBJECT_ID.get_image_data()
-        object_id = math.floor(object_ids[y][x] + 0.5)
-        return object_id
+        self.object_id_request = (max(0, x), max(0, y))
+
+    def update_object_id_readback(self):
+        object_ids = self.renderer.object_id_read_buffer.get_data()
+        if object_ids is not None:
+            self.select_object_id(math.floor(object_ids[0] + 0.5))
 
     def intersect_select_object(self):
-        object_id = self.update_select_object_id()
+        object_id = self.pick_object_id()
+        if object_id is not None:
+            self.select_object_id(object_id)
+        elif not self.core_manager.is_basic_mode:
+            self.request_object_id()
+
+    def select_object_id(self, object_id):
         if 0 < object_id:
             if object_id < AxisGizmo.ID_COUNT:
                 self.selected_axis_gizmo_id = object_id
@@ -732,16 +851,51 @@ class SceneManager(Singleton):
         for camera in self.cameras:
             camera.update_projection(fov, aspect)
 
+    def set_static_shadow_dirty(self):
+        self.static_shadow_dirty = True
+
+    def is_in_static_shadow(self, actor):
+        # an actor which was in the cached shadow map, or is in the shadow frustum now.
+        if actor in self.static_shadow_actors:
+            return True
+        if self.main_light is None or not actor.visible:
+            return False
+        for i in range(actor.get_geometry_count()):
+            if not shadow_culling(self.main_camera, self.main_light, actor, actor.get_geometry_bound_box(i)):
+                return True
+        return False
+
+    def update_lods(self):
+        if RenderOption.RENDER_LOD:
+            select_lods(self.main_camera, self.static_actors)
+            select_lods(self.main_camera, self.skeleton_actors)
+            self.lod_enabled = True
+        elif self.lod_enabled:
+            for actor in self.static_actors + self.skeleton_actors:
+                actor.lod = 0
+            self.lod_enabled = False
+
     def update_static_render_info(self):
-        self.static_solid_render_infos = []
-        self.static_translucent_render_infos = []
-        self.static_shadow_render_infos = []
+        self.static_render_info_pool.clear()
+        self.static_solid_render_infos.clear()
+        self.static_translucent_render_infos.clear()
+
+        # the static shadow render infos are kept with the cached static shadow map.
+        static_shadow_options = (RenderOption.RENDER_STATIC_ACTOR, RenderOption.RENDER_AUTO_INSTANCING, self.terrain.is_render_terrain)
+        if self.static_shadow_options != static_shadow_options:
+            self.static_shadow_options = static_shadow_options
+            self.static_shadow_dirty = True
+        gather_static_shadow = self.static_shadow_dirty
+        if gather_static_shadow:
+            self.static_shadow_render_info_pool.clear()
+            self.static_shadow_render_infos.clear()
 
         if RenderOption.RENDER_COLLISION:
             gather_render_infos(culling_func=view_frustum_culling_geometry,
                                 camera=self.main_camera,
                                 light=self.main_light,
                                 actor_list=self.collision_actors,
+                                render_info_pool=self.static_render_info_pool,
                                 solid_render_infos=self.static_solid_render_infos,
                                 translucent_render_infos=self.static_translucent_render_infos)
 
@@ -750,29 +904,70 @@ class SceneManager(Singleton):
                                 camera=self.main_camera,
                                 light=self.main_light,
                                 actor_list=self.static_actors,
+                                render_info_pool=self.static_render_info_pool,
                                 solid_render_infos=self.static_solid_render_infos,
                                 translucent_render_infos=self.static_translucent_render_infos)
 
-            gather_render_infos(culling_func=shadow_culling,
-                                camera=self.main_camera,
-                                light=self.main_light,
-                                actor_list=self.static_actors,
-                                solid_render_infos=self.static_shadow_render_infos,
-                                translucent_render_infos=None)
+            if gather_static_shadow:
+                gather_render_infos(culling_func=shadow_culling,
+                                    camera=self.main_camera,
+                                    light=self.main_light,
+                                    actor_list=self.static_actors,
+                                    render_info_pool=self.static_shadow_render_info_pool,
+                                    solid_render_infos=self.static_shadow_render_infos,
+                                    translucent_render_infos=None)
+
+        sort_render_infos(self.static_solid_render_infos, self.main_camera)
+        sort_render_infos(self.static_translucent_render_infos, self.main_camera, translucent=True)
+
+        # per instance culling of the instanced actors in the view
+        culled_actors = set()
+        for render_infos in (self.static_solid_render_infos, self.static_translucent_render_infos):
+            for render_info in render_infos:
+                actor = render_info.actor
+                if actor.is_instancing() and actor not in culled_actors:
+                    culled_actors.add(actor)
+                    if RenderOption.RENDER_INSTANCE_CULLING:
+                        actor.update_instance_culling(self.main_camera)
+                    elif actor.instance_visible_count != actor.get_instance_render_count():
+                        actor.reset_instance_culling()
+
+        self.render_triangle_count, self.full_triangle_count = get_render_triangle_count(self.static_solid_render_infos)
+
+        # The skeleton actors are not instanced because the bone matrices are different for each actor.
+        if RenderOption.RENDER_AUTO_INSTANCING:
+            self.static_solid_instance_render_infos = []
+            self.instance_draw_call_saved = gather_instance_render_infos(self.static_solid_render_infos,
+                                                                         self.static_solid_instance_render_infos,
+                                                                         render_info_pool=self.static_render_info_pool)
+            if gather_static_shadow:
+                self.static_shadow_instance_render_infos = []
+                self.static_shadow_instance_draw_call_saved = gather_instance_render_infos(self.static_shadow_render_infos,
+                                                                                           self.static_shadow_instance_render_infos,
+                                                                                           render_info_pool=self.static_shadow_render_info_pool)
+            self.instance_draw_call_saved += self.static_shadow_instance_draw_call_saved
+        else:
+            self.static_solid_instance_render_infos = self.static_solid_render_infos
+            self.static_shadow_instance_render_infos = self.static_shadow_render_infos
+            self.instance_draw_call_saved = 0
+        self.static_render_info_pool.release_unused()
 
-        self.static_solid_render_infos.sort(key=lambda x: (id(x.geometry), id(x.material)))
-        self.static_translucent_render_infos.sort(key=lambda x: (id(x.geometry), id(x.material)))
+        if gather_static_shadow:
+            self.static_shadow_render_info_pool.release_unused()
+            self.static_shadow_actors = set(render_info.actor for render_info in self.static_shadow_render_infos)
 
     def update_skeleton_render_info(self):
-        self.skeleton_solid_render_infos = []
-        self.skeleton_translucent_render_infos = []
-        self.skeleton_shadow_render_infos = []
+        self.skeleton_render_info_pool.clear()
+        self.skeleton_solid_render_infos.clear()
+        self.skeleton_translucent_render_infos.clear()
+        self.skeleton_shadow_render_infos.clear()
 
         if RenderOption.RENDER_SKELETON_ACTOR:
             gather_render_infos(culling_func=view_frustum_culling_geometry,
                                 camera=self.main_camera,
                                 light=self.main_light,
                                 actor_list=self.skeleton_actors,
+                                render_info_pool=self.skeleton_render_info_pool,
                                 solid_render_infos=self.skeleton_solid_render_infos,
                                 translucent_render_infos=self.skeleton_translucent_render_infos)
 
@@ -780,44 +975,40 @@ class SceneManager(Singleton):
                                 camera=self.main_camera,
                                 light=self.main_light,
                                 actor_list=self.skeleton_actors,
+                                render_info_pool=self.skeleton_render_info_pool,
                                 solid_render_infos=self.skeleton_shadow_render_infos,
                                 translucent_render_infos=None)
 
-            self.skeleton_solid_render_infos.sort(key=lambda x: (id(x.geometry), id(x.material)))
-            self.skeleton_translucent_render_infos.sort(key=lambda x: (id(x.geometry), id(x.material)))
+            sort_render_infos(self.skeleton_solid_render_infos, self.main_camera)
+            sort_render_infos(self.skeleton_translucent_render_infos, self.main_camera, translucent=True)
+        self.skeleton_render_info_pool.release_unused()
 
     def update_light_render_infos(self):
-        self.point_light_count = 0
-        self.renderer.uniform_point_light_data.fill(0.0)
-
-        for point_light in self.point_lights:
-            to_light = point_light.transform.pos - self.main_camera.transform.pos
-            for i in range(4):
-                d = np.dot(self.main_camera.frustum_vectors[i], to_light)
-                if point_light.light_radius < d:
-                    # culling
-                    break
-            else:
-                # pass culling
-                point_light_uniform_block = self.renderer.uniform_point_light_data[self.point_light_count]
-                point_light_uniform_block['color'] = point_light.light_color
-                point_light_uniform_block['radius'] = point_light.light_radius
-                point_light_uniform_block['pos'] = point_light.transform.pos
-                point_light_uniform_block['render'] = 1.0
-                self.point_light_count += 1
-            if MAX_POINT_LIGHTS <= self.point_light_count:
-                break
+        # the basic renderer does not render the point lights.
+        if self.core_manager.is_basic_mode:
+            self.point_light_count = 0
+            return
+
+        light_cluster = self.renderer.light_cluster
+        light_cluster.update(self.main_camera, self.point_lights)
+        self.point_light_count = light_cluster.point_light_count
 
     def update_scene(self, dt):
         if not self.core_manager.is_basic_mode:
             self.renderer.postprocess.update()
 
+        # every transform moved since the last frame at once, update_transform of each object just returns the result.
+        self.transform_store.update_transforms()
+
         for camera in self.cameras:
             camera.update()
 
         if self.main_light is not None:
             self.main_light.update(self.main_camera)
 
+            if self.main_light.shadow_changed:
+                self.static_shadow_dirty = True
+
             if self.main_light.changed:
                 self.main_light.reset_changed()
                 self.reset_light_probe()
@@ -826,10 +1017,14 @@ class SceneManager(Singleton):
             light.update()
 
         for collision_actor in self.collision_actors:
-            collision_actor.update(dt)
+            if collision_actor.update(dt):
+                self.collision_world.set_dirty(collision_actor)
 
         for static_actor in self.static_actors:
-            static_actor.update(dt)
+            if static_actor.update(dt):
+                self.collision_world.set_dirty(static_actor)
+                if not self.static_shadow_dirty:
+                    self.static_shadow_dirty = self.is_in_static_shadow(static_actor)
 
         for skeleton_actor in self.skeleton_actors:
             skeleton_actor.update(dt)
@@ -846,7 +1041,15 @@ class SceneManager(Singleton):
 
             self.effect_manager.update(dt)
 
+        # the particles and the transforms attached to the animated bones
+        self.transform_store.update_dirty_transforms()
+        self.collision_world.update()
+
+        if not self.core_manager.is_basic_mode:
+            self.update_object_id_readback()
+
         # culling
+        self.update_lods()
         self.update_static_render_info()
         self.update_skeleton_render_info()
         self.update_light_render_infos()
@@ -875,18 +1078,18 @@ class SceneManager(Singleton):
                         spline_index = list(self.spline_gizmo_object_map).index(spline_gizmo_object_id)
                         spline_point = self.selected_object.spline_data.spline_points[spline_index]
                         spline_gizmo_position[...] = spline_point.position
-                    spline_gizmo_object.transform.set_pos(np.dot(Float4(*spline_gizmo_position, 1.0), self.selected_object.transform.matrix)[:3])
+                    spline_gizmo_object.transform.set_pos(spline_gizmo_position)
                     spline_gizmo_object.update(dt)
                 spline_control_point_gizmo_object0 = self.spline_gizmo_object_map.get(self.spline_control_point_gizmo_id0)
                 spline_control_point_gizmo_object1 = self.spline_gizmo_object_map.get(self.spline_control_point_gizmo_id1)
                 if spline_point_gizmo_object is not None and spline_control_point_gizmo_object0 is not None and spline_control_point_gizmo_object1 is not None:
-                    self.renderer.debug_line_manager.draw_debug_line_3d(spline_point_gizmo_object.get_pos(), spline_control_point_gizmo_object0.get_pos(), Float4(0.0, 1.0, 0.0, 1.0), width=3.0)
-                    self.renderer.debug_line_manager.draw_debug_line_3d(spline_point_gizmo_object.get_pos(), spline_control_point_gizmo_object1.get_pos(), Float4(0.0, 1.0, 0.0, 1.0), width=3.0)
+                    self.renderer.debug_line_manager.draw_debug_line_3d(spline_point_gizmo_object.get_world_pos(), spline_control_point_gizmo_object0.get_world_pos(), Float4(0.0, 1.0, 0.0, 1.0), width=3.0)
+                    self.renderer.debug_line_manager.draw_debug_line_3d(spline_point_gizmo_object.get_world_pos(), spline_control_point_gizmo_object1.get_world_pos(), Float4(0.0, 1.0, 0.0, 1.0), width=3.0)
 
             # update axis gizmo transform
             spline_control_point_gizmo_object = self.spline_gizmo_object_map.get(self.selected_spline_control_point_gizmo_id)
             axis_gizmo_object = spline_control_point_gizmo_object or spline_point_gizmo_object or self.selected_object
-            axis_gizmo_pos = axis_gizmo_object.transform.get_pos()
+            axis_gizmo_pos = axis_gizmo_object.transform.get_world_pos()
             self.axis_gizmo.transform.set_pos(axis_gizmo_pos)
             self.axis_gizmo.transform.set_scale(length(axis_gizmo_pos - self.main_camera.transform.get_pos()) * 0.15)
             self.axis_gizmo.update(dt)
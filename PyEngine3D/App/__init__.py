@@ -1,3 +1,4 @@
 from .CoreManager import CoreManager
 from .SceneManager import SceneManager
 from .ProjectManager import ProjectManager
+from .JobScheduler import JobScheduler, JobPriority, JobState
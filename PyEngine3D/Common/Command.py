@@ -1,27 +1,34 @@
 import os
-import re
-import traceback
+import pickle
+import sys
+from collections import deque
 from multiprocessing import Queue, Pipe
 
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+    shared_memory = None
+
 # logger
 from PyEngine3D.Utilities import AutoEnum, MINOR_INFO
 from PyEngine3D.Common import logger
 
-# UTIL : call stack function for log
-reTraceStack = re.compile("File \"(.+?)\", line (\d+?), .+")  # [0] filename, [1] line number
+# frames bigger than this are passed through shared memory instead of the pipe.
+# below about 8MB the extra copy into the shared memory costs more than the pipe, see benchmark/CommandBenchmark.py
+SHARED_MEMORY_THRESHOLD = 8 * 1024 * 1024
+MAX_BATCH_SIZE = 256
 
 
+# UTIL : call stack function for log
 def getTraceCallStack():
-    for line in traceback.format_stack()[::-1]:
-        m = re.match(reTraceStack, line.strip())
-        if m:
-            filename = m.groups()[0]
-            # ignore case
-            if filename == __file__:
-                continue
-            filename = os.path.split(filename)[1]
-            lineNumber = m.groups()[1]
-            return "[%s:%s]" % (filename, lineNumber)
+    """ walks the frames instead of formatting the whole stack. call it only when the log level is enabled. """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        # ignore case
+        if filename != __file__:
+            return "[%s:%d]" % (os.path.split(filename)[1], frame.f_lineno)
+        frame = frame.f_back
     return ""
 
 
@@ -65,12 +72,12 @@ class COMMAND(AutoEnum):
     DUPLICATE_RESOURCE = ()
     SAVE_RESOURCE = ()
     DELETE_RESOURCE = ()
-    DELETE_RESOURCE_INFO = ()
     REQUEST_RESOURCE_LIST = ()
     TRANS_RESOURCE_LIST = ()
-    TRANS_RESOURCE_INFO = ()
+    TRANS_RESOURCE_LIST_DIFF = ()
     REQUEST_RESOURCE_ATTRIBUTE = ()
     TRANS_RESOURCE_ATTRIBUTE = ()
+    TRANS_RESOURCE_ATTRIBUTE_DIFF = ()
     SET_RESOURCE_ATTRIBUTE = ()
     ADD_RESOURCE_COMPONENT = ()
     DELETE_RESOURCE_COMPONENT = ()
@@ -94,6 +101,7 @@ class COMMAND(AutoEnum):
     TRANS_OBJECT_INFO = ()
     REQUEST_OBJECT_ATTRIBUTE = ()
     TRANS_OBJECT_ATTRIBUTE = ()
+    TRANS_OBJECT_ATTRIBUTE_DIFF = ()
     SET_OBJECT_ATTRIBUTE = ()
     SET_OBJECT_SELECT = ()
     SET_OBJECT_FOCUS = ()
@@ -126,6 +134,44 @@ def get_command_name(cmd: COMMAND) -> str:
     return str(cmd)
 
 
+class SharedMemoryFrame:
+    """ a pickled frame which is waiting in the shared memory. the receiver unlinks it. """
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+
+def encode_frame(frame):
+    """
+    The frame is pickled only once here, the queue and the pipe just copy the bytes.
+    Large frames are moved to the shared memory, so only the name goes through the pipe.
+    """
+    data = pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+    if shared_memory is None or len(data) < SHARED_MEMORY_THRESHOLD:
+        return data
+
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    shm.buf[:len(data)] = data
+    # the receiver process owns it from now on.
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    shm.close()
+    return SharedMemoryFrame(shm.name, len(data))
+
+
+def decode_frame(frame):
+    if isinstance(frame, SharedMemoryFrame):
+        shm = shared_memory.SharedMemory(name=frame.name)
+        data = shm.buf[:frame.size]
+        try:
+            frame = pickle.loads(data)
+        finally:
+            data.release()
+            shm.close()
+            shm.unlink()
+        return frame
+    return pickle.loads(frame)
+
+
 def CustomPipe():
     """get CustomPipe Instances"""
     pipe1, pipe2 = Pipe()
@@ -141,38 +187,47 @@ class PipeClass:
         self.pipe = pipe
         self.simpleLog = True
 
-    def send(self, sendCmd, sendValue=None):
-        if self.simpleLog:
-            logger.log(MINOR_INFO, "Pipe : Send %s in %s" % (get_command_name(sendCmd), getTraceCallStack()))
-        else:
-            logger.log(MINOR_INFO,
-                       "Pipe : Send %s, %s in %s" % (get_command_name(sendCmd), str(sendValue), getTraceCallStack()))
+    def send_frame(self, cmd, value):
         # must send queue date to tuple type
-        self.pipe.send((sendCmd, sendValue))
+        self.pipe.send(encode_frame((cmd, value)))
+
+    def recv_frame(self):
+        return decode_frame(self.pipe.recv())
+
+    def send(self, sendCmd, sendValue=None):
+        if logger.isEnabledFor(MINOR_INFO):
+            if self.simpleLog:
+                logger.log(MINOR_INFO, "Pipe : Send %s in %s" % (get_command_name(sendCmd), getTraceCallStack()))
+            else:
+                logger.log(MINOR_INFO,
+                           "Pipe : Send %s, %s in %s" % (get_command_name(sendCmd), str(sendValue), getTraceCallStack()))
+        self.send_frame(sendCmd, sendValue)
 
     def recv(self):
         """must be a tuple type"""
-        cmdAndValue = self.pipe.recv()
-        if self.simpleLog:
-            logger.log(MINOR_INFO, "Pipe : Recv %s in %s" % (get_command_name(cmdAndValue[0]), getTraceCallStack()))
-        else:
-            logger.log(MINOR_INFO,
-                       "Pipe : Recv %s, %s in %s" % (
-                           get_command_name(cmdAndValue[0]), str(cmdAndValue[1]), getTraceCallStack()))
+        cmdAndValue = self.recv_frame()
+        if logger.isEnabledFor(MINOR_INFO):
+            if self.simpleLog:
+                logger.log(MINOR_INFO, "Pipe : Recv %s in %s" % (get_command_name(cmdAndValue[0]), getTraceCallStack()))
+            else:
+                logger.log(MINOR_INFO,
+                           "Pipe : Recv %s, %s in %s" % (
+                               get_command_name(cmdAndValue[0]), str(cmdAndValue[1]), getTraceCallStack()))
         return cmdAndValue
 
     def SendAndRecv(self, sendCmd, sendValue, checkRecvCmd, checkReceiveValue):
         # send message - must be a tuple type
-        self.pipe.send((sendCmd, sendValue))
+        self.send_frame(sendCmd, sendValue)
 
         # wait recv message - must be a tuple type
-        recv, value = self.pipe.recv()
-        if self.simpleLog:
-            logger.log(MINOR_INFO, "Pipe : Send %s and Recv %s in %s" % (
-                get_command_name(sendCmd), get_command_name(recv), getTraceCallStack()))
-        else:
-            logger.log(MINOR_INFO, "Pipe : Send %s, %s and Recv %s, %s in %s" % (
-                get_command_name(sendCmd), str(sendValue), get_command_name(recv), str(value), getTraceCallStack()))
+        recv, value = self.recv_frame()
+        if logger.isEnabledFor(MINOR_INFO):
+            if self.simpleLog:
+                logger.log(MINOR_INFO, "Pipe : Send %s and Recv %s in %s" % (
+                    get_command_name(sendCmd), get_command_name(recv), getTraceCallStack()))
+            else:
+                logger.log(MINOR_INFO, "Pipe : Send %s, %s and Recv %s, %s in %s" % (
+                    get_command_name(sendCmd), str(sendValue), get_command_name(recv), str(value), getTraceCallStack()))
 
         # check receive correct command and value
         if recv != checkRecvCmd or (checkReceiveValue is not None and checkReceiveValue != value):
@@ -188,22 +243,23 @@ class PipeClass:
 
     def RecvAndSend(self, checkRecvCmd, checkReceiveValue, sendCmd, sendValue):
         # wait recv message - must be a tuple type
-        recv, value = self.pipe.recv()
+        recv, value = self.recv_frame()
 
         if recv == checkRecvCmd and (checkReceiveValue is None or checkReceiveValue == value):
             # receive succesfull - send message, must be a tuple type
-            self.pipe.send((sendCmd, sendValue))
-            if self.simpleLog:
-                logger.log(MINOR_INFO, "Pipe : Recv %s and Send %s in %s" % (
-                    get_command_name(recv), get_command_name(sendCmd), getTraceCallStack()))
-            else:
-                logger.log(MINOR_INFO, "Pipe : Recv %s, %s and Send %s, %s in %s" % (
-                    get_command_name(recv), str(value), get_command_name(sendCmd), str(sendValue), getTraceCallStack()))
+            self.send_frame(sendCmd, sendValue)
+            if logger.isEnabledFor(MINOR_INFO):
+                if self.simpleLog:
+                    logger.log(MINOR_INFO, "Pipe : Recv %s and Send %s in %s" % (
+                        get_command_name(recv), get_command_name(sendCmd), getTraceCallStack()))
+                else:
+                    logger.log(MINOR_INFO, "Pipe : Recv %s, %s and Send %s, %s in %s" % (
+                        get_command_name(recv), str(value), get_command_name(sendCmd), str(sendValue), getTraceCallStack()))
 
             # return received value
             return value
         else:
-            self.pipe.send((COMMAND.FAIL, None))
+            self.send_frame(COMMAND.FAIL, None)
             if self.simpleLog:
                 logger.log(MINOR_INFO,
                            "Pipe : RecvFailed %s and Send %s in %s" % (
@@ -217,29 +273,49 @@ class PipeClass:
 
 # CLASS : Custom Queue
 class CustomQueue:
-    def __init__(self):
+    """
+    Every put goes through the queue as a frame, which is a list of (command, value).
+    With batch=True the commands are buffered until flush() or until MAX_BATCH_SIZE, then sent as one frame.
+    The frames bigger than SHARED_MEMORY_THRESHOLD are sent through the shared memory.
+    """
+    def __init__(self, batch=False):
         self.queue = Queue()
         self.simpleLog = True
+        self.batch = batch
+        self.send_frame = []
+        self.recv_frame = deque()
 
     def empty(self):
-        return self.queue.empty()
+        return 0 == len(self.recv_frame) and self.queue.empty()
 
     def get(self):
         # receive value must be tuple type
-        cmdAndValue = self.queue.get(self)
-        if self.simpleLog:
-            logger.log(MINOR_INFO, "Queue : get %s in %s" % (get_command_name(cmdAndValue[0]), getTraceCallStack()))
-        else:
-            logger.log(MINOR_INFO,
-                       "Queue : get %s, %s in %s" % (
-                           get_command_name(cmdAndValue[0]), str(cmdAndValue[1]), getTraceCallStack()))
+        if 0 == len(self.recv_frame):
+            self.recv_frame.extend(decode_frame(self.queue.get()))
+        cmdAndValue = self.recv_frame.popleft()
+
+        if logger.isEnabledFor(MINOR_INFO):
+            if self.simpleLog:
+                logger.log(MINOR_INFO, "Queue : get %s in %s" % (get_command_name(cmdAndValue[0]), getTraceCallStack()))
+            else:
+                logger.log(MINOR_INFO,
+                           "Queue : get %s, %s in %s" % (
+                               get_command_name(cmdAndValue[0]), str(cmdAndValue[1]), getTraceCallStack()))
         return cmdAndValue
 
     def put(self, cmdIndex, value=None):
-        if self.simpleLog:
-            logger.log(MINOR_INFO, "Queue : put %s in %s" % (get_command_name(cmdIndex), getTraceCallStack()))
-        else:
-            logger.log(MINOR_INFO,
-                       "Queue : put %s, %s in %s" % (get_command_name(cmdIndex), str(value), getTraceCallStack()))
+        if logger.isEnabledFor(MINOR_INFO):
+            if self.simpleLog:
+                logger.log(MINOR_INFO, "Queue : put %s in %s" % (get_command_name(cmdIndex), getTraceCallStack()))
+            else:
+                logger.log(MINOR_INFO,
+                           "Queue : put %s, %s in %s" % (get_command_name(cmdIndex), str(value), getTraceCallStack()))
         # must send queue date to tuple type
-        self.queue.put((cmdIndex, value))
+        self.send_frame.append((cmdIndex, value))
+        if not self.batch or MAX_BATCH_SIZE <= len(self.send_frame):
+            self.flush()
+
+    def flush(self):
+        if self.send_frame:
+            self.queue.put(encode_frame(self.send_frame))
+            self.send_frame = []
@@ -6,7 +6,6 @@ INITIAL_WIDTH = 800
 INITIAL_HEIGHT = 600
 VIDEO_RESIZE_TIME = 0.5
 GRAVITY = 980.0
-MAX_POINT_LIGHTS = 10
 NULL_POINTER = ctypes.c_void_p(0)
 SHADOW_SAMPLES = 16
 SHADOW_EXP = 1000.0
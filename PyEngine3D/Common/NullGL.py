@@ -0,0 +1,381 @@
+"""
+NullGL : a fake PyOpenGL package for headless runs.
+
+Every OpenGL function is replaced by a callable that only counts the call, so the whole engine can run
+without a GPU or a window. install() must be called before anything imports OpenGL.
+
+    from PyEngine3D.Common import NullGL
+    NullGL.install()
+    from PyEngine3D.App import CoreManager
+"""
+
+import ctypes
+import importlib.abc
+import importlib.util
+import os
+import re
+import sys
+import types
+from collections import defaultdict
+
+from .NullGLEnums import GL_ENUMS
+
+
+reNullGLSymbol = re.compile(r"\b(glu?[A-Z]\w*|GLU?_\w+|GL[a-z]\w*|c_[a-z]\w*)\b")
+reGLVersionModule = re.compile(r"GL_\d+_\d+$")
+
+GL_TYPES = dict(
+    GLboolean=ctypes.c_ubyte,
+    GLbyte=ctypes.c_byte,
+    GLubyte=ctypes.c_ubyte,
+    GLchar=ctypes.c_char,
+    GLshort=ctypes.c_short,
+    GLushort=ctypes.c_ushort,
+    GLint=ctypes.c_int,
+    GLuint=ctypes.c_uint,
+    GLint64=ctypes.c_int64,
+    GLuint64=ctypes.c_uint64,
+    GLenum=ctypes.c_uint,
+    GLbitfield=ctypes.c_uint,
+    GLsizei=ctypes.c_int,
+    GLfloat=ctypes.c_float,
+    GLclampf=ctypes.c_float,
+    GLdouble=ctypes.c_double,
+    GLclampd=ctypes.c_double,
+    GLvoid=None,
+)
+
+GL_INTEGERS = dict(
+    GL_MAJOR_VERSION=4,
+    GL_MINOR_VERSION=5,
+    GL_MAX_DRAW_BUFFERS=8,
+    GL_MAX_VERTEX_ATTRIBS=16,
+    GL_MAX_TEXTURE_IMAGE_UNITS=32,
+    GL_MAX_COMBINED_TEXTURE_IMAGE_UNITS=192,
+    GL_MAX_UNIFORM_BLOCK_SIZE=65536,
+    GL_UNIFORM_BUFFER_OFFSET_ALIGNMENT=256,
+    GL_MAX_SHADER_STORAGE_BLOCK_SIZE=134217728,
+    GL_MAX_SHADER_STORAGE_BUFFER_BINDINGS=96,
+)
+
+GL_STRINGS = dict(
+    GL_VENDOR=b"PyEngine3D",
+    GL_RENDERER=b"NullGL",
+    GL_VERSION=b"4.5 NullGL",
+    GL_SHADING_LANGUAGE_VERSION=b"4.50 NullGL",
+    GL_EXTENSIONS=b"",
+)
+
+DRAW_FUNCTIONS = {
+    'glDrawArrays', 'glDrawArraysInstanced', 'glDrawArraysIndirect',
+    'glDrawElements', 'glDrawElementsInstanced', 'glDrawElementsBaseVertex', 'glDrawElementsIndirect',
+    'glMultiDrawArrays', 'glMultiDrawArraysIndirect', 'glMultiDrawElements', 'glMultiDrawElementsIndirect',
+    'glCallList', 'glCallLists',
+}
+
+DISPATCH_FUNCTIONS = {'glDispatchCompute', 'glDispatchComputeIndirect'}
+
+
+class NullGLConstant(int):
+    """
+    Int constant which displays itself as the name, like OpenGL.constant.IntConstant.
+    It loads the pickled IntConstant of PyOpenGL, and it is pickled as a plain int,
+    so the resources saved by a headless run are loaded without NullGL.
+    """
+    def __new__(cls, name, value):
+        constant = int.__new__(cls, value)
+        constant.name = name
+        return constant
+
+    def __setstate__(self, state):
+        # the pickle state of a PyOpenGL constant is the name
+        self.name = state
+
+    def __reduce__(self):
+        return int, (int(self), )
+
+    def __repr__(self):
+        return self.name
+
+    __str__ = __repr__
+
+
+class NullGLFloatConstant(float):
+    """ float version of NullGLConstant, like OpenGL.constant.FloatConstant """
+    def __new__(cls, name, value):
+        constant = float.__new__(cls, value)
+        constant.name = name
+        return constant
+
+    def __setstate__(self, state):
+        self.name = state
+
+    def __reduce__(self):
+        return float, (float(self), )
+
+    def __repr__(self):
+        return self.name
+
+    __str__ = __repr__
+
+
+class NullGLConstantFactory:
+    """ OpenGL.constant.Constant, creates the constant class of the value type """
+    def __new__(cls, name, value=None):
+        if isinstance(value, float):
+            return NullGLFloatConstant(name, value)
+        return NullGLConstant(name, value)
+
+
+# the classes of OpenGL.constant which are referenced by the pickled resources
+OPENGL_CONSTANT_CLASSES = dict(
+    Constant=NullGLConstantFactory,
+    NumericConstant=NullGLConstantFactory,
+    IntConstant=NullGLConstant,
+    LongConstant=NullGLConstant,
+    FloatConstant=NullGLFloatConstant,
+)
+
+
+class NullGLInteger(int):
+    """ glGetInteger result. supports both int(...) and the .value of ctypes. """
+    @property
+    def value(self):
+        return int(self)
+
+
+class NullGLStats:
+    gl_call_count = 0
+    draw_call_count = 0
+    dispatch_call_count = 0
+    call_counts = defaultdict(int)
+
+    @staticmethod
+    def reset():
+        NullGLStats.gl_call_count = 0
+        NullGLStats.draw_call_count = 0
+        NullGLStats.dispatch_call_count = 0
+        NullGLStats.call_counts.clear()
+
+
+class NullGLFunction:
+    def __init__(self, name, handler=None):
+        self.__name__ = name
+        self.is_draw_call = name in DRAW_FUNCTIONS
+        self.is_dispatch_call = name in DISPATCH_FUNCTIONS
+        self.handler = handler
+
+    def __repr__(self):
+        return "<NullGLFunction %s>" % self.__name__
+
+    def __call__(self, *args, **kwargs):
+        NullGLStats.gl_call_count += 1
+        NullGLStats.call_counts[self.__name__] += 1
+        if self.is_draw_call:
+            NullGLStats.draw_call_count += 1
+        elif self.is_dispatch_call:
+            NullGLStats.dispatch_call_count += 1
+
+        if self.handler is not None:
+            return self.handler(*args)
+        return None
+
+
+class NullGLNamespace:
+    """ shared symbol table of the every NullGL modules """
+    exports = []
+    constants = dict()
+    functions = dict()
+    # only for the names which are not in GL_ENUMS, e.g. the names of the project scripts
+    next_constant_value = 0x10000
+    next_object_id = 0
+
+    @staticmethod
+    def create_object_id():
+        NullGLNamespace.next_object_id += 1
+        return NullGLNamespace.next_object_id
+
+    @staticmethod
+    def get_constant(name):
+        constant = NullGLNamespace.constants.get(name)
+        if constant is None:
+            value = GL_ENUMS.get(name)
+            if value is None:
+                # leave a gap for GL_TEXTURE0 + i style arithmetic
+                value = NullGLNamespace.next_constant_value
+                NullGLNamespace.next_constant_value += 0x100
+            constant = NullGLConstant(name, value)
+            NullGLNamespace.constants[name] = constant
+        return constant
+
+    @staticmethod
+    def get_function(name):
+        function = NullGLNamespace.functions.get(name)
+        if function is None:
+            function = NullGLFunction(name, get_function_handler(name))
+            NullGLNamespace.functions[name] = function
+        return function
+
+    @staticmethod
+    def get_symbol(module_name, name):
+        if module_name == 'OpenGL.constant' and name in OPENGL_CONSTANT_CLASSES:
+            return OPENGL_CONSTANT_CLASSES[name]
+        elif reGLVersionModule.match(name):
+            return importlib.import_module(module_name + "." + name)
+        elif re.match(r"glu?[A-Z]", name):
+            return NullGLNamespace.get_function(name)
+        elif name.startswith("GL_") or name.startswith("GLU_"):
+            return NullGLNamespace.get_constant(name)
+        elif name in GL_TYPES:
+            return GL_TYPES[name]
+        elif name == 'integer_types':
+            return (int, )
+        elif name.startswith("c_") and hasattr(ctypes, name):
+            return getattr(ctypes, name)
+        raise AttributeError(name)
+
+
+def get_constant_name(value):
+    return value.name if hasattr(value, 'name') else str(value)
+
+
+def get_data_type_size(data_type):
+    data_type = get_constant_name(data_type)
+    if data_type in ('GL_FLOAT', 'GL_INT', 'GL_UNSIGNED_INT'):
+        return 4
+    elif data_type in ('GL_HALF_FLOAT', 'GL_SHORT', 'GL_UNSIGNED_SHORT'):
+        return 2
+    elif data_type == 'GL_DOUBLE':
+        return 8
+    return 1
+
+
+def get_function_handler(name):
+    def gen_objects(count=1, *args):
+        if count == 1:
+            return NullGLNamespace.create_object_id()
+        return [NullGLNamespace.create_object_id() for i in range(count)]
+
+    def create_object(*args):
+        return NullGLNamespace.create_object_id()
+
+    def get_integer(pname, *args):
+        return NullGLInteger(GL_INTEGERS.get(get_constant_name(pname), 16))
+
+    def get_string(name, *args):
+        return GL_STRINGS.get(get_constant_name(name), b"")
+
+    def read_pixels(x, y, width, height, format, data_type, *args):
+        return bytes(int(width) * int(height) * 4 * get_data_type_size(data_type))
+
+    if name.startswith('glGen') and name != 'glGenerateMipmap' and name != 'glGenerateTextureMipmap':
+        return gen_objects
+    elif name.startswith('glCreate') or name == 'glFenceSync':
+        return create_object
+    elif name in ('glGetShaderiv', 'glGetProgramiv'):
+        return lambda *args: NullGLNamespace.get_constant('GL_TRUE')
+    elif name in ('glGetShaderInfoLog', 'glGetProgramInfoLog'):
+        return lambda *args: b""
+    elif name == 'glGetUniformLocation':
+        return create_object
+    elif name in ('glGetUniformBlockIndex', 'glGetAttribLocation', 'glGetProgramResourceIndex'):
+        return lambda *args: 0
+    elif name in ('glGetInteger', 'glGetIntegerv'):
+        return get_integer
+    elif name == 'glGetIntegeri_v':
+        return lambda *args: [1024, 1024, 64]
+    elif name == 'glGetString':
+        return get_string
+    elif name == 'glCheckFramebufferStatus':
+        return lambda *args: NullGLNamespace.get_constant('GL_FRAMEBUFFER_COMPLETE')
+    elif name == 'glClientWaitSync':
+        return lambda *args: NullGLNamespace.get_constant('GL_ALREADY_SIGNALED')
+    elif name == 'glReadPixels':
+        return read_pixels
+    elif name == 'glGetTexImage':
+        return lambda *args: b""
+    return None
+
+
+class NullGLModule(types.ModuleType):
+    def __init__(self, name):
+        types.ModuleType.__init__(self, name)
+        self.__all__ = NullGLNamespace.exports
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return NullGLNamespace.get_symbol(self.__name__, name)
+
+
+class NullGLFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """ serve 'OpenGL' and every 'OpenGL.*' module with NullGLModule """
+    def find_spec(self, fullname, path, target=None):
+        if fullname == 'OpenGL' or fullname.startswith('OpenGL.'):
+            return importlib.util.spec_from_loader(fullname, self, is_package=True)
+        return None
+
+    def create_module(self, spec):
+        return NullGLModule(spec.name)
+
+    def exec_module(self, module):
+        pass
+
+
+def is_valid_symbol(name):
+    if name.startswith("c_"):
+        return hasattr(ctypes, name)
+    elif re.match(r"GL[a-z]", name):
+        return name in GL_TYPES
+    return True
+
+
+def collect_exports(source_dir):
+    """ the names of 'from OpenGL.GL import *' are collected from the source code. """
+    exports = set()
+    for dirname, dirnames, filenames in os.walk(source_dir):
+        for filename in filenames:
+            if filename.endswith('.py'):
+                with open(os.path.join(dirname, filename), 'r', encoding='utf-8', errors='ignore') as f:
+                    exports.update(reNullGLSymbol.findall(f.read()))
+    exports.add('integer_types')
+    return sorted(name for name in exports if is_valid_symbol(name))
+
+
+def is_installed():
+    return any(isinstance(finder, NullGLFinder) for finder in sys.meta_path)
+
+
+def install():
+    if is_installed():
+        return True
+
+    opengl_module = sys.modules.get('OpenGL')
+    if opengl_module is not None and not isinstance(opengl_module, NullGLModule):
+        sys.stderr.write("NullGL : OpenGL was already imported. NullGL must be installed first.\n")
+        return False
+
+    source_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    NullGLNamespace.exports[:] = collect_exports(source_dir)
+    sys.meta_path.insert(0, NullGLFinder())
+    return True
+
+
+def get_gl_call_count():
+    return NullGLStats.gl_call_count
+
+
+def get_draw_call_count():
+    return NullGLStats.draw_call_count
+
+
+def get_dispatch_call_count():
+    return NullGLStats.dispatch_call_count
+
+
+def get_gl_call_counts():
+    return dict(NullGLStats.call_counts)
+
+
+def reset_gl_call_counts():
+    NullGLStats.reset()
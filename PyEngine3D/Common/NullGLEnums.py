@@ -0,0 +1,208 @@
+"""
+The real OpenGL enum values of the GL_ and GLU_ names which the engine uses.
+
+NullGL returns these values, so the pickled resources and the code compare against the same values as PyOpenGL.
+"""
+
+GL_ENUMS = dict(
+    GL_ALL_BARRIER_BITS=0xFFFFFFFF,
+    GL_ALREADY_SIGNALED=0x911A,
+    GL_AMBIENT=0x1200,
+    GL_ARRAY_BUFFER=0x8892,
+    GL_ATOMIC_COUNTER_BUFFER=0x92C0,
+    GL_BGR=0x80E0,
+    GL_BGRA=0x80E1,
+    GL_BLEND=0x0BE2,
+    GL_BYTE=0x1400,
+    GL_CCW=0x0901,
+    GL_CLAMP=0x2900,
+    GL_CLAMP_TO_EDGE=0x812F,
+    GL_COLOR_ATTACHMENT0=0x8CE0,
+    GL_COLOR_BUFFER_BIT=0x4000,
+    GL_COMPILE=0x1300,
+    GL_COMPILE_STATUS=0x8B81,
+    GL_COMPRESSED_RGBA_S3TC_DXT1_EXT=0x83F1,
+    GL_COMPRESSED_RGBA_S3TC_DXT3_EXT=0x83F2,
+    GL_COMPRESSED_RGBA_S3TC_DXT5_EXT=0x83F3,
+    GL_COMPUTE_SHADER=0x91B9,
+    GL_CONDITION_SATISFIED=0x911C,
+    GL_COPY_READ_BUFFER=0x8F36,
+    GL_COPY_WRITE_BUFFER=0x8F37,
+    GL_CULL_FACE=0x0B44,
+    GL_DEPTH24_STENCIL8=0x88F0,
+    GL_DEPTH32F_STENCIL8=0x8CAD,
+    GL_DEPTH_ATTACHMENT=0x8D00,
+    GL_DEPTH_BUFFER_BIT=0x0100,
+    GL_DEPTH_COMPONENT=0x1902,
+    GL_DEPTH_COMPONENT32=0x81A7,
+    GL_DEPTH_COMPONENT32F=0x8CAC,
+    GL_DEPTH_STENCIL=0x84F9,
+    GL_DEPTH_STENCIL_ATTACHMENT=0x821A,
+    GL_DEPTH_TEST=0x0B71,
+    GL_DIFFUSE=0x1201,
+    GL_DISPATCH_INDIRECT_BUFFER=0x90EE,
+    GL_DOUBLE=0x140A,
+    GL_DRAW_FRAMEBUFFER=0x8CA9,
+    GL_DRAW_INDIRECT_BUFFER=0x8F3F,
+    GL_DYNAMIC_DRAW=0x88E8,
+    GL_ELEMENT_ARRAY_BUFFER=0x8893,
+    GL_EXTENSIONS=0x1F03,
+    GL_FALSE=0,
+    GL_FILL=0x1B02,
+    GL_FLOAT=0x1406,
+    GL_FRAGMENT_SHADER=0x8B30,
+    GL_FRAMEBUFFER=0x8D40,
+    GL_FRAMEBUFFER_COMPLETE=0x8CD5,
+    GL_FRAMEBUFFER_INCOMPLETE_ATTACHMENT=0x8CD6,
+    GL_FRAMEBUFFER_INCOMPLETE_DRAW_BUFFER=0x8CDB,
+    GL_FRAMEBUFFER_INCOMPLETE_MISSING_ATTACHMENT=0x8CD7,
+    GL_FRAMEBUFFER_INCOMPLETE_MULTISAMPLE=0x8D56,
+    GL_FRAMEBUFFER_INCOMPLETE_READ_BUFFER=0x8CDC,
+    GL_FRAMEBUFFER_SRGB=0x8DB9,
+    GL_FRAMEBUFFER_UNDEFINED=0x8219,
+    GL_FRAMEBUFFER_UNSUPPORTED=0x8CDD,
+    GL_FRONT=0x0404,
+    GL_FRONT_AND_BACK=0x0408,
+    GL_FUNC_ADD=0x8006,
+    GL_FUNC_SUBTRACT=0x800A,
+    GL_GEOMETRY_SHADER=0x8DD9,
+    GL_HALF_FLOAT=0x140B,
+    GL_INT=0x1404,
+    GL_INT64=0x140E,
+    GL_LEQUAL=0x0203,
+    GL_LIGHT0=0x4000,
+    GL_LIGHTING=0x0B50,
+    GL_LIGHT_MODEL_AMBIENT=0x0B53,
+    GL_LINE=0x1B01,
+    GL_LINEAR=0x2601,
+    GL_LINEAR_MIPMAP_LINEAR=0x2703,
+    GL_LINEAR_MIPMAP_NEAREST=0x2701,
+    GL_LINES=1,
+    GL_LINK_STATUS=0x8B82,
+    GL_LUMINANCE=0x1909,
+    GL_MAJOR_VERSION=0x821B,
+    GL_MAP_READ_BIT=1,
+    GL_MAX=0x8008,
+    GL_MAX_COMBINED_SHADER_STORAGE_BLOCKS=0x90DC,
+    GL_MAX_COMBINED_TEXTURE_IMAGE_UNITS=0x8B4D,
+    GL_MAX_COMPUTE_SHADER_STORAGE_BLOCKS=0x90DB,
+    GL_MAX_COMPUTE_WORK_GROUP_COUNT=0x91BE,
+    GL_MAX_COMPUTE_WORK_GROUP_INVOCATIONS=0x90EB,
+    GL_MAX_COMPUTE_WORK_GROUP_SIZE=0x91BF,
+    GL_MAX_DRAW_BUFFERS=0x8824,
+    GL_MAX_FRAGMENT_SHADER_STORAGE_BLOCKS=0x90DA,
+    GL_MAX_FRAGMENT_UNIFORM_BLOCKS=0x8A2D,
+    GL_MAX_FRAGMENT_UNIFORM_COMPONENTS=0x8B49,
+    GL_MAX_GEOMETRY_SHADER_STORAGE_BLOCKS=0x90D7,
+    GL_MAX_GEOMETRY_UNIFORM_BLOCKS=0x8A2C,
+    GL_MAX_SHADER_STORAGE_BLOCK_SIZE=0x90DE,
+    GL_MAX_SHADER_STORAGE_BUFFER_BINDINGS=0x90DD,
+    GL_MAX_TESS_CONTROL_SHADER_STORAGE_BLOCKS=0x90D8,
+    GL_MAX_TESS_EVALUATION_SHADER_STORAGE_BLOCKS=0x90D9,
+    GL_MAX_TEXTURE_COORDS=0x8871,
+    GL_MAX_TEXTURE_IMAGE_UNITS=0x8872,
+    GL_MAX_UNIFORM_BLOCK_SIZE=0x8A30,
+    GL_MAX_VARYING_FLOATS=0x8B4B,
+    GL_MAX_VERTEX_ATTRIBS=0x8869,
+    GL_MAX_VERTEX_SHADER_STORAGE_BLOCKS=0x90D6,
+    GL_MAX_VERTEX_TEXTURE_IMAGE_UNITS=0x8B4C,
+    GL_MAX_VERTEX_UNIFORM_BLOCKS=0x8A2B,
+    GL_MAX_VERTEX_UNIFORM_COMPONENTS=0x8B4A,
+    GL_MINOR_VERSION=0x821C,
+    GL_MIRRORED_REPEAT=0x8370,
+    GL_MODELVIEW=0x1700,
+    GL_MULTISAMPLE=0x809D,
+    GL_NEAREST=0x2600,
+    GL_NEAREST_MIPMAP_LINEAR=0x2702,
+    GL_NEAREST_MIPMAP_NEAREST=0x2700,
+    GL_NICEST=0x1102,
+    GL_NONE=0,
+    GL_NORMALIZE=0x0BA1,
+    GL_ONE=1,
+    GL_ONE_MINUS_SRC_ALPHA=0x0303,
+    GL_PERSPECTIVE_CORRECTION_HINT=0x0C50,
+    GL_PIXEL_PACK_BUFFER=0x88EB,
+    GL_POINTS=0,
+    GL_POLYGON=9,
+    GL_POSITION=0x1203,
+    GL_PROGRAM_BINARY_LENGTH=0x8741,
+    GL_PROGRAM_BINARY_RETRIEVABLE_HINT=0x8257,
+    GL_PROGRAM_SEPARABLE=0x8258,
+    GL_PROJECTION=0x1701,
+    GL_QUADS=7,
+    GL_R16F=0x822D,
+    GL_R32F=0x822E,
+    GL_R32UI=0x8236,
+    GL_R8=0x8229,
+    GL_READ_FRAMEBUFFER=0x8CA8,
+    GL_READ_ONLY=0x88B8,
+    GL_READ_WRITE=0x88BA,
+    GL_RED=0x1903,
+    GL_RED_INTEGER=0x8D94,
+    GL_RENDERBUFFER=0x8D41,
+    GL_RENDERER=0x1F01,
+    GL_REPEAT=0x2901,
+    GL_RG=0x8227,
+    GL_RG32F=0x8230,
+    GL_RGB=0x1907,
+    GL_RGB16F=0x881B,
+    GL_RGB8=0x8051,
+    GL_RGBA=0x1908,
+    GL_RGBA16F=0x881A,
+    GL_RGBA32F=0x8814,
+    GL_RGBA8=0x8058,
+    GL_SHADER_STORAGE_BUFFER=0x90D2,
+    GL_SHADER_STORAGE_BUFFER_OFFSET_ALIGNMENT=0x90DF,
+    GL_SHADING_LANGUAGE_VERSION=0x8B8C,
+    GL_SHININESS=0x1601,
+    GL_SHORT=0x1402,
+    GL_SMOOTH=0x1D01,
+    GL_SPECULAR=0x1202,
+    GL_SRC_ALPHA=0x0302,
+    GL_SRC_COLOR=0x0300,
+    GL_SRGB8=0x8C41,
+    GL_SRGB8_ALPHA8=0x8C43,
+    GL_STATIC_DRAW=0x88E4,
+    GL_STREAM_DRAW=0x88E0,
+    GL_STREAM_READ=0x88E1,
+    GL_SYNC_GPU_COMMANDS_COMPLETE=0x9117,
+    GL_TESS_CONTROL_SHADER=0x8E88,
+    GL_TESS_EVALUATION_SHADER=0x8E87,
+    GL_TEXTURE0=0x84C0,
+    GL_TEXTURE_1D=0x0DE0,
+    GL_TEXTURE_2D=0x0DE1,
+    GL_TEXTURE_2D_ARRAY=0x8C1A,
+    GL_TEXTURE_2D_MULTISAMPLE=0x9100,
+    GL_TEXTURE_3D=0x806F,
+    GL_TEXTURE_CUBE_MAP=0x8513,
+    GL_TEXTURE_CUBE_MAP_NEGATIVE_X=0x8516,
+    GL_TEXTURE_CUBE_MAP_NEGATIVE_Y=0x8518,
+    GL_TEXTURE_CUBE_MAP_NEGATIVE_Z=0x851A,
+    GL_TEXTURE_CUBE_MAP_POSITIVE_X=0x8515,
+    GL_TEXTURE_CUBE_MAP_POSITIVE_Y=0x8517,
+    GL_TEXTURE_CUBE_MAP_POSITIVE_Z=0x8519,
+    GL_TEXTURE_CUBE_MAP_SEAMLESS=0x884F,
+    GL_TEXTURE_DEPTH=0x8071,
+    GL_TEXTURE_HEIGHT=0x1001,
+    GL_TEXTURE_MAG_FILTER=0x2800,
+    GL_TEXTURE_MIN_FILTER=0x2801,
+    GL_TEXTURE_WIDTH=0x1000,
+    GL_TEXTURE_WRAP_R=0x8072,
+    GL_TEXTURE_WRAP_S=0x2802,
+    GL_TEXTURE_WRAP_T=0x2803,
+    GL_TRIANGLES=4,
+    GL_TRUE=1,
+    GL_UNIFORM_BUFFER=0x8A11,
+    GL_UNIFORM_BUFFER_OFFSET_ALIGNMENT=0x8A34,
+    GL_UNSIGNED_BYTE=0x1401,
+    GL_UNSIGNED_INT=0x1405,
+    GL_UNSIGNED_INT64=0x140F,
+    GL_UNSIGNED_INT_24_8=0x84FA,
+    GL_UNSIGNED_SHORT=0x1403,
+    GL_VALIDATE_STATUS=0x8B83,
+    GL_VENDOR=0x1F00,
+    GL_VERSION=0x1F02,
+    GL_VERTEX_SHADER=0x8B31,
+    GL_WRITE_ONLY=0x88B9,
+    GL_ZERO=0,
+)
@@ -0,0 +1,95 @@
+import pickle
+from collections import OrderedDict
+
+
+class ResourceListSnapshot:
+    """
+    The resource list published to the editor.
+    Changes are only recorded here and sent as one versioned diff per frame,
+    so the thousands of registrations while a project opens are coalesced into a single message.
+    """
+    def __init__(self):
+        self.version = 0
+        self.resource_infos = OrderedDict()  # {(resource_name, resource_type_name): is_loaded}
+        self.changed = OrderedDict()
+        self.removed = set()
+
+    def clear(self):
+        for key in self.resource_infos:
+            self.removed.add(key)
+        self.resource_infos.clear()
+        self.changed.clear()
+
+    def set_resource_info(self, resource_info):
+        resource_name, resource_type_name, is_loaded = resource_info
+        key = (resource_name, resource_type_name)
+        if key not in self.resource_infos or self.resource_infos[key] != is_loaded:
+            self.resource_infos[key] = is_loaded
+            self.changed[key] = is_loaded
+            self.removed.discard(key)
+
+    def delete_resource_info(self, resource_info):
+        key = (resource_info[0], resource_info[1])
+        if key in self.resource_infos:
+            self.resource_infos.pop(key)
+            self.changed.pop(key, None)
+            self.removed.add(key)
+
+    def has_diff(self):
+        return 0 < len(self.changed) or 0 < len(self.removed)
+
+    def pop_diff(self):
+        """
+        :return: (base_version, version, [(resource_name, resource_type_name, is_loaded)], [(resource_name, resource_type_name)])
+        """
+        if not self.has_diff():
+            return None
+        base_version = self.version
+        self.version += 1
+        diff = (base_version,
+                self.version,
+                [key + (is_loaded, ) for key, is_loaded in self.changed.items()],
+                list(self.removed))
+        self.changed = OrderedDict()
+        self.removed = set()
+        return diff
+
+    def get_snapshot(self):
+        """
+        :return: (version, [(resource_name, resource_type_name, is_loaded)])
+        """
+        # pending changes are included in the snapshot.
+        self.pop_diff()
+        return self.version, [key + (is_loaded, ) for key, is_loaded in self.resource_infos.items()]
+
+
+class AttributeSnapshot:
+    """
+    The last attributes sent to the attribute panel of the editor.
+    Each top level attribute is compared by its pickled bytes, which is what goes through the queue anyway.
+    """
+    def __init__(self):
+        self.digests = None
+
+    @staticmethod
+    def get_digests(attributes):
+        return OrderedDict((attribute.name, pickle.dumps(attribute, protocol=pickle.HIGHEST_PROTOCOL))
+                           for attribute in attributes.get_attributes())
+
+    def clear(self):
+        self.digests = None
+
+    def reset(self, attributes):
+        self.digests = self.get_digests(attributes)
+
+    def make_diff(self, attributes):
+        """
+        :return: [changed Attribute] or None when the attribute names are changed and the whole attributes must be sent.
+        """
+        digests = self.get_digests(attributes)
+        if self.digests is None or list(self.digests.keys()) != list(digests.keys()):
+            self.digests = digests
+            return None
+        changed = [attributes.get_attribute(name) for name in digests if digests[name] != self.digests[name]]
+        self.digests = digests
+        return changed
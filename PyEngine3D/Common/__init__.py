@@ -6,4 +6,5 @@ log_level = Logger.INFO  # Logger.DEBUG, Logger.MINOR_INFO, Logger.INFO, Logger.
 logger = Logger.getLogger(level=log_level)
 
 from .Command import COMMAND, get_command_name, CustomPipe, CustomQueue
+from .Snapshot import ResourceListSnapshot, AttributeSnapshot
 from .Constants import *
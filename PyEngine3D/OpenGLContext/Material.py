@@ -97,6 +97,7 @@ class Material:
 
     def delete(self):
         OpenGLContext.use_program(0)
+        OpenGLContext.clear_uniform_cache(self.program)
         glDeleteProgram(self.program)
         logger.info("Deleted %s material." % self.name)
 
@@ -8,7 +8,7 @@ from OpenGL.raw.GL.VERSION import GL_1_1, GL_1_2, GL_3_0
 from OpenGL.raw.GL import _types
 from OpenGL import images, arrays
 
-from PyEngine3D.Common import logger
+from PyEngine3D.Common import logger, NullGL
 
 
 # Function : IsExtensionSupported
@@ -19,13 +19,30 @@ reCheckGLExtention = re.compile("GL_(.+?)_(.+)")
 class OpenGLContext:
     last_vertex_array = -1
     last_program = 0
+    # state cache, None is unknown state.
+    enable_states = {}  # {capability: bool}
+    blend_equation_state = None
+    blend_func_state = None
+    depth_mask_state = None
+    depth_func_state = None
+    front_face_state = None
+    cull_face_state = None
+    active_texture_unit = None
+    texture_units = {}  # {texture unit: (target, texture)}
+    uniform_values = {}  # {(program, location): last value}
+    state_call_issued = 0
+    state_call_skipped = 0
+    uniform_call_issued = 0
+    uniform_call_skipped = 0
     gl_major_version = 0
     gl_minor_version = 0
+    null_gl = False
     require_gl_major_version = 4
     require_gl_minor_version = 3
     GL_MAX_COMPUTE_WORK_GROUP_COUNT = None
     GL_MAX_COMPUTE_WORK_GROUP_SIZE = None
     GL_MAX_COMPUTE_WORK_GROUP_INVOCATIONS = None
+    GL_SHADER_STORAGE_BUFFER_OFFSET_ALIGNMENT = 256
 
     @staticmethod
     def initialize():
@@ -49,6 +66,8 @@ class OpenGLContext:
                 
         logger.info("=" * 30)
 
+        OpenGLContext.null_gl = NullGL.is_installed()
+
         infos = [GL_RENDERER, GL_VENDOR, GL_SHADING_LANGUAGE_VERSION]
         for info in infos:
             info_string = callglGetString(info)
@@ -87,6 +106,10 @@ class OpenGLContext:
             # set value
             setattr(OpenGLContext, info.name, callglGetIntegerv(info))
 
+        alignment = callglGetIntegerv(GL_SHADER_STORAGE_BUFFER_OFFSET_ALIGNMENT)
+        OpenGLContext.GL_SHADER_STORAGE_BUFFER_OFFSET_ALIGNMENT = int(getattr(alignment, 'value', alignment)) or 256
+        logger.info("%s : %d" % (GL_SHADER_STORAGE_BUFFER_OFFSET_ALIGNMENT.name, OpenGLContext.GL_SHADER_STORAGE_BUFFER_OFFSET_ALIGNMENT))
+
         # compute shader
         OpenGLContext.GL_MAX_COMPUTE_WORK_GROUP_COUNT = [callglGetIntegeri_v(GL_MAX_COMPUTE_WORK_GROUP_COUNT, i)[0] for i in range(3)]
         OpenGLContext.GL_MAX_COMPUTE_WORK_GROUP_SIZE = [callglGetIntegeri_v(GL_MAX_COMPUTE_WORK_GROUP_SIZE, i)[0] for i in range(3)]
@@ -111,6 +134,8 @@ class OpenGLContext:
             return GL_FLOAT
         elif np.float64 == numpy_dtype or np.double == numpy_dtype:
             return GL_DOUBLE
+        elif np.float16 == numpy_dtype:
+            return GL_HALF_FLOAT
         elif np.uint8 == numpy_dtype:
             return GL_UNSIGNED_BYTE
         elif np.uint16 == numpy_dtype:
@@ -158,8 +183,194 @@ class OpenGLContext:
     def present():
         OpenGLContext.use_program(0)
         OpenGLContext.last_vertex_array = -1
+        # The game backend or the ui may change the states out of the cache.
+        OpenGLContext.reset_state_cache()
         glFlush()
 
+    @staticmethod
+    def reset_state_cache():
+        OpenGLContext.enable_states = {}
+        OpenGLContext.blend_equation_state = None
+        OpenGLContext.blend_func_state = None
+        OpenGLContext.depth_mask_state = None
+        OpenGLContext.depth_func_state = None
+        OpenGLContext.front_face_state = None
+        OpenGLContext.cull_face_state = None
+        OpenGLContext.active_texture_unit = None
+        OpenGLContext.texture_units = {}
+
+    @staticmethod
+    def clear_uniform_cache(program):
+        for key in [key for key in OpenGLContext.uniform_values if key[0] == program]:
+            OpenGLContext.uniform_values.pop(key)
+
+    @staticmethod
+    def get_state_cache_stats():
+        return dict(state_call_issued=OpenGLContext.state_call_issued,
+                    state_call_skipped=OpenGLContext.state_call_skipped,
+                    uniform_call_issued=OpenGLContext.uniform_call_issued,
+                    uniform_call_skipped=OpenGLContext.uniform_call_skipped)
+
+    @staticmethod
+    def reset_state_cache_stats():
+        OpenGLContext.state_call_issued = 0
+        OpenGLContext.state_call_skipped = 0
+        OpenGLContext.uniform_call_issued = 0
+        OpenGLContext.uniform_call_skipped = 0
+
+    @staticmethod
+    def enable(capability):
+        if OpenGLContext.enable_states.get(capability) is not True:
+            OpenGLContext.enable_states[capability] = True
+            OpenGLContext.state_call_issued += 1
+            glEnable(capability)
+            return True
+        OpenGLContext.state_call_skipped += 1
+        return False
+
+    @staticmethod
+    def disable(capability):
+        if OpenGLContext.enable_states.get(capability) is not False:
+            OpenGLContext.enable_states[capability] = False
+            OpenGLContext.state_call_issued += 1
+            glDisable(capability)
+            return True
+        OpenGLContext.state_call_skipped += 1
+        return False
+
+    @staticmethod
+    def enablei(capability, index):
+        # the indexed state is not cached, so the state of the capability is unknown now.
+        OpenGLContext.enable_states.pop(capability, None)
+        OpenGLContext.state_call_issued += 1
+        glEnablei(capability, index)
+
+    @staticmethod
+    def disablei(capability, index):
+        OpenGLContext.enable_states.pop(capability, None)
+        OpenGLContext.state_call_issued += 1
+        glDisablei(capability, index)
+
+    @staticmethod
+    def blend_equation(mode):
+        if mode != OpenGLContext.blend_equation_state:
+            OpenGLContext.blend_equation_state = mode
+            OpenGLContext.state_call_issued += 1
+            glBlendEquation(mode)
+            return True
+        OpenGLContext.state_call_skipped += 1
+        return False
+
+    @staticmethod
+    def blend_func(func_src, func_dst):
+        if (func_src, func_dst) != OpenGLContext.blend_func_state:
+            OpenGLContext.blend_func_state = (func_src, func_dst)
+            OpenGLContext.state_call_issued += 1
+            glBlendFunc(func_src, func_dst)
+            return True
+        OpenGLContext.state_call_skipped += 1
+        return False
+
+    @staticmethod
+    def depth_mask(flag):
+        flag = bool(flag)
+        if flag != OpenGLContext.depth_mask_state:
+            OpenGLContext.depth_mask_state = flag
+            OpenGLContext.state_call_issued += 1
+            glDepthMask(flag)
+            return True
+        OpenGLContext.state_call_skipped += 1
+        return False
+
+    @staticmethod
+    def depth_func(func):
+        if func != OpenGLContext.depth_func_state:
+            OpenGLContext.depth_func_state = func
+            OpenGLContext.state_call_issued += 1
+            glDepthFunc(func)
+            return True
+        OpenGLContext.state_call_skipped += 1
+        return False
+
+    @staticmethod
+    def front_face(mode):
+        if mode != OpenGLContext.front_face_state:
+            OpenGLContext.front_face_state = mode
+            OpenGLContext.state_call_issued += 1
+            glFrontFace(mode)
+            return True
+        OpenGLContext.state_call_skipped += 1
+        return False
+
+    @staticmethod
+    def cull_face(mode):
+        if mode != OpenGLContext.cull_face_state:
+            OpenGLContext.cull_face_state = mode
+            OpenGLContext.state_call_issued += 1
+            glCullFace(mode)
+            return True
+        OpenGLContext.state_call_skipped += 1
+        return False
+
+    @staticmethod
+    def active_texture(texture_unit):
+        if texture_unit != OpenGLContext.active_texture_unit:
+            OpenGLContext.active_texture_unit = texture_unit
+            OpenGLContext.state_call_issued += 1
+            glActiveTexture(texture_unit)
+            return True
+        OpenGLContext.state_call_skipped += 1
+        return False
+
+    @staticmethod
+    def bind_texture(target, texture):
+        """ binds to the active texture unit. the textures must be bound through here to keep the cache valid. """
+        texture_unit = OpenGLContext.active_texture_unit
+        if texture_unit is None or OpenGLContext.texture_units.get(texture_unit) != (target, texture):
+            if texture_unit is not None:
+                OpenGLContext.texture_units[texture_unit] = (target, texture)
+            OpenGLContext.state_call_issued += 1
+            glBindTexture(target, texture)
+            return True
+        OpenGLContext.state_call_skipped += 1
+        return False
+
+    @staticmethod
+    def delete_texture(texture):
+        for texture_unit, target_and_texture in list(OpenGLContext.texture_units.items()):
+            if target_and_texture[1] == texture:
+                OpenGLContext.texture_units.pop(texture_unit)
+
+    @staticmethod
+    def is_uniform_changed(program, location, value):
+        """ compares with the last value uploaded to the location of the program, and keeps the new value. """
+        if isinstance(value, np.ndarray):
+            value = value.tobytes()
+        elif isinstance(value, (list, tuple)):
+            value = np.array(value).tobytes()
+        key = (program, location)
+        if key in OpenGLContext.uniform_values and OpenGLContext.uniform_values[key] == value:
+            OpenGLContext.uniform_call_skipped += 1
+            return False
+        OpenGLContext.uniform_values[key] = value
+        OpenGLContext.uniform_call_issued += 1
+        return True
+
+    @staticmethod
+    def get_gl_call_stats():
+        gl_call_stats = OpenGLContext.get_state_cache_stats()
+        if OpenGLContext.null_gl:
+            gl_call_stats.update(gl_calls=NullGL.get_gl_call_count(),
+                                 draw_calls=NullGL.get_draw_call_count(),
+                                 dispatch_calls=NullGL.get_dispatch_call_count())
+        return gl_call_stats
+
+    @staticmethod
+    def reset_gl_call_stats():
+        OpenGLContext.reset_state_cache_stats()
+        if OpenGLContext.null_gl:
+            NullGL.reset_gl_call_counts()
+
     @staticmethod
     def _get_texture_level_dims(target, level):
         dim = _types.GLuint()
@@ -177,6 +388,9 @@ class OpenGLContext:
     @staticmethod
     def glGetTexImage(target, level, format, type, array=None, outputType=bytes):
         """bug fixed overwirte version"""
+        if OpenGLContext.null_gl:
+            return glGetTexImage(target, level, format, type)
+
         arrayType = arrays.GL_CONSTANT_TO_ARRAY_TYPE[images.TYPE_TO_ARRAYTYPE.get(type, type)]
         if array is None:
             dims = OpenGLContext._get_texture_level_dims(target, level)
@@ -114,3 +114,111 @@ class DrawElementIndirectBuffer(ShaderBuffer):
 
 class ShaderStorageBuffer(ShaderBuffer):
     target = GL_SHADER_STORAGE_BUFFER
+
+
+class ShaderStorageRingBuffer:
+    """
+    A shader storage buffer split into ring_count regions for the data streamed every frame.
+    Each upload writes the next region with one glBufferSubData and binds only that range,
+    so the draws still reading the previous regions do not stall the upload.
+    The buffer is orphaned when the ring wraps around, and reallocated when the data does not fit in a region.
+    """
+    target = GL_SHADER_STORAGE_BUFFER
+    usage = GL_STREAM_DRAW
+
+    def __init__(self, name, binding, region_size=64 * 1024, ring_count=3, alignment=256):
+        self.name = name
+        self.binding = binding
+        self.ring_count = ring_count
+        self.alignment = max(1, alignment)
+        self.region_size = 0
+        self.region_index = 0
+
+        self.buffer = glGenBuffers(1)
+        self.allocate(region_size)
+
+    def delete(self):
+        glDeleteBuffers(1, [self.buffer, ])
+
+    def allocate(self, region_size):
+        self.region_size = int(math.ceil(region_size / self.alignment)) * self.alignment
+        self.region_index = 0
+        glBindBuffer(self.target, self.buffer)
+        glBufferData(self.target, self.region_size * self.ring_count, None, self.usage)
+
+    def upload(self, data):
+        if data.nbytes == 0:
+            return
+
+        if self.region_size < data.nbytes:
+            self.allocate(max(data.nbytes, self.region_size * 2))
+        else:
+            self.region_index = (self.region_index + 1) % self.ring_count
+            if 0 == self.region_index:
+                # orphaning
+                glBindBuffer(self.target, self.buffer)
+                glBufferData(self.target, self.region_size * self.ring_count, None, self.usage)
+
+        offset = self.region_index * self.region_size
+        glBindBuffer(self.target, self.buffer)
+        glBufferSubData(self.target, offset, data.nbytes, data)
+        glBindBufferRange(self.target, self.binding, self.buffer, offset, data.nbytes)
+
+
+class PixelReadBuffer:
+    """
+    Reads the pixels of the bound read framebuffer into a pixel pack buffer without waiting for the gpu.
+    The data is taken with get_data on a later frame, when the fence of the read is signaled.
+    """
+    target = GL_PIXEL_PACK_BUFFER
+    usage = GL_STREAM_READ
+
+    def __init__(self, name, dtype, width=1, height=1):
+        self.name = name
+        self.dtype = np.dtype(dtype)
+        self.width = width
+        self.height = height
+        self.data_size = self.dtype.itemsize * width * height
+        self.fence = None
+
+        self.buffer = glGenBuffers(1)
+        glBindBuffer(self.target, self.buffer)
+        glBufferData(self.target, self.data_size, None, self.usage)
+        glBindBuffer(self.target, 0)
+
+    def delete(self):
+        self.delete_fence()
+        glDeleteBuffers(1, [self.buffer, ])
+
+    def delete_fence(self):
+        if self.fence is not None:
+            glDeleteSync(self.fence)
+            self.fence = None
+
+    def is_pending(self):
+        return self.fence is not None
+
+    def read_pixels(self, x, y, texture_format, data_type):
+        glBindBuffer(self.target, self.buffer)
+        glReadPixels(x, y, self.width, self.height, texture_format, data_type, c_void_p(0))
+        glBindBuffer(self.target, 0)
+        self.delete_fence()
+        self.fence = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+
+    def get_data(self):
+        """ :return: None until the gpu finished the read """
+        if self.fence is None:
+            return None
+        if glClientWaitSync(self.fence, 0, 0) not in (GL_ALREADY_SIGNALED, GL_CONDITION_SATISFIED):
+            return None
+        self.delete_fence()
+
+        glBindBuffer(self.target, self.buffer)
+        data_ptr = glMapBufferRange(self.target, 0, self.data_size, GL_MAP_READ_BIT)
+        if data_ptr:
+            data = np.frombuffer(string_at(data_ptr, self.data_size), dtype=self.dtype)
+        else:
+            data = np.zeros(self.width * self.height, dtype=self.dtype)
+        glUnmapBuffer(self.target)
+        glBindBuffer(self.target, 0)
+        return data
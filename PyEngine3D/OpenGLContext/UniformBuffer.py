@@ -5,6 +5,7 @@ from OpenGL.GL import *
 
 from PyEngine3D.Common import logger
 from PyEngine3D.App import CoreManager
+from .OpenGLContext import OpenGLContext
 
 
 ignore_uniform_types = ["atomic_bool", "atomic_uint", "atomic_int", "atomic_float"]
@@ -113,6 +114,7 @@ class UniformVariable:
 
     def __init__(self, program, variable_name):
         self.name = variable_name
+        self.program = program
         self.location = glGetUniformLocation(program, variable_name)
         self.show_message = True
         self.default_value = None
@@ -140,154 +142,176 @@ class UniformBool(UniformVariable):
     uniform_type = "bool"
 
     def bind_uniform(self, value):
-        glUniform1i(self.location, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform1i(self.location, value)
 
 
 class UniformInt(UniformVariable):
     uniform_type = "int"
 
     def bind_uniform(self, value):
-        glUniform1i(self.location, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform1i(self.location, value)
 
 
 class UniformUint(UniformVariable):
     uniform_type = "uint"
 
     def bind_uniform(self, value):
-        glUniform1ui(self.location, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform1ui(self.location, value)
 
 
 class UniformFloat(UniformVariable):
     uniform_type = "float"
 
     def bind_uniform(self, value):
-        glUniform1f(self.location, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform1f(self.location, value)
 
 
 class UniformVector2(UniformVariable):
     uniform_type = "vec2"
 
     def bind_uniform(self, value, num=1):
-        glUniform2fv(self.location, num, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform2fv(self.location, num, value)
 
 
 class UniformVector3(UniformVariable):
     uniform_type = "vec3"
 
     def bind_uniform(self, value, num=1):
-        glUniform3fv(self.location, num, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform3fv(self.location, num, value)
 
 
 class UniformVector4(UniformVariable):
     uniform_type = "vec4"
 
     def bind_uniform(self, value, num=1):
-        glUniform4fv(self.location, num, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform4fv(self.location, num, value)
 
 
 class UniformBoolVector2(UniformVariable):
     uniform_type = "bvec2"
 
     def bind_uniform(self, value, num=1):
-        glUniform2iv(self.location, num, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform2iv(self.location, num, value)
 
 
 class UniformBoolVector3(UniformVariable):
     uniform_type = "bvec3"
 
     def bind_uniform(self, value, num=1):
-        glUniform3iv(self.location, num, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform3iv(self.location, num, value)
 
 
 class UniformBoolVector4(UniformVariable):
     uniform_type = "bvec4"
 
     def bind_uniform(self, value, num=1):
-        glUniform4iv(self.location, num, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform4iv(self.location, num, value)
 
 
 class UniformIntVector2(UniformVariable):
     uniform_type = "ivec2"
 
     def bind_uniform(self, value, num=1):
-        glUniform2iv(self.location, num, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform2iv(self.location, num, value)
 
 
 class UniformIntVector3(UniformVariable):
     uniform_type = "ivec3"
 
     def bind_uniform(self, value, num=1):
-        glUniform3iv(self.location, num, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform3iv(self.location, num, value)
 
 
 class UniformIntVector4(UniformVariable):
     uniform_type = "ivec4"
 
     def bind_uniform(self, value, num=1):
-        glUniform4iv(self.location, num, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform4iv(self.location, num, value)
 
 
 class UniformUintVector2(UniformVariable):
     uniform_type = "uvec2"
 
     def bind_uniform(self, value, num=1):
-        glUniform2uiv(self.location, num, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform2uiv(self.location, num, value)
 
 
 class UniformUintVector3(UniformVariable):
     uniform_type = "uvec3"
 
     def bind_uniform(self, value, num=1):
-        glUniform3uiv(self.location, num, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform3uiv(self.location, num, value)
 
 
 class UniformUintVector4(UniformVariable):
     uniform_type = "uvec4"
 
     def bind_uniform(self, value, num=1):
-        glUniform4uiv(self.location, num, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniform4uiv(self.location, num, value)
 
 
 class UniformMatrix2(UniformVariable):
     uniform_type = "mat2"
 
     def bind_uniform(self, value, num=1, transpose=False):
-        glUniformMatrix2fv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniformMatrix2fv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
 
 
 class UniformMatrix3(UniformVariable):
     uniform_type = "mat3"
 
     def bind_uniform(self, value, num=1, transpose=False):
-        glUniformMatrix3fv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniformMatrix3fv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
 
 
 class UniformMatrix4(UniformVariable):
     uniform_type = "mat4"
 
     def bind_uniform(self, value, num=1, transpose=False):
-        glUniformMatrix4fv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniformMatrix4fv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
 
 
 class UniformDoubleMatrix2(UniformVariable):
     uniform_type = "dmat2"
 
     def bind_uniform(self, value, num=1, transpose=False):
-        glUniformMatrix2dv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniformMatrix2dv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
 
 
 class UniformDoubleMatrix3(UniformVariable):
     uniform_type = "dmat3"
 
     def bind_uniform(self, value, num=1, transpose=False):
-        glUniformMatrix3dv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniformMatrix3dv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
 
 
 class UniformDoubleMatrix4(UniformVariable):
     uniform_type = "dmat4"
 
     def bind_uniform(self, value, num=1, transpose=False):
-        glUniformMatrix4dv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
+        if OpenGLContext.is_uniform_changed(self.program, self.location, value):
+            glUniformMatrix4dv(self.location, num, GL_TRUE if transpose else GL_FALSE, value)
 
 
 class UniformTextureBase(UniformVariable):
@@ -303,9 +327,10 @@ class UniformTextureBase(UniformVariable):
 
     def bind_uniform(self, texture, wrap=None):
         if texture is not None:
-            glActiveTexture(GL_TEXTURE0 + self.textureIndex)
+            OpenGLContext.active_texture(GL_TEXTURE0 + self.textureIndex)
             texture.bind_texture(wrap)
-            glUniform1i(self.location, self.textureIndex)
+            if OpenGLContext.is_uniform_changed(self.program, self.location, self.textureIndex):
+                glUniform1i(self.location, self.textureIndex)
         elif self.show_message:
             self.show_message = False
             logger.error("%s %s is None" % (self.name, self.__class__.__name__))
@@ -9,6 +9,7 @@ from PyEngine3D.Common import logger
 from PyEngine3D.Common.Constants import *
 from PyEngine3D.Utilities import compute_tangent
 from .OpenGLContext import OpenGLContext
+from .ShaderBuffer import DrawElementsIndirectCommand
 
 
 def CreateVertexArrayBuffer(geometry_data):
@@ -148,6 +149,10 @@ class VertexArrayBuffer:
         self.data_element_count = []
         self.data_element_size = []
         self.data_types = []
+        self.vertex_count = len(datas[0])
+        self.index_count = index_data.size
+        # slot in the StaticGeometryBuffer
+        self.static_geometry_index = -1
 
         self.vertex_array = glGenVertexArrays(1)
         glBindVertexArray(self.vertex_array)
@@ -168,11 +173,18 @@ class VertexArrayBuffer:
             if data_element_count == 0:
                 continue
 
+            # the quantized normals, tangents and texcoords are read as the normalized floats
+            normalized = GL_TRUE if data.dtype in (np.int8, np.uint8, np.int16, np.uint16) else GL_FALSE
+
             glBufferSubData(GL_ARRAY_BUFFER, offset, data.nbytes, data)
             glEnableVertexAttribArray(location)
-            glVertexAttribPointer(location, data_element_count, data_type, GL_FALSE, data_element_size, c_void_p(offset))
+            glVertexAttribPointer(location, data_element_count, data_type, normalized, data_element_size, c_void_p(offset))
             # This is very important!!! : divisor reset
             glVertexAttribDivisor(location, 0)
+            self.vertex_buffer_offset.append(offset)
+            self.data_element_count.append(data_element_count)
+            self.data_element_size.append(data_element_size)
+            self.data_types.append(data_type)
             offset += data.nbytes
 
         self.index_buffer_size = index_data.nbytes
@@ -187,6 +199,7 @@ class VertexArrayBuffer:
         glDeleteVertexArrays(1, GLuint(self.vertex_array))
         glDeleteBuffers(1, GLuint(self.vertex_buffer))
         glDeleteBuffers(1, GLuint(self.index_buffer))
+        self.vertex_buffer = None
 
     def draw_elements(self):
         OpenGLContext.bind_vertex_array(self.vertex_array)
@@ -201,3 +214,173 @@ class VertexArrayBuffer:
     def draw_elements_indirect(self, offset=0):
         OpenGLContext.bind_vertex_array(self.vertex_array)
         glDrawElementsIndirect(self.mode, GL_UNSIGNED_INT, c_void_p(offset))
+
+
+class StaticGeometryBuffer:
+    """
+    The static geometries are copied into one shared vertex buffer and index buffer,
+    so that all of them can be drawn with glMultiDrawElementsIndirect.
+    The vertex attributes are stored in blocks like VertexArrayBuffer, [positions, colors, normals, tangents, texcoords],
+    and the model matrix of each draw is an instance attribute fetched with the base_instance of the command.
+    """
+    static_data_element_count = [3, 4, 3, 3, 2]
+    command_dtype = DrawElementsIndirectCommand().dtype
+
+    def __init__(self, name, instance_location=7, vertex_capacity=1024 * 64, index_capacity=1024 * 256):
+        self.name = name
+        self.instance_location = instance_location
+        self.vertex_capacity = vertex_capacity
+        self.index_capacity = index_capacity
+        self.vertex_array_buffers = []
+        self.pending_vertex_array_buffers = []
+        self.vertex_count = 0
+        self.index_count = 0
+        self.base_vertices = np.zeros(0, dtype=np.uint32)
+        self.first_indices = np.zeros(0, dtype=np.uint32)
+        self.index_counts = np.zeros(0, dtype=np.uint32)
+        self.command_count = 0
+        self.instance_count = 0
+
+        self.vertex_array = glGenVertexArrays(1)
+        self.vertex_buffer = glGenBuffers(1)
+        self.index_buffer = glGenBuffers(1)
+        self.instance_buffer = glGenBuffers(1)
+        self.indirect_buffer = glGenBuffers(1)
+        self.allocate_buffers()
+
+    def delete(self):
+        glDeleteVertexArrays(1, GLuint(self.vertex_array))
+        glDeleteBuffers(4, [self.vertex_buffer, self.index_buffer, self.instance_buffer, self.indirect_buffer])
+
+    def get_block_offset(self, location):
+        return sum(self.static_data_element_count[:location]) * 4 * self.vertex_capacity
+
+    def allocate_buffers(self):
+        OpenGLContext.bind_vertex_array(self.vertex_array)
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer)
+        glBufferData(GL_ARRAY_BUFFER, sum(self.static_data_element_count) * 4 * self.vertex_capacity, None, GL_STATIC_DRAW)
+        for location, data_element_count in enumerate(self.static_data_element_count):
+            glEnableVertexAttribArray(location)
+            glVertexAttribPointer(location, data_element_count, GL_FLOAT, GL_FALSE, data_element_count * 4, c_void_p(self.get_block_offset(location)))
+            glVertexAttribDivisor(location, 0)
+
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, 4 * self.index_capacity, None, GL_STATIC_DRAW)
+
+        # mat4 model matrix, divided into 4 vec4
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_buffer)
+        for i in range(4):
+            glEnableVertexAttribArray(self.instance_location + i)
+            glVertexAttribPointer(self.instance_location + i, 4, GL_FLOAT, GL_FALSE, 64, c_void_p(16 * i))
+            glVertexAttribDivisor(self.instance_location + i, 1)
+
+    def is_mergeable(self, vertex_array_buffer):
+        return GL_TRIANGLES == vertex_array_buffer.mode and \
+            self.static_data_element_count == vertex_array_buffer.data_element_count and \
+            all(GL_FLOAT == data_type for data_type in vertex_array_buffer.data_types)
+
+    def add_geometry(self, vertex_array_buffer):
+        """ :return: the index of the geometry in this buffer, or -1 if it must be drawn by itself. """
+        if 0 <= vertex_array_buffer.static_geometry_index:
+            return vertex_array_buffer.static_geometry_index
+
+        if vertex_array_buffer.vertex_buffer is None or not self.is_mergeable(vertex_array_buffer):
+            return -1
+
+        vertex_array_buffer.static_geometry_index = len(self.vertex_array_buffers)
+        self.vertex_array_buffers.append(vertex_array_buffer)
+        self.pending_vertex_array_buffers.append(vertex_array_buffer)
+        self.base_vertices = np.append(self.base_vertices, np.uint32(self.vertex_count))
+        self.first_indices = np.append(self.first_indices, np.uint32(self.index_count))
+        self.index_counts = np.append(self.index_counts, np.uint32(vertex_array_buffer.index_count))
+        self.vertex_count += vertex_array_buffer.vertex_count
+        self.index_count += vertex_array_buffer.index_count
+        return vertex_array_buffer.static_geometry_index
+
+    def rebuild(self):
+        """ drops the deleted geometries and grows the buffers, then every geometry is copied again. """
+        vertex_array_buffers = [x for x in self.vertex_array_buffers if x.vertex_buffer is not None]
+        for vertex_array_buffer in self.vertex_array_buffers:
+            vertex_array_buffer.static_geometry_index = -1
+
+        self.vertex_array_buffers = []
+        self.pending_vertex_array_buffers = []
+        self.vertex_count = 0
+        self.index_count = 0
+        self.base_vertices = np.zeros(0, dtype=np.uint32)
+        self.first_indices = np.zeros(0, dtype=np.uint32)
+        self.index_counts = np.zeros(0, dtype=np.uint32)
+
+        vertex_count = sum(x.vertex_count for x in vertex_array_buffers)
+        index_count = sum(x.index_count for x in vertex_array_buffers)
+        while self.vertex_capacity < vertex_count:
+            self.vertex_capacity *= 2
+        while self.index_capacity < index_count:
+            self.index_capacity *= 2
+        self.allocate_buffers()
+
+        for vertex_array_buffer in vertex_array_buffers:
+            self.add_geometry(vertex_array_buffer)
+
+    def update_geometries(self):
+        """ copies the geometries added since the last call. static_geometry_index may change by the rebuild. """
+        if not self.pending_vertex_array_buffers:
+            return
+
+        if self.vertex_capacity < self.vertex_count or self.index_capacity < self.index_count or \
+                any(x.vertex_buffer is None for x in self.pending_vertex_array_buffers):
+            self.rebuild()
+
+        glBindBuffer(GL_COPY_WRITE_BUFFER, self.vertex_buffer)
+        for vertex_array_buffer in self.pending_vertex_array_buffers:
+            index = vertex_array_buffer.static_geometry_index
+            base_vertex = int(self.base_vertices[index])
+            glBindBuffer(GL_COPY_READ_BUFFER, vertex_array_buffer.vertex_buffer)
+            for location, data_element_size in enumerate(vertex_array_buffer.data_element_size):
+                glCopyBufferSubData(GL_COPY_READ_BUFFER,
+                                    GL_COPY_WRITE_BUFFER,
+                                    vertex_array_buffer.vertex_buffer_offset[location],
+                                    self.get_block_offset(location) + base_vertex * data_element_size,
+                                    vertex_array_buffer.vertex_count * data_element_size)
+
+        glBindBuffer(GL_COPY_WRITE_BUFFER, self.index_buffer)
+        for vertex_array_buffer in self.pending_vertex_array_buffers:
+            index = vertex_array_buffer.static_geometry_index
+            glBindBuffer(GL_COPY_READ_BUFFER, vertex_array_buffer.index_buffer)
+            glCopyBufferSubData(GL_COPY_READ_BUFFER,
+                                GL_COPY_WRITE_BUFFER,
+                                0,
+                                int(self.first_indices[index]) * 4,
+                                vertex_array_buffer.index_count * 4)
+        self.pending_vertex_array_buffers = []
+
+    def set_draw_commands(self, geometry_indices, instance_counts, model_matrices):
+        """
+        :param geometry_indices: uint32 array, static_geometry_index of each command after update_geometries.
+        :param instance_counts: uint32 array, the instance count of each command.
+        :param model_matrices: float32 array of (sum(instance_counts), 4, 4), the model matrices in command order.
+        """
+        commands = np.empty(len(geometry_indices), dtype=self.command_dtype)
+        commands['vertex_count'] = self.index_counts[geometry_indices]
+        commands['instance_count'] = instance_counts
+        commands['first_index'] = self.first_indices[geometry_indices]
+        commands['base_vertex'] = self.base_vertices[geometry_indices]
+        commands['base_instance'] = np.cumsum(instance_counts) - instance_counts
+        self.command_count = len(commands)
+        self.instance_count = len(model_matrices)
+
+        glBindBuffer(GL_DRAW_INDIRECT_BUFFER, self.indirect_buffer)
+        glBufferData(GL_DRAW_INDIRECT_BUFFER, commands.nbytes, commands, GL_STREAM_DRAW)
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_buffer)
+        glBufferData(GL_ARRAY_BUFFER, model_matrices.nbytes, model_matrices, GL_STREAM_DRAW)
+
+    def multi_draw_elements_indirect(self, first_command, command_count):
+        OpenGLContext.bind_vertex_array(self.vertex_array)
+        glBindBuffer(GL_DRAW_INDIRECT_BUFFER, self.indirect_buffer)
+        glMultiDrawElementsIndirect(GL_TRIANGLES,
+                                    GL_UNSIGNED_INT,
+                                    c_void_p(first_command * self.command_dtype.itemsize),
+                                    command_count,
+                                    self.command_dtype.itemsize)
@@ -11,7 +11,8 @@ from .UniformBuffer import CreateUniformBuffer, CreateUniformDataFromString, \
                             UniformMatrix2, UniformMatrix3, UniformMatrix4, \
                             UniformTextureBase, UniformTexture2D, UniformTexture2DMultiSample, UniformTexture2DArray,  \
                             UniformTexture3D, UniformTextureCube
-from .VertexArrayBuffer import VertexArrayBuffer, CreateVertexArrayBuffer, InstanceBuffer
+from .VertexArrayBuffer import VertexArrayBuffer, CreateVertexArrayBuffer, InstanceBuffer, StaticGeometryBuffer
 from .ShaderBuffer import DispatchIndirectCommand, DrawElementsIndirectCommand
 from .ShaderBuffer import AtomicCounterBuffer, DispatchIndirectBuffer, DrawElementIndirectBuffer, ShaderStorageBuffer
+from .ShaderBuffer import ShaderStorageRingBuffer, PixelReadBuffer
 from .Material import Material
\ No newline at end of file
@@ -3,6 +3,7 @@ import math
 import numpy as np
 
 from PyEngine3D.Utilities import *
+from PyEngine3D.Utilities.TransformStore import euler_to_matrices
 from PyEngine3D.App import CoreManager
 from .Mesh import BoundBox
 
@@ -16,6 +17,8 @@ class StaticActor:
         self.visible = object_data.get('visible', True)
         self.object_id = object_data.get('object_id', 0)
         self.object_color = object_data.get('object_color', Float3(1.0, 1.0, 1.0))
+        # the LOD of the mesh, chosen by select_lods
+        self.lod = 0
 
         # transform
         self.bound_box = BoundBox()
@@ -24,6 +27,8 @@ class StaticActor:
         self.transform.set_pos(object_data.get('pos', [0, 0, 0]))
         self.transform.set_rotation(object_data.get('rot', [0, 0, 0]))
         self.transform.set_scale(object_data.get('scale', [1, 1, 1]))
+        # the name of the parent object, the transform is linked by SceneManager.set_object_parent
+        self.parent_name = object_data.get('parent', '')
 
         self.set_model(object_data.get('model'))
 
@@ -38,6 +43,12 @@ class StaticActor:
         self.instance_count = object_data.get('instance_count', 1)
         self.instance_render_count = object_data.get('instance_render_count', None)
         self.instance_matrix = None
+        # bound spheres of the instances in the actor space
+        self.instance_bound_center = None
+        self.instance_bound_radius = None
+        # the instances in the view frustum, packed at the front.
+        self.instance_visible_matrix = None
+        self.instance_visible_count = 0
         self.bound_box_scale = Float3()
         self.bound_box_offset = Float3()
 
@@ -57,6 +68,9 @@ class StaticActor:
     def get_pos(self):
         return self.transform.get_pos()
 
+    def get_world_pos(self):
+        return self.transform.get_world_pos()
+
     def set_pos(self, pos):
         self.transform.set_pos(pos)
 
@@ -91,13 +105,14 @@ class StaticActor:
             pos=self.transform.pos.tolist(),
             rot=self.transform.rot.tolist(),
             scale=self.transform.scale.tolist(),
+            parent=self.parent_name,
             instance_count=self.instance_count,
             instance_pos=self.instance_pos.get_save_data(),
             instance_rot=self.instance_rot.get_save_data(),
             instance_scale=self.instance_scale.get_save_data(),
-            instance_pos_list=self.instance_pos_list,
-            instance_rot_list=self.instance_rot_list,
-            instance_scale_list=self.instance_scale_list,
+            instance_pos_list=np.asarray(self.instance_pos_list).tolist(),
+            instance_rot_list=np.asarray(self.instance_rot_list).tolist(),
+            instance_scale_list=np.asarray(self.instance_scale_list).tolist(),
         )
         return save_data
 
@@ -111,6 +126,40 @@ class StaticActor:
 
     def set_instance_render_count(self, count):
         self.instance_render_count = min(count, self.instance_count)
+        self.reset_instance_culling()
+        self.set_collision_dirty()
+
+    def set_collision_dirty(self):
+        # the bound box or the instances changed without a transform update
+        scene_manager = CoreManager.instance().scene_manager
+        if scene_manager is not None:
+            scene_manager.collision_world.set_dirty(self)
+
+    def reset_instance_culling(self):
+        if self.instance_matrix is not None:
+            render_count = self.get_instance_render_count()
+            self.instance_visible_matrix = self.instance_matrix.copy()
+            self.instance_visible_count = render_count
+        else:
+            self.instance_visible_matrix = None
+            self.instance_visible_count = 0
+
+    def update_instance_culling(self, camera):
+        """ packs the instances whose bound sphere is in the view frustum at the front of instance_visible_matrix """
+        if self.instance_matrix is None:
+            return 0
+
+        render_count = self.get_instance_render_count()
+        matrix = self.transform.matrix
+        centers = np.dot(self.instance_bound_center[:render_count], matrix[:3, :3]) + matrix[3, :3]
+        radius = self.instance_bound_radius[:render_count] * np.sqrt(np.max(np.sum(matrix[:3, :3] ** 2, axis=1)))
+        distances = np.dot(centers - camera.transform.pos, camera.frustum_vectors.T)
+        visible = np.all(distances <= radius.reshape(-1, 1), axis=1)
+
+        self.instance_visible_count = int(np.count_nonzero(visible))
+        np.compress(visible, self.instance_matrix[:render_count], axis=0,
+                    out=self.instance_visible_matrix[:self.instance_visible_count])
+        return self.instance_visible_count
 
     def set_instance_count(self, count):
         if not self.has_mesh:
@@ -124,31 +173,34 @@ class StaticActor:
             self.set_instance_render_count(count)
 
         if 1 < count:
-            self.instance_pos_list = [self.instance_pos.get_uniform() for i in range(count)]
-            self.instance_rot_list = [self.instance_rot.get_uniform() for i in range(count)]
-            self.instance_scale_list = [self.instance_scale.get_uniform() for i in range(count)]
-            self.instance_matrix = np.zeros(count, (np.float32, (4, 4)))
-
-            bound_min = Float3(FLOAT32_MAX, FLOAT32_MAX, FLOAT32_MAX)
-            bound_max = Float3(FLOAT32_MIN, FLOAT32_MIN, FLOAT32_MIN)
-            bound_box = BoundBox()
-
-            for i in range(count):
-                self.instance_matrix[i][...] = MATRIX4_IDENTITY
-                uniform_scale = self.instance_scale_list[i]
-                matrix_scale(self.instance_matrix[i], uniform_scale, uniform_scale, uniform_scale)
-                matrix_rotate(self.instance_matrix[i], *self.instance_rot_list[i])
-                matrix_translate(self.instance_matrix[i], *self.instance_pos_list[i])
-
-                bound_box.update_with_matrix(mesh.bound_box, self.instance_matrix[i])
-                bound_min = np.minimum(bound_min, bound_box.bound_min)
-                bound_max = np.maximum(bound_max, bound_box.bound_max)
+            self.instance_pos_list = self.instance_pos.get_uniforms(count)
+            self.instance_rot_list = self.instance_rot.get_uniforms(count)
+            self.instance_scale_list = self.instance_scale.get_uniforms(count).reshape(count)
+
+            # scale * rotation * translation of every instance at once
+            self.instance_matrix = np.zeros((count, 4, 4), dtype=np.float32)
+            self.instance_matrix[:, :3, :3] = euler_to_matrices(self.instance_rot_list) * self.instance_scale_list.reshape(-1, 1, 1)
+            self.instance_matrix[:, 3, :3] = self.instance_pos_list
+            self.instance_matrix[:, 3, 3] = 1.0
+
+            rotation_scale = self.instance_matrix[:, :3, :3]
+            corner_min = np.dot(mesh.bound_box.bound_min, rotation_scale) + self.instance_pos_list
+            corner_max = np.dot(mesh.bound_box.bound_max, rotation_scale) + self.instance_pos_list
+            bound_min = np.min(np.minimum(corner_min, corner_max), axis=0)
+            bound_max = np.max(np.maximum(corner_min, corner_max), axis=0)
+
+            self.instance_bound_center = np.dot(mesh.bound_box.bound_center, rotation_scale) + self.instance_pos_list
+            self.instance_bound_radius = length(mesh.bound_box.bound_max - mesh.bound_box.bound_min) * 0.5 * np.abs(self.instance_scale_list)
             # update bound box
             self.bound_box_scale[...] = abs((bound_max - bound_min) / (mesh.bound_box.bound_max - mesh.bound_box.bound_min))
             self.bound_box_offset[...] = bound_min - mesh.bound_box.bound_min
         else:
             self.instance_matrix = None
+            self.instance_bound_center = None
+            self.instance_bound_radius = None
+        self.reset_instance_culling()
         self.update_bound_box()
+        self.set_collision_dirty()
 
     def get_attribute(self):
         self.attributes.set_attribute('name', self.name)
@@ -191,11 +243,14 @@ class StaticActor:
         return len(self.model.mesh.geometries)
 
     def get_geometry(self, index):
-        return self.model.mesh.geometries[index] if self.model else None
+        return self.model.mesh.get_geometry(index, self.lod) if self.model else None
 
     def get_geometry_data(self, index):
         return self.model.mesh.get_geometry_data(index) if self.model else None
 
+    def get_triangle_data(self, index):
+        return self.model.mesh.get_triangle_data(index) if self.model else None
+
     def get_gl_call_list(self, index):
         return self.model.mesh.get_gl_call_list(index) if self.model else None
 
@@ -239,6 +294,8 @@ class StaticActor:
     def update(self, dt):
         if self.transform.update_transform():
             self.update_bound_box()
+            return True
+        return False
 
 
 class CollisionActor(StaticActor):
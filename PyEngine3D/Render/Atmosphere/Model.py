@@ -5,7 +5,7 @@ from OpenGL.GL import *
 
 from PyEngine3D.Utilities import *
 from PyEngine3D.App import CoreManager
-from PyEngine3D.OpenGLContext import CreateTexture, Texture2D, Texture3D, FrameBuffer
+from PyEngine3D.OpenGLContext import OpenGLContext, CreateTexture, Texture2D, Texture3D, FrameBuffer
 from PyEngine3D.Render import ScreenQuad
 
 from .Constants import *
@@ -402,14 +402,14 @@ class Model:
         shaderLoader.save_resource(shader_name)
         shaderLoader.load_resource(shader_name)
 
-        glEnable(GL_BLEND)
-        glBlendEquation(GL_FUNC_ADD)
-        glBlendFunc(GL_ONE, GL_ONE)
+        OpenGLContext.enable(GL_BLEND)
+        OpenGLContext.blend_equation(GL_FUNC_ADD)
+        OpenGLContext.blend_func(GL_ONE, GL_ONE)
 
         # compute_transmittance
         framebuffer_manager.bind_framebuffer(self.transmittance_texture)
 
-        glDisablei(GL_BLEND, 0)
+        OpenGLContext.disablei(GL_BLEND, 0)
 
         compute_transmittance_mi = resource_manager.get_material_instance(
             'precomputed_atmosphere.compute_transmittance',
@@ -420,11 +420,11 @@ class Model:
         # compute_direct_irradiance
         framebuffer_manager.bind_framebuffer(self.delta_irradiance_texture, self.irradiance_texture)
 
-        glDisablei(GL_BLEND, 0)
+        OpenGLContext.disablei(GL_BLEND, 0)
         if blend:
-            glEnablei(GL_BLEND, 1)
+            OpenGLContext.enablei(GL_BLEND, 1)
         else:
-            glDisablei(GL_BLEND, 1)
+            OpenGLContext.disablei(GL_BLEND, 1)
 
         compute_direct_irradiance_mi = resource_manager.get_material_instance(
             'precomputed_atmosphere.compute_direct_irradiance',
@@ -441,14 +441,14 @@ class Model:
         compute_single_scattering_mi.bind_uniform_data('luminance_from_radiance', luminance_from_radiance)
         compute_single_scattering_mi.bind_uniform_data('transmittance_texture', self.transmittance_texture)
 
-        glDisablei(GL_BLEND, 0)
-        glDisablei(GL_BLEND, 1)
+        OpenGLContext.disablei(GL_BLEND, 0)
+        OpenGLContext.disablei(GL_BLEND, 1)
         if blend:
-            glEnablei(GL_BLEND, 2)
-            glEnablei(GL_BLEND, 3)
+            OpenGLContext.enablei(GL_BLEND, 2)
+            OpenGLContext.enablei(GL_BLEND, 3)
         else:
-            glDisablei(GL_BLEND, 2)
-            glDisablei(GL_BLEND, 3)
+            OpenGLContext.disablei(GL_BLEND, 2)
+            OpenGLContext.disablei(GL_BLEND, 3)
 
         for layer in range(SCATTERING_TEXTURE_DEPTH):
             if self.optional_single_mie_scattering_texture is None:
@@ -467,7 +467,7 @@ class Model:
 
         for scattering_order in range(2, num_scattering_orders + 1):
             # compute_scattering_density
-            glDisablei(GL_BLEND, 0)
+            OpenGLContext.disablei(GL_BLEND, 0)
 
             compute_scattering_density_mi = resource_manager.get_material_instance(
                 'precomputed_atmosphere.compute_scattering_density',
@@ -488,8 +488,8 @@ class Model:
 
             # compute_indirect_irradiance
             framebuffer_manager.bind_framebuffer(self.delta_irradiance_texture, self.irradiance_texture)
-            glDisablei(GL_BLEND, 0)
-            glEnablei(GL_BLEND, 1)
+            OpenGLContext.disablei(GL_BLEND, 0)
+            OpenGLContext.enablei(GL_BLEND, 1)
 
             compute_indirect_irradiance_mi = resource_manager.get_material_instance(
                 'precomputed_atmosphere.compute_indirect_irradiance',
@@ -504,8 +504,8 @@ class Model:
             self.quad.draw_elements()
 
             # compute_multiple_scattering
-            glDisablei(GL_BLEND, 0)
-            glEnablei(GL_BLEND, 1)
+            OpenGLContext.disablei(GL_BLEND, 0)
+            OpenGLContext.enablei(GL_BLEND, 1)
 
             compute_multiple_scattering_mi = resource_manager.get_material_instance(
                 'precomputed_atmosphere.compute_multiple_scattering',
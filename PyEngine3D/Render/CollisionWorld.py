@@ -0,0 +1,561 @@
+import weakref
+
+import numpy as np
+
+from PyEngine3D.Utilities import *
+from .Picking import get_inverse_direction, ray_box_distances, ray_triangle_distance
+
+
+BOX_CORNERS = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=np.int32)
+BOX_TRIANGLES = np.array([[0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5],
+                          [0, 4, 5], [0, 5, 1], [2, 3, 7], [2, 7, 6],
+                          [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3]], dtype=np.int32)
+
+
+def get_box_triangles(bound_min, bound_max):
+    """ :return: (12, 3, 3) the triangles of the surface of the box """
+    corners = np.where(BOX_CORNERS, bound_max, bound_min).astype(np.float32)
+    return corners[BOX_TRIANGLES]
+
+
+def transform_points(points, matrix):
+    return np.dot(points, matrix[:3, :3]) + matrix[3, :3]
+
+
+def closest_points_on_triangles(points, v0, v1, v2):
+    """ Ericson, Real-Time Collision Detection 5.1.5. broadcasts the points over the triangles. """
+    ab = v1 - v0
+    ac = v2 - v0
+    ap = points - v0
+    bp = points - v1
+    cp = points - v2
+    d1 = np.sum(ab * ap, axis=-1)
+    d2 = np.sum(ac * ap, axis=-1)
+    d3 = np.sum(ab * bp, axis=-1)
+    d4 = np.sum(ac * bp, axis=-1)
+    d5 = np.sum(ab * cp, axis=-1)
+    d6 = np.sum(ac * cp, axis=-1)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    def safe_divide(a, b):
+        return a / np.where(np.abs(b) < 1e-12, 1e-12, b)
+
+    # the voronoi regions, from the face to the vertices. the later region has the priority.
+    denom = va + vb + vc
+    result = v0 + ab * safe_divide(vb, denom)[..., np.newaxis] + ac * safe_divide(vc, denom)[..., np.newaxis]
+    regions = [
+        ((va <= 0.0) & (0.0 <= d4 - d3) & (0.0 <= d5 - d6), v1 + (v2 - v1) * safe_divide(d4 - d3, (d4 - d3) + (d5 - d6))[..., np.newaxis]),
+        ((vb <= 0.0) & (0.0 <= d2) & (d6 <= 0.0), v0 + ac * safe_divide(d2, d2 - d6)[..., np.newaxis]),
+        ((0.0 <= d6) & (d5 <= d6), v2 + ap * 0.0),
+        ((vc <= 0.0) & (0.0 <= d1) & (d3 <= 0.0), v0 + ab * safe_divide(d1, d1 - d3)[..., np.newaxis]),
+        ((0.0 <= d3) & (d4 <= d3), v1 + ap * 0.0),
+        ((d1 <= 0.0) & (d2 <= 0.0), v0 + ap * 0.0),
+    ]
+    for region, points_in_region in regions:
+        result = np.where(region[..., np.newaxis], points_in_region, result)
+    return result
+
+
+def sphere_triangle_overlaps(centers, radius, v0, v1, v2):
+    """ :param centers: (n, 1, 3) :return: (n, triangle count) """
+    closest_points = closest_points_on_triangles(centers, v0, v1, v2)
+    return np.sum((closest_points - centers) ** 2, axis=-1) <= (np.asarray(radius) ** 2).reshape(-1, 1)
+
+
+def sphere_sweep_triangle_ratios(starts, movements, radius, v0, v1, v2):
+    """
+    The first contact of the moving spheres and the triangles, by the ray against the triangle grown by the radius:
+    the offset face, the cylinders of the edges and the spheres of the vertices.
+    :param starts: (n, 1, 3) :param movements: (n, 1, 3) :param radius: (n,)
+    :return: (n,) the ratio of the movement at the first contact, 0 for the overlapped start, inf without a contact
+    """
+    radius = np.asarray(radius, dtype=np.float32).reshape(-1, 1)
+    ratios = np.where(sphere_triangle_overlaps(starts, radius, v0, v1, v2), 0.0, np.inf)
+
+    def keep_first(t, valid):
+        return np.where(valid & (0.0 <= t) & (t <= 1.0), np.minimum(ratios, t), ratios)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # the face, the sphere touches the plane at the radius on the side of the start
+        normals = np.cross(v1 - v0, v2 - v0)
+        normals = normals / np.maximum(np.linalg.norm(normals, axis=-1, keepdims=True), 1e-12)
+        distances = np.sum((starts - v0) * normals, axis=-1)
+        sides = np.where(0.0 <= distances, 1.0, -1.0)
+        approach_speeds = -np.sum(movements * normals, axis=-1) * sides
+        t = (np.abs(distances) - radius) / approach_speeds
+        contacts = starts + movements * t[..., np.newaxis] - normals * (sides * radius)[..., np.newaxis]
+        inside = np.ones(t.shape, dtype=np.bool_)
+        for a, b in ((v0, v1), (v1, v2), (v2, v0)):
+            inside &= 0.0 <= np.sum(np.cross(b - a, contacts - a) * normals, axis=-1)
+        ratios = keep_first(t, (1e-12 < approach_speeds) & (radius <= np.abs(distances)) & inside)
+
+        # the vertices
+        movement_lengths = np.sum(movements * movements, axis=-1)
+        for vertex in (v0, v1, v2):
+            offsets = starts - vertex
+            b = np.sum(offsets * movements, axis=-1)
+            c = np.sum(offsets * offsets, axis=-1) - radius * radius
+            discriminants = b * b - movement_lengths * c
+            t = (-b - np.sqrt(np.maximum(discriminants, 0.0))) / movement_lengths
+            ratios = keep_first(t, (1e-12 < movement_lengths) & (0.0 <= discriminants))
+
+        # the edges, the ray against the cylinder of the edge
+        for a, b in ((v0, v1), (v1, v2), (v2, v0)):
+            edges = b - a
+            offsets = starts - a
+            edge_lengths = np.sum(edges * edges, axis=-1)
+            offset_dot_edge = np.sum(offsets * edges, axis=-1)
+            movement_dot_edge = np.sum(movements * edges, axis=-1)
+            qa = edge_lengths * movement_lengths - movement_dot_edge * movement_dot_edge
+            qb = edge_lengths * np.sum(offsets * movements, axis=-1) - offset_dot_edge * movement_dot_edge
+            qc = edge_lengths * (np.sum(offsets * offsets, axis=-1) - radius * radius) - offset_dot_edge * offset_dot_edge
+            discriminants = qb * qb - qa * qc
+            t = (-qb - np.sqrt(np.maximum(discriminants, 0.0))) / qa
+            u = (offset_dot_edge + movement_dot_edge * t) / edge_lengths
+            ratios = keep_first(t, (1e-12 < qa) & (0.0 <= discriminants) & (0.0 <= u) & (u <= 1.0))
+    return np.min(ratios, axis=-1)
+
+
+def box_triangle_overlaps(centers, half_sizes, v0, v1, v2):
+    """
+    separating axis test of the axis aligned boxes and the triangles, Akenine-Moller.
+    :param centers: (n, 1, 3) :param half_sizes: (n, 1, 3) :return: (n, triangle count)
+    """
+    a = v0 - centers
+    b = v1 - centers
+    c = v2 - centers
+    overlaps = np.all(np.minimum(np.minimum(a, b), c) <= half_sizes, axis=-1) & \
+        np.all(-half_sizes <= np.maximum(np.maximum(a, b), c), axis=-1)
+
+    def overlap_on_axis(axis):
+        pa = np.sum(a * axis, axis=-1)
+        pb = np.sum(b * axis, axis=-1)
+        pc = np.sum(c * axis, axis=-1)
+        r = np.sum(half_sizes * np.abs(axis), axis=-1)
+        return (np.minimum(np.minimum(pa, pb), pc) <= r) & (-r <= np.maximum(np.maximum(pa, pb), pc))
+
+    edges = (b - a, c - b, a - c)
+    overlaps &= overlap_on_axis(np.cross(edges[0], edges[1]))
+    for box_axis in np.eye(3, dtype=np.float32):
+        for edge in edges:
+            overlaps &= overlap_on_axis(np.cross(box_axis, edge))
+    return overlaps
+
+
+class CollisionWorld:
+    """
+    Collision queries over the static and collision actors.
+
+    The broadphase is a sweep and prune over the world bound boxes of the actors, sorted by the min of the axis
+    where the centers spread the most. The boxes of the actors are refreshed only for the actors marked dirty
+    by their transform updates, and the order is sorted again only when a box moved.
+    The queries are batched, the candidates of all the queries are found at once, then the narrowphase tests
+    the queries of an actor together against the triangles of the mesh, which are kept once in the mesh space
+    and shared by the actors and the instances of the mesh. The instances are culled by their world bound boxes,
+    the rays and the spheres of the uniformly scaled instances are transformed into the mesh space,
+    the other queries transform a chunk of the triangles of the instance at a time.
+    The triangles are the cpu triangles of the geometries, or the surfaces of the geometry bound boxes without them.
+    The overlaps are tested with the surfaces, a shape which is completely inside of an actor doesn't overlap it.
+    The sweeps find the first contact of the moving spheres with the triangles exactly, so a fast sphere
+    doesn't pass through a thin geometry.
+    """
+    triangle_chunk_size = 4096
+
+    def __init__(self):
+        self.actors = []
+        self.actor_rows = dict()  # {id(actor): row}
+        self.bound_mins = np.zeros((0, 3), dtype=np.float32)
+        self.bound_maxs = np.zeros((0, 3), dtype=np.float32)
+        self.dirty_actors = set()
+        self.mesh_triangles = weakref.WeakKeyDictionary()  # {Mesh: (v0, v1, v2, bound_min, bound_max)}
+        self.instance_datas = dict()  # {id(actor): InstanceData}
+
+        # sweep and prune
+        self.sort_axis = 0
+        self.sorted_rows = np.zeros(0, dtype=np.int64)
+        self.sorted_mins = np.zeros(0, dtype=np.float32)
+        self.max_extent = 0.0
+        self.order_dirty = True
+
+    def clear(self):
+        self.actors = []
+        self.actor_rows.clear()
+        self.bound_mins = np.zeros((0, 3), dtype=np.float32)
+        self.bound_maxs = np.zeros((0, 3), dtype=np.float32)
+        self.dirty_actors.clear()
+        self.mesh_triangles.clear()
+        self.instance_datas.clear()
+        self.order_dirty = True
+
+    def get_actor_count(self):
+        return len(self.actors)
+
+    def add_actor(self, actor):
+        if id(actor) in self.actor_rows:
+            return
+        self.actor_rows[id(actor)] = len(self.actors)
+        self.actors.append(actor)
+        self.bound_mins = np.vstack([self.bound_mins, np.asarray(actor.bound_box.bound_min, dtype=np.float32).reshape(1, 3)])
+        self.bound_maxs = np.vstack([self.bound_maxs, np.asarray(actor.bound_box.bound_max, dtype=np.float32).reshape(1, 3)])
+        self.update_bound_box(len(self.actors) - 1)
+        self.order_dirty = True
+
+    def remove_actor(self, actor):
+        row = self.actor_rows.pop(id(actor), None)
+        if row is None:
+            return
+        # the last actor fills the row
+        last_row = len(self.actors) - 1
+        if row != last_row:
+            last_actor = self.actors[last_row]
+            self.actors[row] = last_actor
+            self.actor_rows[id(last_actor)] = row
+            self.bound_mins[row] = self.bound_mins[last_row]
+            self.bound_maxs[row] = self.bound_maxs[last_row]
+        self.actors.pop()
+        self.bound_mins = self.bound_mins[:last_row]
+        self.bound_maxs = self.bound_maxs[:last_row]
+        self.dirty_actors.discard(actor)
+        self.instance_datas.pop(id(actor), None)
+        self.order_dirty = True
+
+    def set_dirty(self, actor):
+        if id(actor) in self.actor_rows:
+            self.dirty_actors.add(actor)
+
+    def update_bound_box(self, row):
+        # the bound box of the actor transforms only two corners and doesn't cover the instances,
+        # so the box of the row is the union of the world bound boxes of the instances.
+        if self.actors[row].get_mesh() is not None:
+            instance_mins, instance_maxs = self.get_instance_data(row)[3:]
+            self.bound_mins[row] = np.min(instance_mins, axis=0)
+            self.bound_maxs[row] = np.max(instance_maxs, axis=0)
+
+    def update(self):
+        if self.dirty_actors:
+            for actor in self.dirty_actors:
+                row = self.actor_rows[id(actor)]
+                self.bound_mins[row] = actor.bound_box.bound_min
+                self.bound_maxs[row] = actor.bound_box.bound_max
+                self.instance_datas.pop(id(actor), None)
+                self.update_bound_box(row)
+            self.dirty_actors.clear()
+            self.order_dirty = True
+        if self.order_dirty:
+            self.order_dirty = False
+            if 0 == len(self.actors):
+                self.sorted_rows = np.zeros(0, dtype=np.int64)
+                self.sorted_mins = np.zeros(0, dtype=np.float32)
+                self.max_extent = 0.0
+                return
+            centers = (self.bound_mins + self.bound_maxs) * 0.5
+            self.sort_axis = int(np.argmax(np.var(centers, axis=0)))
+            # the order of the last frame is almost sorted
+            mins = self.bound_mins[:, self.sort_axis]
+            previous_rows = self.sorted_rows[self.sorted_rows < len(self.actors)]
+            if len(previous_rows) == len(self.actors):
+                self.sorted_rows = previous_rows[np.argsort(mins[previous_rows], kind='stable')]
+            else:
+                self.sorted_rows = np.argsort(mins, kind='stable')
+            self.sorted_mins = mins[self.sorted_rows]
+            self.max_extent = float(np.max(self.bound_maxs[:, self.sort_axis] - mins))
+
+    def get_candidates(self, query_mins, query_maxs):
+        """ :return: query indices, actor rows of the boxes which overlap the query boxes """
+        self.update()
+        query_mins = np.asarray(query_mins, dtype=np.float32).reshape(-1, 3)
+        query_maxs = np.asarray(query_maxs, dtype=np.float32).reshape(-1, 3)
+        if 0 == len(self.actors) or 0 == len(query_mins):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        # the boxes which start before the max of the query, and don't start farther than the largest box from the min.
+        axis = self.sort_axis
+        starts = np.searchsorted(self.sorted_mins, query_mins[:, axis] - self.max_extent, side='left')
+        ends = np.searchsorted(self.sorted_mins, query_maxs[:, axis], side='right')
+        counts = np.maximum(ends - starts, 0)
+        query_indices = np.repeat(np.arange(len(query_mins)), counts)
+        offsets = np.arange(np.sum(counts)) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+        rows = self.sorted_rows[offsets]
+
+        overlaps = np.all(self.bound_mins[rows] <= query_maxs[query_indices], axis=1) & \
+            np.all(query_mins[query_indices] <= self.bound_maxs[rows], axis=1)
+        return query_indices[overlaps], rows[overlaps]
+
+    def get_overlap_pairs(self):
+        """ :return: the pairs of the actors whose bound boxes overlap """
+        self.update()
+        count = len(self.actors)
+        if count < 2:
+            return []
+        sorted_maxs = self.bound_maxs[self.sorted_rows, self.sort_axis]
+        ends = np.searchsorted(self.sorted_mins, sorted_maxs, side='right')
+        counts = np.maximum(ends - np.arange(1, count + 1), 0)
+        first = np.repeat(np.arange(count), counts)
+        second = np.arange(np.sum(counts)) - np.repeat(np.cumsum(counts) - counts, counts) + first + 1
+        first = self.sorted_rows[first]
+        second = self.sorted_rows[second]
+        overlaps = np.all(self.bound_mins[first] <= self.bound_maxs[second], axis=1) & \
+            np.all(self.bound_mins[second] <= self.bound_maxs[first], axis=1)
+        return [(self.actors[a], self.actors[b]) for a, b in zip(first[overlaps].tolist(), second[overlaps].tolist())]
+
+    def get_triangles(self, row):
+        """ :return: v0, v1, v2 of the triangles and the bound box in the mesh space """
+        actor = self.actors[row]
+        mesh = actor.get_mesh()
+        if mesh is None:
+            # the actor without a mesh is its bound box, in the world space
+            bound_min = self.bound_mins[row]
+            bound_max = self.bound_maxs[row]
+            triangles = get_box_triangles(bound_min, bound_max)
+            return triangles[:, 0], triangles[:, 1], triangles[:, 2], bound_min, bound_max
+
+        mesh_triangles = self.mesh_triangles.get(mesh)
+        if mesh_triangles is None:
+            local_triangles = []
+            for i in range(actor.get_geometry_count()):
+                triangle_data = actor.get_triangle_data(i)
+                if triangle_data is not None:
+                    positions, indices = triangle_data
+                    local_triangles.append(positions[indices])
+                else:
+                    bound_box = mesh.get_geometry(i).bound_box
+                    local_triangles.append(get_box_triangles(bound_box.bound_min, bound_box.bound_max))
+            local_triangles = np.vstack(local_triangles) if local_triangles else \
+                get_box_triangles(mesh.bound_box.bound_min, mesh.bound_box.bound_max)
+            mesh_triangles = (local_triangles[:, 0], local_triangles[:, 1], local_triangles[:, 2],
+                              np.min(local_triangles.reshape(-1, 3), axis=0), np.max(local_triangles.reshape(-1, 3), axis=0))
+            self.mesh_triangles[mesh] = mesh_triangles
+        return mesh_triangles
+
+    def get_instance_data(self, row):
+        """
+        :return: the matrices of the instances from the mesh space to the world space, their inverses,
+        the uniform scales or 0 for the non uniform scales, and the world bound boxes of the instances
+        """
+        actor = self.actors[row]
+        instance_data = self.instance_datas.get(id(actor))
+        if instance_data is not None:
+            return instance_data
+
+        if actor.get_mesh() is None:
+            matrices = np.eye(4, dtype=np.float32).reshape(1, 4, 4)
+        elif actor.is_instancing():
+            matrices = np.matmul(actor.instance_matrix[:actor.get_instance_render_count()], actor.transform.matrix)
+        else:
+            matrices = actor.transform.matrix.reshape(1, 4, 4)
+        inverse_matrices = np.linalg.inv(matrices)
+
+        axis_scales = np.linalg.norm(matrices[:, :3, :3], axis=2)
+        uniform = np.all(np.abs(axis_scales - axis_scales[:, :1]) <= axis_scales[:, :1] * 1e-4, axis=1)
+        scales = np.where(uniform, axis_scales[:, 0], 0.0)
+
+        bound_min, bound_max = self.get_triangles(row)[3:]
+        corners = np.where(BOX_CORNERS, bound_max, bound_min).astype(np.float32)
+        world_corners = np.dot(corners, matrices[:, :3, :3]).transpose(1, 0, 2) + matrices[:, 3:4, :3]
+        instance_data = (matrices, inverse_matrices, scales, np.min(world_corners, axis=1), np.max(world_corners, axis=1))
+        self.instance_datas[id(actor)] = instance_data
+        return instance_data
+
+    def iterate_world_triangles(self, row, matrix):
+        """ the triangles of an instance in the world space, a chunk at a time """
+        v0, v1, v2 = self.get_triangles(row)[:3]
+        for start in range(0, len(v0), self.triangle_chunk_size):
+            end = start + self.triangle_chunk_size
+            yield transform_points(v0[start:end], matrix), transform_points(v1[start:end], matrix), transform_points(v2[start:end], matrix)
+
+    def group_by_actor(self, query_indices, rows):
+        order = np.argsort(rows, kind='stable')
+        query_indices = query_indices[order]
+        rows = rows[order]
+        unique_rows, starts = np.unique(rows, return_index=True)
+        ends = np.append(starts[1:], len(rows))
+        for row, start, end in zip(unique_rows.tolist(), starts.tolist(), ends.tolist()):
+            yield row, query_indices[start:end]
+
+    def get_sphere_overlaps(self, row, centers, radius):
+        """ :return: (len(centers),) the spheres which overlap the triangles of the actor """
+        v0, v1, v2 = self.get_triangles(row)[:3]
+        matrices, inverse_matrices, scales, instance_mins, instance_maxs = self.get_instance_data(row)
+        overlaps = np.zeros(len(centers), dtype=np.bool_)
+        extents = radius.reshape(-1, 1, 1)
+        candidates = np.all(instance_mins <= centers[:, np.newaxis] + extents, axis=2) & \
+            np.all(centers[:, np.newaxis] - extents <= instance_maxs, axis=2)
+        query_indices, instance_indices = np.nonzero(candidates)
+        for instance_index, indices in self.group_by_actor(query_indices, instance_indices):
+            indices = indices[~overlaps[indices]]
+            if 0 == len(indices):
+                continue
+            scale = scales[instance_index]
+            if 0.0 < scale:
+                # the sphere stays a sphere in the mesh space
+                local_centers = transform_points(centers[indices], inverse_matrices[instance_index]).reshape(-1, 1, 3)
+                local_radius = radius[indices] / scale
+                for start in range(0, len(v0), self.triangle_chunk_size):
+                    end = start + self.triangle_chunk_size
+                    overlaps[indices] |= np.any(sphere_triangle_overlaps(local_centers, local_radius, v0[start:end], v1[start:end], v2[start:end]), axis=1)
+            else:
+                world_centers = centers[indices].reshape(-1, 1, 3)
+                for w0, w1, w2 in self.iterate_world_triangles(row, matrices[instance_index]):
+                    overlaps[indices] |= np.any(sphere_triangle_overlaps(world_centers, radius[indices], w0, w1, w2), axis=1)
+        return overlaps
+
+    def overlap_spheres(self, centers, radius):
+        """ :return: the list of the overlapped actors of every sphere """
+        centers = np.asarray(centers, dtype=np.float32).reshape(-1, 3)
+        radius = np.broadcast_to(np.asarray(radius, dtype=np.float32), (len(centers),))
+        results = [[] for _ in range(len(centers))]
+        extents = radius.reshape(-1, 1)
+        query_indices, rows = self.get_candidates(centers - extents, centers + extents)
+        for row, indices in self.group_by_actor(query_indices, rows):
+            overlaps = self.get_sphere_overlaps(row, centers[indices], radius[indices])
+            for i in indices[overlaps].tolist():
+                results[i].append(self.actors[row])
+        return results
+
+    def get_box_overlaps(self, row, bound_mins, bound_maxs):
+        """ :return: (len(bound_mins),) the axis aligned boxes which overlap the triangles of the actor """
+        matrices, inverse_matrices, scales, instance_mins, instance_maxs = self.get_instance_data(row)
+        overlaps = np.zeros(len(bound_mins), dtype=np.bool_)
+        centers = (bound_mins + bound_maxs) * 0.5
+        half_sizes = (bound_maxs - bound_mins) * 0.5
+        candidates = np.all(instance_mins <= bound_maxs[:, np.newaxis], axis=2) & \
+            np.all(bound_mins[:, np.newaxis] <= instance_maxs, axis=2)
+        query_indices, instance_indices = np.nonzero(candidates)
+        for instance_index, indices in self.group_by_actor(query_indices, instance_indices):
+            # the box is not axis aligned in the mesh space, so the triangles are transformed
+            for w0, w1, w2 in self.iterate_world_triangles(row, matrices[instance_index]):
+                indices = indices[~overlaps[indices]]
+                if 0 == len(indices):
+                    break
+                overlaps[indices] |= np.any(box_triangle_overlaps(centers[indices].reshape(-1, 1, 3), half_sizes[indices].reshape(-1, 1, 3), w0, w1, w2), axis=1)
+        return overlaps
+
+    def overlap_boxes(self, bound_mins, bound_maxs):
+        """ :return: the list of the overlapped actors of every axis aligned box """
+        bound_mins = np.asarray(bound_mins, dtype=np.float32).reshape(-1, 3)
+        bound_maxs = np.asarray(bound_maxs, dtype=np.float32).reshape(-1, 3)
+        results = [[] for _ in range(len(bound_mins))]
+        query_indices, rows = self.get_candidates(bound_mins, bound_maxs)
+        for row, indices in self.group_by_actor(query_indices, rows):
+            overlaps = self.get_box_overlaps(row, bound_mins[indices], bound_maxs[indices])
+            for i in indices[overlaps].tolist():
+                results[i].append(self.actors[row])
+        return results
+
+    def get_ray_distance(self, row, origin, direction, max_distance):
+        """ the ray in the space of every instance, nearest instance box first. :return: the nearest distance or max_distance """
+        v0, v1, v2, bound_min, bound_max = self.get_triangles(row)
+        inverse_matrices = self.get_instance_data(row)[1]
+        # the ray is not normalized in the mesh space, so the distances stay in the ratio of the direction.
+        local_origins = np.dot(Float4(*origin, 1.0), inverse_matrices)[:, :3]
+        local_directions = np.dot(Float4(*direction, 0.0), inverse_matrices)[:, :3]
+        box_distances = ray_box_distances(local_origins, get_inverse_direction(local_directions), bound_min, bound_max)
+        for i in np.argsort(box_distances, kind='stable'):
+            if max_distance <= box_distances[i]:
+                break
+            for start in range(0, len(v0), self.triangle_chunk_size):
+                end = start + self.triangle_chunk_size
+                distance = ray_triangle_distance(local_origins[i], local_directions[i], v0[start:end],
+                                                 v1[start:end] - v0[start:end], v2[start:end] - v0[start:end])
+                max_distance = min(max_distance, distance)
+        return max_distance
+
+    def raycast(self, origins, directions, max_distance=np.inf):
+        """
+        The distances are in the ratio of the directions.
+        :return: (actor, distance, position) of the nearest hit or None for every ray
+        """
+        origins = np.asarray(origins, dtype=np.float32).reshape(-1, 3)
+        directions = np.asarray(directions, dtype=np.float32).reshape(-1, 3)
+        ray_count = len(origins)
+        results = [None] * ray_count
+        self.update()
+        if 0 == len(self.actors) or 0 == ray_count:
+            return results
+
+        # the rays are clipped by the bound box of the world
+        world_min = np.min(self.bound_mins, axis=0)
+        world_max = np.max(self.bound_maxs, axis=0)
+        inverse_directions = get_inverse_direction(directions)
+        t0 = (world_min - origins) * inverse_directions
+        t1 = (world_max - origins) * inverse_directions
+        ray_ends = np.minimum(np.min(np.maximum(t0, t1), axis=1), max_distance)
+        ray_starts = np.maximum(np.max(np.minimum(t0, t1), axis=1), 0.0)
+        valid = ray_starts <= ray_ends
+        ray_ends = np.where(valid, ray_ends, ray_starts)
+
+        start_positions = origins + directions * ray_starts.reshape(-1, 1)
+        end_positions = origins + directions * ray_ends.reshape(-1, 1)
+        query_indices, rows = self.get_candidates(np.minimum(start_positions, end_positions), np.maximum(start_positions, end_positions))
+        keep = valid[query_indices]
+        query_indices, rows = query_indices[keep], rows[keep]
+        box_distances = ray_box_distances(origins[query_indices], inverse_directions[query_indices],
+                                          self.bound_mins[rows], self.bound_maxs[rows])
+        keep = box_distances <= ray_ends[query_indices]
+        query_indices, rows, box_distances = query_indices[keep], rows[keep], box_distances[keep]
+
+        # nearest box first, until the next box is farther than the nearest hit of the ray
+        nearest_distances = np.minimum(np.full(ray_count, np.inf, dtype=np.float32), max_distance)
+        for i in np.argsort(box_distances, kind='stable').tolist():
+            ray_index = query_indices[i]
+            if nearest_distances[ray_index] <= box_distances[i]:
+                continue
+            row = rows[i]
+            distance = self.get_ray_distance(row, origins[ray_index], directions[ray_index], nearest_distances[ray_index])
+            if distance < nearest_distances[ray_index]:
+                nearest_distances[ray_index] = distance
+                results[ray_index] = (self.actors[row], distance, origins[ray_index] + directions[ray_index] * distance)
+        return results
+
+    def get_sweep_ratios(self, row, starts, movements, radius):
+        """ :return: (len(starts),) the ratio of the movement at the first contact with the actor, or inf """
+        v0, v1, v2 = self.get_triangles(row)[:3]
+        matrices, inverse_matrices, scales, instance_mins, instance_maxs = self.get_instance_data(row)
+        ratios = np.full(len(starts), np.inf, dtype=np.float32)
+        ends = starts + movements
+        extents = radius.reshape(-1, 1, 1)
+        candidates = np.all(instance_mins <= np.maximum(starts, ends)[:, np.newaxis] + extents, axis=2) & \
+            np.all(np.minimum(starts, ends)[:, np.newaxis] - extents <= instance_maxs, axis=2)
+        query_indices, instance_indices = np.nonzero(candidates)
+        for instance_index, indices in self.group_by_actor(query_indices, instance_indices):
+            scale = scales[instance_index]
+            if 0.0 < scale:
+                # the affine transform keeps the ratio of the movement
+                inverse_matrix = inverse_matrices[instance_index]
+                local_starts = transform_points(starts[indices], inverse_matrix).reshape(-1, 1, 3)
+                local_movements = np.dot(movements[indices], inverse_matrix[:3, :3]).reshape(-1, 1, 3)
+                local_radius = radius[indices] / scale
+                for start in range(0, len(v0), self.triangle_chunk_size):
+                    end = start + self.triangle_chunk_size
+                    ratios[indices] = np.minimum(ratios[indices], sphere_sweep_triangle_ratios(
+                        local_starts, local_movements, local_radius, v0[start:end], v1[start:end], v2[start:end]))
+            else:
+                world_starts = starts[indices].reshape(-1, 1, 3)
+                world_movements = movements[indices].reshape(-1, 1, 3)
+                for w0, w1, w2 in self.iterate_world_triangles(row, matrices[instance_index]):
+                    ratios[indices] = np.minimum(ratios[indices], sphere_sweep_triangle_ratios(
+                        world_starts, world_movements, radius[indices], w0, w1, w2))
+        return ratios
+
+    def sweep_spheres(self, starts, ends, radius):
+        """
+        Moves the spheres from the starts to the ends.
+        :return: (actor, ratio of the movement) of the first hit or None for every sphere
+        """
+        starts = np.asarray(starts, dtype=np.float32).reshape(-1, 3)
+        ends = np.asarray(ends, dtype=np.float32).reshape(-1, 3)
+        radius = np.broadcast_to(np.asarray(radius, dtype=np.float32), (len(starts),))
+        movements = ends - starts
+        results = [None] * len(starts)
+        extents = radius.reshape(-1, 1)
+        query_indices, rows = self.get_candidates(np.minimum(starts, ends) - extents, np.maximum(starts, ends) + extents)
+        nearest_ratios = np.full(len(starts), np.inf, dtype=np.float32)
+        for row, indices in self.group_by_actor(query_indices, rows):
+            ratios = self.get_sweep_ratios(row, starts[indices], movements[indices], radius[indices])
+            hits = ratios < nearest_ratios[indices]
+            for i, ratio in zip(indices[hits].tolist(), ratios[hits].tolist()):
+                nearest_ratios[i] = ratio
+                results[i] = (self.actors[row], ratio)
+        return results
@@ -9,12 +9,12 @@ from OpenGL.GL import *
 from OpenGL.GLU import *
 
 from PyEngine3D.Common import logger
-from PyEngine3D.OpenGLContext import DispatchIndirectCommand, DispatchIndirectBuffer
+from PyEngine3D.OpenGLContext import OpenGLContext, DispatchIndirectCommand, DispatchIndirectBuffer
 from PyEngine3D.OpenGLContext import DrawElementsIndirectCommand, DrawElementIndirectBuffer
 from PyEngine3D.OpenGLContext import ShaderStorageBuffer, InstanceBuffer, UniformBlock
 from PyEngine3D.Utilities import *
 from PyEngine3D.Common.Constants import *
-from PyEngine3D.Common import logger, log_level, COMMAND
+from PyEngine3D.Common import logger, log_level
 from PyEngine3D.App import CoreManager
 from . import Model, BlendMode
 from .RenderTarget import RenderTargets
@@ -128,17 +128,17 @@ class EffectManager(Singleton):
                 # set blend mode
                 if prev_blend_mode != particle_info.blend_mode:
                     if particle_info.blend_mode is BlendMode.BLEND:
-                        glBlendEquation(GL_FUNC_ADD)
-                        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+                        OpenGLContext.blend_equation(GL_FUNC_ADD)
+                        OpenGLContext.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
                     elif particle_info.blend_mode is BlendMode.ADDITIVE:
-                        glBlendEquation(GL_FUNC_ADD)
-                        glBlendFunc(GL_ONE, GL_ONE)
+                        OpenGLContext.blend_equation(GL_FUNC_ADD)
+                        OpenGLContext.blend_func(GL_ONE, GL_ONE)
                     elif particle_info.blend_mode is BlendMode.MULTIPLY:
-                        glBlendEquation(GL_FUNC_ADD)
-                        glBlendFunc(GL_ZERO, GL_SRC_COLOR)
+                        OpenGLContext.blend_equation(GL_FUNC_ADD)
+                        OpenGLContext.blend_func(GL_ZERO, GL_SRC_COLOR)
                     elif particle_info.blend_mode is BlendMode.SUBTRACT:
-                        glBlendEquation(GL_FUNC_SUBTRACT)
-                        glBlendFunc(GL_ONE, GL_ONE)
+                        OpenGLContext.blend_equation(GL_FUNC_SUBTRACT)
+                        OpenGLContext.blend_func(GL_ONE, GL_ONE)
                     prev_blend_mode = particle_info.blend_mode
 
                 geometry = particle_info.mesh.get_geometry()
@@ -811,7 +811,7 @@ class Particle:
         if self.has_velocity_scale:
             self.transform.scaling(self.velocity_scale * dt)
 
-        self.transform.update_transform()
+        # the matrix is rebuilt with the other particles by TransformStore.update_dirty_transforms
 
         if 0.0 != self.particle_info.fade_in or 0.0 != self.particle_info.fade_out:
             self.final_opacity = self.particle_info.opacity
@@ -868,7 +868,7 @@ class EffectInfo:
         EffectManager.instance().notify_effect_info_changed(self)
 
     def refresh_attribute_info(self):
-        CoreManager.instance().send(COMMAND.TRANS_RESOURCE_ATTRIBUTE, self.get_attribute())
+        CoreManager.instance().send_resource_attribute(self.get_attribute())
 
     def add_component(self, attribute_name, parent_info, attribute_index):
         if 'particle_infos' == attribute_name:
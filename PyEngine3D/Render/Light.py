@@ -16,6 +16,8 @@ class MainLight(StaticActor):
 
         self.last_shadow_camera = None
         self.last_shadow_position = FLOAT3_ZERO.copy()
+        # the shadow view projection is changed in this frame
+        self.shadow_changed = True
 
         self.shadow_samples = object_data.get('shadow_samples', SHADOW_SAMPLES)
         self.shadow_exp = object_data.get('shadow_exp', SHADOW_EXP)
@@ -75,13 +77,18 @@ class MainLight(StaticActor):
         changed = self.transform.update_transform(update_inverse_matrix=True)
         self.changed = self.changed or changed
 
+        self.shadow_changed = self.changed
         if current_camera is not None:
-            camera_pos = current_camera.transform.get_pos()
-
-            self.last_shadow_camera = current_camera
-            self.last_shadow_position[...] = camera_pos
-            set_translate_matrix(self.shadow_view_projection, *(-camera_pos))
-            self.shadow_view_projection[...] = np.dot(np.dot(self.shadow_view_projection, self.transform.inverse_matrix), self.shadow_orthogonal)
+            # The shadow follows the camera in SHADOW_UPDATE_DIST steps, so the cached static shadow map stays valid between the steps.
+            shadow_position = np.round(current_camera.transform.get_pos() / SHADOW_UPDATE_DIST) * SHADOW_UPDATE_DIST
+            if self.last_shadow_camera is not current_camera or any(self.last_shadow_position != shadow_position):
+                self.shadow_changed = True
+
+            if self.shadow_changed:
+                self.last_shadow_camera = current_camera
+                self.last_shadow_position[...] = shadow_position
+                set_translate_matrix(self.shadow_view_projection, *(-shadow_position))
+                self.shadow_view_projection[...] = np.dot(np.dot(self.shadow_view_projection, self.transform.inverse_matrix), self.shadow_orthogonal)
 
 
 class PointLight(StaticActor):
@@ -0,0 +1,156 @@
+import numpy as np
+
+from PyEngine3D.OpenGLContext import OpenGLContext, ShaderStorageRingBuffer
+
+
+POINT_LIGHT_DTYPE = [('color', np.float32, 3),
+                     ('radius', np.float32),
+                     ('pos', np.float32, 3),
+                     ('render', np.float32)]
+
+
+class LightCluster:
+    """
+    Clustered point light assignment on the CPU.
+    The view frustum is split into a froxel grid, screen tiles by exponential depth slices,
+    and every cluster gets the list of the point lights whose sphere overlaps the view space bound box of the cluster.
+    The shading only loops over the lights of its cluster, so there is no fixed limit of the point lights.
+
+    The buffers are bound to the shader storage bindings 8, 9 and 10 and the counts to the light_cluster_constants block.
+    """
+    cluster_count_x = 16
+    cluster_count_y = 9
+    cluster_count_z = 24
+    light_chunk_size = 64
+
+    def __init__(self):
+        self.cluster_count = self.cluster_count_x * self.cluster_count_y * self.cluster_count_z
+        self.cluster_bound_min = None
+        self.cluster_bound_max = None
+        self.cluster_bound_key = None
+        self.depth_scale = 1.0
+        self.depth_bias = 0.0
+
+        self.point_light_data = np.zeros(0, dtype=POINT_LIGHT_DTYPE)
+        self.cluster_data = np.zeros((self.cluster_count, 2), dtype=np.uint32)  # (light index offset, light count)
+        self.light_index_data = np.zeros(0, dtype=np.uint32)
+        self.point_light_count = 0
+
+        self.uniform_data = np.zeros(1, dtype=[('LIGHT_CLUSTER_COUNT', np.int32, 3),
+                                               ('POINT_LIGHT_COUNT', np.int32),
+                                               ('LIGHT_CLUSTER_DEPTH_SCALE_BIAS', np.float32, 2),
+                                               ('LIGHT_CLUSTER_DUMMY_0', np.float32, 2)])
+        self.uniform_data['LIGHT_CLUSTER_COUNT'] = (self.cluster_count_x, self.cluster_count_y, self.cluster_count_z)
+
+        self.point_light_buffer = None
+        self.cluster_buffer = None
+        self.light_index_buffer = None
+
+    def initialize(self):
+        alignment = OpenGLContext.GL_SHADER_STORAGE_BUFFER_OFFSET_ALIGNMENT
+        self.point_light_buffer = ShaderStorageRingBuffer("point_light_buffer", binding=8, alignment=alignment)
+        self.cluster_buffer = ShaderStorageRingBuffer("light_cluster_buffer", binding=9, alignment=alignment)
+        self.light_index_buffer = ShaderStorageRingBuffer("light_index_buffer", binding=10, alignment=alignment)
+
+    def delete(self):
+        for buffer in (self.point_light_buffer, self.cluster_buffer, self.light_index_buffer):
+            if buffer is not None:
+                buffer.delete()
+        self.point_light_buffer = None
+        self.cluster_buffer = None
+        self.light_index_buffer = None
+
+    def update_cluster_bounds(self, camera):
+        near = max(camera.near, 1e-3)
+        far = max(camera.far, near * 2.0)
+        projection_x = camera.projection[0][0]
+        projection_y = camera.projection[1][1]
+        key = (near, far, projection_x, projection_y)
+        if key == self.cluster_bound_key:
+            return
+        self.cluster_bound_key = key
+
+        # slice = log(depth) * scale + bias
+        self.depth_scale = self.cluster_count_z / np.log(far / near)
+        self.depth_bias = -np.log(near) * self.depth_scale
+
+        slice_depths = near * np.power(far / near, np.arange(self.cluster_count_z + 1) / self.cluster_count_z)
+        depth_min = slice_depths[:-1].reshape(-1, 1, 1)
+        depth_max = slice_depths[1:].reshape(-1, 1, 1)
+        tile_x = np.linspace(-1.0, 1.0, self.cluster_count_x + 1).reshape(1, 1, -1)
+        tile_y = np.linspace(-1.0, 1.0, self.cluster_count_y + 1).reshape(1, -1, 1)
+
+        # view space x, y of the ndc at the depth is ndc * depth / projection
+        shape = (self.cluster_count_z, self.cluster_count_y, self.cluster_count_x)
+        bound_min = np.zeros(shape + (3,), dtype=np.float32)
+        bound_max = np.zeros(shape + (3,), dtype=np.float32)
+        bound_min[..., 0] = np.minimum(tile_x[..., :-1] * depth_min, tile_x[..., :-1] * depth_max) / projection_x
+        bound_max[..., 0] = np.maximum(tile_x[..., 1:] * depth_min, tile_x[..., 1:] * depth_max) / projection_x
+        bound_min[..., 1] = np.minimum(tile_y[:, :-1] * depth_min, tile_y[:, :-1] * depth_max) / projection_y
+        bound_max[..., 1] = np.maximum(tile_y[:, 1:] * depth_min, tile_y[:, 1:] * depth_max) / projection_y
+        bound_min[..., 2] = depth_min
+        bound_max[..., 2] = depth_max
+        self.cluster_bound_min = bound_min.reshape(-1, 3)
+        self.cluster_bound_max = bound_max.reshape(-1, 3)
+
+        self.uniform_data['LIGHT_CLUSTER_DEPTH_SCALE_BIAS'] = (self.depth_scale, self.depth_bias)
+
+    def update(self, camera, point_lights):
+        self.update_cluster_bounds(camera)
+
+        point_light_count = len(point_lights)
+        if 0 < point_light_count:
+            positions = np.array([point_light.transform.pos for point_light in point_lights], dtype=np.float32)
+            radius = np.array([point_light.light_radius for point_light in point_lights], dtype=np.float32)
+
+            # frustum culling
+            distances = np.dot(positions - camera.transform.pos, camera.frustum_vectors.T)
+            visible = np.all(distances <= radius.reshape(-1, 1), axis=1)
+            visible_indices = np.nonzero(visible)[0]
+            positions = positions[visible]
+            radius = radius[visible]
+            point_light_count = len(visible_indices)
+
+        if self.point_light_data.shape[0] != point_light_count:
+            self.point_light_data = np.zeros(point_light_count, dtype=POINT_LIGHT_DTYPE)
+        self.point_light_count = point_light_count
+        self.uniform_data['POINT_LIGHT_COUNT'] = point_light_count
+
+        if 0 == point_light_count:
+            self.cluster_data.fill(0)
+            self.light_index_data = np.zeros(0, dtype=np.uint32)
+            return
+
+        self.point_light_data['color'] = [point_lights[i].light_color[:3] for i in visible_indices]
+        self.point_light_data['radius'] = radius
+        self.point_light_data['pos'] = positions
+        self.point_light_data['render'] = 1.0
+
+        # the cluster depth is the distance in front of the camera, which looks at -z in the view space.
+        view_positions = np.dot(np.hstack([positions, np.ones((point_light_count, 1), dtype=np.float32)]), camera.view)[:, :3]
+        view_positions[:, 2] = -view_positions[:, 2]
+
+        # sphere - bound box overlap, a chunk of the lights at a time, only the overlapped pairs are kept.
+        cluster_indices = []
+        light_indices = []
+        for start in range(0, point_light_count, self.light_chunk_size):
+            end = min(start + self.light_chunk_size, point_light_count)
+            centers = view_positions[start:end].reshape(-1, 1, 3)
+            closest = np.clip(centers, self.cluster_bound_min, self.cluster_bound_max)
+            distance_squares = np.sum((closest - centers) ** 2, axis=2)
+            lights, clusters = np.nonzero(distance_squares <= (radius[start:end] ** 2).reshape(-1, 1))
+            cluster_indices.append(clusters)
+            light_indices.append(lights + start)
+        cluster_indices = np.concatenate(cluster_indices)
+        light_indices = np.concatenate(light_indices)
+
+        light_counts = np.bincount(cluster_indices, minlength=self.cluster_count)
+        self.cluster_data[:, 1] = light_counts
+        self.cluster_data[:, 0] = np.cumsum(light_counts) - light_counts
+        # cluster major order, the light indices of a cluster are contiguous and ascending.
+        self.light_index_data = light_indices[np.argsort(cluster_indices, kind='stable')].astype(np.uint32)
+
+    def upload(self):
+        self.point_light_buffer.upload(self.point_light_data)
+        self.cluster_buffer.upload(self.cluster_data)
+        self.light_index_buffer.upload(self.light_index_data)
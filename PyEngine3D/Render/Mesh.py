@@ -1,5 +1,6 @@
 import os
 import traceback
+from threading import Thread, Lock
 
 import numpy as np
 from OpenGL.GL import *
@@ -23,6 +24,21 @@ def calc_bounding(positions):
     return bound_min, bound_max, radius
 
 
+def get_triangle_data(geometry_data):
+    """
+    cpu copy of the triangles for the picking and the collision, the gl buffers can not be read back.
+    :return: positions (n, 3) float32, indices (m, 3) uint32 or None
+    """
+    if geometry_data.get('mode', GL_TRIANGLES) != GL_TRIANGLES:
+        return None
+    positions = np.array(geometry_data.get('positions', []), dtype=np.float32).reshape(-1, 3)
+    indices = np.array(geometry_data.get('indices', []), dtype=np.uint32).reshape(-1)
+    indices = indices[:len(indices) - len(indices) % 3].reshape(-1, 3)
+    if 0 == len(indices) or 0 == len(positions):
+        return None
+    return positions, indices
+
+
 class BoundBox:
     def __init__(self, **data):
         self.bound_min = data.get('bound_min', Float3())
@@ -68,6 +84,7 @@ class Geometry:
         self.index = geometry_data.get('index', 0)
         self.vertex_buffer = geometry_data.get('vertex_buffer')
         self.skeleton = geometry_data.get('skeleton')
+        self.triangle_count = geometry_data.get('triangle_count', 0)
         self.bound_box = BoundBox(**geometry_data)
 
     def draw_elements(self):
@@ -111,6 +128,7 @@ class Mesh:
 
         self.geometries = []
         self.geometry_datas = []
+        self.triangle_datas = []
         for i, geometry_data in enumerate(mesh_data.get('geometry_datas', [])):
             if 'name' not in geometry_data:
                 geometry_data['name'] = "%s_%d" % (mesh_name, i)
@@ -133,22 +151,29 @@ class Mesh:
             self.bound_box.bound_max = np.maximum(self.bound_box.bound_max, bound_max)
             self.bound_box.radius = max(self.bound_box.radius, radius)
 
-            if core_manager.is_basic_mode:
-                vertex_buffer = None
-            else:
-                vertex_buffer = CreateVertexArrayBuffer(geometry_data)
-
-            # create geometry
-            geometry = Geometry(
-                name=vertex_buffer.name if vertex_buffer is not None else '',
-                index=i,
-                vertex_buffer=vertex_buffer,
-                skeleton=skeleton,
-                bound_min=bound_min,
-                bound_max=bound_max,
-                radius=radius
-            )
+            geometry = self.create_geometry(i, geometry_data, skeleton, bound_min, bound_max, radius)
             self.geometries.append(geometry)
+            # the full detail geometry only, whatever LOD is rendered
+            self.triangle_datas.append(get_triangle_data(geometry_data))
+
+        # the LOD geometries match the geometries by the index, and share the materials and the bound boxes.
+        self.lod_geometries = [self.geometries, ]
+        self.lod_screen_sizes = []
+        for lod, lod_data in enumerate(mesh_data.get('lod_datas', [])):
+            lod_geometry_datas = lod_data.get('geometry_datas', [])
+            if len(lod_geometry_datas) != len(self.geometries):
+                logger.warn("%s LOD%d has %d geometries, but the mesh has %d." %
+                            (mesh_name, lod + 1, len(lod_geometry_datas), len(self.geometries)))
+                break
+            geometries = []
+            for i, geometry_data in enumerate(lod_geometry_datas):
+                if 'name' not in geometry_data:
+                    geometry_data['name'] = "%s_%d_lod%d" % (mesh_name, i, lod + 1)
+                bound_box = self.geometries[i].bound_box
+                geometries.append(self.create_geometry(i, geometry_data, self.geometries[i].skeleton,
+                                                       bound_box.bound_min, bound_box.bound_max, bound_box.radius))
+            self.lod_geometries.append(geometries)
+            self.lod_screen_sizes.append(lod_data.get('screen_size', 0.25 * pow(0.5, lod)))
 
         self.geometry_datas = []
         self.gl_call_list = []
@@ -176,9 +201,36 @@ class Mesh:
 
         self.attributes = Attributes()
 
+    def create_geometry(self, index, geometry_data, skeleton, bound_min, bound_max, radius):
+        if CoreManager.instance().is_basic_mode:
+            vertex_buffer = None
+        else:
+            vertex_buffer = CreateVertexArrayBuffer(geometry_data)
+
+        return Geometry(
+            name=vertex_buffer.name if vertex_buffer is not None else '',
+            index=index,
+            vertex_buffer=vertex_buffer,
+            skeleton=skeleton,
+            triangle_count=len(geometry_data.get('indices', [])) // 3,
+            bound_min=bound_min,
+            bound_max=bound_max,
+            radius=radius
+        )
+
+    def delete(self):
+        for geometries in self.lod_geometries:
+            for geometry in geometries:
+                if geometry.vertex_buffer is not None:
+                    geometry.vertex_buffer.delete()
+        for gl_call_list in self.gl_call_list:
+            glDeleteLists(gl_call_list, 1)
+        self.gl_call_list = []
+
     def get_attribute(self):
         self.attributes.set_attribute("name", self.name)
         self.attributes.set_attribute("geometries", [geometry.name for geometry in self.geometries])
+        self.attributes.set_attribute("lod_screen_sizes", self.lod_screen_sizes)
         return self.attributes
 
     def set_attribute(self, attribute_name, attribute_value, item_info_history, attribute_index):
@@ -196,12 +248,19 @@ class Mesh:
     def get_geometry_count(self):
         return len(self.geometries)
 
-    def get_geometry(self, index=0):
-        return self.geometries[index] if index < len(self.geometries) else None
+    def get_geometry(self, index=0, lod=0):
+        geometries = self.lod_geometries[min(lod, len(self.lod_geometries) - 1)]
+        return geometries[index] if index < len(geometries) else None
+
+    def get_lod_count(self):
+        return len(self.lod_geometries)
 
     def get_geometry_data(self, index=0):
         return self.geometry_datas[index] if index < len(self.geometry_datas) else None
 
+    def get_triangle_data(self, index=0):
+        return self.triangle_datas[index] if index < len(self.triangle_datas) else None
+
     def get_gl_call_list(self, index=0):
         return self.gl_call_list[index] if index < len(self.gl_call_list) else None
 
@@ -308,7 +367,53 @@ class Cube(Mesh):
 # ------------------------------#
 # CLASS : Plane
 # ------------------------------#
+def generate_grid_geometry_data(width, height, xz_plane=True, mode=GL_TRIANGLES):
+    width_points = width + 1
+    height_points = height + 1
+    x, y = np.meshgrid(np.arange(width_points, dtype=np.float32) / width, np.arange(height_points, dtype=np.float32) / height)
+    x = x.reshape(-1)
+    y = y.reshape(-1)
+    array_count = width_points * height_points
+    zeros = np.zeros(array_count, dtype=np.float32)
+    if xz_plane:
+        positions = np.stack([x * 2.0 - 1.0, zeros, 1.0 - y * 2.0], axis=1)
+    else:
+        positions = np.stack([x * 2.0 - 1.0, 1.0 - y * 2.0, zeros], axis=1)
+    colors = np.ones((array_count, 4), dtype=np.float32)
+    normals = np.tile(np.array([0, 1, 0], dtype=np.float32), (array_count, 1))
+    tangents = np.tile(np.array([1, 0, 0], dtype=np.float32), (array_count, 1))
+    texcoords = np.stack([x, 1.0 - y], axis=1)
+
+    # the first vertex of the quads
+    quad_indices = (np.arange(height, dtype=np.uint32).reshape(-1, 1) * width_points + np.arange(width, dtype=np.uint32)).reshape(-1, 1)
+    if GL_QUADS == mode:
+        corners = np.array([0, 1, 1 + width_points, width_points], dtype=np.uint32)
+    else:
+        corners = np.array([0, 1, 1 + width_points, 0, 1 + width_points, width_points], dtype=np.uint32)
+    indices = (quad_indices + corners).reshape(-1)
+
+    return dict(
+        mode=mode,
+        positions=positions,
+        colors=colors,
+        normals=normals,
+        tangents=tangents,
+        texcoords=texcoords,
+        indices=indices)
+
+
 class Plane(Mesh):
+    """
+    The grids are cached by (width, height, xz_plane, mode), so the planes of the same grid share the geometry data,
+    and the planes made by get_plane share the vertex buffer too.
+    The planes of get_plane are counted, release_plane deletes the plane and its grid when the last user releases it.
+    """
+    grid_geometry_datas = dict()
+    grid_planes = dict()
+    grid_plane_ref_counts = dict()
+    grid_building_keys = set()
+    grid_lock = Lock()
+
     def __init__(self, mesh_name, width=4, height=4, xz_plane=True, mode=GL_TRIANGLES):
         self.width = width
         self.height = height
@@ -317,47 +422,79 @@ class Plane(Mesh):
         geometry_datas = self.get_geometry_datas()
         Mesh.__init__(self, mesh_name, geometry_datas=geometry_datas)
 
-    def get_geometry_datas(self):
-        width_points = self.width + 1
-        height_points = self.height + 1
-        width_step = 1.0 / self.width
-        height_step = 1.0 / self.height
-        array_count = width_points * height_points
-        positions = np.array([[0, 0, 0], ] * array_count, dtype=np.float32)
-        colors = np.array([[1, 1, 1, 1], ] * array_count, dtype=np.float32)
-        normals = np.array([[0, 1, 0], ] * array_count, dtype=np.float32)
-        tangents = np.array([[1, 0, 0], ] * array_count, dtype=np.float32)
-        texcoords = np.array([[0, 0], ] * array_count, dtype=np.float32)
-        array_index = 0
-        for y in range(height_points):
-            y *= height_step
-            for x in range(width_points):
-                x *= width_step
-                positions[array_index][:] = [x * 2.0 - 1.0, 0.0, 1.0 - y * 2.0] if self.xz_plane else [x * 2.0 - 1.0, 1.0 - y * 2.0, 0.0]
-                texcoords[array_index][:] = [x, 1.0 - y]
-                array_index += 1
-
-        array_index = 0
-        vertex_count = 4 if self.mode == GL_QUADS else 6
-        indices = np.zeros(self.width * self.height * vertex_count, dtype=np.uint32)
-        for y in range(self.height):
-            for x in range(self.width):
-                i = y * width_points + x
-                if GL_QUADS == self.mode:
-                    indices[array_index: array_index + vertex_count] = [i, i + 1, i + 1 + width_points, i + width_points]
-                else:
-                    indices[array_index: array_index + vertex_count] = [i, i + 1, i + 1 + width_points, i, i + 1 + width_points, i + width_points]
-                array_index += vertex_count
+    @staticmethod
+    def get_grid_geometry_data(width, height, xz_plane, mode):
+        key = (width, height, xz_plane, mode)
+        with Plane.grid_lock:
+            geometry_data = Plane.grid_geometry_datas.get(key)
+        if geometry_data is None:
+            geometry_data = generate_grid_geometry_data(width, height, xz_plane, mode)
+            with Plane.grid_lock:
+                geometry_data = Plane.grid_geometry_datas.setdefault(key, geometry_data)
+        return geometry_data
 
-        geometry_data = dict(
-            mode=self.mode,
-            positions=positions,
-            colors=colors,
-            normals=normals,
-            tangents=tangents,
-            texcoords=texcoords,
-            indices=indices)
+    @staticmethod
+    def get_plane(width=4, height=4, xz_plane=True, mode=GL_TRIANGLES):
+        key = (width, height, xz_plane, mode)
+        plane = Plane.grid_planes.get(key)
+        if plane is None:
+            plane = Plane("Plane_%dx%d" % (width, height), width=width, height=height, xz_plane=xz_plane, mode=mode)
+            Plane.grid_planes[key] = plane
+        Plane.grid_plane_ref_counts[key] = Plane.grid_plane_ref_counts.get(key, 0) + 1
+        return plane
 
+    @staticmethod
+    def release_plane(plane):
+        key = (plane.width, plane.height, plane.xz_plane, plane.mode)
+        if Plane.grid_planes.get(key) is not plane:
+            return
+        ref_count = Plane.grid_plane_ref_counts.get(key, 0) - 1
+        if 0 < ref_count:
+            Plane.grid_plane_ref_counts[key] = ref_count
+            return
+        Plane.grid_plane_ref_counts.pop(key, None)
+        Plane.grid_planes.pop(key)
+        with Plane.grid_lock:
+            Plane.grid_geometry_datas.pop(key, None)
+        plane.delete()
+
+    @staticmethod
+    def get_plane_async(width=4, height=4, xz_plane=True, mode=GL_TRIANGLES):
+        """
+        The grid is generated by a worker job, and the plane is created on the calling thread which owns the gl context
+        once the grid is ready. :return: the plane or None while the grid is generated
+        """
+        key = (width, height, xz_plane, mode)
+        if key in Plane.grid_planes:
+            return Plane.get_plane(width, height, xz_plane, mode)
+
+        with Plane.grid_lock:
+            is_ready = key in Plane.grid_geometry_datas
+            is_building = key in Plane.grid_building_keys
+            if not is_ready and not is_building:
+                Plane.grid_building_keys.add(key)
+
+        if is_ready:
+            return Plane.get_plane(width, height, xz_plane, mode)
+
+        if not is_building:
+            def build_grid():
+                try:
+                    Plane.get_grid_geometry_data(width, height, xz_plane, mode)
+                finally:
+                    # a failed grid is generated again by the next request
+                    with Plane.grid_lock:
+                        Plane.grid_building_keys.discard(key)
+            job_scheduler = CoreManager.instance().job_scheduler
+            if job_scheduler is not None:
+                job_scheduler.submit_worker("build_grid %dx%d" % (width, height), build_grid)
+            else:
+                Thread(target=build_grid, daemon=True).start()
+        return None
+
+    def get_geometry_datas(self):
+        # the mesh names the geometry data, so it gets a shallow copy of the cached one.
+        geometry_data = dict(Plane.get_grid_geometry_data(self.width, self.height, self.xz_plane, self.mode))
         return [geometry_data, ]
 
 
@@ -5,7 +5,7 @@ from OpenGL.GL import *
 
 from PyEngine3D.Common import logger
 from PyEngine3D.App import CoreManager
-from PyEngine3D.OpenGLContext import CreateTexture, Texture2D, Texture2DArray, Texture3D, FrameBuffer
+from PyEngine3D.OpenGLContext import OpenGLContext, CreateTexture, Texture2D, Texture2DArray, Texture3D, FrameBuffer
 from PyEngine3D.Render import RenderTarget, ScreenQuad, Plane
 from PyEngine3D.Utilities import *
 from .Constants import *
@@ -99,7 +99,7 @@ class Ocean:
         self.texture_butterfly = self.resource_manager.get_texture("fft_ocean.butterfly", default_texture=False)
 
         self.quad = ScreenQuad.get_vertex_array_buffer()
-        self.fft_grid = Plane("FFT_Grid", mode=GL_QUADS, width=GRID_VERTEX_COUNT, height=GRID_VERTEX_COUNT, xz_plane=False)
+        self.fft_grid = Plane.get_plane(mode=GL_QUADS, width=GRID_VERTEX_COUNT, height=GRID_VERTEX_COUNT, xz_plane=False)
 
         if None in (self.texture_spectrum_1_2, self.texture_spectrum_3_4, self.texture_slope_variance, self.texture_butterfly):
             self.generate_texture()
@@ -310,12 +310,12 @@ class Ocean:
 
     def generate_texture(self):
         glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
-        glDepthFunc(GL_LEQUAL)
-        glEnable(GL_CULL_FACE)
-        glFrontFace(GL_CCW)
-        glEnable(GL_DEPTH_TEST)
-        glDepthMask(True)
-        glDisable(GL_BLEND)
+        OpenGLContext.depth_func(GL_LEQUAL)
+        OpenGLContext.enable(GL_CULL_FACE)
+        OpenGLContext.front_face(GL_CCW)
+        OpenGLContext.enable(GL_DEPTH_TEST)
+        OpenGLContext.depth_mask(True)
+        OpenGLContext.disable(GL_BLEND)
         glClearColor(0.0, 0.0, 0.0, 1.0)
         glClearDepth(1.0)
 
@@ -0,0 +1,294 @@
+import time
+import weakref
+
+import numpy as np
+
+from PyEngine3D.Utilities import *
+
+
+def get_picking_ray(camera, ndc_x, ndc_y):
+    """ :return: the world space origin on the near plane and the normalized direction of the ray through the ndc """
+    near = np.dot(Float4(ndc_x, ndc_y, -1.0, 1.0), camera.inv_projection)
+    far = np.dot(Float4(ndc_x, ndc_y, 1.0, 1.0), camera.inv_projection)
+    near = np.dot(Float4(*(near[:3] / near[3]), 1.0), camera.inv_view)[:3]
+    far = np.dot(Float4(*(far[:3] / far[3]), 1.0), camera.inv_view)[:3]
+    direction = far - near
+    return near, direction / max(length(direction), 1e-12)
+
+
+def get_inverse_direction(direction):
+    direction = np.where(np.abs(direction) < 1e-12, 1e-12, direction)
+    return 1.0 / direction
+
+
+def ray_box_distances(origin, inverse_direction, bound_min, bound_max):
+    """ slab test, broadcasts over the leading axes. inf for the boxes which are missed. """
+    t0 = (bound_min - origin) * inverse_direction
+    t1 = (bound_max - origin) * inverse_direction
+    t_near = np.max(np.minimum(t0, t1), axis=-1)
+    t_far = np.min(np.maximum(t0, t1), axis=-1)
+    return np.where((t_near <= t_far) & (0.0 <= t_far), np.maximum(t_near, 0.0), np.inf)
+
+
+def ray_triangle_distance(origin, direction, v0, edge1, edge2):
+    """ two sided Moller-Trumbore over the triangle arrays. :return: the nearest distance or inf """
+    p = np.cross(direction, edge2)
+    det = np.sum(edge1 * p, axis=1)
+    valid = 1e-12 < np.abs(det)
+    inverse_det = 1.0 / np.where(valid, det, 1.0)
+    s = origin - v0
+    u = np.sum(s * p, axis=1) * inverse_det
+    q = np.cross(s, edge1)
+    v = np.dot(q, direction) * inverse_det
+    t = np.sum(edge2 * q, axis=1) * inverse_det
+    hit = valid & (0.0 <= u) & (0.0 <= v) & (u + v <= 1.0) & (0.0 <= t)
+    return np.min(t[hit]) if np.any(hit) else np.inf
+
+
+class BoundingVolumeHierarchy:
+    """
+    A binary tree of bound boxes, split at the median of the longest axis of the box centers.
+    The nodes are flat arrays and the boxes of a leaf are tested at once.
+    """
+    leaf_size = 8
+
+    def __init__(self):
+        self.item_bound_mins = np.zeros((0, 3), dtype=np.float32)
+        self.item_bound_maxs = np.zeros((0, 3), dtype=np.float32)
+        self.item_indices = np.zeros(0, dtype=np.int32)
+        self.node_bound_mins = []
+        self.node_bound_maxs = []
+        self.node_children = []  # (left, right), -1 for the leaves
+        self.node_ranges = []  # (start, end) of the item indices
+
+    def build(self, bound_mins, bound_maxs):
+        self.item_bound_mins = bound_mins
+        self.item_bound_maxs = bound_maxs
+        self.item_indices = np.arange(len(bound_mins), dtype=np.int32)
+        self.node_bound_mins = []
+        self.node_bound_maxs = []
+        self.node_children = []
+        self.node_ranges = []
+        if 0 < len(bound_mins):
+            self.build_node(0, len(bound_mins))
+        self.node_bound_mins = np.array(self.node_bound_mins, dtype=np.float32).reshape(-1, 3)
+        self.node_bound_maxs = np.array(self.node_bound_maxs, dtype=np.float32).reshape(-1, 3)
+
+    def build_node(self, start, end):
+        indices = self.item_indices[start:end]
+        node_index = len(self.node_children)
+        self.node_bound_mins.append(np.min(self.item_bound_mins[indices], axis=0))
+        self.node_bound_maxs.append(np.max(self.item_bound_maxs[indices], axis=0))
+        self.node_children.append((-1, -1))
+        self.node_ranges.append((start, end))
+
+        if self.leaf_size < (end - start):
+            centers = (self.item_bound_mins[indices] + self.item_bound_maxs[indices]) * 0.5
+            axis = np.argmax(np.max(centers, axis=0) - np.min(centers, axis=0))
+            self.item_indices[start:end] = indices[np.argsort(centers[:, axis], kind='stable')]
+            middle = (start + end) // 2
+            left = self.build_node(start, middle)
+            right = self.build_node(middle, end)
+            self.node_children[node_index] = (left, right)
+        return node_index
+
+    def intersect(self, origin, direction):
+        """ :return: the item indices hit by the ray and the distances to their boxes, nearest first """
+        hit_items = []
+        hit_distances = []
+        inverse_direction = get_inverse_direction(direction)
+        stack = [0] if 0 < len(self.node_children) else []
+        while stack:
+            node_index = stack.pop()
+            if np.inf == ray_box_distances(origin, inverse_direction, self.node_bound_mins[node_index], self.node_bound_maxs[node_index]):
+                continue
+
+            left, right = self.node_children[node_index]
+            if left < 0:
+                start, end = self.node_ranges[node_index]
+                items = self.item_indices[start:end]
+                distances = ray_box_distances(origin, inverse_direction, self.item_bound_mins[items], self.item_bound_maxs[items])
+                hit = distances < np.inf
+                hit_items.append(items[hit])
+                hit_distances.append(distances[hit])
+            else:
+                stack.append(left)
+                stack.append(right)
+
+        if not hit_items:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        hit_items = np.concatenate(hit_items)
+        hit_distances = np.concatenate(hit_distances)
+        order = np.argsort(hit_distances, kind='stable')
+        return hit_items[order], hit_distances[order]
+
+
+class ObjectPicker:
+    """
+    Picks the object under the mouse on the cpu, instead of reading the OBJECT_ID render target back.
+
+    The ray goes through the bound volume hierarchy of the geometry bound boxes, then the triangles are tested
+    in the local space of the actor, nearest box first, until the next box is farther than the nearest hit.
+    The axis gizmo is tested first because it is drawn over everything.
+    Skeleton actors are tested with the bind pose and the instances of an actor one by one.
+    pick returns None when the time budget is exceeded or a geometry under the ray has no cpu triangles,
+    the caller falls back to the object id readback.
+    """
+    time_budget = 0.004
+    triangle_chunk_size = 16384
+    spline_width = 10.0  # add_width of the splines in the object id pass
+
+    def __init__(self):
+        self.bvh = BoundingVolumeHierarchy()
+        self.bvh_items = []  # (object_id, actor, geometry_index)
+        self.triangles = weakref.WeakKeyDictionary()  # {Geometry: (v0, edge1, edge2)}
+        self.pick_time = 0.0
+
+    def clear(self):
+        self.bvh = BoundingVolumeHierarchy()
+        self.bvh_items = []
+        self.triangles.clear()
+
+    def update_bvh(self, actors):
+        items = []
+        bound_mins = []
+        bound_maxs = []
+        for actor in actors:
+            if not actor.visible or not actor.has_mesh:
+                continue
+            object_id = actor.get_object_id()
+            for i in range(actor.get_geometry_count()):
+                bound_box = actor.get_geometry_bound_box(i)
+                items.append((object_id, actor, i))
+                bound_mins.append(bound_box.bound_min)
+                bound_maxs.append(bound_box.bound_max)
+        bound_mins = np.array(bound_mins, dtype=np.float32).reshape(-1, 3)
+        bound_maxs = np.array(bound_maxs, dtype=np.float32).reshape(-1, 3)
+
+        # the tree is rebuilt only when an object is added, removed or moved.
+        if len(items) == len(self.bvh_items) and \
+                all(a[1] is b[1] and a[2] == b[2] for a, b in zip(items, self.bvh_items)) and \
+                np.array_equal(bound_mins, self.bvh.item_bound_mins) and \
+                np.array_equal(bound_maxs, self.bvh.item_bound_maxs):
+            return
+        self.bvh_items = items
+        self.bvh.build(bound_mins, bound_maxs)
+
+    def get_triangles(self, geometry, triangle_data):
+        if geometry is None or triangle_data is None:
+            return None
+        triangles = self.triangles.get(geometry)
+        if triangles is None:
+            positions, indices = triangle_data
+            v0 = positions[indices[:, 0]]
+            triangles = (v0, positions[indices[:, 1]] - v0, positions[indices[:, 2]] - v0)
+            self.triangles[geometry] = triangles
+        return triangles
+
+    def intersect_geometry(self, actor, geometry_index, origin, direction, max_distance, deadline):
+        """
+        :return: the nearest distance under max_distance, max_distance for no hit,
+        or None if the deadline passed or the geometry has no cpu triangles
+        """
+        # the full detail geometry, whatever LOD is rendered
+        geometry = actor.get_mesh().get_geometry(geometry_index)
+        triangles = self.get_triangles(geometry, actor.get_triangle_data(geometry_index))
+        if triangles is None:
+            # a bound box is not a hit, the object id readback decides
+            return None
+
+        if actor.is_instancing():
+            matrices = np.matmul(actor.instance_matrix[:actor.get_instance_render_count()], actor.transform.matrix)
+        else:
+            matrices = actor.transform.matrix.reshape(1, 4, 4)
+
+        # the ray is not normalized in the local space, so the distances stay in the world space.
+        inverse_matrices = np.linalg.inv(matrices)
+        local_origins = np.dot(Float4(*origin, 1.0), inverse_matrices)[:, :3]
+        local_directions = np.dot(Float4(*direction, 0.0), inverse_matrices)[:, :3]
+        box_distances = ray_box_distances(local_origins, get_inverse_direction(local_directions),
+                                          geometry.bound_box.bound_min, geometry.bound_box.bound_max)
+
+        v0, edge1, edge2 = triangles
+        for i in np.argsort(box_distances, kind='stable'):
+            if max_distance <= box_distances[i]:
+                break
+            for start in range(0, len(v0), self.triangle_chunk_size):
+                if deadline < time.perf_counter():
+                    return None
+                end = start + self.triangle_chunk_size
+                distance = ray_triangle_distance(local_origins[i], local_directions[i], v0[start:end], edge1[start:end], edge2[start:end])
+                max_distance = min(max_distance, distance)
+        return max_distance
+
+    def intersect_spline(self, spline, camera, origin, direction, mouse_pos, screen_size):
+        """ the splines are lines of a few pixels, so they are picked by the screen space distance """
+        if spline.spline_data is None or len(spline.spline_data.resampling_positions) < 2:
+            return np.inf
+
+        positions = spline.spline_data.resampling_positions
+        positions = np.hstack([positions, np.ones((len(positions), 1), dtype=np.float32)])
+        world_positions = np.dot(positions, spline.transform.matrix)
+        clip_positions = np.dot(world_positions, camera.view_projection)
+        in_front = camera.near < clip_positions[:, 3]
+        screen_positions = (clip_positions[:, :2] / np.maximum(clip_positions[:, 3:4], 1e-6) * 0.5 + 0.5) * screen_size
+
+        begin = screen_positions[:-1]
+        segment = screen_positions[1:] - begin
+        ratio = np.sum((mouse_pos - begin) * segment, axis=1) / np.maximum(np.sum(segment * segment, axis=1), 1e-12)
+        ratio = np.clip(ratio, 0.0, 1.0).reshape(-1, 1)
+        distance_squares = np.sum((begin + segment * ratio - mouse_pos) ** 2, axis=1)
+        half_width = (spline.width + self.spline_width) * 0.5
+        hit = in_front[:-1] & in_front[1:] & (distance_squares <= half_width * half_width)
+        if not np.any(hit):
+            return np.inf
+        if not spline.depth_test:
+            return 0.0
+        hit_positions = lerp(world_positions[:-1, :3], world_positions[1:, :3], ratio)[hit]
+        return max(0.0, np.min(np.dot(hit_positions - origin, direction)))
+
+    def pick(self, camera, mouse_pos, screen_size, actors, splines=(), axis_gizmo=None):
+        """ :return: the object id under the mouse, 0 for nothing or None if the time budget is exceeded """
+        start_time = time.perf_counter()
+        deadline = start_time + self.time_budget
+        mouse_pos = np.array(mouse_pos[:2], dtype=np.float32)
+        screen_size = np.array(screen_size[:2], dtype=np.float32)
+        ndc = mouse_pos / np.maximum(screen_size, 1.0) * 2.0 - 1.0
+        origin, direction = get_picking_ray(camera, ndc[0], ndc[1])
+
+        nearest_distance = np.inf
+        nearest_object_id = 0
+
+        if axis_gizmo is not None:
+            for i in range(axis_gizmo.get_geometry_count()):
+                distance = self.intersect_geometry(axis_gizmo, i, origin, direction, nearest_distance, deadline)
+                if distance is None:
+                    return None
+                if distance < nearest_distance:
+                    nearest_distance = distance
+                    nearest_object_id = axis_gizmo.get_object_id(i)
+            if 0 < nearest_object_id:
+                self.pick_time = time.perf_counter() - start_time
+                return nearest_object_id
+
+        for spline in splines:
+            distance = self.intersect_spline(spline, camera, origin, direction, mouse_pos, screen_size)
+            if distance < nearest_distance:
+                nearest_distance = distance
+                nearest_object_id = spline.get_object_id()
+
+        self.update_bvh(actors)
+        items, box_distances = self.bvh.intersect(origin, direction)
+        for item_index, box_distance in zip(items, box_distances):
+            if nearest_distance <= box_distance:
+                break
+            object_id, actor, geometry_index = self.bvh_items[item_index]
+            distance = self.intersect_geometry(actor, geometry_index, origin, direction, nearest_distance, deadline)
+            if distance is None:
+                return None
+            if distance < nearest_distance:
+                nearest_distance = distance
+                nearest_object_id = object_id
+
+        self.pick_time = time.perf_counter() - start_time
+        return nearest_object_id
@@ -6,7 +6,7 @@ from OpenGL.GL import *
 from PyEngine3D.Common import logger
 from PyEngine3D.App import CoreManager
 from PyEngine3D.Utilities import Attributes
-from PyEngine3D.OpenGLContext import CreateTexture, Texture3D
+from PyEngine3D.OpenGLContext import OpenGLContext, CreateTexture, Texture3D
 
 
 class VectorFieldTexture3D:
@@ -49,11 +49,11 @@ class VectorFieldTexture3D:
             resource.set_data(texture)
 
         glPolygonMode(GL_FRONT_AND_BACK, renderer.view_mode)
-        glDepthFunc(GL_LEQUAL)
-        glEnable(GL_CULL_FACE)
-        glFrontFace(GL_CCW)
-        glEnable(GL_DEPTH_TEST)
-        glDepthMask(True)
+        OpenGLContext.depth_func(GL_LEQUAL)
+        OpenGLContext.enable(GL_CULL_FACE)
+        OpenGLContext.front_face(GL_CCW)
+        OpenGLContext.enable(GL_DEPTH_TEST)
+        OpenGLContext.depth_mask(True)
         glClearColor(0.0, 0.0, 0.0, 1.0)
         glClearDepth(1.0)
 
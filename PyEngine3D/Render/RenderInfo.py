@@ -1,4 +1,5 @@
 import math
+from collections import OrderedDict
 
 from PyEngine3D.Utilities import *
 
@@ -43,7 +44,48 @@ def shadow_culling(camera, light, actor, geometry_bound_box):
     return False
 
 
-def gather_render_infos(culling_func, camera, light, actor_list, solid_render_infos, translucent_render_infos):
+def select_lods(camera, actor_list, hysteresis=0.1, lod_bias=1.0):
+    """
+    Chooses the LOD of the actors at once by the screen height ratio of the bound sphere.
+    The LOD of an actor changes only when the size leaves the LOD range widened by the hysteresis, so it doesn't pop back and forth.
+    """
+    actors = [actor for actor in actor_list if actor.visible and actor.has_mesh and 1 < actor.model.mesh.get_lod_count()]
+    if not actors:
+        return
+
+    centers = np.array([actor.bound_box.bound_center for actor in actors], dtype=np.float32)
+    radius = np.array([actor.bound_box.radius for actor in actors], dtype=np.float32) * 0.5
+    distances = np.maximum(np.linalg.norm(centers - camera.transform.pos, axis=1), camera.near)
+    screen_sizes = radius * camera.projection[1][1] / distances * lod_bias
+
+    max_lod_count = max(len(actor.model.mesh.lod_screen_sizes) for actor in actors)
+    lod_screen_sizes = np.full((len(actors), max_lod_count), -1.0, dtype=np.float32)
+    for i, actor in enumerate(actors):
+        sizes = actor.model.mesh.lod_screen_sizes
+        lod_screen_sizes[i, :len(sizes)] = sizes
+
+    screen_sizes = screen_sizes.reshape(-1, 1)
+    coarse_lods = np.count_nonzero(screen_sizes < lod_screen_sizes * (1.0 - hysteresis), axis=1)
+    fine_lods = np.count_nonzero(screen_sizes < lod_screen_sizes * (1.0 + hysteresis), axis=1)
+    current_lods = np.array([actor.lod for actor in actors], dtype=np.int32)
+    lods = np.clip(current_lods, coarse_lods, fine_lods)
+    for actor, lod in zip(actors, lods.tolist()):
+        actor.lod = lod
+
+
+def get_render_triangle_count(render_infos):
+    """ :return: triangles of the rendered LODs, triangles of the full detail geometries """
+    triangle_count = 0
+    full_triangle_count = 0
+    for render_info in render_infos:
+        actor = render_info.actor
+        instance_count = actor.instance_visible_count if actor.is_instancing() else 1
+        triangle_count += render_info.geometry.triangle_count * instance_count
+        full_triangle_count += actor.get_mesh().geometries[render_info.geometry.index].triangle_count * instance_count
+    return triangle_count, full_triangle_count
+
+
+def gather_render_infos(culling_func, camera, light, actor_list, solid_render_infos, translucent_render_infos, render_info_pool=None):
     for actor in actor_list:
         for i in range(actor.get_geometry_count()):
             if not actor.visible:
@@ -53,7 +95,7 @@ def gather_render_infos(culling_func, camera, light, actor_list, solid_render_in
                 continue
 
             material_instance = actor.get_material_instance(i)
-            render_info = RenderInfo()
+            render_info = RenderInfo() if render_info_pool is None else render_info_pool.get_render_info()
             render_info.actor = actor
             render_info.geometry = actor.get_geometry(i)
             render_info.geometry_data = actor.get_geometry_data(i)
@@ -67,7 +109,110 @@ def gather_render_infos(culling_func, camera, light, actor_list, solid_render_in
                 solid_render_infos.append(render_info)
 
 
+def get_dense_ranks(values, bits):
+    # object ids to small ranks, clamped to the bits of the render key field.
+    ranks = np.unique(np.array(values, dtype=np.int64), return_inverse=True)[1].reshape(-1)
+    return np.minimum(ranks, (1 << bits) - 1).astype(np.uint64)
+
+
+def get_render_keys(render_infos, camera, translucent=False):
+    """
+    64 bit render keys of the render infos.
+    solid : material(16) | material instance(16) | geometry(16) | depth, front to back(16)
+    translucent : depth, back to front(24) | material(12) | material instance(14) | geometry(14)
+    """
+    materials = [id(render_info.material) for render_info in render_infos]
+    material_instances = [id(render_info.material_instance) for render_info in render_infos]
+    geometries = [id(render_info.geometry) for render_info in render_infos]
+    positions = np.array([render_info.actor.transform.pos for render_info in render_infos], dtype=np.float32)
+
+    depth = np.dot(positions - camera.transform.pos, -camera.transform.front) / max(camera.far, 1e-6)
+    depth = np.clip(depth, 0.0, 1.0)
+
+    if translucent:
+        depth_max = (1 << 24) - 1
+        keys = (depth_max - (depth * depth_max).astype(np.uint64)) << np.uint64(40)
+        keys |= get_dense_ranks(materials, 12) << np.uint64(28)
+        keys |= get_dense_ranks(material_instances, 14) << np.uint64(14)
+        keys |= get_dense_ranks(geometries, 14)
+    else:
+        depth_max = (1 << 16) - 1
+        keys = get_dense_ranks(materials, 16) << np.uint64(48)
+        keys |= get_dense_ranks(material_instances, 16) << np.uint64(32)
+        keys |= get_dense_ranks(geometries, 16) << np.uint64(16)
+        keys |= (depth * depth_max).astype(np.uint64)
+    return keys
+
+
+def sort_render_infos(render_infos, camera, translucent=False):
+    """ sorts the render infos in place by the render keys, the translucent render infos are drawn back to front. """
+    if len(render_infos) < 2:
+        return
+    order = np.argsort(get_render_keys(render_infos, camera, translucent), kind='stable')
+    render_infos[:] = [render_infos[i] for i in order]
+
+
+def group_render_infos_by_material(render_infos):
+    """
+    groups the render infos in place by the material and the material instance fields of the solid render key.
+    The sort is stable, so the render key order is kept inside a group, and the sorted solid lists stay as they are.
+    """
+    if len(render_infos) < 2:
+        return
+    keys = get_dense_ranks([id(render_info.material) for render_info in render_infos], 16) << np.uint64(16)
+    keys |= get_dense_ranks([id(render_info.material_instance) for render_info in render_infos], 16)
+    if np.all(keys[:-1] <= keys[1:]):
+        return
+    order = np.argsort(keys, kind='stable')
+    render_infos[:] = [render_infos[i] for i in order]
+
+
+def gather_instance_render_infos(render_infos, instance_render_infos, min_instance_count=2, render_info_pool=None):
+    """
+    Groups the render infos of the actors sharing a geometry and a material instance into one instanced draw.
+    The model matrices of the group are packed into the instance_matrix of the new render info.
+    Actors which are already instancing keep their own draw.
+    :return: the number of draw calls saved
+    """
+    groups = OrderedDict()
+    for render_info in render_infos:
+        if render_info.actor.is_instancing():
+            groups[id(render_info)] = [render_info, ]
+        else:
+            key = (id(render_info.geometry), id(render_info.material_instance))
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [render_info, ]
+            else:
+                group.append(render_info)
+
+    for group in groups.values():
+        if len(group) < min_instance_count:
+            instance_render_infos.extend(group)
+            continue
+
+        first_render_info = group[0]
+        render_info = RenderInfo() if render_info_pool is None else render_info_pool.get_render_info()
+        render_info.actor = first_render_info.actor
+        render_info.geometry = first_render_info.geometry
+        render_info.geometry_data = first_render_info.geometry_data
+        render_info.gl_call_list = first_render_info.gl_call_list
+        render_info.material = first_render_info.material
+        render_info.material_instance = first_render_info.material_instance
+        render_info.instance_count = len(group)
+        # the matrix array of the pooled render info is reused when the group size is unchanged.
+        if render_info.instance_matrix is None or len(render_info.instance_matrix) != len(group):
+            render_info.instance_matrix = np.empty((len(group), 4, 4), dtype=np.float32)
+        for i, x in enumerate(group):
+            render_info.instance_matrix[i] = x.actor.transform.matrix
+        instance_render_infos.append(render_info)
+    return len(render_infos) - len(instance_render_infos)
+
+
 class RenderInfo:
+    __slots__ = ['actor', 'geometry', 'geometry_data', 'gl_call_list', 'material', 'material_instance',
+                 'instance_count', 'instance_matrix']
+
     def __init__(self):
         self.actor = None
         self.geometry = None
@@ -75,3 +220,108 @@ class RenderInfo:
         self.gl_call_list = None
         self.material = None
         self.material_instance = None
+        # instanced draw of the actors sharing the geometry and the material instance
+        self.instance_count = 0
+        self.instance_matrix = None
+
+
+class RenderInfoPool:
+    """
+    Keeps the RenderInfo objects of the previous frame and hands them out again,
+    so gathering the render infos does not allocate once the pool has grown.
+    Every list gathered from the pool must be gathered again after clear.
+    """
+    def __init__(self):
+        self.render_infos = []
+        self.count = 0
+        self.prev_count = 0
+
+    def clear(self):
+        self.prev_count = max(self.prev_count, self.count)
+        self.count = 0
+
+    def release_unused(self):
+        # drop the references of the render infos unused in this frame, so the deleted actors are not kept alive.
+        for render_info in self.render_infos[self.count:self.prev_count]:
+            render_info.actor = None
+            render_info.geometry = None
+            render_info.geometry_data = None
+            render_info.gl_call_list = None
+            render_info.material = None
+            render_info.material_instance = None
+            render_info.instance_matrix = None
+        self.prev_count = self.count
+
+    def get_render_info(self):
+        if self.count < len(self.render_infos):
+            render_info = self.render_infos[self.count]
+            render_info.instance_count = 0
+        else:
+            render_info = RenderInfo()
+            self.render_infos.append(render_info)
+        self.count += 1
+        return render_info
+
+
+class ObjectTransformBuffer:
+    """
+    The model matrices and the bone matrices of the actors drawn in the frame, packed into one matrix array
+    which is uploaded once into a shader storage ring buffer. Each draw only binds the offsets of its actor.
+    """
+    def __init__(self, ring_buffer):
+        self.ring_buffer = ring_buffer
+        self.transforms = np.zeros((1024, 4, 4), dtype=np.float32)
+        self.transform_count = 0
+        self.offsets = {}  # {(id(actor), skeleton_index): (model offset, bone offset, prev bone offset)}
+
+    def delete(self):
+        self.ring_buffer.delete()
+
+    def clear(self):
+        self.transform_count = 0
+        self.offsets = {}
+
+    def reserve(self, count):
+        if len(self.transforms) < self.transform_count + count:
+            transforms = np.zeros((max(len(self.transforms) * 2, self.transform_count + count), 4, 4), dtype=np.float32)
+            transforms[:self.transform_count] = self.transforms[:self.transform_count]
+            self.transforms = transforms
+        offset = self.transform_count
+        self.transform_count += count
+        return offset
+
+    def add_render_info(self, render_info):
+        # the actors grouped by auto instancing have their matrices in the instance buffer.
+        if 0 < render_info.instance_count:
+            return
+
+        actor = render_info.actor
+        skeleton = render_info.geometry.skeleton
+        skeleton_index = -1 if skeleton is None else skeleton.index
+        key = (id(actor), skeleton_index)
+        if key in self.offsets:
+            return
+
+        animation_buffer = None
+        prev_animation_buffer = None
+        bone_count = 0
+        if skeleton is not None and hasattr(actor, 'get_animation_buffer'):
+            animation_buffer = actor.get_animation_buffer(skeleton_index)
+            prev_animation_buffer = actor.get_prev_animation_buffer(skeleton_index)
+            if animation_buffer is not None:
+                bone_count = len(animation_buffer)
+
+        offset = self.reserve(1 + bone_count * 2)
+        self.transforms[offset] = actor.transform.matrix
+        if 0 < bone_count:
+            self.transforms[offset + 1:offset + 1 + bone_count] = animation_buffer
+            self.transforms[offset + 1 + bone_count:offset + 1 + bone_count * 2] = prev_animation_buffer
+            self.offsets[key] = (offset, offset + 1, offset + 1 + bone_count)
+        else:
+            self.offsets[key] = (offset, offset, offset)
+
+    def get_offsets(self, actor, skeleton_index=-1):
+        return self.offsets.get((id(actor), skeleton_index))
+
+    def upload(self):
+        self.ring_buffer.upload(self.transforms[:self.transform_count])
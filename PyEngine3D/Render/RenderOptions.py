@@ -16,6 +16,9 @@ class RenderOption:
     RENDER_ONLY_ATMOSPHERE = False
     RENDER_FONT = True
     RENDER_STATIC_ACTOR = True
+    RENDER_AUTO_INSTANCING = True
+    RENDER_MULTI_DRAW_INDIRECT = True
+    RENDER_OBJECT_TRANSFORM_BUFFER = True
     RENDER_SKELETON_ACTOR = True
     RENDER_ATMOSPHERE = True
     RENDER_OCEAN = True
@@ -24,6 +27,10 @@ class RenderOption:
     RENDER_DEBUG_LINE = True
     RENDER_GIZMO = True
     RENDER_OBJECT_ID = True
+    RENDER_CPU_PICKING = True
+    RENDER_INSTANCE_CULLING = True
+    RENDER_LOD = True
+    RENDER_TERRAIN_LOD = True
 
 
 class RenderingType(AutoEnum):
@@ -9,11 +9,12 @@ from OpenGL.GLU import *
 from PyEngine3D.Common import logger, COMMAND
 from PyEngine3D.Common.Constants import *
 from PyEngine3D.Utilities import *
-from PyEngine3D.OpenGLContext import InstanceBuffer, FrameBufferManager, RenderBuffer, UniformBlock, CreateTexture
+from PyEngine3D.OpenGLContext import OpenGLContext, InstanceBuffer, StaticGeometryBuffer, ShaderStorageRingBuffer, PixelReadBuffer, FrameBufferManager, RenderBuffer, UniformBlock, CreateTexture
 from .PostProcess import AntiAliasing, PostProcess
-from . import RenderTargets, RenderOption, RenderingType, RenderGroup, RenderMode
+from . import RenderTargets, RenderOption, RenderingType, RenderGroup, RenderMode, ObjectTransformBuffer, LightCluster
 from . import SkeletonActor, StaticActor, ScreenQuad, Line
 from . import Spline3D
+from . import group_render_infos_by_material
 
 
 class Renderer(Singleton):
@@ -56,8 +57,8 @@ class Renderer(Singleton):
         self.uniform_view_projection_data = None
         self.uniform_light_buffer = None
         self.uniform_light_data = None
-        self.uniform_point_light_buffer = None
-        self.uniform_point_light_data = None
+        self.uniform_light_cluster_buffer = None
+        self.light_cluster = LightCluster()
         self.uniform_particle_common_buffer = None
         self.uniform_particle_common_data = None
         self.uniform_particle_infos_buffer = None
@@ -81,6 +82,12 @@ class Renderer(Singleton):
         self.font_shader = None
 
         self.actor_instance_buffer = None
+        self.static_geometry_buffer = None
+        self.object_transform_buffer = None
+        self.object_id_read_buffer = None
+
+        self.static_shadowmap = None
+        self.static_shadow_render_count = 0
 
         self.render_custom_translucent_callbacks = []
 
@@ -126,6 +133,12 @@ class Renderer(Singleton):
 
         # instance buffer
         self.actor_instance_buffer = InstanceBuffer(name="actor_instance_buffer", location_offset=7, element_datas=[MATRIX4_IDENTITY, ])
+        self.static_geometry_buffer = StaticGeometryBuffer(name="static_geometry_buffer", instance_location=7)
+        self.object_transform_buffer = ObjectTransformBuffer(
+            ShaderStorageRingBuffer(name="object_transform_buffer",
+                                    binding=7,
+                                    alignment=OpenGLContext.GL_SHADER_STORAGE_BUFFER_OFFSET_ALIGNMENT))
+        self.object_id_read_buffer = PixelReadBuffer(name="object_id_read_buffer", dtype=np.float32)
 
         # scene constants uniform buffer
         program = self.scene_constants_material.get_program()
@@ -169,11 +182,8 @@ class Renderer(Singleton):
                                                      ('SHADOW_SAMPLES', np.int32)])
         self.uniform_light_buffer = UniformBlock("light_constants", program, 3, self.uniform_light_data)
 
-        self.uniform_point_light_data = np.zeros(MAX_POINT_LIGHTS, dtype=[('color', np.float32, 3),
-                                                                          ('radius', np.float32),
-                                                                          ('pos', np.float32, 3),
-                                                                          ('render', np.float32)])
-        self.uniform_point_light_buffer = UniformBlock("point_light_constants", program, 4, self.uniform_point_light_data)
+        self.light_cluster.initialize()
+        self.uniform_light_cluster_buffer = UniformBlock("light_cluster_constants", program, 4, self.light_cluster.uniform_data)
 
         self.uniform_particle_common_data = np.zeros(1, dtype=[
             ('PARTICLE_COLOR', np.float32, 3),
@@ -235,7 +245,19 @@ class Renderer(Singleton):
         self.core_manager.send_rendering_type_list(rendering_type_list)
 
     def close(self):
-        pass
+        if self.static_geometry_buffer is not None:
+            self.static_geometry_buffer.delete()
+            self.static_geometry_buffer = None
+
+        if self.object_transform_buffer is not None:
+            self.object_transform_buffer.delete()
+            self.object_transform_buffer = None
+
+        self.light_cluster.delete()
+
+        if self.object_id_read_buffer is not None:
+            self.object_id_read_buffer.delete()
+            self.object_id_read_buffer = None
 
     def render_custom_translucent(self, render_custom_translucent_callback):
         self.render_custom_translucent_callbacks.append(render_custom_translucent_callback)
@@ -251,11 +273,11 @@ class Renderer(Singleton):
             self.blend_equation = equation
             self.blend_func_src = func_src
             self.blend_func_dst = func_dst
-            glEnable(GL_BLEND)
-            glBlendEquation(equation)
-            glBlendFunc(func_src, func_dst)
+            OpenGLContext.enable(GL_BLEND)
+            OpenGLContext.blend_equation(equation)
+            OpenGLContext.blend_func(func_src, func_dst)
         else:
-            glDisable(GL_BLEND)
+            OpenGLContext.disable(GL_BLEND)
 
     def restore_blend_state_prev(self):
         self.set_blend_state(self.blend_enable_prev,
@@ -358,7 +380,8 @@ class Renderer(Singleton):
         uniform_data['LIGHT_COLOR'][...] = main_light.light_color[:3]
         self.uniform_light_buffer.bind_uniform_block(data=uniform_data)
 
-        self.uniform_point_light_buffer.bind_uniform_block(data=self.uniform_point_light_data)
+        self.uniform_light_cluster_buffer.bind_uniform_block(data=self.light_cluster.uniform_data)
+        self.light_cluster.upload()
 
     def render_light_probe(self, light_probe):
         if light_probe.isRendered:
@@ -509,9 +532,7 @@ class Renderer(Singleton):
 
         # render static actor
         if RenderOption.RENDER_STATIC_ACTOR:
-            self.render_actors(RenderGroup.STATIC_ACTOR,
-                               RenderMode.GBUFFER,
-                               self.scene_manager.static_solid_render_infos)
+            self.render_static_actors(RenderMode.GBUFFER, self.scene_manager.static_solid_instance_render_infos)
 
         # render velocity
         self.framebuffer_manager.bind_framebuffer(RenderTargets.VELOCITY)
@@ -537,21 +558,26 @@ class Renderer(Singleton):
         self.uniform_view_projection_data['PREV_VIEW_PROJECTION'][...] = light.shadow_view_projection
         self.uniform_view_projection_buffer.bind_uniform_block(data=self.uniform_view_projection_data)
 
-        # static shadow
-        self.framebuffer_manager.bind_framebuffer(depth_texture=RenderTargets.STATIC_SHADOWMAP)
-        glClear(GL_DEPTH_BUFFER_BIT)
-        glFrontFace(GL_CCW)
+        # static shadow, cached until the light, the shadow position or a static actor in the shadow is changed.
+        if self.scene_manager.static_shadow_dirty or self.static_shadowmap is not RenderTargets.STATIC_SHADOWMAP:
+            self.scene_manager.static_shadow_dirty = False
+            self.static_shadowmap = RenderTargets.STATIC_SHADOWMAP
+            self.static_shadow_render_count += 1
 
-        if self.scene_manager.terrain.is_render_terrain:
-            self.scene_manager.terrain.render_terrain(RenderMode.SHADOW)
+            self.framebuffer_manager.bind_framebuffer(depth_texture=RenderTargets.STATIC_SHADOWMAP)
+            glClear(GL_DEPTH_BUFFER_BIT)
+            OpenGLContext.front_face(GL_CCW)
 
-        if RenderOption.RENDER_STATIC_ACTOR:
-            self.render_actors(RenderGroup.STATIC_ACTOR, RenderMode.SHADOW, self.scene_manager.static_shadow_render_infos, self.shadowmap_material)
+            if self.scene_manager.terrain.is_render_terrain:
+                self.scene_manager.terrain.render_terrain(RenderMode.SHADOW)
+
+            if RenderOption.RENDER_STATIC_ACTOR:
+                self.render_static_actors(RenderMode.SHADOW, self.scene_manager.static_shadow_instance_render_infos, self.shadowmap_material)
 
         # dyanmic shadow
         self.framebuffer_manager.bind_framebuffer(depth_texture=RenderTargets.DYNAMIC_SHADOWMAP)
         glClear(GL_DEPTH_BUFFER_BIT)
-        glFrontFace(GL_CCW)
+        OpenGLContext.front_face(GL_CCW)
 
         if RenderOption.RENDER_SKELETON_ACTOR:
             self.render_actors(RenderGroup.SKELETON_ACTOR, RenderMode.SHADOW, self.scene_manager.skeleton_shadow_render_infos, self.shadowmap_skeletal_material)
@@ -560,7 +586,7 @@ class Renderer(Singleton):
         self.framebuffer_manager.bind_framebuffer(RenderTargets.COMPOSITE_SHADOWMAP)
         glClearColor(1.0, 1.0, 1.0, 1.0)
         glClear(GL_COLOR_BUFFER_BIT)
-        glDisable(GL_CULL_FACE)
+        OpenGLContext.disable(GL_CULL_FACE)
 
         self.postprocess.render_composite_shadowmap(RenderTargets.STATIC_SHADOWMAP, RenderTargets.DYNAMIC_SHADOWMAP)
 
@@ -610,9 +636,7 @@ class Renderer(Singleton):
             self.postprocess.render_deferred_shading(self.scene_manager.get_light_probe_texture(),
                                                      self.scene_manager.atmosphere)
         elif RenderingType.FORWARD_RENDERING == self.render_option_manager.rendering_type:
-            self.render_actors(RenderGroup.STATIC_ACTOR,
-                               RenderMode.FORWARD_SHADING,
-                               self.scene_manager.static_solid_render_infos)
+            self.render_static_actors(RenderMode.FORWARD_SHADING, self.scene_manager.static_solid_instance_render_infos)
             self.render_actors(RenderGroup.SKELETON_ACTOR,
                                RenderMode.FORWARD_SHADING,
                                self.scene_manager.skeleton_solid_render_infos)
@@ -632,6 +656,96 @@ class Renderer(Singleton):
     def render_effect(self):
         self.scene_manager.effect_manager.render()
 
+    def bind_actor_material(self, render_mode, actor_material, actor_material_instance, scene_material_instance,
+                            last_actor_material, last_actor_material_instance):
+        if RenderMode.GBUFFER == render_mode or RenderMode.FORWARD_SHADING == render_mode:
+            if last_actor_material != actor_material and actor_material is not None:
+                actor_material.use_program()
+
+            if last_actor_material_instance != actor_material_instance and actor_material_instance is not None:
+                actor_material_instance.bind_material_instance()
+
+                actor_material_instance.bind_uniform_data('is_render_gbuffer', RenderMode.GBUFFER == render_mode)
+
+                if RenderMode.FORWARD_SHADING == render_mode:
+                    actor_material_instance.bind_uniform_data('texture_probe', self.scene_manager.get_light_probe_texture())
+                    actor_material_instance.bind_uniform_data('texture_shadow', RenderTargets.COMPOSITE_SHADOWMAP)
+                    actor_material_instance.bind_uniform_data('texture_ssao', RenderTargets.SSAO)
+                    actor_material_instance.bind_uniform_data('texture_scene_reflect', RenderTargets.SCREEN_SPACE_REFLECTION_RESOLVED)
+                    # Bind Atmosphere
+                    self.scene_manager.atmosphere.bind_precomputed_atmosphere(actor_material_instance)
+        elif RenderMode.SHADOW == render_mode:
+            if last_actor_material_instance != actor_material_instance and actor_material_instance is not None:
+                # get diffuse texture from actor material instance
+                data_diffuse = actor_material_instance.get_uniform_data('texture_diffuse')
+                scene_material_instance.bind_uniform_data('texture_diffuse', data_diffuse)
+
+    def render_static_actors(self, render_mode, render_infos, scene_material_instance=None):
+        if RenderOption.RENDER_MULTI_DRAW_INDIRECT:
+            self.render_static_actors_indirect(render_mode, render_infos, scene_material_instance)
+        else:
+            self.render_actors(RenderGroup.STATIC_ACTOR, render_mode, render_infos, scene_material_instance)
+
+    def render_static_actors_indirect(self, render_mode, render_infos, scene_material_instance=None):
+        """
+        The static geometries merged in the static_geometry_buffer are drawn with one glMultiDrawElementsIndirect
+        per material instance. The others, like the actors with their own instance data, go through render_actors.
+        """
+        if len(render_infos) < 1:
+            return
+
+        static_geometry_buffer = self.static_geometry_buffer
+        indirect_render_infos = []
+        other_render_infos = []
+        for render_info in render_infos:
+            if render_info.instance_count == 0 and render_info.actor.is_instancing():
+                other_render_infos.append(render_info)
+            elif static_geometry_buffer.add_geometry(render_info.geometry.vertex_buffer) < 0:
+                other_render_infos.append(render_info)
+            else:
+                indirect_render_infos.append(render_info)
+
+        if indirect_render_infos:
+            static_geometry_buffer.update_geometries()
+
+            # one draw range for each material instance
+            group_render_infos_by_material(indirect_render_infos)
+            geometry_indices = np.array([x.geometry.vertex_buffer.static_geometry_index for x in indirect_render_infos], dtype=np.uint32)
+            instance_counts = np.array([x.instance_count or 1 for x in indirect_render_infos], dtype=np.uint32)
+            model_matrices = np.concatenate([x.instance_matrix if 0 < x.instance_count else x.actor.transform.matrix.reshape(1, 4, 4)
+                                             for x in indirect_render_infos]).astype(np.float32, copy=False)
+            static_geometry_buffer.set_draw_commands(geometry_indices, instance_counts, model_matrices)
+
+            if scene_material_instance is not None:
+                scene_material_instance.use_program()
+                scene_material_instance.bind_material_instance()
+
+            last_actor_material = None
+            last_actor_material_instance = None
+            first_command = 0
+            command_count = len(indirect_render_infos)
+            for i in range(command_count):
+                render_info = indirect_render_infos[i]
+                actor_material = render_info.material
+                actor_material_instance = render_info.material_instance
+                next_index = i + 1
+                if next_index < command_count and indirect_render_infos[next_index].material_instance is actor_material_instance:
+                    continue
+
+                self.bind_actor_material(render_mode, actor_material, actor_material_instance, scene_material_instance,
+                                         last_actor_material, last_actor_material_instance)
+                material_instance = scene_material_instance or actor_material_instance
+                material_instance.bind_uniform_data('is_instancing', True)
+                material_instance.bind_uniform_data('use_object_transform', False)
+                material_instance.bind_uniform_data('model', MATRIX4_IDENTITY)
+                static_geometry_buffer.multi_draw_elements_indirect(first_command, next_index - first_command)
+
+                first_command = next_index
+                last_actor_material = actor_material
+                last_actor_material_instance = actor_material_instance
+
+        self.render_actors(RenderGroup.STATIC_ACTOR, render_mode, other_render_infos, scene_material_instance)
+
     def render_actors(self, render_group, render_mode, render_infos, scene_material_instance=None):
         if len(render_infos) < 1:
             return
@@ -651,50 +765,51 @@ class Renderer(Singleton):
             actor_material = render_info.material
             actor_material_instance = render_info.material_instance
 
-            is_instancing = actor.is_instancing()
-
-            if RenderMode.GBUFFER == render_mode or RenderMode.FORWARD_SHADING == render_mode:
-                if last_actor_material != actor_material and actor_material is not None:
-                    actor_material.use_program()
+            # the actors grouped by gather_instance_render_infos
+            is_auto_instancing = 0 < render_info.instance_count
+            is_instancing = is_auto_instancing or actor.is_instancing()
 
-                if last_actor_material_instance != actor_material_instance and actor_material_instance is not None:
-                    actor_material_instance.bind_material_instance()
+            self.bind_actor_material(render_mode, actor_material, actor_material_instance, scene_material_instance,
+                                     last_actor_material, last_actor_material_instance)
 
-                    actor_material_instance.bind_uniform_data('is_render_gbuffer', RenderMode.GBUFFER == render_mode)
-
-                    if RenderMode.FORWARD_SHADING == render_mode:
-                        actor_material_instance.bind_uniform_data('texture_probe', self.scene_manager.get_light_probe_texture())
-                        actor_material_instance.bind_uniform_data('texture_shadow', RenderTargets.COMPOSITE_SHADOWMAP)
-                        actor_material_instance.bind_uniform_data('texture_ssao', RenderTargets.SSAO)
-                        actor_material_instance.bind_uniform_data('texture_scene_reflect', RenderTargets.SCREEN_SPACE_REFLECTION_RESOLVED)
-                        # Bind Atmosphere
-                        self.scene_manager.atmosphere.bind_precomputed_atmosphere(actor_material_instance)
-            elif RenderMode.SHADOW == render_mode:
-                if last_actor_material_instance != actor_material_instance and actor_material_instance is not None:
-                    # get diffuse texture from actor material instance
-                    data_diffuse = actor_material_instance.get_uniform_data('texture_diffuse')
-                    scene_material_instance.bind_uniform_data('texture_diffuse', data_diffuse)
-
-            if last_actor != actor:
+            if last_actor != actor or is_auto_instancing:
                 material_instance = scene_material_instance or actor_material_instance
                 if RenderMode.OBJECT_ID == render_mode:
                     material_instance.bind_uniform_data('object_id', actor.get_object_id())
                 elif RenderMode.GIZMO == render_mode:
                     material_instance.bind_uniform_data('color', actor.get_object_color())
                 material_instance.bind_uniform_data('is_instancing', is_instancing)
-                material_instance.bind_uniform_data('model', actor.transform.matrix)
-                if render_group == RenderGroup.SKELETON_ACTOR:
-                    animation_buffer = actor.get_animation_buffer(geometry.skeleton.index)
-                    prev_animation_buffer = actor.get_prev_animation_buffer(geometry.skeleton.index)
-                    material_instance.bind_uniform_data('bone_matrices', animation_buffer, num=len(animation_buffer))
-                    material_instance.bind_uniform_data('prev_bone_matrices', prev_animation_buffer, num=len(prev_animation_buffer))
+
+                object_transform_offsets = None
+                if 'object_transform_offsets' in material_instance.linked_uniform_map:
+                    if not is_auto_instancing:
+                        skeleton_index = geometry.skeleton.index if render_group == RenderGroup.SKELETON_ACTOR else -1
+                        object_transform_offsets = self.object_transform_buffer.get_offsets(actor, skeleton_index)
+                    material_instance.bind_uniform_data('use_object_transform', object_transform_offsets is not None)
+
+                if object_transform_offsets is not None:
+                    material_instance.bind_uniform_data('object_transform_offsets', object_transform_offsets)
+                else:
+                    material_instance.bind_uniform_data('model', MATRIX4_IDENTITY if is_auto_instancing else actor.transform.matrix)
+                    if render_group == RenderGroup.SKELETON_ACTOR:
+                        animation_buffer = actor.get_animation_buffer(geometry.skeleton.index)
+                        prev_animation_buffer = actor.get_prev_animation_buffer(geometry.skeleton.index)
+                        material_instance.bind_uniform_data('bone_matrices', animation_buffer, num=len(animation_buffer))
+                        material_instance.bind_uniform_data('prev_bone_matrices', prev_animation_buffer, num=len(prev_animation_buffer))
             # draw
-            if is_instancing:
-                geometry.draw_elements_instanced(actor.get_instance_render_count(), self.actor_instance_buffer, [actor.instance_matrix, ])
+            if is_auto_instancing:
+                geometry.draw_elements_instanced(render_info.instance_count, self.actor_instance_buffer, [render_info.instance_matrix, ])
+            elif is_instancing:
+                # the shadow casters out of the view are not culled.
+                if RenderMode.SHADOW == render_mode:
+                    geometry.draw_elements_instanced(actor.get_instance_render_count(), self.actor_instance_buffer, [actor.instance_matrix, ])
+                elif 0 < actor.instance_visible_count:
+                    geometry.draw_elements_instanced(actor.instance_visible_count, self.actor_instance_buffer, [actor.instance_visible_matrix, ])
             else:
                 geometry.draw_elements()
 
-            last_actor = actor
+            # the model matrix of the first actor of the group is not bound.
+            last_actor = None if is_auto_instancing else actor
             last_actor_material = actor_material
             last_actor_material_instance = actor_material_instance
 
@@ -702,8 +817,8 @@ class Renderer(Singleton):
         selected_object = self.scene_manager.get_selected_object()
         if selected_object is not None:
             self.framebuffer_manager.bind_framebuffer(RenderTargets.TEMP_RGBA8)
-            glDisable(GL_DEPTH_TEST)
-            glDepthMask(False)
+            OpenGLContext.disable(GL_DEPTH_TEST)
+            OpenGLContext.depth_mask(False)
             glClearColor(0.0, 0.0, 0.0, 0.0)
             glClear(GL_COLOR_BUFFER_BIT)
             self.set_blend_state(False)
@@ -742,6 +857,7 @@ class Renderer(Singleton):
                 material_instance = self.static_object_id_material
             material_instance.use_program()
             material_instance.bind_uniform_data('is_instancing', False)
+            material_instance.bind_uniform_data('use_object_transform', False)
             material_instance.bind_uniform_data('model', axis_gizmo_actor.transform.matrix)
             geometries = axis_gizmo_actor.get_geometries()
             for i, geometry in enumerate(geometries):
@@ -753,9 +869,9 @@ class Renderer(Singleton):
 
     def render_object_id(self):
         self.framebuffer_manager.bind_framebuffer(RenderTargets.OBJECT_ID, depth_texture=RenderTargets.OBJECT_ID_DEPTH)
-        glDisable(GL_CULL_FACE)
-        glEnable(GL_DEPTH_TEST)
-        glDepthMask(True)
+        OpenGLContext.disable(GL_CULL_FACE)
+        OpenGLContext.enable(GL_DEPTH_TEST)
+        OpenGLContext.depth_mask(True)
         glClearColor(0.0, 0.0, 0.0, 0.0)
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         self.set_blend_state(False)
@@ -798,12 +914,17 @@ class Renderer(Singleton):
         glClear(GL_DEPTH_BUFFER_BIT)
         self.render_axis_gizmo(RenderMode.OBJECT_ID)
 
+        if self.scene_manager.object_id_request is not None:
+            x, y = self.scene_manager.object_id_request
+            self.scene_manager.object_id_request = None
+            self.object_id_read_buffer.read_pixels(x, y, GL_RED, GL_FLOAT)
+
     def render_heightmap(self, actor):
         self.framebuffer_manager.bind_framebuffer(RenderTargets.TEMP_HEIGHT_MAP)
         self.set_blend_state(blend_enable=True, equation=GL_MAX, func_src=GL_ONE, func_dst=GL_ONE)
         glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
-        glDisable(GL_CULL_FACE)
-        glDisable(GL_DEPTH_TEST)
+        OpenGLContext.disable(GL_CULL_FACE)
+        OpenGLContext.disable(GL_DEPTH_TEST)
         glClearColor(0.0, 0.0, 0.0, 1.0)
 
         self.render_heightmap_material.use_program()
@@ -817,8 +938,8 @@ class Renderer(Singleton):
             self.postprocess.render_generate_max_z(RenderTargets.TEMP_HEIGHT_MAP)
 
     def render_bones(self):
-        glDisable(GL_DEPTH_TEST)
-        glDisable(GL_CULL_FACE)
+        OpenGLContext.disable(GL_DEPTH_TEST)
+        OpenGLContext.disable(GL_CULL_FACE)
         mesh = self.resource_manager.get_mesh("Cube")
         static_actors = self.scene_manager.static_actors[:]
 
@@ -961,24 +1082,44 @@ class Renderer(Singleton):
         self.debug_line_manager.draw_debug_line_2d(line_offset, line_offset + camera.view_origin[1][0:2] * line_size, color=Float4(0.0, 1.0, 0.0, 1.0), width=line_thickness)
         self.debug_line_manager.draw_debug_line_2d(line_offset, line_offset + camera.view_origin[0][0:2] * line_size, color=Float4(1.0, 0.0, 0.0, 1.0), width=line_thickness)
 
+    def update_object_transform_buffer(self):
+        object_transform_buffer = self.object_transform_buffer
+        object_transform_buffer.clear()
+        if RenderOption.RENDER_OBJECT_TRANSFORM_BUFFER:
+            scene_manager = self.scene_manager
+            for render_infos in (scene_manager.static_solid_render_infos,
+                                 scene_manager.static_translucent_render_infos,
+                                 scene_manager.static_shadow_render_infos,
+                                 scene_manager.skeleton_solid_render_infos,
+                                 scene_manager.skeleton_translucent_render_infos,
+                                 scene_manager.skeleton_shadow_render_infos,
+                                 scene_manager.selected_object_render_info,
+                                 scene_manager.spline_gizmo_render_infos):
+                for render_info in render_infos:
+                    object_transform_buffer.add_render_info(render_info)
+        object_transform_buffer.upload()
+
     def render_scene(self):
         main_camera = self.scene_manager.main_camera
 
         # bind scene constants uniform blocks
         self.bind_uniform_blocks()
 
+        # model and bone matrices of the frame
+        self.update_object_transform_buffer()
+
         self.set_blend_state(False)
 
         glHint(GL_PERSPECTIVE_CORRECTION_HINT, GL_NICEST)
         glPolygonMode(GL_FRONT_AND_BACK, self.view_mode)
-        # glEnable(GL_FRAMEBUFFER_SRGB)
-        glEnable(GL_MULTISAMPLE)
-        glEnable(GL_TEXTURE_CUBE_MAP_SEAMLESS)
-        glDepthFunc(GL_LEQUAL)
-        glEnable(GL_CULL_FACE)
-        glFrontFace(GL_CCW)
-        glEnable(GL_DEPTH_TEST)
-        glDepthMask(True)
+        # OpenGLContext.enable(GL_FRAMEBUFFER_SRGB)
+        OpenGLContext.enable(GL_MULTISAMPLE)
+        OpenGLContext.enable(GL_TEXTURE_CUBE_MAP_SEAMLESS)
+        OpenGLContext.depth_func(GL_LEQUAL)
+        OpenGLContext.enable(GL_CULL_FACE)
+        OpenGLContext.front_face(GL_CCW)
+        OpenGLContext.enable(GL_DEPTH_TEST)
+        OpenGLContext.depth_mask(True)
         glClearColor(0.0, 0.0, 0.0, 1.0)
         glClearDepth(1.0)
 
@@ -1038,9 +1179,9 @@ class Renderer(Singleton):
             self.uniform_view_projection_data['PREV_VIEW_PROJECTION'][...] = camera.prev_view_projection_jitter
             self.uniform_view_projection_buffer.bind_uniform_block(data=self.uniform_view_projection_data)
 
-            glFrontFace(GL_CCW)
+            OpenGLContext.front_face(GL_CCW)
 
-            glDepthMask(False)  # cause depth prepass and gbuffer
+            OpenGLContext.depth_mask(False)  # cause depth prepass and gbuffer
 
             self.framebuffer_manager.bind_framebuffer(RenderTargets.HDR, depth_texture=RenderTargets.DEPTH)
             glClear(GL_COLOR_BUFFER_BIT)
@@ -1063,9 +1204,9 @@ class Renderer(Singleton):
             # render ocean
             if self.scene_manager.ocean.is_render_ocean:
                 self.framebuffer_manager.bind_framebuffer(RenderTargets.HDR, depth_texture=RenderTargets.DEPTH)
-                glDisable(GL_CULL_FACE)
-                glEnable(GL_DEPTH_TEST)
-                glDepthMask(True)
+                OpenGLContext.disable(GL_CULL_FACE)
+                OpenGLContext.enable(GL_DEPTH_TEST)
+                OpenGLContext.depth_mask(True)
 
                 self.scene_manager.ocean.render_ocean(atmosphere=self.scene_manager.atmosphere,
                                                       texture_scene=RenderTargets.HDR_TEMP,
@@ -1085,9 +1226,9 @@ class Renderer(Singleton):
                                                                             RenderTargets.COMPOSITE_SHADOWMAP,
                                                                             RenderOption.RENDER_LIGHT_PROBE)
 
-            glEnable(GL_CULL_FACE)
-            glEnable(GL_DEPTH_TEST)
-            glDepthMask(False)
+            OpenGLContext.enable(GL_CULL_FACE)
+            OpenGLContext.enable(GL_DEPTH_TEST)
+            OpenGLContext.depth_mask(False)
 
             # Composite Atmosphere
             if self.scene_manager.atmosphere.is_render_atmosphere:
@@ -1108,20 +1249,20 @@ class Renderer(Singleton):
             # prepare translucent
             self.set_blend_state(True, GL_FUNC_ADD, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
             self.framebuffer_manager.bind_framebuffer(RenderTargets.HDR, depth_texture=RenderTargets.DEPTH)
-            glEnable(GL_DEPTH_TEST)
+            OpenGLContext.enable(GL_DEPTH_TEST)
 
             # Translucent
             self.render_translucent()
 
             # render particle
             if RenderOption.RENDER_EFFECT:
-                glDisable(GL_CULL_FACE)
-                glEnable(GL_BLEND)
+                OpenGLContext.disable(GL_CULL_FACE)
+                OpenGLContext.enable(GL_BLEND)
 
                 self.render_effect()
 
-                glDisable(GL_BLEND)
-                glEnable(GL_CULL_FACE)
+                OpenGLContext.disable(GL_BLEND)
+                OpenGLContext.enable(GL_CULL_FACE)
 
             # render probe done
             if RenderOption.RENDER_LIGHT_PROBE:
@@ -1133,7 +1274,8 @@ class Renderer(Singleton):
 
             self.render_postprocess()
 
-        if RenderOption.RENDER_OBJECT_ID:
+        # the object id pass is drawn only for the pixel requested when the cpu picking could not decide.
+        if RenderOption.RENDER_OBJECT_ID and self.scene_manager.object_id_request is not None:
             self.render_object_id()
 
         self.render_selected_object()
@@ -1163,8 +1305,8 @@ class Renderer(Singleton):
 
         if RenderOption.RENDER_GIZMO and self.debug_texture is None:
             self.framebuffer_manager.bind_framebuffer(RenderTargets.BACKBUFFER, depth_texture=RenderTargets.DEPTH)
-            glEnable(GL_DEPTH_TEST)
-            glDepthMask(True)
+            OpenGLContext.enable(GL_DEPTH_TEST)
+            OpenGLContext.depth_mask(True)
             self.set_blend_state(True, GL_FUNC_ADD, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
 
             # render spline gizmo
@@ -6,7 +6,7 @@ import math
 import numpy as np
 from OpenGL.GL import *
 
-from PyEngine3D.Common import logger, COMMAND
+from PyEngine3D.Common import logger
 from PyEngine3D.App import CoreManager
 from PyEngine3D.OpenGLContext import InstanceBuffer
 from PyEngine3D.Utilities import *
@@ -27,6 +27,10 @@ class SplinePoint:
 
 
 class SplineData:
+    # samples of a segment in the arc length table
+    arc_sample_count = 32
+    closest_point_chunk_size = 256
+
     default_spline_points = [
         SplinePoint(Float3(0.0, 0.0, 0.0), Float3(1.0, 0.0, 0.0), 0.0),
         SplinePoint(Float3(4.0, 2.0, 0.0), Float3(1.0, 0.0, 0.0), 1.0)
@@ -37,6 +41,12 @@ class SplineData:
         self.spline_points = data.get('spline_points', copy.deepcopy(self.default_spline_points))
         self.resample_count = data.get('resample_count', 128)
         self.resampling_positions = np.zeros(0, dtype=(np.float32, 3))
+        self.segment_tables = dict()
+        self.changed_segment_count = 0
+        self.arc_positions = np.zeros((1, 3), dtype=np.float32)
+        self.arc_tangents = np.zeros((1, 3), dtype=np.float32)
+        self.arc_distances = np.zeros(1, dtype=np.float32)
+        self.length = 0.0
         self.resampling(self.resample_count)
         self.attributes = Attributes()
 
@@ -85,7 +95,7 @@ class SplineData:
         self.resampling()
 
     def refresh_attribute_info(self):
-        CoreManager.instance().send(COMMAND.TRANS_RESOURCE_ATTRIBUTE, self.get_attribute())
+        CoreManager.instance().send_resource_attribute(self.get_attribute())
 
     def add_component(self, attribute_name, parent_info, attribute_index):
         if 'spline_points' == attribute_name:
@@ -112,50 +122,148 @@ class SplineData:
         factor = resample_index - index_min
         return lerp(self.resampling_positions[index_min], self.resampling_positions[index_max], factor)
 
+    def get_segment_control_points(self):
+        """ :return: (segment count, 4, 3) the bezier control points of the segments """
+        positions = np.array([spline_point.position for spline_point in self.spline_points], dtype=np.float32).reshape(-1, 3)
+        control_points = np.array([spline_point.control_point for spline_point in self.spline_points], dtype=np.float32).reshape(-1, 3)
+        return np.stack([positions[:-1], positions[:-1] + control_points[:-1], positions[1:] - control_points[1:], positions[1:]], axis=1)
+
     def resampling(self, resample_count=None):
         if resample_count is not None:
             self.resample_count = max(1, resample_count)
 
         self.resampling_positions = np.zeros(self.resample_count, dtype=(np.float32, 3))
+        self.update_arc_length_table()
 
         point_count = len(self.spline_points)
         if point_count == 0:
             return
         elif point_count == 1:
-            spline_point = self.spline_points[0]
-            for i in range(self.resample_count):
-                self.resampling_positions[i][...] = spline_point.position
+            self.resampling_positions[...] = self.spline_points[0].position
+            return
+
         # 가장 첫번째 point의 시간은 제외
-        total_time = sum([self.spline_points[i].point_time for i in range(1, len(self.spline_points), 1)])
-        key_frames = [spline_point.point_time for spline_point in self.spline_points]
+        key_frames = np.array([spline_point.point_time for spline_point in self.spline_points], dtype=np.float32)
         key_frames[0] = 0.0
-        key_frames = [sum(key_frames[:i+1]) for i in range(len(key_frames))]
-
-        point_index = 0
-        resample_pos = 0.0
-        resample_step = total_time / (self.resample_count - 1)
-        for i in range(self.resample_count):
-            while True:
-                if key_frames[point_index] <= resample_pos <= key_frames[point_index + 1]:
-                    break
-                if (point_count - 2) <= point_index:
-                    break
-                point_index += 1
-
-            spline_point = self.spline_points[point_index]
-            next_spline_point = self.spline_points[point_index + 1]
-            time_range = key_frames[point_index + 1] - key_frames[point_index]
-            t = min(1.0, max(0.0, (resample_pos - key_frames[point_index]) / time_range))
-
-            self.resampling_positions[i][...] = getCubicBezierCurvePoint(
-                spline_point.position,
-                spline_point.position + spline_point.control_point,
-                next_spline_point.position - next_spline_point.control_point,
-                next_spline_point.position,
-                t
-            )
-
-            resample_pos = min(total_time, resample_pos + resample_step)
+        key_frames = np.cumsum(key_frames)
+        total_time = key_frames[-1]
+
+        resample_times = np.linspace(0.0, total_time, self.resample_count, dtype=np.float32)
+        point_indices = np.clip(np.searchsorted(key_frames, resample_times, side='right') - 1, 0, point_count - 2)
+        time_ranges = np.maximum(key_frames[point_indices + 1] - key_frames[point_indices], 1e-6)
+        t = np.clip((resample_times - key_frames[point_indices]) / time_ranges, 0.0, 1.0).reshape(-1, 1)
+
+        control_points = self.get_segment_control_points()[point_indices]
+        self.resampling_positions[...] = getCubicBezierCurvePoint(control_points[:, 0], control_points[:, 1], control_points[:, 2], control_points[:, 3], t)
+
+    def update_arc_length_table(self):
+        """
+        The arc length table is the positions, tangents and distances from the start of the dense samples of the segments.
+        The tables of the segments are cached by the control points, so only the changed segments are sampled again.
+        """
+        control_points = self.get_segment_control_points() if 1 < len(self.spline_points) else np.zeros((0, 4, 3), dtype=np.float32)
+        keys = [segment_control_points.tobytes() for segment_control_points in control_points]
+        changed_indices = [i for i, key in enumerate(keys) if key not in self.segment_tables]
+        self.changed_segment_count = len(changed_indices)
+
+        segment_tables = dict()
+        if changed_indices:
+            changed_control_points = control_points[changed_indices].reshape(-1, 4, 1, 3)
+            t = np.linspace(0.0, 1.0, self.arc_sample_count + 1, dtype=np.float32).reshape(1, -1, 1)
+            p0, c0, c1, p1 = [changed_control_points[:, i] for i in range(4)]
+            positions = getCubicBezierCurvePoint(p0, c0, c1, p1, t)
+            tangents = getCubicBezierCurveTangent(p0, c0, c1, p1, t)
+            tangents /= np.maximum(np.linalg.norm(tangents, axis=2, keepdims=True), 1e-6)
+            lengths = np.linalg.norm(positions[:, 1:] - positions[:, :-1], axis=2)
+            distances = np.hstack([np.zeros((len(changed_indices), 1), dtype=np.float32), np.cumsum(lengths, axis=1)])
+            for i, index in enumerate(changed_indices):
+                segment_tables[keys[index]] = (positions[i], tangents[i], distances[i])
+        for key in keys:
+            if key not in segment_tables:
+                segment_tables[key] = self.segment_tables[key]
+        self.segment_tables = segment_tables
+
+        if 0 == len(keys):
+            position = self.spline_points[0].position if self.spline_points else Float3()
+            self.arc_positions = np.array([position], dtype=np.float32)
+            self.arc_tangents = np.array([[1.0, 0.0, 0.0]], dtype=np.float32)
+            self.arc_distances = np.zeros(1, dtype=np.float32)
+            self.length = 0.0
+            return
+
+        # the first sample of a segment is the last sample of the previous segment
+        tables = [segment_tables[key] for key in keys]
+        segment_lengths = np.array([table[2][-1] for table in tables], dtype=np.float32)
+        segment_offsets = np.cumsum(segment_lengths) - segment_lengths
+        self.arc_positions = np.vstack([tables[0][0]] + [table[0][1:] for table in tables[1:]])
+        self.arc_tangents = np.vstack([tables[0][1]] + [table[1][1:] for table in tables[1:]])
+        self.arc_distances = np.concatenate([tables[0][2]] + [table[2][1:] + offset for table, offset in zip(tables[1:], segment_offsets[1:])])
+        self.length = float(self.arc_distances[-1])
+
+    def get_arc_sample_indices(self, distances):
+        distances = np.clip(np.asarray(distances, dtype=np.float32).reshape(-1), 0.0, self.length)
+        indices = np.clip(np.searchsorted(self.arc_distances, distances, side='right') - 1, 0, len(self.arc_distances) - 2)
+        distance_ranges = np.maximum(self.arc_distances[indices + 1] - self.arc_distances[indices], 1e-12)
+        ratios = ((distances - self.arc_distances[indices]) / distance_ranges).reshape(-1, 1)
+        return indices, ratios
+
+    def sample_arc_length_table(self, table, distances):
+        if len(self.arc_distances) < 2:
+            values = np.repeat(table[:1], np.size(distances), axis=0)
+        else:
+            indices, ratios = self.get_arc_sample_indices(distances)
+            values = lerp(table[indices], table[indices + 1], ratios)
+        return values[0] if 0 == np.ndim(distances) else values
+
+    def position_at_distance(self, distances):
+        """ :param distances: a distance or an array of the distances along the spline :return: positions """
+        return self.sample_arc_length_table(self.arc_positions, distances)
+
+    def tangent_at_distance(self, distances):
+        tangents = self.sample_arc_length_table(self.arc_tangents, distances)
+        return tangents / np.maximum(np.linalg.norm(tangents, axis=-1, keepdims=True), 1e-6)
+
+    def position_at_ratio(self, ratio):
+        """ the position by the ratio of the length, so the speed along the spline is constant """
+        return self.position_at_distance(np.asarray(ratio, dtype=np.float32) * self.length)
+
+    def closest_point(self, points, hint_distances=None, search_distance=None):
+        """
+        The followers give the distances of the last frame as the hint,
+        then only the samples within the search distance of the hint are tested.
+        :return: closest positions, distances along the spline
+        """
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+        sample_count = len(self.arc_distances)
+        if sample_count < 2:
+            return np.repeat(self.arc_positions[:1], len(points), axis=0), np.zeros(len(points), dtype=np.float32)
+
+        if hint_distances is None:
+            candidates = np.arange(sample_count - 1).reshape(1, -1)
+        else:
+            if search_distance is None:
+                search_distance = self.length / max(1, len(self.spline_points) - 1)
+            window = int(math.ceil(search_distance * (sample_count - 1) / max(self.length, 1e-6))) + 1
+            centers = np.searchsorted(self.arc_distances, np.asarray(hint_distances, dtype=np.float32).reshape(-1, 1))
+            candidates = np.clip(centers + np.arange(-window, window), 0, sample_count - 2)
+
+        closest_positions = np.zeros((len(points), 3), dtype=np.float32)
+        closest_distances = np.zeros(len(points), dtype=np.float32)
+        for start in range(0, len(points), self.closest_point_chunk_size):
+            end = min(start + self.closest_point_chunk_size, len(points))
+            chunk_candidates = candidates if 1 == len(candidates) else candidates[start:end]
+            begin = self.arc_positions[chunk_candidates]
+            segment = self.arc_positions[chunk_candidates + 1] - begin
+            to_points = points[start:end].reshape(-1, 1, 3) - begin
+            ratios = np.clip(np.sum(to_points * segment, axis=2) / np.maximum(np.sum(segment * segment, axis=2), 1e-12), 0.0, 1.0)
+            distance_squares = np.sum((to_points - segment * ratios[..., np.newaxis]) ** 2, axis=2)
+            nearest = np.argmin(distance_squares, axis=1)
+            rows = np.arange(end - start)
+            indices = np.broadcast_to(chunk_candidates, distance_squares.shape)[rows, nearest]
+            ratios = ratios[rows, nearest]
+            closest_positions[start:end] = lerp(self.arc_positions[indices], self.arc_positions[indices + 1], ratios.reshape(-1, 1))
+            closest_distances[start:end] = lerp(self.arc_distances[indices], self.arc_distances[indices + 1], ratios)
+        return closest_positions, closest_distances
 
 
 class Spline3D:
@@ -227,6 +335,20 @@ class Spline3D:
         pos = self.spline_data.get_resampling_position(ratio)
         return np.dot(Float4(*pos, 1.0), self.transform.matrix)[:3]
 
+    def get_position_at_distance(self, distances):
+        """ the distances are in the local space of the spline """
+        positions = np.asarray(self.spline_data.position_at_distance(distances), dtype=np.float32)
+        world_positions = np.dot(np.hstack([positions.reshape(-1, 3), np.ones((positions.size // 3, 1), dtype=np.float32)]), self.transform.matrix)[:, :3]
+        return world_positions.reshape(positions.shape)
+
+    def get_closest_point(self, world_points, hint_distances=None, search_distance=None):
+        """ :return: closest world positions, distances along the spline """
+        world_points = np.asarray(world_points, dtype=np.float32).reshape(-1, 3)
+        local_points = np.dot(np.hstack([world_points, np.ones((len(world_points), 1), dtype=np.float32)]), self.transform.inverse_matrix)[:, :3]
+        positions, distances = self.spline_data.closest_point(local_points, hint_distances, search_distance)
+        world_positions = np.dot(np.hstack([positions, np.ones((len(positions), 1), dtype=np.float32)]), self.transform.matrix)[:, :3]
+        return world_positions, distances
+
     def update(self, dt):
         self.transform.update_transform(update_inverse_matrix=True)
 
@@ -5,7 +5,8 @@ from PyEngine3D.App import CoreManager
 from PyEngine3D.Render import Plane
 from PyEngine3D.OpenGLContext import InstanceBuffer
 from PyEngine3D.Utilities import *
-from . import RenderMode
+from . import RenderMode, RenderOption
+from .TerrainQuadTree import HeightField, TerrainQuadTree
 
 
 class Terrain:
@@ -26,10 +27,17 @@ class Terrain:
         self.height = object_data.get('height', 10)
         self.subdivide_level = object_data.get('subdivide_level', 100)
         self.height_map_size = np.array(object_data.get('height_map_size', [10.0, 10.0]), dtype=np.float32)
+        self.lod_pixel_error = object_data.get('lod_pixel_error', 2.0)
 
+        # (x, y, patch size, edge lods) of the patches, the shadow draws all the selected patches
         self.instance_offset = None
+        self.visible_instance_offset = None
         self.instance_buffer = None
 
+        self.height_field = None
+        self.quad_tree = None
+        self.lod_enabled = False
+
         self.terrain_grid = None
 
         self.texture_height_map_name = object_data.get('texture_height_map', "common.noise")
@@ -46,6 +54,9 @@ class Terrain:
         self.generate_terrain(self.subdivide_level)
 
         self.texture_height_map = self.resource_manager.get_texture(self.texture_height_map_name)
+        self.height_field = HeightField.create_from_texture(self.texture_height_map)
+        self.build_quad_tree()
+
         self.terrain_render = self.resource_manager.get_material_instance('terrain.terrain_render_ps')
         self.terrain_shadow = self.resource_manager.get_material_instance('terrain.terrain_shadow')
 
@@ -59,6 +70,7 @@ class Terrain:
             width=self.width,
             height=self.height,
             subdivide_level=self.subdivide_level,
+            lod_pixel_error=self.lod_pixel_error,
             texture_height_map=self.texture_height_map.name if self.texture_height_map is not None else self.texture_height_map_name,
         )
         return save_data
@@ -78,43 +90,124 @@ class Terrain:
             self.transform.set_scale(attribute_value)
         elif attribute_name == 'texture_height_map':
             self.texture_height_map = self.resource_manager.get_texture(attribute_value)
+            self.height_field = HeightField.create_from_texture(self.texture_height_map)
+            self.build_quad_tree()
+        elif attribute_name == 'height_map_size':
+            self.height_map_size = np.array(attribute_value, dtype=np.float32)
+            self.build_quad_tree()
         elif hasattr(self, attribute_name):
             setattr(self, attribute_name, attribute_value)
             if attribute_name in ('width', 'height'):
                 self.set_instance_offset(self.width, self.height)
+                self.build_quad_tree()
             elif attribute_name in 'subdivide_level':
-                self.generate_terrain(self.subdivide_level)
+                # the new grid is generated by a thread, the current grid is rendered until the new grid is ready.
+                self.subdivide_level = max(1, int(self.subdivide_level))
         return self.attributes
 
+    def delete(self):
+        self.set_terrain_grid(None)
+
+    def set_terrain_grid(self, terrain_grid):
+        if self.terrain_grid is not None:
+            Plane.release_plane(self.terrain_grid)
+        self.terrain_grid = terrain_grid
+
     def generate_terrain(self, subdivide_level):
-        self.terrain_grid = Plane("Terrain_Grid", mode=GL_QUADS, width=subdivide_level, height=subdivide_level, xz_plane=True)
+        self.set_terrain_grid(Plane.get_plane(mode=GL_QUADS, width=subdivide_level, height=subdivide_level, xz_plane=True))
+
+    def update_terrain_grid(self):
+        if self.terrain_grid is None or self.terrain_grid.width != self.subdivide_level:
+            terrain_grid = Plane.get_plane_async(mode=GL_QUADS, width=self.subdivide_level, height=self.subdivide_level, xz_plane=True)
+            if terrain_grid is not None:
+                self.set_terrain_grid(terrain_grid)
+                self.build_quad_tree()
+
+    def build_quad_tree(self):
+        if self.height_field is not None:
+            subdivide_level = self.terrain_grid.width if self.terrain_grid is not None else self.subdivide_level
+            self.quad_tree = TerrainQuadTree(self.height_field, self.width, self.height, subdivide_level, self.height_map_size)
 
     def set_instance_offset(self, width, height):
-        count = width * height
-        self.instance_offset = np.zeros(count, (np.float32, 4))
-        i = 0
-        for y in range(height):
-            for x in range(width):
-                self.instance_offset[i][0] = x
-                self.instance_offset[i][1] = y
-                i += 1
+        # every tile is a patch of the size 1
+        x, y = np.meshgrid(np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32))
+        self.instance_offset = np.zeros((width * height, 4), dtype=np.float32)
+        self.instance_offset[:, 0] = x.reshape(-1)
+        self.instance_offset[:, 1] = y.reshape(-1)
+        self.instance_offset[:, 2] = 1.0
+        self.visible_instance_offset = self.instance_offset
+
+    def update_patches(self, camera):
+        if self.quad_tree is None or not RenderOption.RENDER_TERRAIN_LOD:
+            if self.lod_enabled:
+                self.set_instance_offset(self.width, self.height)
+                self.lod_enabled = False
+            return
+        self.lod_enabled = True
+        patches, visible = self.quad_tree.select_patches(self.transform.matrix, camera, self.renderer.viewport.height, self.lod_pixel_error)
+        self.instance_offset = patches
+        self.visible_instance_offset = patches[visible]
+
+    def get_local_positions(self, positions):
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        inverse_matrix = np.linalg.inv(self.transform.matrix)
+        return np.dot(np.hstack([positions, np.ones((len(positions), 1), dtype=np.float32)]), inverse_matrix)[:, :3]
+
+    def sample_height(self, positions):
+        """ :return: world heights of the terrain under the world positions """
+        local_positions = self.get_local_positions(positions)
+        local_positions[:, 1] = self.quad_tree.get_local_heights(local_positions[:, [0, 2]])
+        return np.dot(np.hstack([local_positions, np.ones((len(local_positions), 1), dtype=np.float32)]), self.transform.matrix)[:, 1]
+
+    def sample_normal(self, positions):
+        """ :return: world normals of the terrain under the world positions, by the central differences of a texel """
+        local_xz = self.get_local_positions(positions)[:, [0, 2]]
+        delta = self.height_map_size / np.array([self.height_field.width, self.height_field.height], dtype=np.float32)
+        get_heights = self.quad_tree.get_local_heights
+        slope_x = (get_heights(local_xz + [delta[0], 0.0]) - get_heights(local_xz - [delta[0], 0.0])) / (delta[0] * 2.0)
+        slope_z = (get_heights(local_xz + [0.0, delta[1]]) - get_heights(local_xz - [0.0, delta[1]])) / (delta[1] * 2.0)
+        ones = np.ones_like(slope_x)
+        zeros = np.zeros_like(slope_x)
+        tangent_x = np.dot(np.stack([ones, slope_x, zeros], axis=1), self.transform.matrix[:3, :3])
+        tangent_z = np.dot(np.stack([zeros, slope_z, ones], axis=1), self.transform.matrix[:3, :3])
+        normals = np.cross(tangent_z, tangent_x)
+        return normals / np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+
+    def raycast(self, origin, direction, max_distance=np.inf):
+        """ :return: world hit position of the ray, or None """
+        if self.quad_tree is None:
+            return None
+        inverse_matrix = np.linalg.inv(self.transform.matrix)
+        local_origin = np.dot(np.append(np.asarray(origin, dtype=np.float32)[:3], 1.0), inverse_matrix)[:3]
+        local_direction = np.dot(np.append(np.asarray(direction, dtype=np.float32)[:3], 0.0), inverse_matrix)[:3]
+        distance = self.quad_tree.raycast(local_origin, local_direction, max_distance)
+        if distance is None:
+            return None
+        return np.asarray(origin, dtype=np.float32)[:3] + np.asarray(direction, dtype=np.float32)[:3] * distance
 
     def update(self, delta):
         self.transform.update_transform()
+        self.update_terrain_grid()
+        self.update_patches(self.scene_manager.main_camera)
 
     def render_terrain(self, render_mode):
         if RenderMode.GBUFFER == render_mode:
             material_instance = self.terrain_render
+            instance_offset = self.visible_instance_offset
         elif RenderMode.SHADOW == render_mode:
             material_instance = self.terrain_shadow
+            instance_offset = self.instance_offset
         else:
             raise BaseException("Unkown terrain render mode %s" % render_mode)
+
+        if 0 == len(instance_offset):
+            return
         material_instance.use_program()
         material_instance.bind_material_instance()
         material_instance.bind_uniform_data('height_map_size', self.height_map_size)
         material_instance.bind_uniform_data('model', self.transform.matrix)
         material_instance.bind_uniform_data('texture_height_map', self.texture_height_map)
         material_instance.bind_uniform_data('scale', self.transform.scale)
-        material_instance.bind_uniform_data('subdivide_level', self.subdivide_level)
-        self.terrain_grid.get_geometry().draw_elements_instanced(len(self.instance_offset), self.instance_buffer, [self.instance_offset, ])
+        material_instance.bind_uniform_data('subdivide_level', self.terrain_grid.width)
+        self.terrain_grid.get_geometry().draw_elements_instanced(len(instance_offset), self.instance_buffer, [instance_offset, ])
 
@@ -0,0 +1,296 @@
+import math
+
+import numpy as np
+from OpenGL.GL import GL_REPEAT, GL_MIRRORED_REPEAT
+
+from PyEngine3D.Common import logger
+
+
+class HeightField:
+    """
+    CPU copy of the height map. It is sampled like the terrain shader samples the texture,
+    bilinear between the texel centers and wrapped by the wrap mode of the texture.
+    """
+    def __init__(self, heights, repeat=True):
+        self.heights = np.asarray(heights, dtype=np.float32)
+        if self.heights.ndim != 2 or 0 == self.heights.size:
+            self.heights = np.zeros((1, 1), dtype=np.float32)
+        self.height, self.width = self.heights.shape
+        self.repeat = repeat
+
+    @staticmethod
+    def create_from_texture(texture):
+        data = texture.get_image_data() if texture is not None else None
+        if data is None or 0 == len(data):
+            logger.warn("The height map is not readable, the height field is flat.")
+            return HeightField(np.zeros((1, 1), dtype=np.float32))
+
+        channel_count = max(1, len(data) // (texture.width * texture.height))
+        heights = np.asarray(data).reshape(texture.height, texture.width, channel_count)[..., 0]
+        # the normalized texture formats are read as 0.0 ~ 1.0 by the sampler
+        if np.issubdtype(heights.dtype, np.integer):
+            heights = heights / float(np.iinfo(heights.dtype).max)
+        wrap = texture.wrap_s or texture.wrap
+        return HeightField(heights, repeat=wrap in (GL_REPEAT, GL_MIRRORED_REPEAT))
+
+    def get_texel_indices(self, coords, size):
+        coords = coords * size - 0.5
+        index = np.floor(coords)
+        ratio = (coords - index).astype(np.float32)
+        index = index.astype(np.int64)
+        if self.repeat:
+            return index % size, (index + 1) % size, ratio
+        return np.clip(index, 0, size - 1), np.clip(index + 1, 0, size - 1), ratio
+
+    def sample(self, tex_coords):
+        """ :param tex_coords: (n, 2) texture coordinates :return: (n,) heights """
+        tex_coords = np.asarray(tex_coords, dtype=np.float64).reshape(-1, 2)
+        x0, x1, ratio_x = self.get_texel_indices(tex_coords[:, 0], self.width)
+        y0, y1, ratio_y = self.get_texel_indices(tex_coords[:, 1], self.height)
+        heights = self.heights
+        h0 = heights[y0, x0] * (1.0 - ratio_x) + heights[y0, x1] * ratio_x
+        h1 = heights[y1, x0] * (1.0 - ratio_x) + heights[y1, x1] * ratio_x
+        return h0 * (1.0 - ratio_y) + h1 * ratio_y
+
+
+def block_reduce(grid, block_size, func):
+    """ reduces the blocks of the grid sampled on the vertices, the block includes the shared border samples """
+    block_count_y = (grid.shape[0] - 1) // block_size
+    block_count_x = (grid.shape[1] - 1) // block_size
+    rows = func(grid[:-1].reshape(block_count_y, block_size, -1), axis=1)
+    rows = func(np.stack([rows, grid[block_size::block_size]]), axis=0)
+    blocks = func(rows[:, :-1].reshape(block_count_y, block_count_x, block_size), axis=2)
+    return func(np.stack([blocks, rows[:, block_size::block_size]]), axis=0)
+
+
+def reduce_children(values, func):
+    count = values.shape[0] // 2
+    return func(values.reshape(count, 2, count, 2), axis=(1, 3))
+
+
+class TerrainQuadTree:
+    """
+    Quadtree of the terrain patches in the local space of the terrain, the unit is a tile of the terrain.
+    Every patch is drawn with the same grid of subdivide_level quads, so a patch of the level covers 2 ^ (leaf level - level) tiles.
+    The nodes keep the min / max heights for the culling and the raycast,
+    and the geometric error, the largest height difference of the grid of the node to the grid of the leaves.
+    """
+    max_sample_count = 2048
+
+    def __init__(self, height_field, width, height, subdivide_level, height_map_size):
+        self.height_field = height_field
+        self.width = max(1, int(width))
+        self.height = max(1, int(height))
+        self.subdivide_level = max(1, int(subdivide_level))
+        self.height_map_size = np.array(height_map_size, dtype=np.float64)
+
+        self.root_size = 2 ** int(math.ceil(math.log2(max(self.width, self.height))))
+        self.level_count = int(math.log2(self.root_size)) + 1
+        # the nodes of the level are [y][x]
+        self.min_heights = []
+        self.max_heights = []
+        self.errors = []
+        self.build()
+
+    def get_node_size(self, level):
+        return self.root_size >> level
+
+    def get_local_heights(self, local_xz):
+        local_xz = np.asarray(local_xz, dtype=np.float64).reshape(-1, 2)
+        return self.height_field.sample(local_xz / self.height_map_size)
+
+    def get_grid_heights(self, xs, zs):
+        xz = np.empty((len(zs), len(xs), 2), dtype=np.float64)
+        xz[..., 0] = xs.reshape(1, -1)
+        xz[..., 1] = zs.reshape(-1, 1)
+        return self.get_local_heights(xz.reshape(-1, 2)).reshape(len(zs), len(xs)).astype(np.float32)
+
+    def get_coarse_grid_heights(self, positions, grid_size):
+        """ the heights at the positions of the grid of the vertices spaced by grid_size, interpolated as the rasterizer does """
+        coords = positions / grid_size
+        index0 = np.floor(coords + 1e-6)
+        ratio = np.clip(coords - index0, 0.0, 1.0).astype(np.float32)
+        vertex_indices, inverse = np.unique(np.concatenate([index0, index0 + 1.0]), return_inverse=True)
+        i0 = inverse[:len(coords)]
+        i1 = inverse[len(coords):]
+        vertex_positions = vertex_indices * grid_size
+        vertex_heights = self.get_grid_heights(vertex_positions, vertex_positions)
+        ratio_x = ratio.reshape(1, -1)
+        ratio_z = ratio.reshape(-1, 1)
+        h0 = vertex_heights[i0][:, i0] * (1.0 - ratio_x) + vertex_heights[i0][:, i1] * ratio_x
+        h1 = vertex_heights[i1][:, i0] * (1.0 - ratio_x) + vertex_heights[i1][:, i1] * ratio_x
+        return h0 * (1.0 - ratio_z) + h1 * ratio_z
+
+    def build(self):
+        # samples of the tiles, on the vertices of the leaf grid when the sample count allows it
+        samples_per_tile = max(1, min(self.subdivide_level, self.max_sample_count // self.root_size))
+        positions = np.arange(self.root_size * samples_per_tile + 1, dtype=np.float64) / samples_per_tile
+        heights = self.get_grid_heights(positions, positions)
+
+        min_heights = [block_reduce(heights, samples_per_tile, np.min)]
+        max_heights = [block_reduce(heights, samples_per_tile, np.max)]
+        errors = [np.zeros_like(min_heights[0])]
+        for level in range(self.level_count - 2, -1, -1):
+            node_size = self.get_node_size(level)
+            min_heights.append(reduce_children(min_heights[-1], np.min))
+            max_heights.append(reduce_children(max_heights[-1], np.max))
+            coarse_heights = self.get_coarse_grid_heights(positions, node_size / self.subdivide_level)
+            error = block_reduce(np.abs(heights - coarse_heights), node_size * samples_per_tile, np.max)
+            # the error of a node doesn't get smaller than the error of the children, so the selection is monotonic
+            errors.append(np.maximum(error, reduce_children(errors[-1], np.max)))
+
+        self.min_heights = min_heights[::-1]
+        self.max_heights = max_heights[::-1]
+        self.errors = errors[::-1]
+
+    def get_node_bounds(self, level, nodes):
+        node_size = self.get_node_size(level)
+        x, y = nodes[:, 0], nodes[:, 1]
+        bound_min = np.stack([x * node_size, self.min_heights[level][y, x], y * node_size], axis=1).astype(np.float32)
+        bound_max = np.stack([(x + 1) * node_size, self.max_heights[level][y, x], (y + 1) * node_size], axis=1).astype(np.float32)
+        return bound_min, bound_max
+
+    def get_child_nodes(self, nodes):
+        children = np.repeat(nodes * 2, 4, axis=0)
+        children[:, 0] += np.tile([0, 1, 0, 1], len(nodes))
+        children[:, 1] += np.tile([0, 0, 1, 1], len(nodes))
+        return children
+
+    def get_leaf_patches(self):
+        x, y = np.meshgrid(np.arange(self.width), np.arange(self.height))
+        patches = np.zeros((x.size, 4), dtype=np.float32)
+        patches[:, 0] = x.reshape(-1)
+        patches[:, 1] = y.reshape(-1)
+        patches[:, 2] = 1.0
+        return patches, np.ones(x.size, dtype=np.bool_)
+
+    def select_patches(self, matrix, camera, screen_height, max_pixel_error=2.0):
+        """
+        Refines the nodes from the root while the screen space error of the node is larger than max_pixel_error.
+        The nodes out of the view frustum are not refined, they are kept for the shadow.
+        :return: (n, 4) patches of (x, y, size, edge lods), visible flags of the patches
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        axis_scales = np.linalg.norm(matrix[:3, :3], axis=1)
+        cam_pos = camera.transform.pos
+        # pixels of the world unit at the distance of 1
+        pixel_scale = camera.projection[1][1] * screen_height * 0.5
+
+        patch_list = []
+        visible_list = []
+        nodes = np.zeros((1, 2), dtype=np.int64)
+        for level in range(self.level_count):
+            node_size = self.get_node_size(level)
+            x, y = nodes[:, 0], nodes[:, 1]
+            nodes = nodes[(x * node_size < self.width) & (y * node_size < self.height)]
+            if 0 == len(nodes):
+                break
+            x, y = nodes[:, 0], nodes[:, 1]
+
+            bound_min, bound_max = self.get_node_bounds(level, nodes)
+            centers = np.dot(np.hstack([(bound_min + bound_max) * 0.5, np.ones((len(nodes), 1), dtype=np.float32)]), matrix)[:, :3]
+            radius = np.linalg.norm((bound_max - bound_min) * 0.5 * axis_scales, axis=1)
+            visible = np.all(np.dot(centers - cam_pos, camera.frustum_vectors.T) <= radius.reshape(-1, 1), axis=1)
+
+            if level < self.level_count - 1:
+                distances = np.maximum(np.linalg.norm(centers - cam_pos, axis=1) - radius, camera.near)
+                pixel_errors = self.errors[level][y, x] * axis_scales[1] * pixel_scale / distances
+                # the node over the border of the terrain is always split
+                partial = (self.width < (x + 1) * node_size) | (self.height < (y + 1) * node_size)
+                split = partial | (visible & (max_pixel_error < pixel_errors))
+            else:
+                split = np.zeros(len(nodes), dtype=np.bool_)
+
+            selected = ~split
+            if np.any(selected):
+                patches = np.zeros((np.count_nonzero(selected), 4), dtype=np.float32)
+                patches[:, :2] = nodes[selected] * node_size
+                patches[:, 2] = node_size
+                patch_list.append(patches)
+                visible_list.append(visible[selected])
+            nodes = self.get_child_nodes(nodes[split])
+
+        if not patch_list:
+            return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.bool_)
+        patches = np.vstack(patch_list)
+        patches[:, 3] = self.get_edge_lods(patches)
+        return patches, np.concatenate(visible_list)
+
+    def get_edge_lods(self, patches):
+        """
+        The level differences to the coarser neighbors on the four edges, packed by 3 bits of (-x, +x, -z, +z).
+        The vertices of the edge are snapped to the grid of the neighbor in the shader, so there are no cracks.
+        """
+        size_map = np.zeros((self.root_size, self.root_size), dtype=np.int64)
+        x = patches[:, 0].astype(np.int64)
+        y = patches[:, 1].astype(np.int64)
+        sizes = patches[:, 2].astype(np.int64)
+        for node_size in np.unique(sizes).tolist():
+            level_map = np.zeros((self.root_size // node_size, self.root_size // node_size), dtype=np.int64)
+            same_size = sizes == node_size
+            level_map[y[same_size] // node_size, x[same_size] // node_size] = node_size
+            size_map = np.maximum(size_map, np.repeat(np.repeat(level_map, node_size, axis=0), node_size, axis=1))
+
+        def get_edge_lod(neighbor_x, neighbor_y):
+            inside = (0 <= neighbor_x) & (neighbor_x < self.root_size) & (0 <= neighbor_y) & (neighbor_y < self.root_size)
+            neighbor_sizes = size_map[np.clip(neighbor_y, 0, self.root_size - 1), np.clip(neighbor_x, 0, self.root_size - 1)]
+            neighbor_sizes = np.where(inside, np.maximum(neighbor_sizes, sizes), sizes)
+            return np.minimum(np.round(np.log2(neighbor_sizes / sizes)).astype(np.int64), 7)
+
+        edge_lods = get_edge_lod(x - 1, y)
+        edge_lods += get_edge_lod(x + sizes, y) << 3
+        edge_lods += get_edge_lod(x, y - 1) << 6
+        edge_lods += get_edge_lod(x, y + sizes) << 9
+        return edge_lods.astype(np.float32)
+
+    def raycast(self, origin, direction, max_distance=np.inf):
+        """
+        The ray in the local space, tested against the bounds of the nodes down to the leaves,
+        then marched on the height field of the hit leaves from the nearest one.
+        :return: distance in the ratio of the direction, or None
+        """
+        origin = np.asarray(origin, dtype=np.float64)[:3]
+        direction = np.asarray(direction, dtype=np.float64)[:3]
+        safe_direction = np.where(np.abs(direction) < 1e-12, 1e-12, direction)
+        inv_direction = 1.0 / safe_direction
+
+        nodes = np.zeros((1, 2), dtype=np.int64)
+        for level in range(self.level_count):
+            node_size = self.get_node_size(level)
+            nodes = nodes[(nodes[:, 0] * node_size < self.width) & (nodes[:, 1] * node_size < self.height)]
+            bound_min, bound_max = self.get_node_bounds(level, nodes)
+            t0 = (bound_min - origin) * inv_direction
+            t1 = (bound_max - origin) * inv_direction
+            t_near = np.max(np.minimum(t0, t1), axis=1)
+            t_far = np.min(np.maximum(t0, t1), axis=1)
+            hit = (t_near <= t_far) & (0.0 <= t_far) & (t_near <= max_distance)
+            nodes, t_near, t_far = nodes[hit], t_near[hit], t_far[hit]
+            if 0 == len(nodes):
+                return None
+            if level < self.level_count - 1:
+                nodes = self.get_child_nodes(nodes)
+
+        step_length = 0.5 / self.subdivide_level / max(np.linalg.norm(direction[[0, 2]]), 1e-6)
+        for i in np.argsort(t_near, kind='stable').tolist():
+            t_start = max(t_near[i], 0.0)
+            t_end = min(t_far[i], max_distance)
+            step_count = max(2, int(math.ceil((t_end - t_start) / step_length)) + 1)
+            ts = np.linspace(t_start, t_end, step_count)
+            points = origin + ts.reshape(-1, 1) * direction
+            below = points[:, 1] <= self.get_local_heights(points[:, [0, 2]])
+            if not np.any(below):
+                continue
+            index = int(np.argmax(below))
+            if 0 == index:
+                return ts[0]
+            # bisection between the last sample above and the first sample below the surface
+            t_above, t_below = ts[index - 1], ts[index]
+            for _ in range(8):
+                t = (t_above + t_below) * 0.5
+                point = origin + t * direction
+                if point[1] <= self.get_local_heights(point[[0, 2]])[0]:
+                    t_below = t
+                else:
+                    t_above = t
+            return t_below
+        return None
@@ -1,5 +1,7 @@
-from .RenderInfo import RenderInfo, gather_render_infos
+from .RenderInfo import RenderInfo, RenderInfoPool, ObjectTransformBuffer, gather_render_infos, gather_instance_render_infos, sort_render_infos
+from .RenderInfo import group_render_infos_by_material
 from .RenderInfo import view_frustum_culling_geometry, cone_sphere_culling_actor, always_pass, shadow_culling
+from .RenderInfo import select_lods, get_render_triangle_count
 from .RenderOptions import BlendMode, RenderOption, RenderingType, RenderGroup, RenderMode, RenderOptionManager
 
 from .MaterialInstance import MaterialInstance
@@ -15,11 +17,15 @@ from .Gizmo import AxisGizmo
 from .Effect import EffectManager, Effect, Particle, EffectInfo, ParticleInfo
 from .Camera import Camera
 from .Light import MainLight, PointLight
+from .LightCluster import LightCluster
 from .LightProbe import LightProbe
 from .Atmosphere import Atmosphere
 from .Ocean import Ocean
+from .TerrainQuadTree import HeightField, TerrainQuadTree
 from .Terrain import Terrain
 from .Spline import SplinePoint, SplineData, Spline3D
+from .Picking import ObjectPicker, BoundingVolumeHierarchy, get_picking_ray
+from .CollisionWorld import CollisionWorld
 
 from .Font import TextRenderData, FontData, FontManager
 from .RenderTarget import RenderTargets, RenderTargetManager
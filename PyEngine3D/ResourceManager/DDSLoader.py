@@ -10,6 +10,7 @@ from OpenGL.arrays.arraydatatype import *
 from OpenGL.raw.GL.EXT.texture_compression_s3tc import *
 
 from PyEngine3D.Common import logger
+from PyEngine3D.OpenGLContext import OpenGLContext
 
 
 dxgi_pixel_or_block_size = [
@@ -93,7 +94,7 @@ def loadDDS(imagepath):
         # Create one OpenGL texture
         offset = 0
         textureID = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, textureID)
+        OpenGLContext.bind_texture(GL_TEXTURE_2D, textureID)
         for level in range(mipMapCount):
             if width > 0 and height > 0:
                 size = int((width + 3)/4) * int((height + 3)/4) * blockSize
@@ -15,6 +15,7 @@ import numpy as np
 from PyEngine3D.Common import logger
 from PyEngine3D.Common.Constants import *
 from PyEngine3D.Utilities import *
+from PyEngine3D.OpenGLContext import OpenGLContext
 
 SIMPLE_VERTEX_SHADER = '''
 #version 430 core
@@ -99,12 +100,12 @@ void main(void)
 
 def DistanceField(font_size, image_width, image_height, image_mode, image_data):
     # GL setting
-    glFrontFace(GL_CCW)
-    glEnable(GL_TEXTURE_2D)
-    glDisable(GL_DEPTH_TEST)
-    glDisable(GL_CULL_FACE)
-    glDisable(GL_LIGHTING)
-    glDisable(GL_BLEND)
+    OpenGLContext.front_face(GL_CCW)
+    OpenGLContext.enable(GL_TEXTURE_2D)
+    OpenGLContext.disable(GL_DEPTH_TEST)
+    OpenGLContext.disable(GL_CULL_FACE)
+    OpenGLContext.disable(GL_LIGHTING)
+    OpenGLContext.disable(GL_BLEND)
     glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
 
     # Create Shader
@@ -171,7 +172,7 @@ def DistanceField(font_size, image_width, image_height, image_mode, image_data):
     if image_mode == 'RGB':
         texture_format = GL_RGB
     texture_buffer = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, texture_buffer)
+    OpenGLContext.bind_texture(GL_TEXTURE_2D, texture_buffer)
     glTexImage2D(GL_TEXTURE_2D, 0, texture_format, image_width, image_height, 0, texture_format, GL_UNSIGNED_BYTE,
                  image_data)
     glGenerateMipmap(GL_TEXTURE_2D)
@@ -179,17 +180,17 @@ def DistanceField(font_size, image_width, image_height, image_mode, image_data):
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-    glBindTexture(GL_TEXTURE_2D, 0)
+    OpenGLContext.bind_texture(GL_TEXTURE_2D, 0)
 
     # Create RenderTarget
     render_target_buffer = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, render_target_buffer)
+    OpenGLContext.bind_texture(GL_TEXTURE_2D, render_target_buffer)
     glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, image_width, image_height, 0, GL_RGBA, GL_UNSIGNED_BYTE, NULL_POINTER)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
-    glBindTexture(GL_TEXTURE_2D, 0)
+    OpenGLContext.bind_texture(GL_TEXTURE_2D, 0)
 
     # Create FrameBuffer
     frame_buffer = glGenFramebuffers(1)
@@ -217,8 +218,8 @@ def DistanceField(font_size, image_width, image_height, image_mode, image_data):
 
     # bind texture
     texture_location = glGetUniformLocation(program, "texture_font")
-    glActiveTexture(GL_TEXTURE0)
-    glBindTexture(GL_TEXTURE_2D, texture_buffer)
+    OpenGLContext.active_texture(GL_TEXTURE0)
+    OpenGLContext.bind_texture(GL_TEXTURE_2D, texture_buffer)
     glUniform1i(texture_location, 0)
 
     # Bind Vertex Array
@@ -247,9 +248,9 @@ def DistanceField(font_size, image_width, image_height, image_mode, image_data):
     glDrawElements(GL_TRIANGLES, index_buffer_size, GL_UNSIGNED_INT, NULL_POINTER)
 
     # Save
-    glBindTexture(GL_TEXTURE_2D, render_target_buffer)
+    OpenGLContext.bind_texture(GL_TEXTURE_2D, render_target_buffer)
     save_image_data = glGetTexImage(GL_TEXTURE_2D, 0, GL_RGB, GL_UNSIGNED_BYTE)
-    glBindTexture(GL_TEXTURE_2D, 0)
+    OpenGLContext.bind_texture(GL_TEXTURE_2D, 0)
 
     return save_image_data
 
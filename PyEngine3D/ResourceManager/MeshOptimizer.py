@@ -0,0 +1,198 @@
+from collections import deque
+
+import numpy as np
+from OpenGL.GL import GL_TRIANGLES
+
+from PyEngine3D.Common import logger
+from PyEngine3D.Utilities import compute_tangent
+from .MeshSimplifier import VERTEX_ATTRIBUTE_NAMES, select_vertex_attribute
+
+
+VERTEX_CACHE_SIZE = 16
+# the cache size to report, about the post transform cache of the recent GPUs
+ACMR_CACHE_SIZE = 32
+
+
+def get_acmr(indices, cache_size=ACMR_CACHE_SIZE):
+    """ average cache miss ratio, the transformed vertices per triangle through a FIFO cache """
+    indices = np.asarray(indices).reshape(-1).tolist()
+    if len(indices) < 3:
+        return 0.0
+    cache = deque()
+    cached = set()
+    miss_count = 0
+    for index in indices:
+        if index not in cached:
+            miss_count += 1
+            cache.append(index)
+            cached.add(index)
+            if cache_size < len(cache):
+                cached.discard(cache.popleft())
+    return miss_count / (len(indices) // 3)
+
+
+def optimize_vertex_cache(indices, vertex_count, cache_size=VERTEX_CACHE_SIZE):
+    """
+    Tipsify, Sander et al. 2007. Fans the triangles around a vertex, and picks the next vertex among the vertices of the fan
+    which are still in the cache. The triangle order is split in clusters where the fanning leaves the fan.
+    :return: triangle order, start of the clusters in the triangle order
+    """
+    triangles = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    triangle_count = len(triangles)
+    flat_indices = triangles.reshape(-1)
+
+    # triangles of each vertex
+    live = np.bincount(flat_indices, minlength=vertex_count)
+    adjacency_offsets = np.concatenate([[0], np.cumsum(live)]).tolist()
+    adjacency = (np.argsort(flat_indices, kind='stable') // 3).tolist()
+    live = live.tolist()
+    triangle_list = triangles.tolist()
+
+    emitted = [False] * triangle_count
+    timestamps = [0] * vertex_count
+    time = cache_size + 1
+    dead_end = []
+    cursor = 0
+    triangle_order = []
+    cluster_starts = [0]
+
+    fanning_vertex = 0 if 0 < triangle_count else -1
+    while 0 <= fanning_vertex:
+        candidates = []
+        for i in range(adjacency_offsets[fanning_vertex], adjacency_offsets[fanning_vertex + 1]):
+            triangle = adjacency[i]
+            if emitted[triangle]:
+                continue
+            emitted[triangle] = True
+            triangle_order.append(triangle)
+            for vertex in triangle_list[triangle]:
+                dead_end.append(vertex)
+                candidates.append(vertex)
+                live[vertex] -= 1
+                if cache_size < time - timestamps[vertex]:
+                    timestamps[vertex] = time
+                    time += 1
+
+        # the vertex of the fan which stays in the cache after its remaining triangles
+        next_vertex = -1
+        best_priority = -1
+        for vertex in candidates:
+            if 0 < live[vertex]:
+                priority = 0
+                if time - timestamps[vertex] + 2 * live[vertex] <= cache_size:
+                    priority = time - timestamps[vertex]
+                if best_priority < priority:
+                    best_priority = priority
+                    next_vertex = vertex
+
+        if next_vertex < 0:
+            while dead_end:
+                vertex = dead_end.pop()
+                if 0 < live[vertex]:
+                    next_vertex = vertex
+                    break
+            if next_vertex < 0:
+                while cursor < vertex_count and 0 == live[cursor]:
+                    cursor += 1
+                if cursor < vertex_count:
+                    next_vertex = cursor
+            if 0 <= next_vertex and cluster_starts[-1] < len(triangle_order):
+                cluster_starts.append(len(triangle_order))
+        fanning_vertex = next_vertex
+    return np.array(triangle_order, dtype=np.int64), np.array(cluster_starts, dtype=np.int64)
+
+
+def optimize_overdraw(positions, triangles, triangle_order, cluster_starts):
+    """
+    Sorts the clusters of the vertex cache order, the clusters which face out of the mesh center first,
+    so they are more likely to occlude the other clusters of the mesh.
+    """
+    if len(cluster_starts) < 2:
+        return triangle_order
+
+    ordered_triangles = triangles[triangle_order]
+    v0 = positions[ordered_triangles[:, 0]]
+    v1 = positions[ordered_triangles[:, 1]]
+    v2 = positions[ordered_triangles[:, 2]]
+    # area weighted normals and centers
+    normals = np.cross(v1 - v0, v2 - v0)
+    areas = np.linalg.norm(normals, axis=1)
+    centers = (v0 + v1 + v2) / 3.0
+
+    cluster_normals = np.add.reduceat(normals, cluster_starts, axis=0)
+    cluster_areas = np.maximum(np.add.reduceat(areas, cluster_starts), 1e-12).reshape(-1, 1)
+    cluster_centers = np.add.reduceat(centers * areas.reshape(-1, 1), cluster_starts, axis=0) / cluster_areas
+    mesh_center = np.sum(cluster_centers * cluster_areas, axis=0) / np.sum(cluster_areas)
+    cluster_normals /= np.maximum(np.linalg.norm(cluster_normals, axis=1, keepdims=True), 1e-12)
+    sort_keys = np.sum((cluster_centers - mesh_center) * cluster_normals, axis=1)
+
+    cluster_ends = np.append(cluster_starts[1:], len(triangle_order))
+    cluster_order = np.argsort(-sort_keys, kind='stable')
+    return np.concatenate([triangle_order[cluster_starts[i]:cluster_ends[i]] for i in cluster_order])
+
+
+def optimize_vertex_fetch(indices, vertex_count):
+    """ :return: old vertex indices in the order of the first use, and the indices remapped to the new order """
+    unique_vertices, first_index = np.unique(indices, return_index=True)
+    vertex_order = unique_vertices[np.argsort(first_index)]
+    remap = np.zeros(vertex_count, dtype=np.uint32)
+    remap[vertex_order] = np.arange(len(vertex_order), dtype=np.uint32)
+    return vertex_order, remap[indices]
+
+
+def quantize_geometry_data(geometry_data):
+    """
+    normals and tangents to normalized int16, texcoords to float16.
+    The tangents are computed before, because they are computed from the float normals and texcoords.
+    """
+    positions = np.asarray(geometry_data['positions'], dtype=np.float32)
+    vertex_count = len(positions)
+    normals = np.asarray(geometry_data.get('normals', [[1.0, 1.0, 1.0], ] * vertex_count), dtype=np.float32)
+    texcoords = np.asarray(geometry_data.get('texcoords', [[0.0, 0.0], ] * vertex_count), dtype=np.float32)
+    tangents = geometry_data.get('tangents', [])
+    if len(tangents) == 0:
+        tangents = compute_tangent(True, positions, texcoords, normals, np.asarray(geometry_data['indices'], dtype=np.uint32))
+
+    def to_snorm16(vectors):
+        return np.round(np.clip(np.asarray(vectors, dtype=np.float32), -1.0, 1.0) * 32767.0).astype(np.int16)
+
+    geometry_data['normals'] = to_snorm16(normals)
+    geometry_data['tangents'] = to_snorm16(tangents)
+    geometry_data['texcoords'] = texcoords.astype(np.float16)
+
+
+def optimize_geometry_data(geometry_data, quantize=False):
+    """
+    Reorders the triangles for the post transform vertex cache and the overdraw,
+    then the vertices in the order of the first use for the vertex fetch.
+    :return: ACMR before and after
+    """
+    if geometry_data.get('mode', GL_TRIANGLES) != GL_TRIANGLES:
+        return None
+
+    positions = np.asarray(geometry_data['positions'], dtype=np.float32)
+    vertex_count = len(positions)
+    indices = np.asarray(geometry_data['indices'], dtype=np.int64).reshape(-1)
+    indices = indices[:len(indices) - len(indices) % 3]
+    if 0 == len(indices) or 0 == vertex_count:
+        return None
+    acmr = get_acmr(indices)
+
+    triangles = indices.reshape(-1, 3)
+    triangle_order, cluster_starts = optimize_vertex_cache(indices, vertex_count)
+    triangle_order = optimize_overdraw(positions, triangles, triangle_order, cluster_starts)
+    indices = triangles[triangle_order].reshape(-1)
+
+    vertex_order, indices = optimize_vertex_fetch(indices, vertex_count)
+    for key in VERTEX_ATTRIBUTE_NAMES:
+        value = geometry_data.get(key)
+        if value is not None and len(value) == vertex_count:
+            geometry_data[key] = select_vertex_attribute(value, vertex_order)
+    geometry_data['indices'] = indices
+
+    if quantize:
+        quantize_geometry_data(geometry_data)
+
+    optimized_acmr = get_acmr(indices)
+    logger.info("%s ACMR : %.3f -> %.3f, %d triangles" % (geometry_data.get('name', ''), acmr, optimized_acmr, len(triangle_order)))
+    return acmr, optimized_acmr
@@ -0,0 +1,188 @@
+import numpy as np
+from OpenGL.GL import GL_TRIANGLES
+
+from PyEngine3D.Common import logger
+
+
+VERTEX_ATTRIBUTE_NAMES = ('positions', 'normals', 'texcoords', 'tangents', 'colors', 'bone_indicies', 'bone_weights')
+LOD_TRIANGLE_RATIOS = (0.5, 0.25, 0.125)
+LOD_SCREEN_SIZES = (0.25, 0.125, 0.0625)
+
+
+def get_triangle_planes(positions, triangles):
+    v0 = positions[triangles[:, 0]]
+    normals = np.cross(positions[triangles[:, 1]] - v0, positions[triangles[:, 2]] - v0)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals /= np.maximum(lengths, 1e-12)
+    return normals, -np.sum(normals * v0, axis=1)
+
+
+def get_vertex_quadrics(positions, triangles):
+    """ sum of the squared distance to the planes of the triangles around the vertex, 4x4 for the homogeneous positions """
+    normals, distances = get_triangle_planes(positions, triangles)
+    planes = np.hstack([normals, distances.reshape(-1, 1)])
+    triangle_quadrics = planes[:, :, np.newaxis] * planes[:, np.newaxis, :]
+    quadrics = np.zeros((len(positions), 4, 4), dtype=np.float64)
+    for corner in range(3):
+        np.add.at(quadrics, triangles[:, corner], triangle_quadrics)
+    return quadrics
+
+
+def get_edges(triangles):
+    edges = np.vstack([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+    return np.sort(edges, axis=1)
+
+
+def get_border_vertices(triangles, vertex_count):
+    """ the vertices on the edges used by one triangle. the uv and normal seams are borders too, because the vertices are split. """
+    edges, counts = np.unique(get_edges(triangles), axis=0, return_counts=True)
+    border = np.zeros(vertex_count, dtype=np.bool_)
+    border[edges[counts == 1].reshape(-1)] = True
+    return border
+
+
+def simplify_triangles(positions, indices, target_triangle_count, max_error):
+    """
+    Quadric error edge collapse. Every pass collapses a batch of the edges which are the cheapest edge of both vertices,
+    so the collapses of a pass never share a vertex and are applied at once.
+    The removed vertex moves to the kept vertex, so the vertex attributes are kept as they are.
+    :param max_error: the largest squared distance to the original surface
+    :return: triangle indices, error of the last collapse
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    triangles = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    vertex_count = len(positions)
+    homogeneous_positions = np.hstack([positions, np.ones((vertex_count, 1), dtype=np.float64)])
+    quadrics = get_vertex_quadrics(positions, triangles)
+    locked = get_border_vertices(triangles, vertex_count)
+    error = 0.0
+
+    while target_triangle_count < len(triangles):
+        edges = np.unique(get_edges(triangles), axis=0)
+        a, b = edges[:, 0], edges[:, 1]
+        edge_quadrics = quadrics[a] + quadrics[b]
+        cost_to_a = np.einsum('ni,nij,nj->n', homogeneous_positions[a], edge_quadrics, homogeneous_positions[a])
+        cost_to_b = np.einsum('ni,nij,nj->n', homogeneous_positions[b], edge_quadrics, homogeneous_positions[b])
+        cost_to_a[locked[b]] = np.inf
+        cost_to_b[locked[a]] = np.inf
+        keep_b = cost_to_b <= cost_to_a
+        costs = np.where(keep_b, cost_to_b, cost_to_a)
+        sources = np.where(keep_b, a, b)
+        targets = np.where(keep_b, b, a)
+
+        valid = costs <= max_error
+        if not np.any(valid):
+            break
+        costs, sources, targets = costs[valid], sources[valid], targets[valid]
+
+        # the cheapest edge of both vertices
+        vertex_costs = np.full(vertex_count, np.inf)
+        np.minimum.at(vertex_costs, sources, costs)
+        np.minimum.at(vertex_costs, targets, costs)
+        selected = (costs <= vertex_costs[sources]) & (costs <= vertex_costs[targets])
+        costs, sources, targets = costs[selected], sources[selected], targets[selected]
+
+        # same costs can select the edges sharing a vertex, only the first edge of the vertex is kept.
+        order = np.argsort(costs, kind='stable')
+        costs, sources, targets = costs[order], sources[order], targets[order]
+        first_index = np.unique(np.vstack([sources, targets]).T.reshape(-1), return_index=True)[1]
+        first = np.zeros(len(sources) * 2, dtype=np.bool_)
+        first[first_index] = True
+        independent = first[0::2] & first[1::2]
+        costs, sources, targets = costs[independent], sources[independent], targets[independent]
+
+        # a collapse removes two triangles of a manifold edge
+        collapse_count = max(1, (len(triangles) - target_triangle_count + 1) // 2)
+        costs, sources, targets = costs[:collapse_count], sources[:collapse_count], targets[:collapse_count]
+
+        collapse_map = np.arange(vertex_count)
+        collapse_map[sources] = targets
+        new_triangles = collapse_map[triangles]
+        degenerated = (new_triangles[:, 0] == new_triangles[:, 1]) | \
+                      (new_triangles[:, 1] == new_triangles[:, 2]) | \
+                      (new_triangles[:, 2] == new_triangles[:, 0])
+
+        # cancel the collapses which flip a triangle
+        moved = np.any(new_triangles != triangles, axis=1) & ~degenerated
+        if np.any(moved):
+            old_normals = get_triangle_planes(positions, triangles[moved])[0]
+            new_normals = get_triangle_planes(positions, new_triangles[moved])[0]
+            flipped = np.sum(old_normals * new_normals, axis=1) <= 0.0
+            if np.any(flipped):
+                flipped_vertices = triangles[moved][flipped].reshape(-1)
+                canceled = np.isin(sources, flipped_vertices)
+                collapse_map[sources[canceled]] = sources[canceled]
+                costs, sources, targets = costs[~canceled], sources[~canceled], targets[~canceled]
+                if 0 == len(sources):
+                    break
+                new_triangles = collapse_map[triangles]
+                degenerated = (new_triangles[:, 0] == new_triangles[:, 1]) | \
+                              (new_triangles[:, 1] == new_triangles[:, 2]) | \
+                              (new_triangles[:, 2] == new_triangles[:, 0])
+
+        np.add.at(quadrics, targets, quadrics[sources])
+        triangles = new_triangles[~degenerated]
+        error = max(error, float(costs[-1]))
+    return triangles.reshape(-1), error
+
+
+def select_vertex_attribute(value, vertices):
+    """
+    float32 like CreateVertexArrayBuffer makes from the lists. np.asarray would make float64 from the float lists
+    and int64 from the bone indices, which are uploaded as GL_DOUBLE and GL_INT64.
+    """
+    return np.asarray(value, dtype=np.float32)[vertices]
+
+
+def compact_geometry_data(geometry_data, indices, name):
+    """ the geometry data of the used vertices only """
+    vertex_count = len(geometry_data['positions'])
+    used_vertices, new_indices = np.unique(indices, return_inverse=True)
+    lod_geometry_data = dict()
+    for key, value in geometry_data.items():
+        if key in VERTEX_ATTRIBUTE_NAMES and value is not None and len(value) == vertex_count:
+            lod_geometry_data[key] = select_vertex_attribute(value, used_vertices)
+        elif key != 'indices':
+            lod_geometry_data[key] = value
+    lod_geometry_data['name'] = name
+    lod_geometry_data['indices'] = new_indices.astype(np.uint32)
+    return lod_geometry_data
+
+
+def generate_lod_datas(geometry_datas, triangle_ratios=LOD_TRIANGLE_RATIOS, screen_sizes=LOD_SCREEN_SIZES, max_error_ratio=0.02):
+    """
+    Simplifies every geometry of the mesh for each LOD, each LOD from the previous one.
+    A LOD is dropped if it does not reduce the triangles of the previous LOD by 10%.
+    :param max_error_ratio: the largest distance to the surface in the ratio of the size of the geometry
+    :return: [dict(screen_size=, geometry_datas=[...]), ...]
+    """
+    lod_datas = []
+    if not geometry_datas or any(geometry_data.get('mode', GL_TRIANGLES) != GL_TRIANGLES for geometry_data in geometry_datas):
+        return lod_datas
+
+    base_triangle_counts = [len(geometry_data['indices']) // 3 for geometry_data in geometry_datas]
+    previous_geometry_datas = geometry_datas
+    previous_triangle_count = sum(base_triangle_counts)
+    for lod, (triangle_ratio, screen_size) in enumerate(zip(triangle_ratios, screen_sizes)):
+        lod_geometry_datas = []
+        for i, geometry_data in enumerate(previous_geometry_datas):
+            positions = np.asarray(geometry_data['positions'], dtype=np.float64)
+            size = np.linalg.norm(np.max(positions, axis=0) - np.min(positions, axis=0))
+            target_triangle_count = int(base_triangle_counts[i] * triangle_ratio)
+            indices, error = simplify_triangles(positions, geometry_data['indices'], target_triangle_count,
+                                                (size * max_error_ratio) ** 2)
+            lod_geometry_data = compact_geometry_data(geometry_data, indices, "%s_lod%d" % (geometry_datas[i].get('name', i), lod + 1))
+            # the LOD is culled by the bound box of the original geometry
+            for key in ('bound_min', 'bound_max', 'radius'):
+                if key in geometry_datas[i]:
+                    lod_geometry_data[key] = geometry_datas[i][key]
+            lod_geometry_datas.append(lod_geometry_data)
+
+        triangle_count = sum(len(geometry_data['indices']) // 3 for geometry_data in lod_geometry_datas)
+        if previous_triangle_count * 0.9 < triangle_count or 0 == triangle_count:
+            break
+        logger.info("LOD%d : %d -> %d triangles" % (lod + 1, sum(base_triangle_counts), triangle_count))
+        lod_datas.append(dict(screen_size=screen_size, geometry_datas=lod_geometry_datas))
+        previous_geometry_datas = lod_geometry_datas
+        previous_triangle_count = triangle_count
+    return lod_datas
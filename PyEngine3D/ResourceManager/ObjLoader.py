@@ -6,6 +6,7 @@ import numpy as np
 
 from PyEngine3D.Common import logger
 from PyEngine3D.Utilities import *
+from PyEngine3D.OpenGLContext import OpenGLContext
 
 
 defaultTexCoord = [0.0, 0.0]
@@ -173,8 +174,8 @@ class OBJ:
     def generateInstruction(self):
         self.glList = glGenLists(1)
         glNewList(self.glList, GL_COMPILE)
-        glEnable(GL_TEXTURE_2D)
-        glFrontFace(GL_CCW)
+        OpenGLContext.enable(GL_TEXTURE_2D)
+        OpenGLContext.front_face(GL_CCW)
         # generate  face
         for face in self.faces:
             positions, normals, texcoords, material = face
@@ -184,7 +185,7 @@ class OBJ:
                 mtl = self.mtl[material]
                 if 'texture_Kd' in mtl:
                     # set diffuse texture
-                    glBindTexture(GL_TEXTURE_2D, mtl['texture_Kd'])
+                    OpenGLContext.bind_texture(GL_TEXTURE_2D, mtl['texture_Kd'])
                 elif 'Kd' in mtl:
                     # just use diffuse colour
                     glColor(*mtl['Kd'])
@@ -201,7 +202,7 @@ class OBJ:
                 # set positions
                 glVertex3fv(self.positions[positions[i]])
             glEnd()
-        glDisable(GL_TEXTURE_2D)
+        OpenGLContext.disable(GL_TEXTURE_2D)
         glEndList()
         
     def changeColor(self):
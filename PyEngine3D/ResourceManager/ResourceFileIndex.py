@@ -0,0 +1,199 @@
+import datetime
+import hashlib
+import os
+import pickle
+import traceback
+
+from PyEngine3D.Common import logger
+
+
+class FileInfo:
+    __slots__ = ['size', 'mtime', 'hash']
+
+    def __init__(self, size, mtime, hash=None):
+        self.size = size
+        self.mtime = mtime
+        self.hash = hash
+
+    def __getstate__(self):
+        return self.size, self.mtime, self.hash
+
+    def __setstate__(self, state):
+        self.size, self.mtime, self.hash = state
+
+
+class DirectoryInfo:
+    __slots__ = ['mtime', 'filenames', 'dirnames']
+
+    def __init__(self, mtime, filenames, dirnames):
+        self.mtime = mtime
+        self.filenames = filenames
+        self.dirnames = dirnames
+
+    def __getstate__(self):
+        return self.mtime, self.filenames, self.dirnames
+
+    def __setstate__(self, state):
+        self.mtime, self.filenames, self.dirnames = state
+
+
+class ResourceFileIndex:
+    """
+    One scan of the resource trees shared by every resource loader.
+
+    The index is cached in a file between runs. A directory whose mtime is unchanged reuses its cached listing
+    and the cached file infos, so only the changed directories are listed and their files stat'ed again.
+    An edit in place doesn't change the directory mtime, so the loaders read the file info through refresh_file,
+    which stats the file live. The content hash is computed lazily and kept while the size and mtime are unchanged.
+    """
+    index_version = 1
+
+    def __init__(self, root_paths, index_filepath):
+        self.root_paths = [os.path.normpath(root_path) for root_path in root_paths]
+        self.index_filepath = index_filepath
+        self.directories = {}  # {dirpath: DirectoryInfo}
+        self.files = {}  # {filepath: FileInfo}
+        self.listed_directory_count = 0
+
+    def load(self):
+        if os.path.exists(self.index_filepath):
+            try:
+                with open(self.index_filepath, 'rb') as f:
+                    load_data = pickle.load(f)
+                if load_data.get('index_version') == self.index_version and load_data.get('root_paths') == self.root_paths:
+                    self.directories = load_data['directories']
+                    self.files = load_data['files']
+                    return True
+            except BaseException:
+                logger.error(traceback.format_exc())
+        self.directories = {}
+        self.files = {}
+        return False
+
+    def save(self):
+        temp_filepath = self.index_filepath + ".tmp"
+        try:
+            with open(temp_filepath, 'wb') as f:
+                save_data = dict(index_version=self.index_version,
+                                 root_paths=self.root_paths,
+                                 directories=self.directories,
+                                 files=self.files)
+                pickle.dump(save_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_filepath, self.index_filepath)
+        except BaseException:
+            logger.error(traceback.format_exc())
+
+    def scan(self):
+        self.listed_directory_count = 0
+        old_directories = self.directories
+        old_files = self.files
+        self.directories = {}
+        self.files = {}
+
+        for root_path in self.root_paths:
+            if root_path not in self.directories:
+                self.scan_directory(root_path, old_directories, old_files)
+
+        logger.info("ResourceFileIndex : %d directories, %d files, %d directories are listed." %
+                    (len(self.directories), len(self.files), self.listed_directory_count))
+
+    def scan_directory(self, dirpath, old_directories, old_files):
+        try:
+            mtime = os.stat(dirpath).st_mtime
+        except OSError:
+            return
+
+        directory_info = old_directories.get(dirpath)
+        if directory_info is not None and directory_info.mtime == mtime:
+            self.directories[dirpath] = directory_info
+            for filename in directory_info.filenames:
+                filepath = os.path.join(dirpath, filename)
+                file_info = old_files.get(filepath)
+                if file_info is None:
+                    file_info = self.stat_file(filepath)
+                if file_info is not None:
+                    self.files[filepath] = file_info
+        else:
+            filenames = []
+            dirnames = []
+            for entry in os.scandir(dirpath):
+                if entry.is_dir():
+                    dirnames.append(entry.name)
+                else:
+                    filenames.append(entry.name)
+            filenames.sort()
+            dirnames.sort()
+            directory_info = DirectoryInfo(mtime, filenames, dirnames)
+            self.listed_directory_count += 1
+            self.directories[dirpath] = directory_info
+            for filename in directory_info.filenames:
+                filepath = os.path.join(dirpath, filename)
+                file_info = self.stat_file(filepath, old_files.get(filepath))
+                if file_info is not None:
+                    self.files[filepath] = file_info
+
+        for dirname in directory_info.dirnames:
+            self.scan_directory(os.path.join(dirpath, dirname), old_directories, old_files)
+
+    def get_files(self, dirpath, file_exts=None):
+        """
+        :param file_exts: collection of lower case extensions to filter. None is every file.
+        :return: file paths under the directory in the os.walk order
+        """
+        filepaths = []
+        directory_info = self.directories.get(os.path.normpath(dirpath))
+        if directory_info is None and os.path.isdir(dirpath):
+            # out of the root paths or made after the scan
+            self.scan_directory(os.path.normpath(dirpath), {}, {})
+            directory_info = self.directories.get(os.path.normpath(dirpath))
+
+        if directory_info is not None:
+            for filename in directory_info.filenames:
+                if file_exts is None or os.path.splitext(filename)[1].lower() in file_exts:
+                    filepaths.append(os.path.join(dirpath, filename))
+            for dirname in directory_info.dirnames:
+                filepaths += self.get_files(os.path.join(dirpath, dirname), file_exts)
+        return filepaths
+
+    def get_file_info(self, filepath):
+        return self.files.get(os.path.normpath(filepath))
+
+    def get_modify_time_of_file(self, filepath):
+        """ same format as Utilities.get_modify_time_of_file, which is stored in the meta files. """
+        file_info = self.get_file_info(filepath)
+        if file_info is not None:
+            return str(datetime.datetime.fromtimestamp(file_info.mtime))
+        return str(datetime.datetime.min)
+
+    @staticmethod
+    def stat_file(filepath, file_info=None):
+        """ :return: file_info while the size and the mtime are unchanged, a new FileInfo or None without the file """
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return None
+        if file_info is None or file_info.size != stat.st_size or file_info.mtime != stat.st_mtime:
+            file_info = FileInfo(stat.st_size, stat.st_mtime)
+        return file_info
+
+    def refresh_file(self, filepath):
+        """ stats the file again, for the files which are changed or made after the scan. :return: FileInfo or None """
+        filepath = os.path.normpath(filepath)
+        file_info = self.stat_file(filepath, self.files.get(filepath))
+        if file_info is None:
+            self.files.pop(filepath, None)
+        else:
+            self.files[filepath] = file_info
+        return file_info
+
+    def get_hash(self, filepath):
+        file_info = self.refresh_file(filepath)
+        if file_info is None:
+            return None
+        if file_info.hash is None:
+            file_hash = hashlib.sha1()
+            with open(filepath, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    file_hash.update(chunk)
+            file_info.hash = file_hash.hexdigest()
+        return file_info.hash
@@ -42,6 +42,10 @@ from PyEngine3D.OpenGLContext import parsing_macros, parsing_uniforms, parsing_m
 from PyEngine3D.Utilities import Attributes, Singleton, Config, Logger, Profiler, Float3
 from PyEngine3D.Utilities import GetClassName, is_gz_compressed_file, check_directory_and_mkdir, get_modify_time_of_file
 from . import Collada, OBJ, loadDDS, generate_font_data, TextureGenerator
+from .MeshSimplifier import generate_lod_datas
+from .MeshOptimizer import optimize_geometry_data
+from .ResourceFileIndex import ResourceFileIndex
+from .ResourceWatcher import ResourceWatcher
 
 
 class LoadingThread(Thread):
@@ -77,14 +81,16 @@ class LoadingThread(Thread):
 # CLASS : MetaData
 # -----------------------#
 class MetaData:
-    def __init__(self, resource_version, resource_filepath, is_engine_resource):
+    def __init__(self, resource_version, resource_filepath, is_engine_resource, enable_save=True):
         self.is_engine_resource = is_engine_resource
+        self.enable_save = enable_save
         self.filepath = os.path.splitext(resource_filepath)[0] + ".meta"
         self.resource_version = resource_version
         self.resource_filepath = resource_filepath
         self.resource_modify_time = get_modify_time_of_file(resource_filepath)
         self.source_filepath = ""
         self.source_modify_time = ""
+        self.source_hash = ""
         self.version_updated = False
         self.changed = False
 
@@ -116,7 +122,7 @@ class MetaData:
         if self.changed and save:
             self.save_meta_file()
 
-    def set_source_meta_data(self, source_filepath, save=True):
+    def set_source_meta_data(self, source_filepath, save=True, source_hash=""):
         # filepath, ext = os.path.splitext(source_filepath)
         # dirpath, filename = os.path.split(filepath)
         # source_filepath = os.path.join(dirpath, filename.replace(".", os.sep) + ext)
@@ -124,8 +130,10 @@ class MetaData:
         source_modify_time = get_modify_time_of_file(source_filepath)
         self.changed |= self.source_filepath != source_filepath
         self.changed |= self.source_modify_time != source_modify_time
+        self.changed |= self.source_hash != source_hash
         self.source_filepath = source_filepath
         self.source_modify_time = source_modify_time
+        self.source_hash = source_hash
 
         if self.changed and save:
             self.save_meta_file()
@@ -139,12 +147,14 @@ class MetaData:
                 resource_modify_time = load_data.get("resource_modify_time", None)
                 source_filepath = load_data.get("source_filepath", None)
                 source_modify_time = load_data.get("source_modify_time", None)
+                source_hash = load_data.get("source_hash", None)
 
                 self.changed |= self.resource_version != resource_version
                 self.changed |= self.resource_filepath != resource_filepath
                 self.changed |= self.resource_modify_time != resource_modify_time
                 self.changed |= self.source_filepath != source_filepath
                 self.changed |= self.source_modify_time != source_modify_time
+                self.changed |= self.source_hash != source_hash
 
                 if resource_version is not None:
                     self.resource_version = resource_version
@@ -152,6 +162,8 @@ class MetaData:
                     self.source_filepath = source_filepath
                 if source_modify_time is not None:
                     self.source_modify_time = source_modify_time
+                if source_hash is not None:
+                    self.source_hash = source_hash
         else:
             # save meta file
             self.changed = True
@@ -160,6 +172,9 @@ class MetaData:
             self.save_meta_file()
 
     def save_meta_file(self):
+        if not self.enable_save:
+            return
+
         if (self.changed or not os.path.exists(self.filepath)) and os.path.exists(self.resource_filepath):
             with open(self.filepath, 'w') as f:
                 save_data = dict(
@@ -168,6 +183,7 @@ class MetaData:
                     resource_modify_time=self.resource_modify_time,
                     source_filepath=self.source_filepath,
                     source_modify_time=self.source_modify_time,
+                    source_hash=self.source_hash,
                 )
                 pprint.pprint(save_data, f)
             self.changed = False
@@ -186,12 +202,14 @@ class Resource:
         self.type_name = resource_type_name
         self.data = None
         self.meta_data = None
+        # set by ResourceManager.update when the resource file is changed.
+        self.dirty = False
 
     def get_resource_info(self):
         return self.name, self.type_name, self.data is not None
 
     def is_need_to_load(self):
-        return self.data is None or self.meta_data.is_resource_file_changed()
+        return self.data is None or self.dirty
 
     def set_data(self, data):
         if self.data is None:
@@ -292,12 +310,22 @@ class ResourceLoader(object):
         return resource_name if make_lower else resource_name
 
     def is_new_external_data(self, meta_data, source_filepath):
-        if os.path.exists(source_filepath):
-            # Refresh the resource from external file.
-            source_modify_time = get_modify_time_of_file(source_filepath)
-            return (meta_data.resource_version != self.resource_version) or (meta_data.source_filepath == source_filepath and meta_data.source_modify_time != source_modify_time)
-        else:
+        file_index = self.resource_manager.file_index
+        # the source can be changed or made after the scan of the file index
+        if not source_filepath or file_index.refresh_file(source_filepath) is None:
+            return False
+
+        # Refresh the resource from external file.
+        if meta_data.resource_version != self.resource_version:
+            return True
+        if meta_data.source_filepath != source_filepath or meta_data.source_modify_time == file_index.get_modify_time_of_file(source_filepath):
+            return False
+        # the content hash is only read when the modify time is changed, a touched source is not converted again.
+        source_hash = file_index.get_hash(source_filepath)
+        if meta_data.source_hash and meta_data.source_hash == source_hash:
+            meta_data.set_source_meta_data(source_filepath, source_hash=source_hash)
             return False
+        return True
 
     def is_engine_resource(self, filepath):
         return filepath.startswith(self.engine_resource_path) or self.engine_resource_path == self.project_resource_path
@@ -308,6 +336,7 @@ class ResourceLoader(object):
     def initialize(self):
         logger.info("initialize " + GetClassName(self))
 
+        file_index = self.resource_manager.file_index
         resource_paths = [self.engine_resource_path, ]
         if self.project_resource_path not in resource_paths:
             resource_paths.append(self.project_resource_path)
@@ -315,28 +344,19 @@ class ResourceLoader(object):
         # collect resource files
         for resource_path in resource_paths:
             is_engine_resource = resource_path is self.engine_resource_path
-            for dirname, dirnames, filenames in os.walk(resource_path):
-                for filename in filenames:
-                    fileExt = os.path.splitext(filename)[1]
-                    if ".*" == self.fileExt or fileExt == self.fileExt:
-                        filepath = os.path.join(dirname, filename)
-                        resource_name = self.get_resource_name(resource_path, filepath)
-                        self.create_resource(resource_name=resource_name, resource_data=None, resource_filepath=filepath, is_engine_resource=is_engine_resource)
+            file_exts = None if ".*" == self.fileExt else (self.fileExt.lower(), )
+            for filepath in file_index.get_files(resource_path, file_exts):
+                if ".*" == self.fileExt or os.path.splitext(filepath)[1] == self.fileExt:
+                    resource_name = self.get_resource_name(resource_path, filepath)
+                    self.create_resource(resource_name=resource_name, resource_data=None, resource_filepath=filepath, is_engine_resource=is_engine_resource)
 
         # Convert external files to resources.
         if self.externalFileExt:
             # gather external source files
+            external_file_exts = set(self.externalFileExt.values())
             for external_path in self.external_paths:
                 is_engine_external = self.is_engine_external(external_path)
-                externalFileList = []
-
-                for dirname, dirnames, filenames in os.walk(external_path):
-                    for filename in filenames:
-                        source_filepath = os.path.join(dirname, filename)
-
-                        file_ext = os.path.splitext(source_filepath)[1].lower()
-                        if file_ext in self.externalFileExt.values() and source_filepath not in externalFileList:
-                            externalFileList.append(source_filepath)
+                externalFileList = file_index.get_files(external_path, external_file_exts)
 
                 # convert external file to rsource file.
                 for source_filepath in externalFileList:
@@ -353,21 +373,18 @@ class ResourceLoader(object):
                         logger.info("Refresh the new resource from %s." % source_filepath)
 
         # clear gabage meta file
-        for dirname, dirnames, filenames in os.walk(self.project_resource_path):
-            for filename in filenames:
-                file_ext = os.path.splitext(filename)[1]
-                if file_ext == '.meta':
-                    filepath = os.path.join(dirname, filename)
-                    resource_name = self.get_resource_name(self.project_resource_path, filepath)
-                    resource = self.get_resource(resource_name, noWarn=True)
-                    meta_data = self.get_meta_data(resource_name, noWarn=True)
-                    if resource is None:
-                        if meta_data:
-                            meta_data.delete_meta_file()
-                            self.metaDatas.pop(resource_name)
-                        else:
-                            logger.info("Delete the %s." % filepath)
-                            os.remove(filepath)
+        for filepath in file_index.get_files(self.project_resource_path, ('.meta', )):
+            if os.path.splitext(filepath)[1] == '.meta':
+                resource_name = self.get_resource_name(self.project_resource_path, filepath)
+                resource = self.get_resource(resource_name, noWarn=True)
+                meta_data = self.get_meta_data(resource_name, noWarn=True)
+                if resource is None:
+                    if meta_data:
+                        meta_data.delete_meta_file()
+                        self.metaDatas.pop(resource_name)
+                    else:
+                        logger.info("Delete the %s." % filepath)
+                        os.remove(filepath)
 
     def get_new_resource_name(self, prefix=""):
         if prefix not in self.resources:
@@ -449,7 +466,7 @@ class ResourceLoader(object):
         else:
             resource_filepath = self.engine_resource_path if is_engine_resource else self.project_resource_path
             resource_filepath = os.path.join(resource_filepath, resource_name.replace(".", os.sep)) + self.fileExt
-        meta_data = MetaData(self.resource_version, resource_filepath, is_engine_resource)
+        meta_data = MetaData(self.resource_version, resource_filepath, is_engine_resource, self.resource_manager.enable_save)
         self.regist_resource(resource, meta_data)
         return resource
 
@@ -459,12 +476,14 @@ class ResourceLoader(object):
         if meta_data is not None:
             self.metaDatas[resource.name] = meta_data
             resource.meta_data = meta_data
+            self.resource_manager.watch_resource(resource)
         # The new resource registered.
         if resource:
             self.core_manager.send_resource_info(resource.get_resource_info())
 
     def unregist_resource(self, resource):
         if resource:
+            self.resource_manager.unwatch_resource(resource)
             if resource.name in self.metaDatas:
                 self.metaDatas.pop(resource.name)
             if resource.name in self.resources:
@@ -537,6 +556,9 @@ class ResourceLoader(object):
         return None
 
     def save_resource_data(self, resource, save_data, source_filepath=""):
+        if not self.resource_manager.enable_save:
+            return
+
         save_filepath = resource.name.replace('.', os.sep)
 
         if resource.meta_data.is_engine_resource:
@@ -551,9 +573,11 @@ class ResourceLoader(object):
         if self.save_data_to_file(save_filepath, save_data):
             # refresh meta data because resource file saved.
             resource.meta_data.set_resource_meta_data(save_filepath, save=False)
-            resource.meta_data.set_source_meta_data(source_filepath, save=False)
+            source_hash = (self.resource_manager.file_index.get_hash(source_filepath) or "") if source_filepath else ""
+            resource.meta_data.set_source_meta_data(source_filepath, save=False, source_hash=source_hash)
             resource.meta_data.set_resource_version(self.resource_version, save=False)
             resource.meta_data.save_meta_file()
+            self.resource_manager.watch_resource(resource)
 
     def save_data_to_file(self, save_filepath, save_data):
         logger.info("Save : %s" % save_filepath)
@@ -1104,7 +1128,9 @@ class ProceduralTextureLoader(ResourceLoader):
     def action_resource(self, resource_name):
         texture = self.get_resource_data(resource_name)
         if texture is not None:
-            texture.generate_texture()
+            self.core_manager.job_scheduler.submit("generate_texture : %s" % resource_name,
+                                                   texture.generate_texture,
+                                                   key=("generate_texture", resource_name))
 
 
 # -----------------------#
@@ -1112,12 +1138,14 @@ class ProceduralTextureLoader(ResourceLoader):
 # -----------------------#
 class MeshLoader(ResourceLoader):
     name = "MeshLoader"
-    resource_version = 0
+    resource_version = 2
     resource_dir_name = 'Meshes'
     resource_type_name = 'Mesh'
     fileExt = '.mesh'
     externalFileExt = dict(WaveFront='.obj', Collada='.dae')
     USE_FILE_COMPRESS_TO_SAVE = True
+    # normals and tangents to int16, texcoords to float16. the quantized geometries are not merged in the StaticGeometryBuffer.
+    USE_VERTEX_QUANTIZATION = False
 
     def initialize(self):
         # load and regist resource
@@ -1153,6 +1181,15 @@ class MeshLoader(ResourceLoader):
             return
 
         if mesh_data:
+            if 'lod_datas' not in mesh_data:
+                mesh_data['lod_datas'] = generate_lod_datas(mesh_data.get('geometry_datas', []))
+
+            geometry_datas = list(mesh_data.get('geometry_datas', []))
+            for lod_data in mesh_data['lod_datas']:
+                geometry_datas += lod_data.get('geometry_datas', [])
+            for geometry_data in geometry_datas:
+                optimize_geometry_data(geometry_data, quantize=self.USE_VERTEX_QUANTIZATION)
+
             # create mesh
             mesh = Mesh(resoure.name, **mesh_data)
             resoure.set_data(mesh)
@@ -1564,6 +1601,12 @@ class ResourceManager(Singleton):
     def __init__(self):
         self.project_path = ""
         self.resource_loaders = []
+        self.resource_loader_map = {}
+        self.file_index = None
+        # False in the headless runs, the generated resources are not written to the resource directories.
+        self.enable_save = True
+        self.resource_watcher = ResourceWatcher()
+        self.watch_resources = {}  # {resource filepath: {Resource}}
         self.core_manager = None
         self.scene_manager = None
         self.sound_manager = None
@@ -1586,6 +1629,7 @@ class ResourceManager(Singleton):
         resource_loader = resource_loader_class(self)
         if not self.core_manager.is_basic_mode or resource_loader.enable_basic_mode:
             self.resource_loaders.append(resource_loader)
+            self.resource_loader_map[resource_loader.resource_type_name] = resource_loader
         return resource_loader
 
     def initialize(self, core_manager, project_path=""):
@@ -1620,18 +1664,65 @@ class ResourceManager(Singleton):
         # start loading thread
         # self.loading_thread.start()
 
+        # scan the resource files once for all loaders
+        root_paths = [self.engine_path, ]
+        if self.project_path != self.engine_path:
+            root_paths.append(self.project_path)
+        self.file_index = ResourceFileIndex(root_paths, os.path.join(self.project_path, ".resource_index"))
+        self.file_index.load()
+        self.file_index.scan()
+
         # initialize
         for resource_loader in self.resource_loaders:
             if not self.core_manager.is_basic_mode or resource_loader.enable_basic_mode:
                 resource_loader.initialize()
 
+        self.file_index.save()
+
+        self.resource_watcher.start()
+
         logger.info("Resource register done.")
 
+    def watch_resource(self, resource):
+        filepath = os.path.normpath(resource.meta_data.resource_filepath)
+        if filepath not in self.watch_resources:
+            self.watch_resources[filepath] = set()
+        self.watch_resources[filepath].add(resource)
+        self.resource_watcher.watch_file(filepath)
+
+    def unwatch_resource(self, resource):
+        for filepath, resources in list(self.watch_resources.items()):
+            if resource in resources:
+                resources.discard(resource)
+                if not resources:
+                    self.watch_resources.pop(filepath)
+                    self.resource_watcher.unwatch_file(filepath)
+
+    def reload_resource(self, resource):
+        meta_data = resource.meta_data
+        if not os.path.exists(meta_data.resource_filepath) or not meta_data.is_resource_file_changed():
+            return
+        logger.info("Reload %s : %s" % (resource.type_name, resource.name))
+        resource.dirty = True
+        self.load_resource(resource.name, resource.type_name)
+        resource.dirty = False
+        meta_data.set_resource_meta_data(meta_data.resource_filepath)
+
     def update(self):
-        pass
+        # the changed resources are reloaded by the gl jobs, in the frame budget of the job scheduler.
+        for filepath in self.resource_watcher.pop_changed_files():
+            for resource in list(self.watch_resources.get(filepath, ())):
+                meta_data = resource.meta_data
+                if resource.data is None or os.path.normpath(meta_data.resource_filepath) != filepath:
+                    continue
+                self.core_manager.job_scheduler.submit("Reload %s : %s" % (resource.type_name, resource.name),
+                                                       self.reload_resource,
+                                                       args=(resource,),
+                                                       key=("reload_resource", resource.type_name, resource.name))
         # self.loading_thread.set_data()
 
     def close(self):
+        self.resource_watcher.stop()
         for resource_loader in self.resource_loaders:
             if not self.core_manager.is_basic_mode or resource_loader.enable_basic_mode:
                 resource_loader.close()
@@ -1651,7 +1742,7 @@ class ResourceManager(Singleton):
         for resource_loader in self.resource_loaders:
             result += [(resName, resource_loader.resource_type_name) for resName in
                        resource_loader.get_resource_name_list()]
-        return
+        return result
 
     def set_resource_attribute(self, resource_name, resource_type_name, attribute_name, attribute_value,
                                parent_info, attribute_index):
@@ -1722,9 +1813,9 @@ class ResourceManager(Singleton):
             resource_loader.delete_resource(resource_name)
 
     def find_resource_loader(self, resource_type_name):
-        for resource_loader in self.resource_loaders:
-            if resource_loader.resource_type_name == resource_type_name:
-                return resource_loader
+        resource_loader = self.resource_loader_map.get(resource_type_name)
+        if resource_loader is not None:
+            return resource_loader
         logger.error("%s is a unknown resource type." % resource_type_name)
         return None
 
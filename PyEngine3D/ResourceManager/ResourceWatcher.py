@@ -0,0 +1,177 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+import traceback
+from threading import Thread, Lock
+
+from PyEngine3D.Common import logger
+
+
+# inotify flags, see <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+INOTIFY_EVENT_HEADER = struct.Struct('iIII')
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE
+
+
+def load_inotify():
+    if not hasattr(os, 'uname') or os.uname().sysname != 'Linux':
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class ResourceWatcher:
+    """
+    Watches the resource files on a background thread and collects the changed file paths.
+    Uses inotify on the directories of the watched files, or polls the mtime of the watched files when inotify is not available.
+    The main thread only takes the collected paths with pop_changed_files.
+    """
+    poll_interval = 0.5
+
+    def __init__(self):
+        self.lock = Lock()
+        self.thread = None
+        self.running = False
+        self.libc = None
+        self.inotify_fd = -1
+        self.watch_files = set()
+        self.watch_directories = {}  # {dirpath: watch descriptor}
+        self.watch_descriptors = {}  # {watch descriptor: dirpath}
+        self.file_modify_times = {}
+        self.changed_files = set()
+
+    def is_inotify(self):
+        return 0 <= self.inotify_fd
+
+    def start(self):
+        if self.running:
+            return
+
+        self.libc = load_inotify()
+        if self.libc is not None:
+            self.inotify_fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if self.inotify_fd < 0:
+                logger.warn("inotify_init1 failed : %s" % os.strerror(ctypes.get_errno()))
+
+        with self.lock:
+            dirpaths = set(os.path.dirname(filepath) for filepath in self.watch_files)
+            self.watch_directories.clear()
+            self.watch_descriptors.clear()
+            for dirpath in dirpaths:
+                self.add_directory_watch(dirpath)
+
+        self.running = True
+        self.thread = Thread(target=self.run_inotify if self.is_inotify() else self.run_polling, daemon=True)
+        self.thread.start()
+        logger.info("ResourceWatcher : %s, %d files." % ("inotify" if self.is_inotify() else "polling", len(self.watch_files)))
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.is_inotify():
+            os.close(self.inotify_fd)
+            self.inotify_fd = -1
+
+    def add_directory_watch(self, dirpath):
+        # call in the lock
+        if not self.is_inotify() or dirpath in self.watch_directories or not os.path.isdir(dirpath or os.curdir):
+            return
+        watch_descriptor = self.libc.inotify_add_watch(self.inotify_fd, os.fsencode(dirpath or os.curdir), WATCH_MASK)
+        if 0 <= watch_descriptor:
+            self.watch_directories[dirpath] = watch_descriptor
+            self.watch_descriptors[watch_descriptor] = dirpath
+        else:
+            logger.warn("inotify_add_watch failed : %s, %s" % (dirpath, os.strerror(ctypes.get_errno())))
+
+    def watch_file(self, filepath):
+        filepath = os.path.normpath(filepath)
+        with self.lock:
+            self.watch_files.add(filepath)
+            self.add_directory_watch(os.path.dirname(filepath))
+
+    def unwatch_file(self, filepath):
+        filepath = os.path.normpath(filepath)
+        with self.lock:
+            self.watch_files.discard(filepath)
+            self.file_modify_times.pop(filepath, None)
+
+    def pop_changed_files(self):
+        if not self.changed_files:
+            return ()
+        with self.lock:
+            changed_files = self.changed_files
+            self.changed_files = set()
+        return changed_files
+
+    def run_inotify(self):
+        while self.running:
+            try:
+                readable = select.select([self.inotify_fd], [], [], self.poll_interval)[0]
+                if not readable:
+                    continue
+                buffer = os.read(self.inotify_fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                logger.error(traceback.format_exc())
+                break
+
+            offset = 0
+            with self.lock:
+                while offset < len(buffer):
+                    watch_descriptor, mask, cookie, name_length = INOTIFY_EVENT_HEADER.unpack_from(buffer, offset)
+                    offset += INOTIFY_EVENT_HEADER.size
+                    name = buffer[offset:offset + name_length].rstrip(b'\0')
+                    offset += name_length
+
+                    if mask & IN_Q_OVERFLOW:
+                        # events are lost, so every file is regarded as changed.
+                        self.changed_files.update(self.watch_files)
+                        continue
+
+                    dirpath = self.watch_descriptors.get(watch_descriptor)
+                    if dirpath is not None and name:
+                        filepath = os.path.join(dirpath, os.fsdecode(name))
+                        if filepath in self.watch_files:
+                            self.changed_files.add(filepath)
+
+    def run_polling(self):
+        while self.running:
+            with self.lock:
+                watch_files = list(self.watch_files)
+
+            for filepath in watch_files:
+                if not self.running:
+                    break
+                try:
+                    modify_time = os.stat(filepath).st_mtime
+                except OSError:
+                    modify_time = None
+
+                with self.lock:
+                    if filepath not in self.watch_files:
+                        continue
+                    if filepath not in self.file_modify_times:
+                        self.file_modify_times[filepath] = modify_time
+                    elif self.file_modify_times[filepath] != modify_time:
+                        self.file_modify_times[filepath] = modify_time
+                        self.changed_files.add(filepath)
+
+            time.sleep(self.poll_interval)
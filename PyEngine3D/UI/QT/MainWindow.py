@@ -87,7 +87,7 @@ class MessageThread(QtCore.QThread):
             self.lastTime = time.time()
 
             # Process recieved queues
-            if not self.cmdQueue.empty():
+            while self.running and not self.cmdQueue.empty():
                 # receive value must be tuple type
                 cmd, value = self.cmdQueue.get()
                 cmdName = get_command_name(cmd)
@@ -109,6 +109,8 @@ class MainWindow(QtGui.QMainWindow, Singleton):
         self.selected_item = None
         self.selected_item_categoty = ''
         self.isFillAttributeTree = False
+        self.resource_list_version = 0
+        self.resource_items = {}  # {(resource_name, resource_type_name): QTreeWidgetItem}
 
         # MessageThread
         self.message_thread = MessageThread(self.cmdQueue)
@@ -166,13 +168,13 @@ class MainWindow(QtGui.QMainWindow, Singleton):
         self.resourceListWidget.itemDoubleClicked.connect(self.load_resource)
         self.resourceListWidget.itemClicked.connect(self.select_resource)
         self.connect(self.message_thread, QtCore.SIGNAL(get_command_name(COMMAND.TRANS_RESOURCE_LIST)),
-                     self.add_resource_list)
-        self.connect(self.message_thread, QtCore.SIGNAL(get_command_name(COMMAND.TRANS_RESOURCE_INFO)),
-                     self.set_resource_info)
+                     self.set_resource_list)
+        self.connect(self.message_thread, QtCore.SIGNAL(get_command_name(COMMAND.TRANS_RESOURCE_LIST_DIFF)),
+                     self.apply_resource_list_diff)
         self.connect(self.message_thread, QtCore.SIGNAL(get_command_name(COMMAND.TRANS_RESOURCE_ATTRIBUTE)),
                      self.fill_resource_attribute)
-        self.connect(self.message_thread, QtCore.SIGNAL(get_command_name(COMMAND.DELETE_RESOURCE_INFO)),
-                     self.delete_resource_info)
+        self.connect(self.message_thread, QtCore.SIGNAL(get_command_name(COMMAND.TRANS_RESOURCE_ATTRIBUTE_DIFF)),
+                     lambda attributes: self.apply_attribute_diff('Resource', attributes))
 
         btn = self.findChild(QtGui.QPushButton, "btnOpenResource")
         btn.clicked.connect(self.openResource)
@@ -247,6 +249,8 @@ class MainWindow(QtGui.QMainWindow, Singleton):
                      self.add_object_info)
         self.connect(self.message_thread, QtCore.SIGNAL(get_command_name(COMMAND.TRANS_OBJECT_ATTRIBUTE)),
                      self.fill_object_attribute)
+        self.connect(self.message_thread, QtCore.SIGNAL(get_command_name(COMMAND.TRANS_OBJECT_ATTRIBUTE_DIFF)),
+                     lambda attributes: self.apply_attribute_diff('Object', attributes))
         self.connect(self.message_thread, QtCore.SIGNAL(get_command_name(COMMAND.CLEAR_OBJECT_LIST)),
                      self.clear_object_list)
 
@@ -486,6 +490,26 @@ class MainWindow(QtGui.QMainWindow, Singleton):
         # unlock edit attribute ui
         self.isFillAttributeTree = False
 
+    def apply_attribute_diff(self, category, attributes):
+        """ replace only the changed top level attributes of the selected item. """
+        if self.selected_item_categoty != category:
+            return
+
+        self.isFillAttributeTree = True
+
+        for attribute in attributes:
+            items = self.attributeTree.findItems(attribute.name, QtCore.Qt.MatchExactly, column=0)
+            if items:
+                index = self.attributeTree.indexOfTopLevelItem(items[0])
+                self.attributeTree.takeTopLevelItem(index)
+                self.add_attribute(self.attributeTree, attribute.name, attribute.value)
+                # add_attribute appends the item, move it back.
+                item = self.attributeTree.takeTopLevelItem(self.attributeTree.topLevelItemCount() - 1)
+                self.attributeTree.insertTopLevelItem(index, item)
+                item.setExpanded(True)
+
+        self.isFillAttributeTree = False
+
     def showProperties(self):
         for item in self.attributeTree.findItems("", QtCore.Qt.MatchExactly | QtCore.Qt.MatchRecursive):
             print(item.text(0), item.text(1))
@@ -496,20 +520,35 @@ class MainWindow(QtGui.QMainWindow, Singleton):
     def get_selected_resource(self):
         return self.resourceListWidget.selectedItems()
 
-    def add_resource_list(self, resourceList):
-        for resName, resType in resourceList:
-            item = QtGui.QTreeWidgetItem(self.resourceListWidget)
-            item.setText(0, resName)
-            item.setText(1, resType)
+    def set_resource_list(self, resource_list):
+        version, resource_infos = resource_list
+        self.resourceListWidget.clear()
+        self.resource_items = {}
+
+        for resource_info in resource_infos:
+            self.set_resource_info(resource_info)
+        self.resource_list_version = version
+
+    def apply_resource_list_diff(self, diff):
+        base_version, version, changed_resource_infos, removed_resources = diff
+        if base_version != self.resource_list_version:
+            # missed a diff, get the whole list again.
+            self.appCmdQueue.put(COMMAND.REQUEST_RESOURCE_LIST)
+            return
+
+        for resource_name, resource_type_name in removed_resources:
+            self.delete_resource_info((resource_name, resource_type_name, False))
+
+        for resource_info in changed_resource_infos:
+            self.set_resource_info(resource_info)
+        self.resource_list_version = version
 
     def set_resource_info(self, resource_info):
         resource_name, resource_type, is_loaded = resource_info
-        items = self.resourceListWidget.findItems(resource_name, QtCore.Qt.MatchExactly, column=0)
-        for item in items:
-            if item.text(1) == resource_type:
-                break
-        else:
+        item = self.resource_items.get((resource_name, resource_type))
+        if item is None:
             item = QtGui.QTreeWidgetItem(self.resourceListWidget)
+            self.resource_items[(resource_name, resource_type)] = item
 
         item.is_loaded = is_loaded
         fontColor = 'black' if is_loaded else 'gray'
@@ -560,11 +599,10 @@ class MainWindow(QtGui.QMainWindow, Singleton):
 
     def delete_resource_info(self, resource_info):
         resource_name, resource_type_name, is_loaded = resource_info
-        items = self.resourceListWidget.findItems(resource_name, QtCore.Qt.MatchExactly, column=0)
-        for item in items:
-            if item.text(1) == resource_type_name:
-                index = self.resourceListWidget.indexOfTopLevelItem(item)
-                self.resourceListWidget.takeTopLevelItem(index)
+        item = self.resource_items.pop((resource_name, resource_type_name), None)
+        if item is not None:
+            index = self.resourceListWidget.indexOfTopLevelItem(item)
+            self.resourceListWidget.takeTopLevelItem(index)
 
     def test(self):
         myPopUp = InputDialogDemo(self, "Create Static Mesh")
@@ -104,7 +104,7 @@ class MessageThread(Thread):
             self.lastTime = time.time()
 
             # Process recieved queues
-            if not self.cmdQueue.empty():
+            while self.running and not self.cmdQueue.empty():
                 # receive value must be tuple type
                 cmd, value = self.cmdQueue.get()
                 cmdName = get_command_name(cmd)
@@ -132,6 +132,8 @@ class MainWindow:
         self.selected_item = None
         self.selected_item_categoty = ''
         self.isFillAttributeTree = False
+        self.resource_list_version = 0
+        self.resource_item_ids = {}  # {(resource_name, resource_type_name): item_id}
 
         # MessageThread
         self.message_thread = MessageThread(self.cmdQueue)
@@ -149,14 +151,17 @@ class MainWindow:
 
         self.message_thread.connect(get_command_name(COMMAND.CLOSE_UI), self.exit)
         self.message_thread.connect(get_command_name(COMMAND.SORT_UI_ITEMS), self.sort_items)
-        self.message_thread.connect(get_command_name(COMMAND.TRANS_RESOURCE_LIST), self.add_resource_list)
-        self.message_thread.connect(get_command_name(COMMAND.TRANS_RESOURCE_INFO), self.set_resource_info)
+        self.message_thread.connect(get_command_name(COMMAND.TRANS_RESOURCE_LIST), self.set_resource_list)
+        self.message_thread.connect(get_command_name(COMMAND.TRANS_RESOURCE_LIST_DIFF), self.apply_resource_list_diff)
         self.message_thread.connect(get_command_name(COMMAND.TRANS_RESOURCE_ATTRIBUTE), self.fill_resource_attribute)
-        self.message_thread.connect(get_command_name(COMMAND.DELETE_RESOURCE_INFO), self.delete_resource_info)
+        self.message_thread.connect(get_command_name(COMMAND.TRANS_RESOURCE_ATTRIBUTE_DIFF),
+                                    lambda attributes: self.apply_attribute_diff('Resource', attributes))
 
         self.message_thread.connect(get_command_name(COMMAND.DELETE_OBJECT_INFO), self.delete_object_info)
         self.message_thread.connect(get_command_name(COMMAND.TRANS_OBJECT_INFO), self.add_object_info)
         self.message_thread.connect(get_command_name(COMMAND.TRANS_OBJECT_ATTRIBUTE), self.fill_object_attribute)
+        self.message_thread.connect(get_command_name(COMMAND.TRANS_OBJECT_ATTRIBUTE_DIFF),
+                                    lambda attributes: self.apply_attribute_diff('Object', attributes))
         self.message_thread.connect(get_command_name(COMMAND.CLEAR_OBJECT_LIST), self.clear_object_list)
 
         width = 600
@@ -310,6 +315,8 @@ class MainWindow:
                                        command=lambda: self.sort_treeview(self.resource_treeview, 0))
         self.resource_treeview.heading("#1", text="Resource Type",
                                        command=lambda: self.sort_treeview(self.resource_treeview, 1))
+        self.resource_treeview.tag_configure(TAG_NORMAL, foreground="gray")
+        self.resource_treeview.tag_configure(TAG_LOADED, foreground="black")
 
         self.resource_treeview.bind("<<TreeviewSelect>>", self.select_resource)
         self.resource_treeview.bind("<Button-1>", lambda event: self.resource_menu.unpost())
@@ -677,8 +684,8 @@ class MainWindow:
     def get_selected_attribute(self):
         return [self.attribute_treeview.item(item_id) for item_id in self.attribute_treeview.selection()]
 
-    def add_attribute(self, parent, attribute_name, value, dataType, parent_info=None, index=0):
-        item_id = self.attribute_treeview.insert(parent, 'end', text=attribute_name, open=True)
+    def add_attribute(self, parent, attribute_name, value, dataType, parent_info=None, index=0, position='end'):
+        item_id = self.attribute_treeview.insert(parent, position, text=attribute_name, open=True)
         item_info = ItemInfo(attribute_name=attribute_name,
                              dataType=dataType,
                              parent_info=parent_info,
@@ -770,32 +777,66 @@ class MainWindow:
         # unlock edit attribute ui
         self.isFillAttributeTree = False
 
+    def apply_attribute_diff(self, category, attributes):
+        """ replace only the changed top level attributes of the selected item. """
+        if self.selected_item_categoty != category:
+            return
+
+        self.isFillAttributeTree = True
+
+        top_level_item_ids = self.attribute_treeview.get_children('')
+        top_level_names = [self.attribute_treeview.item(item_id)['text'] for item_id in top_level_item_ids]
+        for attribute in attributes:
+            if attribute.name in top_level_names:
+                position = top_level_names.index(attribute.name)
+                self.attribute_treeview.delete(top_level_item_ids[position])
+                self.add_attribute("", attribute.name, attribute.value, attribute.type, position=position)
+                top_level_item_ids = self.attribute_treeview.get_children('')
+
+        self.isFillAttributeTree = False
+
     # ------------------------- #
     # Widget - Resource List
     # ------------------------- #
     def get_selected_resource(self):
         return [self.resource_treeview.item(item_id) for item_id in self.resource_treeview.selection()]
 
-    def add_resource_list(self, resourceList):
-        for resName, resType in resourceList:
-            self.resource_treeview.insert("", 'end', text=resName, values=(resType,))
+    def set_resource_list(self, resource_list):
+        version, resource_infos = resource_list
+        for item_id in self.resource_item_ids.values():
+            self.resource_treeview.delete(item_id)
+        self.resource_item_ids = {}
+
+        for resource_info in resource_infos:
+            self.set_resource_info(resource_info)
+        self.resource_list_version = version
+
+    def apply_resource_list_diff(self, diff):
+        base_version, version, changed_resource_infos, removed_resources = diff
+        if base_version != self.resource_list_version:
+            # missed a diff, get the whole list again.
+            self.appCmdQueue.put(COMMAND.REQUEST_RESOURCE_LIST)
+            return
+
+        for resource_name, resource_type_name in removed_resources:
+            self.delete_resource_info((resource_name, resource_type_name, False))
+
+        for resource_info in changed_resource_infos:
+            self.set_resource_info(resource_info)
+        self.resource_list_version = version
 
     def set_resource_info(self, resource_info):
         resource_name, resource_type, is_loaded = resource_info
-
-        self.resource_treeview.tag_configure(TAG_NORMAL, foreground="gray")
-        self.resource_treeview.tag_configure(TAG_LOADED, foreground="black")
         tag = TAG_LOADED if is_loaded else TAG_NORMAL
 
-        for item_id in self.resource_treeview.get_children(''):
-            item = self.resource_treeview.item(item_id)
+        item_id = self.resource_item_ids.get((resource_name, resource_type))
+        if item_id is not None:
             # edit item
-            if get_name(item) == resource_name and get_value(item) == resource_type:
-                self.resource_treeview.item(item_id, text=resource_name, values=(resource_type,), tags=(tag, ))
-                break
+            self.resource_treeview.item(item_id, text=resource_name, values=(resource_type,), tags=(tag, ))
         else:
             # insert item
-            self.resource_treeview.insert("", 'end', text=resource_name, values=(resource_type,), tags=(tag, ))
+            item_id = self.resource_treeview.insert("", 'end', text=resource_name, values=(resource_type,), tags=(tag, ))
+            self.resource_item_ids[(resource_name, resource_type)] = item_id
 
     def select_resource(self, event):
         items = self.get_selected_resource()
@@ -845,10 +886,9 @@ class MainWindow:
 
     def delete_resource_info(self, resource_info):
         resource_name, resource_type_name, is_loaded = resource_info
-        for item_id in self.resource_treeview.get_children():
-            item = self.resource_treeview.item(item_id)
-            if get_name(item) == resource_name and get_value(item) == resource_type_name:
-                self.resource_treeview.delete(item_id)
+        item_id = self.resource_item_ids.pop((resource_name, resource_type_name), None)
+        if item_id is not None:
+            self.resource_treeview.delete(item_id)
 
     # ------------------------- #
     # Widget - Object List
@@ -94,3 +94,8 @@ def getCubicBezierCurvePoint(p0, c0, c1, p1, t):
     t2 = t * t
     inv_t = 1.0 - t
     return (inv_t * inv_t * inv_t * p0) + (3.0 * t * inv_t * inv_t * c0) + (3.0 * inv_t * t2 * c1) + t2 * t * p1
+
+
+def getCubicBezierCurveTangent(p0, c0, c1, p1, t):
+    inv_t = 1.0 - t
+    return (3.0 * inv_t * inv_t * (c0 - p0)) + (6.0 * inv_t * t * (c1 - c0)) + (3.0 * t * t * (p1 - c1))
@@ -1,47 +1,95 @@
+import weakref
+
 import numpy as np
 
 from .Transform import *
+from .TransformStore import TransformStore, TRANSFORM_DIRTY, TRANSFORM_FORCE_UPDATE
 
 
 class TransformObject:
-    def __init__(self, local=None):
-        self.local = local if local is not None else Matrix4()
-
-        self.updated = True
-
-        self.left = WORLD_LEFT.copy()
-        self.up = WORLD_UP.copy()
-        self.front = WORLD_FRONT.copy()
-
-        self.pos = Float3()
-        self.rot = Float3()
-        self.euler_to_quat = QUATERNION_IDENTITY.copy()
-        self.quat = QUATERNION_IDENTITY.copy()
-        self.final_rotation = QUATERNION_IDENTITY.copy()
-        self.scale = Float3(1, 1, 1)
-
-        self.prev_pos = Float3()
-        self.prev_Rot = Float3()
-        self.prev_quat = QUATERNION_IDENTITY.copy()
-        self.prev_final_rotation = QUATERNION_IDENTITY.copy()
-        self.prev_Scale = Float3(1, 1, 1)
-
-        self.prev_pos_store = Float3()
-
-        self.quaternionMatrix = Matrix4()
-        self.eulerMatrix = Matrix4()
-        self.rotationMatrix = Matrix4()
-
-        self.matrix = Matrix4()
-        self.inverse_matrix = Matrix4()
-
-        self.prev_matrix = Matrix4()
-        self.prev_inverse_matrix = Matrix4()
-
-        self.update_transform(True)
+    """
+    A view of a slot of the TransformStore. pos, rot, quat, scale and the matrices are views of the store arrays,
+    so the setters write into the store and mark the slot dirty, and the matrices are rebuilt by the batched update.
+    Write the values through the methods, a direct write to the arrays is not detected.
+
+    With a parent, pos, rot and scale are relative to the parent, or to the bone of the parent actor,
+    and matrix and inverse_matrix are the cached world matrices.
+    """
+    def __init__(self, local=None, store=None):
+        self.store = store if store is not None else TransformStore.instance()
+        self.page, self.slot = self.store.allocate(local)
+        weakref.finalize(self, self.store.release, self.page, self.slot)
+
+        page = self.page
+        slot = self.slot
+        self.local = page.local[slot]
+
+        self.left = page.left[slot]
+        self.up = page.up[slot]
+        self.front = page.front[slot]
+
+        self.pos = page.pos[slot]
+        self.rot = page.rot[slot]
+        self.quat = page.quat[slot]
+        self.final_rotation = page.final_rotation[slot]
+        self.scale = page.scale[slot]
+
+        self.prev_pos = page.prev_pos[slot]
+        self.prev_Rot = page.prev_rot[slot]
+        self.prev_quat = page.prev_quat[slot]
+        self.prev_Scale = page.prev_scale[slot]
+
+        self.prev_pos_store = page.prev_pos_store[slot]
+
+        self.rotationMatrix = page.rotation_matrix[slot]
+
+        self.matrix = page.matrix[slot]
+        self.inverse_matrix = page.inverse_matrix[slot]
+
+        self.prev_matrix = page.prev_matrix[slot]
+        self.prev_inverse_matrix = page.prev_inverse_matrix[slot]
+
+        self.parent = None
+
+    def set_dirty(self):
+        self.page.dirty[self.slot] |= TRANSFORM_DIRTY
+
+    @property
+    def updated(self):
+        return bool(self.page.updated[self.slot])
+
+    # Hierarchy
+    def get_parent(self):
+        return self.parent
+
+    def set_parent(self, parent):
+        if parent is None:
+            self.store.set_parent(self.page, self.slot)
+        elif not self.store.set_parent(self.page, self.slot, parent.page, parent.slot):
+            return False
+        self.parent = parent
+        return True
+
+    def detach(self):
+        self.set_parent(None)
+
+    def attach_to_bone(self, actor, bone_name, skeleton_index=0):
+        """ follows the animated bone of the skeleton actor, the relative transform is in the space of the bone. """
+        skeleton = actor.model.mesh.skeletons[skeleton_index]
+        if bone_name not in skeleton.bone_names:
+            return False
+        bone_index = skeleton.bone_names.index(bone_name)
+        bind_matrix = np.linalg.inv(skeleton.bones[bone_index].inv_bind_matrix)
+        if not self.set_parent(actor.transform):
+            return False
+        self.store.attach_to_bone(self.page, self.slot, actor, skeleton_index, bone_index, bind_matrix)
+        return True
+
+    def get_world_pos(self):
+        return self.matrix[3, :3]
 
     def reset_transform(self):
-        self.updated = True
+        self.page.updated[self.slot] = True
         self.set_pos(Float3())
         self.set_rotation(Float3())
         self.set_quaternion(QUATERNION_IDENTITY)
@@ -75,39 +123,51 @@ class TransformObject:
 
     def set_pos(self, pos):
         self.pos[...] = pos
+        self.set_dirty()
 
     def set_prev_pos(self, prev_pos):
         self.prev_pos[...] = prev_pos
+        self.set_dirty()
 
     def set_pos_x(self, x):
         self.pos[0] = x
+        self.set_dirty()
 
     def set_pos_y(self, y):
         self.pos[1] = y
+        self.set_dirty()
 
     def set_pos_z(self, z):
         self.pos[2] = z
+        self.set_dirty()
 
     def move(self, pos):
         self.pos[...] = self.pos + pos
+        self.set_dirty()
 
     def move_front(self, pos):
         self.pos[...] = self.pos + self.front * pos
+        self.set_dirty()
 
     def move_left(self, pos):
         self.pos[...] = self.pos + self.left * pos
+        self.set_dirty()
 
     def move_up(self, pos):
         self.pos[...] = self.pos + self.up * pos
+        self.set_dirty()
 
     def move_x(self, pos_x):
         self.pos[0] += pos_x
+        self.set_dirty()
 
     def move_y(self, pos_y):
         self.pos[1] += pos_y
+        self.set_dirty()
 
     def move_z(self, pos_z):
         self.pos[2] += pos_z
+        self.set_dirty()
 
     # Rotation
     def get_rotation(self):
@@ -124,21 +184,25 @@ class TransformObject:
 
     def set_rotation(self, rot):
         self.rot[...] = rot
+        self.set_dirty()
 
     def set_pitch(self, pitch):
         if pitch > TWO_PI or pitch < 0.0:
             pitch %= TWO_PI
         self.rot[0] = pitch
+        self.set_dirty()
 
     def set_yaw(self, yaw):
         if yaw > TWO_PI or yaw < 0.0:
             yaw %= TWO_PI
         self.rot[1] = yaw
+        self.set_dirty()
 
     def set_roll(self, roll):
         if roll > TWO_PI or roll < 0.0:
             roll %= TWO_PI
         self.rot[2] = roll
+        self.set_dirty()
 
     def rotation(self, rot):
         self.rotation_pitch(rot[0])
@@ -149,16 +213,19 @@ class TransformObject:
         self.rot[0] += delta
         if self.rot[0] > TWO_PI or self.rot[0] < 0.0:
             self.rot[0] %= TWO_PI
+        self.set_dirty()
 
     def rotation_yaw(self, delta=0.0):
         self.rot[1] += delta
         if self.rot[1] > TWO_PI or self.rot[1] < 0.0:
             self.rot[1] %= TWO_PI
+        self.set_dirty()
 
     def rotation_roll(self, delta=0.0):
         self.rot[2] += delta
         if self.rot[2] > TWO_PI or self.rot[2] < 0.0:
             self.rot[2] %= TWO_PI
+        self.set_dirty()
 
     # Quaternion
     def get_final_rotation(self):
@@ -172,18 +239,22 @@ class TransformObject:
 
     def set_quaternion(self, quat):
         self.quat[...] = quat
+        self.set_dirty()
 
     def axis_rotation(self, axis, radian):
         self.multiply_quaternion(axis_rotation(axis, radian))
 
     def multiply_quaternion(self, quat):
         self.quat[...] = muliply_quaternion(quat, self.quat)
+        self.set_dirty()
 
     def normalize_quaternion(self):
         self.quat[...] = normalize(self.quat)
+        self.set_dirty()
 
     def euler_to_quaternion(self):
         euler_to_quaternion(*self.rot, self.quat)
+        self.set_dirty()
 
     # Scale
     def get_scale(self):
@@ -200,15 +271,19 @@ class TransformObject:
 
     def set_scale(self, scale):
         self.scale[...] = scale
+        self.set_dirty()
 
     def set_scale_x(self, x):
         self.scale[0] = x
+        self.set_dirty()
 
     def set_scale_y(self, y):
         self.scale[1] = y
+        self.set_dirty()
 
     def set_scale_z(self, z):
         self.scale[2] = z
+        self.set_dirty()
 
     def scale_xyz(self, scale):
         self.scale_x(scale[0])
@@ -217,67 +292,41 @@ class TransformObject:
 
     def scale_x(self, x):
         self.scale[0] += x
+        self.set_dirty()
 
     def scale_y(self, y):
         self.scale[1] += y
+        self.set_dirty()
 
     def scale_z(self, z):
         self.scale[2] += z
+        self.set_dirty()
 
     def scaling(self, scale):
         self.scale[...] = self.scale + scale
+        self.set_dirty()
 
     def matrix_to_vectors(self):
         matrix_to_vectors(self.rotationMatrix, self.left, self.up, self.front, do_normalize=True)
 
     # update Transform
     def update_transform(self, update_inverse_matrix=False, force_update=False):
-        prev_updated = self.updated
-        self.updated = False
-        rotation_update = False
-
-        if any(self.prev_pos != self.pos) or force_update:
-            self.prev_pos_store[...] = self.prev_pos
-            self.prev_pos[...] = self.pos
-            self.updated = True
-
-        # Quaternion Rotation
-        if any(self.prev_quat != self.quat) or force_update:
-            self.prev_quat[...] = self.quat
-            self.updated = True
-            rotation_update = True
-            quaternion_to_matrix(self.quat, self.quaternionMatrix)
-
-        # Euler Roation
-        if any(self.prev_Rot != self.rot) or force_update:
-            self.prev_Rot[...] = self.rot
-            self.updated = True
-            rotation_update = True
-            matrix_rotation(self.eulerMatrix, *self.rot)
-
-        if rotation_update:
-            self.rotationMatrix[...] = np.dot(self.eulerMatrix, self.quaternionMatrix)
-            self.matrix_to_vectors()
-
-        if any(self.prev_Scale != self.scale) or force_update:
-            self.prev_Scale[...] = self.scale
-            self.updated = True
-
-        if prev_updated or self.updated:
-            self.prev_matrix[...] = self.matrix
-            if update_inverse_matrix:
-                self.prev_inverse_matrix[...] = self.inverse_matrix
-
-        if self.updated:
-            self.matrix[...] = self.local
-            transform_matrix(self.matrix, self.pos, self.rotationMatrix, self.scale)
-
-            if update_inverse_matrix:
-                # self.inverse_matrix[...] = np.linalg.inv(self.matrix)
-                self.inverse_matrix[...] = self.local
-                inverse_transform_matrix(self.inverse_matrix, self.pos, self.rotationMatrix, self.scale)
-
-        return self.updated
+        """
+        Rebuilds the matrices of this transform now if it is dirty. The inverse matrix is always kept.
+        :return: True if the transform changed since the last call, also by TransformStore.update_transforms.
+        """
+        page = self.page
+        slot = self.slot
+        if force_update:
+            page.dirty[slot] |= TRANSFORM_FORCE_UPDATE
+        if page.dirty[slot]:
+            if page.update(np.array([slot, ]))[0]:
+                page.pending[slot] = True
+                if self.parent is not None or (page.offset + slot) in self.store.children:
+                    self.store.update_subtree(page, slot)
+        updated = page.pending[slot]
+        page.pending[slot] = False
+        return bool(updated)
 
     def get_transform_infos(self):
         text = "\tPosition : " + " ".join(["%2.2f" % i for i in self.pos])
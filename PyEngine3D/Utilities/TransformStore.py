@@ -0,0 +1,406 @@
+from threading import Lock
+import weakref
+
+import numpy as np
+
+from .Singleton import Singleton
+from .Transform import *
+
+
+TRANSFORM_DIRTY = 1
+TRANSFORM_FORCE_UPDATE = 2
+
+
+def euler_to_matrices(rotations):
+    """ vectorized matrix_rotation, the 3x3 rotations of the (pitch, yaw, roll) array """
+    cb, ch, ca = np.cos(rotations).T
+    sb, sh, sa = np.sin(rotations).T
+    matrices = np.empty((len(rotations), 3, 3), dtype=np.float64)
+    matrices[:, 0, 0] = ch * ca
+    matrices[:, 1, 0] = sh * sb - ch * sa * cb
+    matrices[:, 2, 0] = ch * sa * sb + sh * cb
+    matrices[:, 0, 1] = sa
+    matrices[:, 1, 1] = ca * cb
+    matrices[:, 2, 1] = -ca * sb
+    matrices[:, 0, 2] = -sh * ca
+    matrices[:, 1, 2] = sh * sa * cb + ch * sb
+    matrices[:, 2, 2] = -sh * sa * sb + ch * cb
+    return matrices
+
+
+def quaternions_to_matrices(quaternions):
+    """ vectorized quaternion_to_matrix, the 3x3 rotations of the (w, x, y, z) array """
+    qw, qx, qy, qz = quaternions.astype(np.float64).T
+    qxqx = qx * qx * 2.0
+    qxqy = qx * qy * 2.0
+    qxqz = qx * qz * 2.0
+    qxqw = qx * qw * 2.0
+    qyqy = qy * qy * 2.0
+    qyqz = qy * qz * 2.0
+    qyqw = qy * qw * 2.0
+    qzqw = qz * qw * 2.0
+    qzqz = qz * qz * 2.0
+    matrices = np.empty((len(quaternions), 3, 3), dtype=np.float64)
+    matrices[:, 0] = np.stack([1.0 - qyqy - qzqz, qxqy + qzqw, qxqz - qyqw], axis=1)
+    matrices[:, 1] = np.stack([qxqy - qzqw, 1.0 - qxqx - qzqz, qyqz + qxqw], axis=1)
+    matrices[:, 2] = np.stack([qxqz + qyqw, qyqz - qxqw, 1.0 - qxqx - qyqy], axis=1)
+    return matrices
+
+
+class TransformPage:
+    """ contiguous arrays of a fixed number of transforms. the arrays are never reallocated, so the views stay valid. """
+    def __init__(self, index, size):
+        self.index = index
+        self.offset = index * size
+        self.size = size
+        self.pos = np.zeros((size, 3), dtype=np.float32)
+        self.rot = np.zeros((size, 3), dtype=np.float32)
+        self.quat = np.tile(QUATERNION_IDENTITY, (size, 1))
+        self.final_rotation = np.tile(QUATERNION_IDENTITY, (size, 1))
+        self.scale = np.ones((size, 3), dtype=np.float32)
+
+        self.prev_pos = np.zeros((size, 3), dtype=np.float32)
+        self.prev_rot = np.zeros((size, 3), dtype=np.float32)
+        self.prev_quat = np.tile(QUATERNION_IDENTITY, (size, 1))
+        self.prev_scale = np.ones((size, 3), dtype=np.float32)
+        self.prev_pos_store = np.zeros((size, 3), dtype=np.float32)
+
+        self.left = np.tile(WORLD_LEFT, (size, 1))
+        self.up = np.tile(WORLD_UP, (size, 1))
+        self.front = np.tile(WORLD_FRONT, (size, 1))
+
+        self.local = np.tile(MATRIX4_IDENTITY, (size, 1, 1))
+        self.rotation_matrix = np.tile(MATRIX4_IDENTITY, (size, 1, 1))
+        self.matrix = np.tile(MATRIX4_IDENTITY, (size, 1, 1))
+        self.inverse_matrix = np.tile(MATRIX4_IDENTITY, (size, 1, 1))
+        self.prev_matrix = np.tile(MATRIX4_IDENTITY, (size, 1, 1))
+        self.prev_inverse_matrix = np.tile(MATRIX4_IDENTITY, (size, 1, 1))
+
+        # matrix of the pos, rot and scale. it is the world matrix of the roots,
+        # and the world matrix of a child is relative_matrix * socket_matrix * world matrix of the parent.
+        self.relative_matrix = np.tile(MATRIX4_IDENTITY, (size, 1, 1))
+        self.relative_inverse_matrix = np.tile(MATRIX4_IDENTITY, (size, 1, 1))
+        self.socket_matrix = np.tile(MATRIX4_IDENTITY, (size, 1, 1))
+        self.socket_inverse_matrix = np.tile(MATRIX4_IDENTITY, (size, 1, 1))
+        self.has_parent = np.zeros(size, dtype=np.bool_)
+
+        self.dirty = np.zeros(size, dtype=np.uint8)
+        # changed at the last update, the prev matrices follow at the next update.
+        self.updated = np.zeros(size, dtype=np.bool_)
+        # changed by a batched update and not returned by TransformObject.update_transform yet.
+        self.pending = np.zeros(size, dtype=np.bool_)
+        self.free_slots = list(range(size - 1, -1, -1))
+
+    def reset_slot(self, slot, local):
+        for values, default in ((self.pos, FLOAT3_ZERO), (self.rot, FLOAT3_ZERO), (self.quat, QUATERNION_IDENTITY),
+                                (self.final_rotation, QUATERNION_IDENTITY), (self.scale, 1.0),
+                                (self.prev_pos, FLOAT3_ZERO), (self.prev_rot, FLOAT3_ZERO), (self.prev_quat, QUATERNION_IDENTITY),
+                                (self.prev_scale, 1.0), (self.prev_pos_store, FLOAT3_ZERO),
+                                (self.left, WORLD_LEFT), (self.up, WORLD_UP), (self.front, WORLD_FRONT),
+                                (self.rotation_matrix, MATRIX4_IDENTITY), (self.matrix, MATRIX4_IDENTITY),
+                                (self.inverse_matrix, MATRIX4_IDENTITY), (self.prev_matrix, MATRIX4_IDENTITY),
+                                (self.prev_inverse_matrix, MATRIX4_IDENTITY), (self.relative_matrix, MATRIX4_IDENTITY),
+                                (self.relative_inverse_matrix, MATRIX4_IDENTITY), (self.socket_matrix, MATRIX4_IDENTITY),
+                                (self.socket_inverse_matrix, MATRIX4_IDENTITY)):
+            values[slot] = default
+        self.local[slot] = local if local is not None else MATRIX4_IDENTITY
+        self.has_parent[slot] = False
+        self.dirty[slot] = 0
+        self.updated[slot] = False
+        self.pending[slot] = False
+
+    def update(self, slots, catch_up=True):
+        """
+        Rebuilds the matrices of the changed slots at once.
+        :param slots: candidate slot indices, only the dirty ones are compared with the previous values.
+        :param catch_up: the slots changed at their last update copy the matrices to the prev matrices too.
+        :return: updated flags of the slots
+        """
+        dirty = self.dirty[slots]
+        candidates = dirty != 0
+        force = (dirty & TRANSFORM_FORCE_UPDATE) != 0
+
+        pos_changed = candidates & (force | np.any(self.prev_pos[slots] != self.pos[slots], axis=1))
+        rot_changed = candidates & (force | np.any(self.prev_rot[slots] != self.rot[slots], axis=1))
+        quat_changed = candidates & (force | np.any(self.prev_quat[slots] != self.quat[slots], axis=1))
+        scale_changed = candidates & (force | np.any(self.prev_scale[slots] != self.scale[slots], axis=1))
+        rotation_changed = rot_changed | quat_changed
+        updated = pos_changed | rotation_changed | scale_changed
+
+        changed_slots = slots[pos_changed]
+        self.prev_pos_store[changed_slots] = self.prev_pos[changed_slots]
+        self.prev_pos[changed_slots] = self.pos[changed_slots]
+        changed_slots = slots[rot_changed]
+        self.prev_rot[changed_slots] = self.rot[changed_slots]
+        changed_slots = slots[quat_changed]
+        self.prev_quat[changed_slots] = self.quat[changed_slots]
+        changed_slots = slots[scale_changed]
+        self.prev_scale[changed_slots] = self.scale[changed_slots]
+
+        changed_slots = slots[rotation_changed]
+        if 0 < len(changed_slots):
+            rotation = np.matmul(euler_to_matrices(self.rot[changed_slots]), quaternions_to_matrices(self.quat[changed_slots]))
+            rotation /= np.linalg.norm(rotation, axis=2, keepdims=True)
+            self.rotation_matrix[changed_slots, :3, :3] = rotation
+            self.left[changed_slots] = rotation[:, 0]
+            self.up[changed_slots] = rotation[:, 1]
+            self.front[changed_slots] = rotation[:, 2]
+
+        prev_slots = slots[(self.updated[slots] if catch_up else False) | updated]
+        self.prev_matrix[prev_slots] = self.matrix[prev_slots]
+        self.prev_inverse_matrix[prev_slots] = self.inverse_matrix[prev_slots]
+
+        changed_slots = slots[updated]
+        if 0 < len(changed_slots):
+            pos = self.pos[changed_slots]
+            scale = self.scale[changed_slots]
+            rotation = self.rotation_matrix[changed_slots]
+
+            matrix = self.local[changed_slots].copy()
+            matrix[:, :3] *= scale[:, :, np.newaxis]
+            matrix = np.matmul(matrix, rotation)
+            matrix[:, 3, :3] += pos
+            self.matrix[changed_slots] = matrix
+
+            inverse_matrix = self.local[changed_slots].copy()
+            inverse_matrix[:, 3, :3] -= pos
+            inverse_matrix = np.matmul(inverse_matrix, np.transpose(rotation, (0, 2, 1)))
+            has_scale = np.all(scale != 0.0, axis=1)
+            inverse_matrix[has_scale, :3] *= (1.0 / scale[has_scale])[:, :, np.newaxis]
+
+            self.relative_matrix[changed_slots] = matrix
+            self.relative_inverse_matrix[changed_slots] = inverse_matrix
+            # the children get the world matrices in TransformStore.update_hierarchy
+            roots = ~self.has_parent[changed_slots]
+            self.matrix[changed_slots[roots]] = matrix[roots]
+            self.inverse_matrix[changed_slots[roots]] = inverse_matrix[roots]
+
+        self.dirty[slots] = 0
+        self.updated[slots] = updated
+        return updated
+
+
+class TransformStore(Singleton):
+    """
+    Keeps the transforms of every TransformObject in contiguous arrays, split in pages.
+    The setters of TransformObject write into the arrays and set the dirty mask,
+    and update_transforms rebuilds the matrices of all dirty transforms in one vectorized pass per page.
+
+    A transform can have a parent transform, optionally through a bone socket of a skeleton actor.
+    The world matrices of the children are cached, and only the subtrees under the changed transforms are rebuilt,
+    level by level in the order of the depth, so every level is one vectorized pass.
+    """
+    page_size = 1024
+
+    def __init__(self):
+        self.lock = Lock()
+        self.pages = []
+        # hierarchy by the global index, page.offset + slot
+        self.parents = np.zeros(0, dtype=np.int32)
+        self.depths = np.zeros(0, dtype=np.int32)
+        self.children = {}  # {parent index: set of child indices}
+        self.bone_attachments = {}  # {child index: (weakref of actor, skeleton index, bone index, bind matrix)}
+        self.levels = None  # child indices of each depth
+
+    def allocate(self, local=None):
+        with self.lock:
+            for page in self.pages:
+                if page.free_slots:
+                    break
+            else:
+                page = TransformPage(len(self.pages), self.page_size)
+                self.pages.append(page)
+                self.parents = np.concatenate([self.parents, np.full(self.page_size, -1, dtype=np.int32)])
+                self.depths = np.concatenate([self.depths, np.zeros(self.page_size, dtype=np.int32)])
+            slot = page.free_slots.pop()
+            page.reset_slot(slot, local)
+        return page, slot
+
+    def release(self, page, slot):
+        index = page.offset + slot
+        with self.lock:
+            if index in self.children or 0 <= self.parents[index]:
+                for child in list(self.children.get(index, ())):
+                    self.set_parent_index(child, -1)
+                self.set_parent_index(index, -1)
+            page.dirty[slot] = 0
+            page.updated[slot] = False
+            page.pending[slot] = False
+            page.free_slots.append(slot)
+
+    def get_transform_count(self):
+        return sum(page.size - len(page.free_slots) for page in self.pages)
+
+    def get_page(self, index):
+        return self.pages[index // self.page_size], index % self.page_size
+
+    def gather(self, name, indices):
+        pages = indices // self.page_size
+        slots = indices % self.page_size
+        first = getattr(self.pages[0], name)
+        values = np.empty((len(indices),) + first.shape[1:], dtype=first.dtype)
+        for page_index in np.unique(pages):
+            mask = pages == page_index
+            values[mask] = getattr(self.pages[page_index], name)[slots[mask]]
+        return values
+
+    def scatter(self, name, indices, values):
+        pages = indices // self.page_size
+        slots = indices % self.page_size
+        for page_index in np.unique(pages):
+            mask = pages == page_index
+            getattr(self.pages[page_index], name)[slots[mask]] = values[mask]
+
+    def has_hierarchy(self):
+        return 0 < len(self.children)
+
+    def get_parent_index(self, page, slot):
+        return int(self.parents[page.offset + slot])
+
+    def set_parent(self, page, slot, parent_page=None, parent_slot=None):
+        """ :return: False if the parent is in the subtree of the transform """
+        index = page.offset + slot
+        parent = -1 if parent_page is None else parent_page.offset + parent_slot
+        with self.lock:
+            node = parent
+            while 0 <= node:
+                if node == index:
+                    return False
+                node = self.parents[node]
+            self.set_parent_index(index, parent)
+        return True
+
+    def set_parent_index(self, index, parent):
+        # call in the lock
+        old_parent = self.parents[index]
+        if 0 <= old_parent:
+            children = self.children[old_parent]
+            children.discard(index)
+            if not children:
+                self.children.pop(old_parent)
+        self.bone_attachments.pop(index, None)
+
+        self.parents[index] = parent
+        if 0 <= parent:
+            self.children.setdefault(parent, set()).add(index)
+
+        # depths of the subtree
+        depth = self.depths[parent] + 1 if 0 <= parent else 0
+        nodes = [index]
+        while nodes:
+            self.depths[nodes] = depth
+            depth += 1
+            nodes = [child for node in nodes for child in self.children.get(node, ())]
+        self.levels = None
+
+        page, slot = self.get_page(index)
+        page.has_parent[slot] = 0 <= parent
+        page.socket_matrix[slot] = MATRIX4_IDENTITY
+        page.socket_inverse_matrix[slot] = MATRIX4_IDENTITY
+        page.dirty[slot] |= TRANSFORM_DIRTY | TRANSFORM_FORCE_UPDATE
+
+    def attach_to_bone(self, page, slot, actor, skeleton_index, bone_index, bind_matrix):
+        index = page.offset + slot
+        with self.lock:
+            self.bone_attachments[index] = (weakref.ref(actor), skeleton_index, bone_index, bind_matrix)
+            page.dirty[slot] |= TRANSFORM_DIRTY | TRANSFORM_FORCE_UPDATE
+
+    def get_levels(self):
+        if self.levels is None:
+            nodes = np.nonzero(0 <= self.parents)[0]
+            depths = self.depths[nodes]
+            self.levels = [nodes[depths == depth] for depth in range(1, depths.max() + 1)] if 0 < len(nodes) else []
+        return self.levels
+
+    def update_bone_sockets(self, changed):
+        groups = {}
+        for index, (actor_ref, skeleton_index, bone_index, bind_matrix) in self.bone_attachments.items():
+            actor = actor_ref()
+            if actor is None:
+                continue
+            groups.setdefault((id(actor), skeleton_index), (actor, skeleton_index, [], []))
+            groups[(id(actor), skeleton_index)][2].append(index)
+            groups[(id(actor), skeleton_index)][3].append((bone_index, bind_matrix))
+
+        for actor, skeleton_index, indices, bones in groups.values():
+            animation_buffers = getattr(actor, 'animation_buffers', None)
+            if not animation_buffers or len(animation_buffers) <= skeleton_index or animation_buffers[skeleton_index] is None:
+                continue
+            indices = np.array(indices, dtype=np.int64)
+            bone_indices = np.array([bone[0] for bone in bones], dtype=np.int64)
+            bind_matrices = np.array([bone[1] for bone in bones], dtype=np.float64)
+            # model space matrix of the bone, the skinning matrix is inv_bind_matrix * animated bone matrix.
+            sockets = np.matmul(bind_matrices, np.asarray(animation_buffers[skeleton_index])[bone_indices])
+            moved = np.any(self.gather('socket_matrix', indices) != sockets, axis=(1, 2))
+            if np.any(moved):
+                indices = indices[moved]
+                sockets = sockets[moved]
+                self.scatter('socket_matrix', indices, sockets)
+                self.scatter('socket_inverse_matrix', indices, np.linalg.inv(sockets))
+                changed[indices] = True
+
+    def update_hierarchy(self, changed, catch_up=True):
+        """
+        :param changed: bool array by the global index, the transforms whose relative matrix changed.
+        """
+        if not self.children:
+            return
+        self.update_bone_sockets(changed)
+
+        for nodes in self.get_levels():
+            parents = self.parents[nodes]
+            own_changed = changed[nodes]
+            nodes = nodes[own_changed | changed[parents]]
+            if 0 == len(nodes):
+                continue
+            parents = self.parents[nodes]
+            own_changed = changed[nodes]
+
+            # moved only by the parent, the prev matrices were not copied by TransformPage.update
+            moved_by_parent = nodes[~own_changed]
+            if 0 < len(moved_by_parent):
+                self.scatter('prev_matrix', moved_by_parent, self.gather('matrix', moved_by_parent))
+                self.scatter('prev_inverse_matrix', moved_by_parent, self.gather('inverse_matrix', moved_by_parent))
+
+            matrix = np.matmul(np.matmul(self.gather('relative_matrix', nodes), self.gather('socket_matrix', nodes)),
+                               self.gather('matrix', parents))
+            inverse_matrix = np.matmul(np.matmul(self.gather('inverse_matrix', parents),
+                                                 self.gather('socket_inverse_matrix', nodes)),
+                                       self.gather('relative_inverse_matrix', nodes))
+            self.scatter('matrix', nodes, matrix)
+            self.scatter('inverse_matrix', nodes, inverse_matrix)
+            flags = np.ones(len(nodes), dtype=np.bool_)
+            if catch_up:
+                self.scatter('updated', nodes, flags)
+            self.scatter('pending', nodes, flags)
+            changed[nodes] = True
+
+    def update_subtree(self, page, slot):
+        """ world matrices of a transform updated alone and its children """
+        changed = np.zeros(len(self.parents), dtype=np.bool_)
+        changed[page.offset + slot] = True
+        self.update_hierarchy(changed)
+
+    def update_transforms(self):
+        """ once a frame. the dirty transforms are rebuilt, and the prev matrices of the ones changed last frame follow. """
+        changed = np.zeros(len(self.parents), dtype=np.bool_)
+        for page in self.pages:
+            slots = np.nonzero((page.dirty != 0) | page.updated)[0]
+            if 0 < len(slots):
+                updated = page.update(slots)
+                page.pending[slots[updated]] = True
+                changed[page.offset + slots[updated]] = True
+        self.update_hierarchy(changed)
+        return np.count_nonzero(changed)
+
+    def update_dirty_transforms(self):
+        """ rebuilds only the transforms changed since the last update, e.g. after the particles or the bones moved. """
+        changed = np.zeros(len(self.parents), dtype=np.bool_)
+        for page in self.pages:
+            slots = np.nonzero(page.dirty)[0]
+            if 0 < len(slots):
+                updated = page.update(slots, catch_up=False)
+                page.pending[slots[updated]] = True
+                changed[page.offset + slots[updated]] = True
+        self.update_hierarchy(changed, catch_up=False)
+        return np.count_nonzero(changed)
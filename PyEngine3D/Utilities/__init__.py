@@ -7,6 +7,7 @@ from .RangeVariable import RangeVariable
 from .Singleton import Singleton
 from .StateMachine import StateMachine, StateItem
 from .Transform import *
+from .TransformStore import TransformStore
 from .TransformObject import TransformObject
 from .Spline import *
 from .Utility import GetClassName, is_gz_compressed_file, check_directory_and_mkdir, get_modify_time_of_file
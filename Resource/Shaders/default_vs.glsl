@@ -11,6 +11,10 @@ uniform mat4 bone_matrices[MAX_BONES];
 uniform mat4 prev_bone_matrices[MAX_BONES];
 #endif
 
+// x : model matrix, y : bone matrices, z : prev bone matrices in object_transforms
+uniform bool use_object_transform;
+uniform ivec3 object_transform_offsets;
+
 struct VERTEX_OUTPUT
 {
     vec3 world_position;
@@ -38,6 +42,20 @@ layout (location = 7) in mat4 vs_in_isntance_matrix;
 
 layout (location = 0) out VERTEX_OUTPUT vs_output;
 
+layout(std430, binding=7) readonly buffer object_transform_buffer { mat4 object_transforms[]; };
+
+#if 1 == SKELETAL
+mat4 get_bone_matrix(int bone_index)
+{
+    return use_object_transform ? object_transforms[object_transform_offsets.y + bone_index] : bone_matrices[bone_index];
+}
+
+mat4 get_prev_bone_matrix(int bone_index)
+{
+    return use_object_transform ? object_transforms[object_transform_offsets.z + bone_index] : prev_bone_matrices[bone_index];
+}
+#endif
+
 void main() {
     vec4 position = vec4(0.0, 0.0, 0.0, 0.0);
     vec4 prev_position = vec4(0.0, 0.0, 0.0, 0.0);
@@ -47,10 +65,12 @@ void main() {
 #if 1 == SKELETAL
     for(int i=0; i<MAX_BONES_PER_VERTEX; ++i)
     {
-        prev_position += (prev_bone_matrices[int(vs_in_bone_indicies[i])] * vec4(vs_in_position, 1.0)) * vs_in_bone_weights[i];
-        position += (bone_matrices[int(vs_in_bone_indicies[i])] * vec4(vs_in_position, 1.0)) * vs_in_bone_weights[i];
-        vertex_normal += (bone_matrices[int(vs_in_bone_indicies[i])] * vec4(vs_in_normal, 0.0)).xyz * vs_in_bone_weights[i];
-        vertex_tangent += (bone_matrices[int(vs_in_bone_indicies[i])] * vec4(vs_in_tangent, 0.0)).xyz * vs_in_bone_weights[i];
+        int bone_index = int(vs_in_bone_indicies[i]);
+        mat4 bone_matrix = get_bone_matrix(bone_index);
+        prev_position += (get_prev_bone_matrix(bone_index) * vec4(vs_in_position, 1.0)) * vs_in_bone_weights[i];
+        position += (bone_matrix * vec4(vs_in_position, 1.0)) * vs_in_bone_weights[i];
+        vertex_normal += (bone_matrix * vec4(vs_in_normal, 0.0)).xyz * vs_in_bone_weights[i];
+        vertex_tangent += (bone_matrix * vec4(vs_in_tangent, 0.0)).xyz * vs_in_bone_weights[i];
     }
     position /= position.w;
     prev_position /= prev_position.w;
@@ -64,7 +84,8 @@ void main() {
     vertex_normal = normalize(vertex_normal);
     vertex_tangent = normalize(vertex_tangent);
 
-    mat4 local_matrix = is_instancing ? model * vs_in_isntance_matrix : model;
+    mat4 model_matrix = use_object_transform ? object_transforms[object_transform_offsets.x] : model;
+    mat4 local_matrix = is_instancing ? model_matrix * vs_in_isntance_matrix : model_matrix;
 
     vs_output.world_position = (local_matrix * position).xyz;
     vs_output.vertex_normal = vertex_normal;
@@ -44,8 +44,6 @@ layout(std140, binding=3) uniform light_constants
     int SHADOW_SAMPLES;
 };
 
-const int MAX_POINT_LIGHTS = 10;
-
 struct POINT_LIGHT
 {
     vec3 color;
@@ -54,11 +52,19 @@ struct POINT_LIGHT
     float render;
 };
 
-layout(std140, binding=4) uniform point_light_constants
+layout(std140, binding=4) uniform light_cluster_constants
 {
-    POINT_LIGHT POINT_LIGHTS[MAX_POINT_LIGHTS];
+    ivec3 LIGHT_CLUSTER_COUNT;
+    int POINT_LIGHT_COUNT;
+    vec2 LIGHT_CLUSTER_DEPTH_SCALE_BIAS;
+    vec2 LIGHT_CLUSTER_DUMMY_0;
 };
 
+// see LightCluster.py
+layout(std430, binding=8) readonly buffer point_light_buffer { POINT_LIGHT POINT_LIGHTS[]; };
+layout(std430, binding=9) readonly buffer light_cluster_buffer { uvec2 LIGHT_CLUSTERS[]; };
+layout(std430, binding=10) readonly buffer light_index_buffer { uint LIGHT_INDICES[]; };
+
 
 layout(std140, binding=5) uniform particle_common
 {
@@ -218,6 +218,30 @@ vec2 env_BRDF_pproximate(float NdV, float roughness)
 }
 
 
+// (light index offset, light count) of the cluster which contains the world position.
+uvec2 get_light_cluster(vec3 world_position)
+{
+    if(0 == POINT_LIGHT_COUNT)
+    {
+        return uvec2(0, 0);
+    }
+
+    vec4 view_position = VIEW * vec4(world_position, 1.0);
+    vec4 clip_position = PROJECTION * view_position;
+    vec2 ndc = clip_position.xy / clip_position.w;
+    float depth = max(-view_position.z, 1e-5);
+
+    ivec3 cluster;
+    cluster.xy = ivec2(floor((ndc * 0.5 + 0.5) * vec2(LIGHT_CLUSTER_COUNT.xy)));
+    cluster.z = int(floor(log(depth) * LIGHT_CLUSTER_DEPTH_SCALE_BIAS.x + LIGHT_CLUSTER_DEPTH_SCALE_BIAS.y));
+
+    if(any(lessThan(cluster, ivec3(0))) || any(greaterThanEqual(cluster, LIGHT_CLUSTER_COUNT)))
+    {
+        return uvec2(0, 0);
+    }
+    return LIGHT_CLUSTERS[(cluster.z * LIGHT_CLUSTER_COUNT.y + cluster.y) * LIGHT_CLUSTER_COUNT.x + cluster.x];
+}
+
 /* PBR reference
     - http://www.curious-creature.com/pbr_sandbox/shaders/pbr.fs
     - https://gist.github.com/galek/53557375251e1a942dfa */
@@ -310,14 +334,11 @@ vec4 surface_shading(vec4 base_color,
         diffuse_light += oren_nayar(roughness, NdL, NdV, N, V, L) / PI * NdL * light_color * shadow_factor;
         specular_light += cooktorrance_specular(light_fresnel, NdL, NdV, NdH, roughness) * NdL * light_color * shadow_factor;
 
-        // Point Lights
-        for(int i=0; i<MAX_POINT_LIGHTS; ++i)
+        // Point Lights of the light cluster
+        uvec2 light_cluster = get_light_cluster(world_position);
+        for(uint n=0; n<light_cluster.y; ++n)
         {
-            if(1.0 != POINT_LIGHTS[i].render)
-            {
-                break;
-            }
-
+            uint i = LIGHT_INDICES[light_cluster.x + n];
             float point_light_radius = POINT_LIGHTS[i].radius;
             vec3 point_light_dir = POINT_LIGHTS[i].pos.xyz - world_position;
             float point_light_dist = length(point_light_dir);
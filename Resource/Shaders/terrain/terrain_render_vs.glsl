@@ -22,7 +22,7 @@ layout (location = 1) in vec4 vs_in_color;
 layout (location = 2) in vec3 vs_in_normal;
 layout (location = 3) in vec3 vs_in_tangent;
 layout (location = 4) in vec2 vs_in_tex_coord;
-// instance data
+// instance data : x, y, patch size, edge lods
 layout (location = 5) in vec4 vs_in_isntance_offset;
 
 layout (location = 0) out VERTEX_OUTPUT vs_output;
@@ -30,15 +30,24 @@ layout (location = 0) out VERTEX_OUTPUT vs_output;
 void main()
 {
     vec4 position = vec4(vs_in_position, 1.0);
-    position.xz = position.xz * 0.5 + 0.5;
-    position.xz += vs_in_isntance_offset.xy;
+    vec2 grid_position = position.xz * 0.5 + 0.5;
+    float patch_size = vs_in_isntance_offset.z;
+    float grid_size = patch_size / subdivide_level;
+    position.xz = grid_position * patch_size + vs_in_isntance_offset.xy;
+
+    // the vertices on the edge to a coarser patch are snapped to the vertices of the coarser patch, so there are no cracks.
+    int edge_lods = int(vs_in_isntance_offset.w);
+    int lod_x = (grid_position.y < 0.0001) ? ((edge_lods >> 6) & 7) : ((0.9999 < grid_position.y) ? ((edge_lods >> 9) & 7) : 0);
+    int lod_z = (grid_position.x < 0.0001) ? (edge_lods & 7) : ((0.9999 < grid_position.x) ? ((edge_lods >> 3) & 7) : 0);
+    vec2 snap_size = grid_size * exp2(vec2(lod_x, lod_z));
+    position.xz = floor(position.xz / snap_size + 0.5) * snap_size;
 
     vec2 tex_coord = position.xz / height_map_size;
     float height = texture2DLod(texture_height_map, tex_coord, 0.0).x;
     position.y += height;
 
-    vec2 tex_coord_delta = 1.0 / (height_map_size * subdivide_level);
-    vec3 size_of_grid = vec3(scale.x / subdivide_level, scale.y, scale.z / subdivide_level);
+    vec2 tex_coord_delta = grid_size / height_map_size;
+    vec3 size_of_grid = vec3(scale.x * grid_size, scale.y, scale.z * grid_size);
 
     float height_w = texture2DLod(texture_height_map, tex_coord + vec2(tex_coord_delta.x, 0.0), 0.0).x;
     float height_h = texture2DLod(texture_height_map, tex_coord + vec2(0.0, tex_coord_delta.y), 0.0).x;
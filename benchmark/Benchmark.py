@@ -0,0 +1,166 @@
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from PyEngine3D.App import CoreManager
+from PyEngine3D.App.GameBackend import GameBackNames
+from PyEngine3D.Common import logger
+from .SyntheticScene import get_scene_option, generate_mesh_files, get_material_variant_macros, build_synthetic_scene
+from .Scenarios import BenchmarkContext, SCENARIOS
+
+
+RESULT_VERSION = 1
+DEFAULT_BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def get_git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode('utf-8').strip()
+    except BaseException:
+        return ""
+
+
+def measure(scenario, context, repeat, warmup):
+    timings = []
+    metrics = None
+    for i in range(warmup + repeat):
+        if scenario.setup is not None:
+            scenario.setup(context)
+        start_time = time.perf_counter()
+        metrics = scenario.run(context)
+        elapsed_time = (time.perf_counter() - start_time) * 1000.0
+        if warmup <= i:
+            timings.append(elapsed_time)
+    return dict(
+        repeat=repeat,
+        min=min(timings),
+        max=max(timings),
+        mean=statistics.mean(timings),
+        median=statistics.median(timings),
+        stdev=statistics.stdev(timings) if 1 < len(timings) else 0.0,
+        metrics=metrics or {},
+    )
+
+
+def run_benchmark(preset='medium', scenario_names=None, repeat=5, warmup=1, frame_count=60, project_filename=""):
+    """
+    :return: results dict or None
+    """
+    scene_option = get_scene_option(preset)
+    np.random.seed(scene_option.seed)
+
+    log_level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        core_manager = CoreManager.instance()
+        if not core_manager.initialize(None, None, None, project_filename, game_backend=GameBackNames.HEADLESS):
+            return None
+
+        with tempfile.TemporaryDirectory(prefix="pyengine3d_benchmark_") as temp_dir:
+            mesh_files = generate_mesh_files(temp_dir, scene_option.mesh_grid_size)
+            scene_data = build_synthetic_scene(core_manager, scene_option, mesh_files)
+            material_macros = get_material_variant_macros(scene_option.material_variant_count)
+            context = BenchmarkContext(core_manager, scene_option, scene_data, mesh_files, material_macros, frame_count)
+
+            scenario_results = {}
+            for scenario_name in (scenario_names or SCENARIOS.keys()):
+                scenario = SCENARIOS[scenario_name]
+                scenario_results[scenario_name] = measure(scenario, context, repeat, warmup)
+                sys.stdout.write("%-20s median %10.3f ms\n" % (scenario_name, scenario_results[scenario_name]['median']))
+    finally:
+        logger.setLevel(log_level)
+
+    return dict(
+        version=RESULT_VERSION,
+        date=datetime.datetime.now().isoformat(),
+        revision=get_git_revision(),
+        environment=dict(platform=platform.platform(),
+                         python=platform.python_version(),
+                         numpy=np.__version__,
+                         processor=platform.processor()),
+        preset=preset,
+        scene_option=scene_option.get_save_data(),
+        repeat=repeat,
+        warmup=warmup,
+        frame_count=frame_count,
+        scenarios=scenario_results,
+    )
+
+
+def save_results(results, filepath):
+    with open(filepath, 'w') as f:
+        json.dump(results, f, indent=4, sort_keys=True)
+
+
+def load_results(filepath):
+    if os.path.exists(filepath):
+        with open(filepath, 'r') as f:
+            return json.load(f)
+    return None
+
+
+def compare_value(name, value, baseline_value, threshold):
+    ratio = (value / baseline_value) if baseline_value else (1.0 if value == baseline_value else float('inf'))
+    if 1.0 + threshold < ratio:
+        state = "regression"
+    elif ratio < 1.0 - threshold:
+        state = "improvement"
+    else:
+        state = "same"
+    return dict(name=name, value=value, baseline=baseline_value, ratio=ratio, state=state)
+
+
+def compare_count(name, value, baseline_value):
+    ratio = (value / baseline_value) if baseline_value else (1.0 if value == baseline_value else float('inf'))
+    state = "same" if value == baseline_value else "changed"
+    return dict(name=name, value=value, baseline=baseline_value, ratio=ratio, state=state)
+
+
+def compare_results(results, baseline, threshold=0.1):
+    """
+    compares the median time and the cost metrics of every scenario, higher is worse.
+    The workload counts are not regressions, they are reported as changed when they differ from the baseline.
+    :return: list of dict(name, value, baseline, ratio, state)
+    """
+    comparisons = []
+    if baseline.get('preset') != results.get('preset') or baseline.get('scene_option') != results.get('scene_option'):
+        logger.warning("The baseline was measured with an other scene option.")
+
+    for scenario_name, scenario_result in results['scenarios'].items():
+        baseline_result = baseline.get('scenarios', {}).get(scenario_name)
+        if baseline_result is None:
+            continue
+        comparisons.append(compare_value(scenario_name, scenario_result['median'], baseline_result['median'], threshold))
+        scenario = SCENARIOS.get(scenario_name)
+        cost_metrics = scenario.cost_metrics if scenario is not None else ()
+        baseline_metrics = baseline_result.get('metrics', {})
+        for metric_name, value in scenario_result['metrics'].items():
+            if metric_name not in baseline_metrics:
+                continue
+            name = "%s.%s" % (scenario_name, metric_name)
+            if metric_name in cost_metrics:
+                comparisons.append(compare_value(name, value, baseline_metrics[metric_name], threshold))
+            else:
+                comparisons.append(compare_count(name, value, baseline_metrics[metric_name]))
+    return comparisons
+
+
+def print_comparisons(comparisons, stream=sys.stdout):
+    stream.write("%-40s %14s %14s %8s\n" % ("name", "baseline", "current", "ratio"))
+    for comparison in comparisons:
+        stream.write("%-40s %14.3f %14.3f %7.2fx %s\n" % (comparison['name'],
+                                                         comparison['baseline'],
+                                                         comparison['value'],
+                                                         comparison['ratio'],
+                                                         "" if comparison['state'] == "same" else comparison['state']))
@@ -0,0 +1,84 @@
+"""
+Throughput of the command queue between the engine and the editor process.
+
+usage : python -m benchmark.CommandBenchmark [--output results.json]
+"""
+
+import argparse
+import json
+import sys
+import time
+from multiprocessing import Process
+
+from PyEngine3D.Common import Command, COMMAND, CustomQueue, CustomPipe
+
+
+def consumer(cmd_queue, pipe):
+    message_count = 0
+    while True:
+        cmd, value = cmd_queue.get()
+        if cmd == COMMAND.CLOSE_UI:
+            break
+        message_count += 1
+    pipe.send(COMMAND.PIPE_DONE, message_count)
+
+
+def measure_throughput(message_count, value, batch, use_shared_memory):
+    cmd_queue = CustomQueue(batch=batch)
+    pipe, consumer_pipe = CustomPipe()
+    process = Process(target=consumer, args=(cmd_queue, consumer_pipe))
+    process.start()
+
+    shared_memory_threshold = Command.SHARED_MEMORY_THRESHOLD
+    if not use_shared_memory:
+        Command.SHARED_MEMORY_THRESHOLD = sys.maxsize
+    try:
+        start_time = time.perf_counter()
+        for i in range(message_count):
+            cmd_queue.put(COMMAND.TRANS_OBJECT_INFO, value)
+        cmd_queue.put(COMMAND.CLOSE_UI)
+        cmd_queue.flush()
+        cmd, received_count = pipe.recv()
+        elapsed_time = time.perf_counter() - start_time
+    finally:
+        Command.SHARED_MEMORY_THRESHOLD = shared_memory_threshold
+        process.join()
+
+    return dict(message_count=received_count,
+                seconds=elapsed_time,
+                messages_per_second=received_count / elapsed_time)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmark.CommandBenchmark")
+    parser.add_argument('--message-count', type=int, default=20000)
+    parser.add_argument('--payload-count', type=int, default=10)
+    parser.add_argument('--payload-size', type=int, default=16 * 1024 * 1024)
+    parser.add_argument('--output', default="")
+    args = parser.parse_args(args)
+
+    small_value = ("resource_name", "Texture")
+    large_value = bytes(args.payload_size)
+
+    results = {}
+    for batch in (False, True):
+        name = "small_messages%s" % ("_batch" if batch else "")
+        results[name] = measure_throughput(args.message_count, small_value, batch, True)
+
+    for use_shared_memory in (False, True):
+        name = "large_payloads%s" % ("_shared_memory" if use_shared_memory else "")
+        result = measure_throughput(args.payload_count, large_value, False, use_shared_memory)
+        result['megabytes_per_second'] = args.payload_size * args.payload_count / result['seconds'] / (1024.0 * 1024.0)
+        results[name] = result
+
+    for name, result in results.items():
+        sys.stdout.write("%-30s %12.1f messages/s\n" % (name, result['messages_per_second']))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
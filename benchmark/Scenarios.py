@@ -0,0 +1,266 @@
+import copy
+import os
+
+import numpy as np
+from collections import OrderedDict
+
+from PyEngine3D.OpenGLContext import default_compile_option, parsing_macros, parsing_uniforms
+from PyEngine3D.Render import Mesh, SplineData, SplinePoint
+from PyEngine3D.ResourceManager import OBJ, Collada
+from PyEngine3D.ResourceManager.MeshSimplifier import generate_lod_datas
+from PyEngine3D.ResourceManager.MeshOptimizer import optimize_geometry_data
+from .SyntheticScene import MATERIAL_SHADER_NAME
+
+
+class BenchmarkContext:
+    def __init__(self, core_manager, scene_option, scene_data, mesh_files, material_macros, frame_count=60):
+        self.core_manager = core_manager
+        self.scene_option = scene_option
+        self.scene_data = scene_data
+        self.mesh_files = mesh_files
+        self.material_macros = material_macros
+        self.frame_count = frame_count
+        self.delta = 1.0 / 60.0
+        # per iteration data made by Scenario.setup
+        self.prepared_data = None
+
+
+class Scenario:
+    """
+    run(context) is timed. setup(context) is called before every run and is not timed.
+    run may return a dict of extra metrics. The cost_metrics such as draw calls are compared with the baseline, lower is better,
+    the other metrics are the workload counts such as the actor count, they are only reported when they differ.
+    """
+    def __init__(self, name, run, setup=None, description="", cost_metrics=()):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.description = description
+        self.cost_metrics = cost_metrics
+
+
+def setup_scene_open(context):
+    resource_manager = context.core_manager.resource_manager
+    scene_data = copy.deepcopy(context.scene_data)
+    # same as SceneLoader.load_resource
+    for object_data in scene_data.get('static_actors', []) + scene_data.get('skeleton_actors', []):
+        object_data['model'] = resource_manager.get_model(object_data.get('model'))
+    context.prepared_data = scene_data
+
+
+def run_scene_open(context):
+    scene_manager = context.core_manager.scene_manager
+    scene_manager.open_scene("synthetic_scene", context.prepared_data)
+    return dict(static_actors=len(scene_manager.static_actors),
+                skeleton_actors=len(scene_manager.skeleton_actors),
+                point_lights=len(scene_manager.point_lights))
+
+
+def run_import(context):
+    triangle_count = 0
+    for filepath in context.mesh_files:
+        file_ext = os.path.splitext(filepath)[1].lower()
+        if file_ext == '.obj':
+            mesh_data = OBJ(filepath, 1, True).get_mesh_data()
+        else:
+            mesh_data = Collada(filepath).get_mesh_data()
+        mesh = Mesh(os.path.split(filepath)[1], **mesh_data)
+        triangle_count += sum(len(geometry_data['indices']) // 3 for geometry_data in mesh_data['geometry_datas'])
+    return dict(triangles=triangle_count)
+
+
+def setup_mesh_simplify(context):
+    mesh_datas = []
+    for filepath in context.mesh_files:
+        if os.path.splitext(filepath)[1].lower() == '.obj':
+            mesh_datas.append(OBJ(filepath, 1, True).get_mesh_data())
+    context.prepared_data = mesh_datas
+
+
+def run_mesh_simplify(context):
+    triangle_count = 0
+    lod_triangle_counts = []
+    for mesh_data in context.prepared_data:
+        geometry_datas = mesh_data['geometry_datas']
+        triangle_count += sum(len(geometry_data['indices']) // 3 for geometry_data in geometry_datas)
+        for lod, lod_data in enumerate(generate_lod_datas(geometry_datas)):
+            if len(lod_triangle_counts) <= lod:
+                lod_triangle_counts.append(0)
+            lod_triangle_counts[lod] += sum(len(geometry_data['indices']) // 3 for geometry_data in lod_data['geometry_datas'])
+    metrics = dict(triangles=triangle_count)
+    for lod, lod_triangle_count in enumerate(lod_triangle_counts):
+        metrics['lod%d_triangles' % (lod + 1)] = lod_triangle_count
+    return metrics
+
+
+def run_mesh_optimize(context):
+    acmr = 0.0
+    optimized_acmr = 0.0
+    geometry_count = 0
+    for mesh_data in context.prepared_data:
+        for geometry_data in mesh_data['geometry_datas']:
+            result = optimize_geometry_data(geometry_data)
+            if result is not None:
+                acmr += result[0]
+                optimized_acmr += result[1]
+                geometry_count += 1
+    geometry_count = max(1, geometry_count)
+    return dict(acmr=acmr / geometry_count, optimized_acmr=optimized_acmr / geometry_count)
+
+
+def run_culling(context):
+    scene_manager = context.core_manager.scene_manager
+    scene_manager.update_lods()
+    scene_manager.update_static_render_info()
+    scene_manager.update_skeleton_render_info()
+    scene_manager.update_light_render_infos()
+    full_triangle_count = max(1, scene_manager.full_triangle_count)
+    return dict(static_render_infos=len(scene_manager.static_solid_render_infos),
+                skeleton_render_infos=len(scene_manager.skeleton_solid_render_infos),
+                point_lights=scene_manager.point_light_count,
+                static_triangles=scene_manager.render_triangle_count,
+                static_full_triangles=scene_manager.full_triangle_count,
+                lod_triangle_reduction=1.0 - scene_manager.render_triangle_count / full_triangle_count)
+
+
+def run_terrain_lod(context):
+    scene_manager = context.core_manager.scene_manager
+    terrain = scene_manager.terrain
+    terrain.update_patches(scene_manager.main_camera)
+    return dict(patches=len(terrain.instance_offset),
+                visible_patches=len(terrain.visible_instance_offset),
+                full_patches=terrain.width * terrain.height)
+
+
+def setup_spline_followers(context):
+    random_state = np.random.RandomState(0)
+    spline_points = [SplinePoint(random_state.uniform(-50.0, 50.0, 3).astype(np.float32),
+                                 random_state.uniform(-5.0, 5.0, 3).astype(np.float32)) for _ in range(32)]
+    spline_data = SplineData("benchmark_spline", spline_points=spline_points)
+    follower_count = 1000
+    distances = random_state.uniform(0.0, spline_data.length, follower_count).astype(np.float32)
+    offsets = random_state.uniform(-1.0, 1.0, (follower_count, 3)).astype(np.float32)
+    context.prepared_data = (spline_data, distances, offsets)
+
+
+def run_spline_followers(context):
+    spline_data, distances, offsets = context.prepared_data
+    for _ in range(context.frame_count):
+        distances = np.mod(distances + 10.0 * context.delta, spline_data.length)
+        positions = spline_data.position_at_distance(distances) + offsets
+        distances = spline_data.closest_point(positions, hint_distances=distances)[1]
+    # move a spline point, only the two segments of the point are sampled again
+    spline_data.spline_points[16].position += 1.0
+    spline_data.resampling()
+    return dict(followers=len(distances), arc_samples=len(spline_data.arc_distances),
+                changed_segments=spline_data.changed_segment_count)
+
+
+def setup_collision(context):
+    scene_manager = context.core_manager.scene_manager
+    # the bound boxes of the new actors are updated by the scene update, without the scene_open scenario too
+    scene_manager.update_scene(0.0)
+    random_state = np.random.RandomState(0)
+    extent = context.scene_option.scene_extent
+    query_count = 1000
+    centers = random_state.uniform(-extent, extent, (query_count, 3)).astype(np.float32)
+    directions = random_state.normal(size=(query_count, 3)).astype(np.float32)
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    context.prepared_data = (centers, directions)
+
+
+def run_collision(context):
+    collision_world = context.core_manager.scene_manager.collision_world
+    centers, directions = context.prepared_data
+    overlaps = collision_world.overlap_spheres(centers, 2.0)
+    box_overlaps = collision_world.overlap_boxes(centers - 2.0, centers + 2.0)
+    hits = collision_world.raycast(centers, directions)
+    sweeps = collision_world.sweep_spheres(centers, centers + directions * 10.0, 1.0)
+    return dict(actors=collision_world.get_actor_count(),
+                overlap_pairs=len(collision_world.get_overlap_pairs()),
+                sphere_overlaps=sum(len(actors) for actors in overlaps),
+                box_overlaps=sum(len(actors) for actors in box_overlaps),
+                ray_hits=sum(hit is not None for hit in hits),
+                sweep_hits=sum(hit is not None for hit in sweeps))
+
+
+def run_jobs(context):
+    job_scheduler = context.core_manager.job_scheduler
+    results = []
+    for i in range(64):
+        worker_job = job_scheduler.submit_worker("sort %d" % i, np.sort, args=(np.random.random(10000),))
+        job_scheduler.submit("collect %d" % i, lambda job=worker_job: results.append(job.result[-1]), dependencies=(worker_job,))
+    job_scheduler.flush()
+    stats = job_scheduler.get_stats()
+    return dict(completed=len(results),
+                failed=stats['failed'],
+                wait_ms=stats['wait_ms'],
+                run_ms=stats['run_ms'])
+
+
+def run_animation(context):
+    for skeleton_actor in context.core_manager.scene_manager.skeleton_actors:
+        skeleton_actor.update(context.delta)
+
+
+def run_particle_update(context):
+    effect_manager = context.core_manager.effect_manager
+    effect_manager.update(context.delta)
+    return dict(alive_particles=effect_manager.alive_particle_count)
+
+
+def run_shader_preprocess(context):
+    resource_manager = context.core_manager.resource_manager
+    shader_loader = resource_manager.shader_loader
+    shader = resource_manager.get_shader(MATERIAL_SHADER_NAME)
+    shader_meta_data = shader_loader.get_meta_data(MATERIAL_SHADER_NAME)
+    if shader is None or shader_meta_data is None:
+        return None
+
+    is_engine_resource = shader_loader.is_engine_resource(shader_meta_data.resource_filepath)
+    shader_version = resource_manager.get_shader_version()
+    # same as MaterialLoader.generate_new_material without compiling
+    for macros in context.material_macros:
+        shader_codes = shader.generate_shader_codes(is_engine_resource,
+                                                    shader_loader.engine_resource_path,
+                                                    shader_loader.project_resource_path,
+                                                    shader_version,
+                                                    default_compile_option,
+                                                    macros)
+        if shader_codes is not None:
+            parsing_macros(shader_codes.values())
+            parsing_uniforms(shader_codes.values())
+    return dict(material_variants=len(context.material_macros))
+
+
+def run_frame(context):
+    game_backend = context.core_manager.game_backend
+    game_backend.set_frame_count(context.frame_count)
+    game_backend.run()
+    summary = game_backend.get_frame_stats_summary()
+    return dict(frame_time=summary['frame_time']['avg'],
+                draw_calls=summary['draw_calls']['avg'],
+                gl_calls=summary['gl_calls']['avg'])
+
+
+SCENARIOS = OrderedDict((scenario.name, scenario) for scenario in [
+    Scenario("scene_open", run_scene_open, setup_scene_open, "open the synthetic scene"),
+    Scenario("import", run_import, description="parse the generated OBJ and Collada files and create meshes"),
+    Scenario("mesh_simplify", run_mesh_simplify, setup_mesh_simplify, "generate the LOD geometries of the OBJ meshes"),
+    Scenario("mesh_optimize", run_mesh_optimize, setup_mesh_simplify, "vertex cache, overdraw and vertex fetch order of the OBJ meshes",
+             cost_metrics=("optimized_acmr",)),
+    Scenario("culling", run_culling, description="LOD selection, frustum, shadow and point light culling",
+             cost_metrics=("static_triangles",)),
+    Scenario("terrain_lod", run_terrain_lod, description="select the terrain patches of the quadtree",
+             cost_metrics=("patches",)),
+    Scenario("spline_followers", run_spline_followers, setup_spline_followers, "arc length position and closest point queries of the followers",
+             cost_metrics=("changed_segments",)),
+    Scenario("collision", run_collision, setup_collision, "batched sphere overlap, raycast and sphere sweep queries"),
+    Scenario("jobs", run_jobs, description="worker jobs and the dependent main thread jobs of the job scheduler",
+             cost_metrics=("wait_ms", "run_ms")),
+    Scenario("animation", run_animation, description="update skeleton actors"),
+    Scenario("particle_update", run_particle_update, description="update effects"),
+    Scenario("shader_preprocess", run_shader_preprocess, description="preprocess the material variants"),
+    Scenario("frame", run_frame, description="full headless frames",
+             cost_metrics=("frame_time", "draw_calls", "gl_calls")),
+])
@@ -0,0 +1,194 @@
+import os
+
+import numpy as np
+
+from PyEngine3D.Render import Mesh, Model
+from PyEngine3D.ResourceManager import OBJ
+from PyEngine3D.ResourceManager.MeshSimplifier import generate_lod_datas
+
+
+class SyntheticSceneOption:
+    def __init__(self, **option):
+        self.static_actor_count = option.get('static_actor_count', 1000)
+        self.lod_actor_count = option.get('lod_actor_count', 200)
+        self.skeleton_actor_count = option.get('skeleton_actor_count', 50)
+        self.effect_count = option.get('effect_count', 20)
+        self.point_light_count = option.get('point_light_count', 256)
+        self.mesh_grid_size = option.get('mesh_grid_size', 128)
+        self.material_variant_count = option.get('material_variant_count', 16)
+        self.scene_extent = option.get('scene_extent', 200.0)
+        self.seed = option.get('seed', 0)
+
+    def get_save_data(self):
+        return dict(self.__dict__)
+
+
+SCENE_PRESETS = dict(
+    small=dict(static_actor_count=100, lod_actor_count=20, skeleton_actor_count=5, effect_count=4, point_light_count=32,
+               mesh_grid_size=32, material_variant_count=4),
+    medium=dict(),
+    large=dict(static_actor_count=10000, lod_actor_count=2000, skeleton_actor_count=200, effect_count=100, point_light_count=1024,
+               mesh_grid_size=512, material_variant_count=64),
+)
+
+STATIC_MODEL_NAMES = ['Cube', 'sphere', 'suzan']
+LOD_MODEL_NAME = 'synthetic_lod_grid'
+# the grid actors are scaled, so their screen sizes span the LOD_SCREEN_SIZES over the scene extent.
+LOD_ACTOR_SCALE = 10.0
+SKELETON_MODEL_NAME = 'skeletal'
+EFFECT_NAME = 'default_effect'
+MATERIAL_SHADER_NAME = 'default'
+
+
+def get_scene_option(preset='medium', **option):
+    scene_option = dict(SCENE_PRESETS[preset])
+    scene_option.update(option)
+    return SyntheticSceneOption(**scene_option)
+
+
+def generate_grid(grid_size):
+    """
+    :return: positions, normals, texcoords, quad indices of a (grid_size x grid_size) quads xz plane.
+    """
+    line = np.linspace(0.0, 1.0, grid_size + 1, dtype=np.float32)
+    u, v = np.meshgrid(line, line)
+    u = u.reshape(-1)
+    v = v.reshape(-1)
+    positions = np.stack([u - 0.5, np.sin(u * 6.28318) * np.cos(v * 6.28318) * 0.05, v - 0.5], axis=-1)
+    normals = np.zeros_like(positions)
+    normals[:, 1] = 1.0
+    texcoords = np.stack([u, v], axis=-1)
+
+    index = np.arange((grid_size + 1) * (grid_size + 1)).reshape(grid_size + 1, grid_size + 1)
+    quads = np.stack([index[:-1, :-1], index[1:, :-1], index[1:, 1:], index[:-1, 1:]], axis=-1).reshape(-1, 4)
+    return positions, normals, texcoords, quads
+
+
+def write_obj_grid(filepath, grid_size):
+    positions, normals, texcoords, quads = generate_grid(grid_size)
+    with open(filepath, 'w') as f:
+        f.write("o %s\n" % os.path.splitext(os.path.split(filepath)[1])[0])
+        f.writelines("v %f %f %f\n" % tuple(position) for position in positions)
+        f.writelines("vt %f %f\n" % tuple(texcoord) for texcoord in texcoords)
+        f.writelines("vn %f %f %f\n" % tuple(normal) for normal in normals)
+        # obj indices start at 1
+        f.writelines("f %d/%d/%d %d/%d/%d %d/%d/%d %d/%d/%d\n" % tuple(np.repeat(quad + 1, 3)) for quad in quads)
+
+
+def write_collada_grid(filepath, grid_size):
+    positions, normals, texcoords, quads = generate_grid(grid_size)
+    triangles = quads[:, [0, 1, 2, 0, 2, 3]].reshape(-1)
+    name = os.path.splitext(os.path.split(filepath)[1])[0]
+
+    def float_source(source_id, data, stride):
+        return ('<source id="{0}"><float_array id="{0}-array" count="{1}">{2}</float_array>'
+                '<technique_common><accessor source="#{0}-array" count="{3}" stride="{4}"/></technique_common>'
+                '</source>').format(source_id, data.size, " ".join("%f" % x for x in data.reshape(-1)),
+                                    len(data), stride)
+
+    with open(filepath, 'w') as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        f.write('<COLLADA xmlns="http://www.collada.org/2005/11/COLLADASchema" version="1.4.1">\n')
+        f.write('<asset><unit name="meter" meter="1"/><up_axis>Y_UP</up_axis></asset>\n')
+        f.write('<library_geometries><geometry id="{0}-mesh" name="{0}"><mesh>\n'.format(name))
+        f.write(float_source(name + "-positions", positions, 3) + "\n")
+        f.write(float_source(name + "-normals", normals, 3) + "\n")
+        f.write(float_source(name + "-texcoords", texcoords, 2) + "\n")
+        f.write('<vertices id="{0}-vertices"><input semantic="POSITION" source="#{0}-positions"/></vertices>\n'.format(name))
+        f.write('<triangles count="%d">' % (len(triangles) // 3))
+        f.write('<input semantic="VERTEX" source="#{0}-vertices" offset="0"/>'
+                '<input semantic="NORMAL" source="#{0}-normals" offset="1"/>'
+                '<input semantic="TEXCOORD" source="#{0}-texcoords" offset="2" set="0"/>'.format(name))
+        f.write('<p>%s</p></triangles>\n' % " ".join("%d %d %d" % (i, i, i) for i in triangles))
+        f.write('</mesh></geometry></library_geometries>\n')
+        f.write('<library_visual_scenes><visual_scene id="Scene" name="Scene">'
+                '<node id="{0}" name="{0}" type="NODE"><instance_geometry url="#{0}-mesh"/></node>'
+                '</visual_scene></library_visual_scenes>\n'.format(name))
+        f.write('</COLLADA>\n')
+
+
+def generate_mesh_files(directory, grid_size):
+    """ :return: list of generated .obj and .dae files """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    obj_filepath = os.path.join(directory, "synthetic_grid_%d.obj" % grid_size)
+    collada_filepath = os.path.join(directory, "synthetic_grid_%d.dae" % grid_size)
+    write_obj_grid(obj_filepath, grid_size)
+    write_collada_grid(collada_filepath, grid_size)
+    return [obj_filepath, collada_filepath]
+
+
+def get_material_variant_macros(count):
+    """ distinct macro sets of the default shader. """
+    macros_list = []
+    for i in range(count):
+        macros_list.append(dict(SKELETAL=i % 2, TRANSPARENT_MATERIAL=(i // 2) % 2, BENCHMARK_VARIANT=i))
+    return macros_list
+
+
+def get_random_positions(random_state, count, extent):
+    positions = random_state.uniform(-extent, extent, (count, 3)).astype(np.float32)
+    positions[:, 1] = random_state.uniform(0.0, extent * 0.05, count)
+    return positions
+
+
+def create_lod_model(resource_manager, obj_filepath):
+    """ registers the model of the grid with the generated LODs, it is not saved. """
+    model = resource_manager.get_model(LOD_MODEL_NAME)
+    if model is not None:
+        return model
+    mesh_data = OBJ(obj_filepath, 1, True).get_mesh_data()
+    mesh_data['lod_datas'] = generate_lod_datas(mesh_data['geometry_datas'])
+    mesh = Mesh(LOD_MODEL_NAME, **mesh_data)
+    model = Model(LOD_MODEL_NAME, mesh=mesh)
+    resource_manager.mesh_loader.create_resource(LOD_MODEL_NAME, mesh)
+    resource_manager.model_loader.create_resource(LOD_MODEL_NAME, model)
+    return model
+
+
+def build_synthetic_scene(core_manager, scene_option, mesh_files=()):
+    """
+    builds a new scene in the scene manager and returns its save data.
+    the LOD actors use the generated .obj grid of mesh_files.
+    """
+    resource_manager = core_manager.resource_manager
+    scene_manager = core_manager.scene_manager
+    random_state = np.random.RandomState(scene_option.seed)
+    extent = scene_option.scene_extent
+
+    scene_manager.new_scene()
+
+    static_models = [resource_manager.get_model(model_name) for model_name in STATIC_MODEL_NAMES]
+    static_models = [model for model in static_models if model is not None]
+    if static_models:
+        positions = get_random_positions(random_state, scene_option.static_actor_count, extent)
+        rotations = random_state.uniform(0.0, 6.28318, (scene_option.static_actor_count, 3))
+        for i in range(scene_option.static_actor_count):
+            scene_manager.add_object(model=static_models[i % len(static_models)],
+                                     pos=positions[i],
+                                     rot=rotations[i])
+
+    obj_filepaths = [filepath for filepath in mesh_files if os.path.splitext(filepath)[1].lower() == '.obj']
+    if obj_filepaths:
+        lod_model = create_lod_model(resource_manager, obj_filepaths[0])
+        positions = get_random_positions(random_state, scene_option.lod_actor_count, extent)
+        for i in range(scene_option.lod_actor_count):
+            scene_manager.add_object(model=lod_model, pos=positions[i], scale=[LOD_ACTOR_SCALE] * 3)
+
+    skeleton_model = resource_manager.get_model(SKELETON_MODEL_NAME)
+    if skeleton_model is not None:
+        positions = get_random_positions(random_state, scene_option.skeleton_actor_count, extent)
+        for i in range(scene_option.skeleton_actor_count):
+            scene_manager.add_object(model=skeleton_model, pos=positions[i])
+
+    positions = get_random_positions(random_state, scene_option.effect_count, extent)
+    for i in range(scene_option.effect_count):
+        scene_manager.add_effect(effect_info=EFFECT_NAME, pos=positions[i])
+
+    positions = get_random_positions(random_state, scene_option.point_light_count, extent)
+    colors = random_state.uniform(0.0, 10.0, (scene_option.point_light_count, 3)).astype(np.float32)
+    radius = random_state.uniform(1.0, 20.0, scene_option.point_light_count)
+    for i in range(scene_option.point_light_count):
+        scene_manager.add_light(pos=positions[i], light_color=colors[i], light_radius=radius[i])
+
+    return scene_manager.get_save_data()
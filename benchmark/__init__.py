@@ -0,0 +1,13 @@
+"""
+Headless benchmark suite of PyEngine3D.
+
+usage : python -m benchmark [--preset small|medium|large] [--output results.json] [--baseline baseline.json]
+quick check : python -m benchmark --preset small --repeat 1 --warmup 0 --frame-count 10 --output results.json
+
+Scenes are generated by SyntheticScene from a fixed seed and every scenario runs without window and GPU,
+so the results of two revisions can be compared.
+"""
+
+# NullGL must be installed before any benchmark module imports OpenGL.
+from PyEngine3D.Common import NullGL
+NullGL.install()
@@ -0,0 +1,57 @@
+import argparse
+import json
+import sys
+
+from . import Benchmark
+from .Scenarios import SCENARIOS
+from .SyntheticScene import SCENE_PRESETS
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="PyEngine3D headless benchmark")
+    parser.add_argument('--preset', default='medium', choices=list(SCENE_PRESETS.keys()))
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS.keys()),
+                        help="scenario to run, can be repeated. default is all scenarios.")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--frame-count', type=int, default=60)
+    parser.add_argument('--project', default="", help="project filename. default is the engine default project.")
+    parser.add_argument('--output', default="", help="write the results to this json file.")
+    parser.add_argument('--baseline', default=Benchmark.DEFAULT_BASELINE_FILE, help="baseline json file to compare.")
+    parser.add_argument('--save-baseline', action='store_true', help="store the results as the new baseline.")
+    parser.add_argument('--threshold', type=float, default=0.1, help="allowed relative slowdown. default is 0.1")
+    args = parser.parse_args(args)
+
+    results = Benchmark.run_benchmark(preset=args.preset,
+                                      scenario_names=args.scenario,
+                                      repeat=args.repeat,
+                                      warmup=args.warmup,
+                                      frame_count=args.frame_count,
+                                      project_filename=args.project)
+    if results is None:
+        sys.stderr.write("Failed to initialize the engine.\n")
+        return 2
+
+    if args.output:
+        Benchmark.save_results(results, args.output)
+    else:
+        json.dump(results, sys.stdout, indent=4, sort_keys=True)
+        sys.stdout.write("\n")
+
+    if args.save_baseline:
+        Benchmark.save_results(results, args.baseline)
+        sys.stdout.write("Saved baseline : %s\n" % args.baseline)
+        return 0
+
+    baseline = Benchmark.load_results(args.baseline)
+    if baseline is None:
+        sys.stdout.write("Not found baseline : %s. Run with --save-baseline to store one.\n" % args.baseline)
+        return 0
+
+    comparisons = Benchmark.compare_results(results, baseline, args.threshold)
+    Benchmark.print_comparisons(comparisons)
+    return 1 if any(comparison['state'] == "regression" for comparison in comparisons) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -69,7 +69,7 @@ def run(editor=GUIEditor.QT, project_filename=""):
     # other process - GUIEditor
     if editor != GUIEditor.CLIENT_MODE:
         appCmdQueue = CustomQueue()
-        uiCmdQueue = CustomQueue()
+        uiCmdQueue = CustomQueue(batch=True)
         pipe1, pipe2 = CustomPipe()
 
         # Select GUI backend
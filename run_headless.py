@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Run PyEngine3D without window and GPU for a fixed number of frames.
+
+usage : python run_headless.py [project_filename] [frame_count]
+"""
+
+import json
+import os
+import sys
+
+# NullGL must be installed before anything imports OpenGL.
+from PyEngine3D.Common import NullGL
+NullGL.install()
+
+from PyEngine3D.App import CoreManager
+from PyEngine3D.App.GameBackend import GameBackNames
+
+
+def run_headless(project_filename="", frame_count=600, camera_script=None):
+    """
+    :param camera_script: camera_script(frame_index, camera). default is orbit_camera_script.
+    :return: (summary, frame_stats) or None
+    """
+    coreManager = CoreManager.instance()
+    if not coreManager.initialize(None, None, None, project_filename, game_backend=GameBackNames.HEADLESS):
+        return None
+
+    game_backend = coreManager.game_backend
+    game_backend.set_frame_count(frame_count)
+    if camera_script is not None:
+        game_backend.set_camera_script(camera_script)
+
+    coreManager.run()
+    return game_backend.get_frame_stats_summary(), game_backend.frame_stats
+
+
+if __name__ == "__main__":
+    project_filename = sys.argv[1] if len(sys.argv) > 1 else ""
+    frame_count = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+
+    if project_filename and not os.path.exists(project_filename):
+        sys.stderr.write("Not found project : %s\n" % project_filename)
+        sys.exit(1)
+
+    result = run_headless(project_filename, frame_count)
+    if result is None:
+        sys.exit(1)
+
+    summary, frame_stats = result
+    print(json.dumps(summary, indent=4))